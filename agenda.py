@@ -1,49 +1,24 @@
-import json
-import os
+"""Agenda pelo terminal (cadeira padrão), com o mesmo núcleo e a mesma gravação da janela."""
 from datetime import datetime
 
-ARQUIVO_AGENDA = "agenda.json"
-
-HORARIO_INICIO = (9, 0)   # 9:00
-HORARIO_FIM = (20, 30)    # 20:30
-INTERVALO_MINUTOS = 30
-
-# Serviços da barbearia
-SERVICOS = {
-    "1": ("Cabelo", 30),
-    "2": ("Barba", 30),
-    "3": ("Cabelo e barba", 60),
-    "4": ("Outro", 30),
-}
-
-def carregar_agenda():
-    if not os.path.exists(ARQUIVO_AGENDA):
-        return {}
-    try:
-        with open(ARQUIVO_AGENDA, "r", encoding="utf-8") as f:
-            return json.load(f)
-    except json.JSONDecodeError:
-        return {}
-
-def salvar_agenda(agenda):
-    with open(ARQUIVO_AGENDA, "w", encoding="utf-8") as f:
-        json.dump(agenda, f, ensure_ascii=False, indent=2)
-
-def gerar_horarios():
-    horarios = []
-    hora, minuto = HORARIO_INICIO
-    fim_hora, fim_minuto = HORARIO_FIM
-    while True:
-        horarios.append(f"{hora:02d}:{minuto:02d}")
-        if hora == fim_hora and minuto == fim_minuto:
-            break
-        minuto += INTERVALO_MINUTOS
-        if minuto >= 60:
-            minuto -= 60
-            hora += 1
-    return horarios
-
-HORARIOS_DIA = gerar_horarios()
+from agenda_expediente import carregar_expediente
+from agenda_nucleo import (
+    CHAVE_CLIENTE_ID,
+    GRANULARIDADE,
+    RECURSO_PADRAO,
+    IndiceOcupacao,
+    carregar_clientes,
+    catalogo,
+    hora_para_minutos,
+    horarios_do_dia,
+    iso_para_br,
+    linhas_do_dia,
+    liberar_atendimento,
+    minutos_para_hora,
+    reservar_atendimento,
+    slot_em,
+)
+from agenda_sincronia import SincroniaAgenda
 
 def pegar_data_usuario():
     while True:
@@ -54,109 +29,128 @@ def pegar_data_usuario():
         except ValueError:
             print("Data inválida. Tente novamente.")
 
-def garantir_dia_na_agenda(agenda, dia):
-    if dia not in agenda:
-        agenda[dia] = {h: None for h in HORARIOS_DIA}
-
-def mostrar_agenda_dia(agenda, dia):
-    garantir_dia_na_agenda(agenda, dia)
-    print(f"\nAgenda do dia {datetime.strptime(dia, '%Y-%m-%d').strftime('%d/%m/%Y')}:")
+def mostrar_agenda_dia(indice, dia):
+    print(f"\nAgenda do dia {iso_para_br(dia)}:")
     print("-" * 40)
-    for h in HORARIOS_DIA:
-        slot = agenda[dia].get(h)
-        if slot is None:
-            status = "LIVRE"
+    for h, inicio, slot, motivo in linhas_do_dia(indice, dia, RECURSO_PADRAO):
+        if slot is not None:
+            continuacao = "" if inicio == h else f" (desde {inicio})"
+            status = f"OCUPADO - {slot.get('cliente', '')} ({slot.get('servico', '')}){continuacao}"
+        elif motivo:
+            status = f"FECHADO - {motivo}"
         else:
-            status = f"OCUPADO - {slot['cliente']} ({slot['servico']})"
+            status = "LIVRE"
         print(f"{h} - {status}")
     print("-" * 40)
 
-def escolher_servico():
+def escolher_servico(dia):
+    servicos = list(catalogo.servicos(dia).items())
     print("\nEscolha o serviço:")
-    for k, (nome, duracao) in SERVICOS.items():
-        print(f"{k} - {nome} ({duracao} min)")
+    for k, (nome, duracao) in enumerate(servicos, start=1):
+        print(f"{k} - {nome} ({duracao} min) - R$ {catalogo.preco(nome, dia):.2f}")
     while True:
         op = input("Opção: ").strip()
-        if op in SERVICOS:
-            return SERVICOS[op]
+        if op.isdigit() and 1 <= int(op) <= len(servicos):
+            return servicos[int(op) - 1]
         print("Opção inválida.")
 
-def agendar_horario(agenda):
+def gravar(sincronia, indice):
+    """Salva com a trava; dias trazidos de outro terminal têm o índice refeito."""
+    try:
+        resultado = sincronia.salvar(indice.agenda)
+    except TimeoutError as e:
+        print(f"⚠️ {e} A mudança vai junto na próxima gravação.")
+        return False
+    for dia in resultado.recarregados:
+        indice.invalidar(dia)
+    if resultado.conflitos:
+        print("⚠️ Não gravado, o horário foi ocupado em outro terminal:")
+        for linha in resultado.mensagens_conflito():
+            print(f"   {linha}")
+        return False
+    return True
+
+def atualizar_do_disco(sincronia, indice):
+    """Traz o que outro terminal gravou desde a última leitura (só stat se nada mudou)."""
+    try:
+        for dia in sincronia.recarregar_alterados(indice.agenda):
+            indice.invalidar(dia)
+    except TimeoutError:
+        pass
+
+def agendar_horario(sincronia, indice):
     dia = pegar_data_usuario()
-    garantir_dia_na_agenda(agenda, dia)
-    mostrar_agenda_dia(agenda, dia)
+    atualizar_do_disco(sincronia, indice)
+    mostrar_agenda_dia(indice, dia)
 
     cliente = input("Nome do cliente: ").strip()
-    servico_nome, duracao = escolher_servico()
+    servico_nome, duracao = escolher_servico(dia)
     obs = input("Observações (opcional): ").strip()
 
-    # quantos blocos de 30 min o serviço ocupa
-    blocos = duracao // INTERVALO_MINUTOS
-
     while True:
         hora_escolhida = input("Digite o horário inicial (ex: 09:00): ").strip()
-        if hora_escolhida not in HORARIOS_DIA:
+        minutos = hora_para_minutos(hora_escolhida)
+        if minutos is None:
             print("Horário inválido. Tente novamente.")
             continue
-
-        indice = HORARIOS_DIA.index(hora_escolhida)
-        if indice + blocos - 1 >= len(HORARIOS_DIA):
-            print("Esse serviço não cabe até o fim do expediente. Escolha outro horário.")
+        hora_escolhida = minutos_para_hora(minutos)  # "9:00" -> "09:00"
+        if not indice.aberto(dia, hora_escolhida, duracao):
+            print("Esse serviço não cabe no expediente desse horário. Escolha outro.")
             continue
-
-        blocos_horarios = HORARIOS_DIA[indice : indice + blocos]
-
-        # verifica se todos os blocos estão livres
-        if any(agenda[dia][h] is not None for h in blocos_horarios):
+        if hora_escolhida not in horarios_do_dia(indice, dia):
+            print(f"Os atendimentos começam de {GRANULARIDADE} em {GRANULARIDADE} minutos (ex: 09:00, 09:15). Escolha outro.")
+            continue
+        if not indice.cabe(dia, RECURSO_PADRAO, hora_escolhida, duracao):
             print("Um dos horários desse período já está ocupado. Escolha outro.")
             continue
+        break
 
-        # reservar blocos
-        for h in blocos_horarios:
-            agenda[dia][h] = {
-                "cliente": cliente,
-                "servico": servico_nome,
-                "duracao": duracao,
-                "obs": obs,
-                "inicio": hora_escolhida,
-            }
-        salvar_agenda(agenda)
+    clientes = carregar_clientes()
+    reservar_atendimento(indice, dia, RECURSO_PADRAO, hora_escolhida, {
+        "cliente": cliente,
+        CHAVE_CLIENTE_ID: clientes.id_de(cliente),
+        "servico": servico_nome,
+        "duracao": duracao,
+        "obs": obs,
+        "preco": catalogo.preco(servico_nome, dia),
+        "pago": False,
+        "extras": [],
+        "pacote": False,
+        "pacote_nome": None,
+        "pacote_valor_mensal": 0.0,
+        "status": "pendente",
+    })
+    if gravar(sincronia, indice):
         print(f"\n✅ Agendado {servico_nome} para {cliente} em {hora_escolhida} ({duracao} min).")
-        break
 
-def cancelar_horario(agenda):
+def cancelar_horario(sincronia, indice):
     dia = pegar_data_usuario()
-    garantir_dia_na_agenda(agenda, dia)
-    mostrar_agenda_dia(agenda, dia)
+    atualizar_do_disco(sincronia, indice)
+    mostrar_agenda_dia(indice, dia)
 
     hora = input("Digite o horário a cancelar (ex: 09:00): ").strip()
-    if hora not in HORARIOS_DIA:
+    if hora_para_minutos(hora) is None:
         print("Horário inválido.")
         return
 
-    slot = agenda[dia].get(hora)
+    # qualquer meia hora do atendimento serve: acha o horário inicial
+    inicio, slot = slot_em(indice, dia, RECURSO_PADRAO, hora)
     if slot is None:
         print("Esse horário já está livre.")
         return
 
-    inicio = slot["inicio"]
-    duracao = slot["duracao"]
-    blocos = duracao // INTERVALO_MINUTOS
-    indice_inicio = HORARIOS_DIA.index(inicio)
-    blocos_horarios = HORARIOS_DIA[indice_inicio : indice_inicio + blocos]
-
-    confirm = input(f"Confirmar cancelamento de {slot['servico']} de {slot['cliente']} às {inicio}? (s/n) ").strip().lower()
+    confirm = input(f"Confirmar cancelamento de {slot.get('servico', '')} de {slot.get('cliente', '')} às {inicio}? (s/n) ").strip().lower()
     if confirm != "s":
         print("Cancelamento abortado.")
         return
 
-    for h in blocos_horarios:
-        agenda[dia][h] = None
-    salvar_agenda(agenda)
-    print("✅ Horário cancelado com sucesso.")
+    liberar_atendimento(indice, dia, RECURSO_PADRAO, inicio)
+    if gravar(sincronia, indice):
+        print("✅ Horário cancelado com sucesso.")
 
 def menu():
-    agenda = carregar_agenda()
+    sincronia = SincroniaAgenda()
+    indice = IndiceOcupacao(sincronia.carregar(), carregar_expediente())
     while True:
         print("\n" + "=" * 40)
         print("   AGENDA - BARBEARIA CAVALHEIROS")
@@ -169,12 +163,12 @@ def menu():
 
         if opcao == "1":
             dia = pegar_data_usuario()
-            garantir_dia_na_agenda(agenda, dia)
-            mostrar_agenda_dia(agenda, dia)
+            atualizar_do_disco(sincronia, indice)
+            mostrar_agenda_dia(indice, dia)
         elif opcao == "2":
-            agendar_horario(agenda)
+            agendar_horario(sincronia, indice)
         elif opcao == "3":
-            cancelar_horario(agenda)
+            cancelar_horario(sincronia, indice)
         elif opcao == "4":
             print("Saindo da agenda. Até mais!")
             break
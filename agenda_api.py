@@ -0,0 +1,517 @@
+"""
+API local HTTP/JSON da agenda, para um tablet na cadeira ou uma segunda tela.
+
+Uso:
+    python agenda_api.py [--host 0.0.0.0] [--porta 8765]
+
+Rotas (datas em AAAA-MM-DD, horas em HH:MM):
+    GET    /saude
+    GET    /dia/<data>[?recurso=...]
+    GET    /livres?data=<data>&servico=Cabelo[&duracao=45][&recurso=...]
+    GET    /relatorio?inicio=<data>&fim=<data>
+    GET    /telefone/<numero>
+    POST   /agendamentos                      {"data", "hora", "cliente", "servico", "recurso", "obs"}
+    DELETE /agendamentos/<data>/<hora>[?recurso=...]
+    POST   /agendamentos/<data>/<hora>/status {"status", "recurso"}
+"""
+import argparse
+import json
+import threading
+import time
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from agenda_arquivo_morto import ArquivoMorto, resumo_periodo
+from agenda_caixa import LivroCaixa
+from agenda_clientes import identificar_telefone
+from agenda_diagnostico import medido
+from agenda_espera import ListaEspera
+from agenda_expediente import carregar_expediente
+from agenda_nucleo import (
+    ARQUIVO_CLIENTES,
+    CHAVE_CLIENTE_ID,
+    GRANULARIDADE,
+    RECURSOS,
+    RECURSO_PADRAO,
+    IndiceOcupacao,
+    atualizar_atendimento,
+    carregar_clientes,
+    catalogo,
+    fazer_backup,
+    dia_semana_br,
+    hora_para_minutos,
+    horarios_do_dia,
+    iso_para_br,
+    liberar_atendimento,
+    linhas_do_dia,
+    migrar_agenda_para_ids,
+    nome_do_registro,
+    reservar_atendimento,
+    salvar_clientes,
+    slot_em,
+)
+from agenda_pacotes import FaturasPacote, resumo_pacotes
+from agenda_sincronia import SincroniaAgenda, assinatura_arquivo
+
+HOST_PADRAO = "127.0.0.1"
+PORTA_PADRAO = 8765
+JANELA_LOTE_S = 0.05            # espera para juntar escritas num só salvar
+ESPERA_GRAVACAO_S = 15.0        # quanto uma escrita espera pela gravação
+VERIFICAR_OUTRO_TERMINAL_S = 5.0
+CONEXAO_OCIOSA_S = 30           # fecha conexões keep-alive paradas
+TAMANHO_MAX_CORPO = 64 * 1024
+STATUS_VALIDOS = ("pendente", "confirmado", "remarcar", "cancelado")
+
+class ErroApi(Exception):
+    def __init__(self, codigo, mensagem):
+        super().__init__(mensagem)
+        self.codigo = codigo
+        self.mensagem = mensagem
+
+# ---------- ESTADO COMPARTILHADO ----------
+
+class EstadoAgenda:
+    """Agenda, clientes e índice na memória, protegidos por uma trava."""
+
+    def __init__(self, sincronia=None):
+        self.trava = threading.RLock()
+        self.sincronia = sincronia or SincroniaAgenda()
+        self.agenda = self.sincronia.carregar()
+        self.ocupacao = IndiceOcupacao(self.agenda, carregar_expediente())
+        self.arquivo = ArquivoMorto()
+        self.livro = LivroCaixa()
+        self.faturas = FaturasPacote()
+        self.espera = ListaEspera(self.ocupacao)
+        self._clientes = None
+        self._assinatura_clientes = None
+        self.clientes()
+
+    def clientes(self):
+        """clientes.json, relido só quando o arquivo muda (ex.: cadastro pela janela)."""
+        with self.trava:
+            assinatura = assinatura_arquivo(ARQUIVO_CLIENTES)
+            if assinatura != self._assinatura_clientes:
+                self._clientes = carregar_clientes()
+                if self._clientes.migrado:
+                    # mesmo passo da janela: backup, liga a agenda aos ids e grava os dois arquivos
+                    fazer_backup()
+                    migrar_agenda_para_ids(self.agenda, self._clientes)
+                    salvar_clientes(self._clientes)
+                    self.sincronia.salvar(self.agenda)
+                    assinatura = assinatura_arquivo(ARQUIVO_CLIENTES)
+                self._assinatura_clientes = assinatura
+            return self._clientes
+
+    def invalidar(self, dias):
+        for dia in dias:
+            self.ocupacao.invalidar(dia)
+
+class GravadorEmLote(threading.Thread):
+    """
+    Grava a agenda fora das threads de conexão. Cada escrita chama pedir()
+    e espera; o que chegar dentro de JANELA_LOTE_S sai no mesmo salvar().
+    Parado, verifica de tempos em tempos se outro terminal gravou.
+    """
+
+    def __init__(self, estado):
+        super().__init__(name="agenda-gravador", daemon=True)
+        self.estado = estado
+        self._cond = threading.Condition()
+        self._pendentes = []
+        self._parar = False
+
+    def pedir(self):
+        pedido = {"pronto": threading.Event(), "resultado": None, "erro": None}
+        with self._cond:
+            self._pendentes.append(pedido)
+            self._cond.notify()
+        return pedido
+
+    def parar(self):
+        with self._cond:
+            self._parar = True
+            self._cond.notify()
+
+    def run(self):
+        while True:
+            with self._cond:
+                if not self._pendentes and not self._parar:
+                    self._cond.wait(VERIFICAR_OUTRO_TERMINAL_S)
+                parar = self._parar
+                tem_pendentes = bool(self._pendentes)
+
+            if tem_pendentes:
+                time.sleep(JANELA_LOTE_S)
+                with self._cond:
+                    lote, self._pendentes = self._pendentes, []
+                self._gravar(lote)
+            elif not parar:
+                self._recarregar()
+
+            if parar:
+                with self._cond:
+                    if not self._pendentes:
+                        return
+
+    def _gravar(self, lote):
+        estado = self.estado
+        resultado = erro = None
+        with estado.trava:
+            try:
+                resultado = estado.sincronia.salvar(estado.agenda)
+            except TimeoutError as e:
+                # a mudança fica na memória e vai junto no próximo salvar
+                erro = e
+            else:
+                estado.invalidar(resultado.recarregados)
+        for pedido in lote:
+            pedido["resultado"] = resultado
+            pedido["erro"] = erro
+            pedido["pronto"].set()
+
+    def _recarregar(self):
+        estado = self.estado
+        catalogo.atualizar()  # preço alterado na janela ou pela linha de comando
+        with estado.trava:
+            try:
+                estado.invalidar(estado.sincronia.recarregar_alterados(estado.agenda))
+            except TimeoutError:
+                pass
+
+# ---------- VALIDAÇÃO ----------
+
+def _data(texto):
+    try:
+        return datetime.strptime(texto or "", "%Y-%m-%d").strftime("%Y-%m-%d")
+    except ValueError:
+        raise ErroApi(400, f"Data inválida: {texto!r} (use AAAA-MM-DD).")
+
+def _hora(texto):
+    if hora_para_minutos(texto or "") is None:
+        raise ErroApi(400, f"Horário inválido: {texto!r} (use HH:MM).")
+    return texto
+
+def _recurso(texto, padrao=None):
+    if not texto:
+        return padrao
+    if texto not in RECURSOS:
+        raise ErroApi(400, f"Cadeira desconhecida: {texto!r}.")
+    return texto
+
+def _duracao(servico, duracao, data_iso):
+    if duracao:
+        try:
+            minutos = int(duracao)
+        except ValueError:
+            raise ErroApi(400, "Duração inválida.")
+        if minutos <= 0:
+            raise ErroApi(400, "Duração inválida.")
+        return minutos
+    servicos = catalogo.servicos(data_iso)
+    if servico not in servicos:
+        raise ErroApi(400, f"Serviço desconhecido: {servico!r}.")
+    return servicos[servico]
+
+def _slot_json(clientes, recurso, inicio, slot, data_iso=None):
+    return {
+        "recurso": recurso,
+        "inicio": inicio,
+        "cliente": nome_do_registro(clientes, slot),
+        "cliente_id": slot.get(CHAVE_CLIENTE_ID),
+        "servico": slot.get("servico", ""),
+        "duracao": slot.get("duracao"),
+        "status": slot.get("status", "pendente"),
+        "pago": bool(slot.get("pago", False)),
+        "preco": float(slot.get("preco", catalogo.preco(slot.get("servico", ""), data_iso))),
+        "extras": slot.get("extras", []),
+        "obs": slot.get("obs", ""),
+        "pacote": bool(slot.get("pacote", False)),
+    }
+
+# ---------- ROTAS ----------
+
+@medido("api_dia")
+def ver_dia(estado, data_iso, recurso=None):
+    recursos = [recurso] if recurso else RECURSOS
+    with estado.trava:
+        grades = {}
+        for r in recursos:
+            linhas = []
+            for h, inicio, slot, motivo in linhas_do_dia(estado.ocupacao, data_iso, r):
+                linha = {"hora": h, "fechado": motivo, "atendimento": None}
+                # só a linha onde o atendimento começa leva os dados
+                if isinstance(slot, dict) and inicio == h:
+                    linha["atendimento"] = _slot_json(estado.clientes(), r, inicio, slot, data_iso)
+                elif inicio:
+                    linha["continua"] = inicio
+                linhas.append(linha)
+            grades[r] = linhas
+    return {
+        "data": data_iso,
+        "data_br": iso_para_br(data_iso),
+        "dia_semana": dia_semana_br(data_iso),
+        "recursos": grades,
+    }
+
+@medido("api_livres")
+def ver_livres(estado, data_iso, duracao, recurso=None):
+    recursos = [recurso] if recurso else RECURSOS
+    with estado.trava:
+        livres = {r: estado.ocupacao.horarios_livres(data_iso, r, duracao) for r in recursos}
+    return {"data": data_iso, "duracao": duracao, "livres": livres}
+
+@medido("api_relatorio")
+def ver_relatorio(estado, inicio_iso, fim_iso):
+    inicio = datetime.strptime(inicio_iso, "%Y-%m-%d")
+    fim = datetime.strptime(fim_iso, "%Y-%m-%d")
+    if fim < inicio:
+        raise ErroApi(400, "O fim vem antes do início.")
+    datas = [(inicio + timedelta(days=i)).strftime("%Y-%m-%d") for i in range((fim - inicio).days + 1)]
+    with estado.trava:
+        resumo = resumo_periodo(estado.agenda, estado.arquivo, datas, fechados=estado.livro.fechados())
+        recebido = {}
+        for data_iso in datas:
+            for forma, valor in estado.livro.totais_do_dia(data_iso).items():
+                recebido[forma] = recebido.get(forma, 0.0) + valor
+    resumo["recebido_por_forma"] = recebido
+    # pacotes são cobrados por fatura mensal, fora de total_servicos
+    resumo["pacotes"] = resumo_pacotes(estado.faturas, sorted({d[:7] for d in datas}))
+    resumo["inicio"] = inicio_iso
+    resumo["fim"] = fim_iso
+    return resumo
+
+def ver_telefone(estado, telefone):
+    with estado.trava:
+        achados = identificar_telefone(estado.clientes(), estado.agenda, telefone)
+    for a in achados:
+        if a["proximo"] is not None:
+            data_iso, recurso, hora, servico = a["proximo"]
+            a["proximo"] = {"data": data_iso, "recurso": recurso, "hora": hora, "servico": servico}
+    return {"telefone": telefone, "clientes": achados}
+
+def _esperar_gravacao(gravador, data_iso, recurso, inicio):
+    """Espera o salvar() em lote; 409 se o horário ficou com outro terminal."""
+    pedido = gravador.pedir()
+    if not pedido["pronto"].wait(ESPERA_GRAVACAO_S) or pedido["erro"] is not None:
+        raise ErroApi(503, "Não foi possível gravar agora; a mudança vai no próximo salvamento.")
+    for dia, r, h, _slot in pedido["resultado"].conflitos:
+        if (dia, r, h) == (data_iso, recurso, inicio):
+            raise ErroApi(409, "Esse horário foi ocupado em outro terminal.")
+    return pedido["resultado"]
+
+@medido("api_agendar")
+def agendar(estado, gravador, dados):
+    data_iso = _data(dados.get("data"))
+    hora = _hora(dados.get("hora"))
+    servico = dados.get("servico") or ""
+    duracao = _duracao(servico, None, data_iso)
+    nome = (dados.get("cliente") or "").strip()
+    recurso = _recurso(dados.get("recurso"))
+
+    with estado.trava:
+        if nome not in estado.clientes():
+            raise ErroApi(400, "Cliente não cadastrado.")
+        if not estado.ocupacao.aberto(data_iso, hora, duracao):
+            raise ErroApi(409, "Esse horário está fora do expediente (fechado, pausa ou bloqueio).")
+        if hora not in horarios_do_dia(estado.ocupacao, data_iso):
+            raise ErroApi(400, f"Os atendimentos começam de {GRANULARIDADE} em {GRANULARIDADE} minutos.")
+        if recurso is None:
+            livres = estado.ocupacao.recursos_livres(data_iso, hora, duracao)
+            if not livres:
+                raise ErroApi(409, "Nenhuma cadeira livre nesse período.")
+            recurso = livres[0]
+        elif not estado.ocupacao.cabe(data_iso, recurso, hora, duracao):
+            raise ErroApi(409, "Um ou mais horários desse período já estão ocupados.")
+
+        slot = reservar_atendimento(estado.ocupacao, data_iso, recurso, hora, {
+            "cliente": nome,
+            CHAVE_CLIENTE_ID: estado.clientes().id_de(nome),
+            "servico": servico,
+            "duracao": duracao,
+            "obs": (dados.get("obs") or "").strip(),
+            "preco": catalogo.preco(servico, data_iso),
+            "pago": False,
+            "extras": [],
+            "pacote": False,
+            "pacote_nome": None,
+            "pacote_valor_mensal": 0.0,
+            "status": "pendente",
+        })
+        resposta = _slot_json(estado.clientes(), recurso, hora, slot, data_iso)
+
+    _esperar_gravacao(gravador, data_iso, recurso, hora)
+    resposta["data"] = data_iso
+    return resposta
+
+@medido("api_cancelar")
+def cancelar(estado, gravador, data_iso, hora, recurso):
+    with estado.trava:
+        inicio, slot = slot_em(estado.ocupacao, data_iso, recurso, hora)
+        if slot is None:
+            raise ErroApi(404, "Agendamento não encontrado.")
+        liberar_atendimento(estado.ocupacao, data_iso, recurso, inicio)
+        resposta = _slot_json(estado.clientes(), recurso, inicio, slot, data_iso)
+    try:
+        resultado = _esperar_gravacao(gravador, data_iso, recurso, inicio)
+    except ErroApi as e:
+        if e.codigo == 409:
+            with estado.trava:
+                estado.espera.esquecer(data_iso)
+        raise   # 503: a mudança vai no próximo salvamento e a vaga continua anotada
+    resposta["data"] = data_iso
+
+    # a vaga só vai para a lista de espera depois de gravada; dia mesclado com
+    # outro terminal fica de fora (o horário pode não estar mais livre)
+    resposta["ofertas_espera"] = 0
+    with estado.trava:
+        if data_iso in resultado.recarregados or any(c[0] == data_iso for c in resultado.conflitos):
+            estado.espera.esquecer(data_iso)
+            return resposta
+        try:
+            resposta["ofertas_espera"] = len(estado.espera.processar(dias={data_iso}))
+        except (OSError, TimeoutError):
+            resposta["ofertas_espera"] = None   # a vaga continua anotada para a próxima vez
+    return resposta
+
+@medido("api_status")
+def mudar_status(estado, gravador, data_iso, hora, recurso, status):
+    if status not in STATUS_VALIDOS:
+        raise ErroApi(400, f"Status inválido: {status!r}.")
+    with estado.trava:
+        inicio, slot = slot_em(estado.ocupacao, data_iso, recurso, hora)
+        if slot is None:
+            raise ErroApi(404, "Agendamento não encontrado.")
+        slot = atualizar_atendimento(estado.ocupacao, data_iso, recurso, inicio, status=status)
+        resposta = _slot_json(estado.clientes(), recurso, inicio, slot, data_iso)
+    _esperar_gravacao(gravador, data_iso, recurso, inicio)
+    resposta["data"] = data_iso
+    return resposta
+
+# ---------- HTTP ----------
+
+class ManipuladorApi(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"   # keep-alive
+    timeout = CONEXAO_OCIOSA_S
+    server_version = "AgendaCavalheiros/1.0"
+
+    def log_message(self, formato, *args):
+        pass  # o tempo das rotas vai para o diagnóstico (agenda_diagnostico)
+
+    def _responder(self, codigo, dados):
+        corpo = json.dumps(dados, ensure_ascii=False).encode("utf-8")
+        self.send_response(codigo)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(corpo)))
+        self.end_headers()
+        self.wfile.write(corpo)
+
+    def _corpo(self):
+        try:
+            tamanho = int(self.headers.get("Content-Length") or 0)
+        except ValueError:
+            raise ErroApi(400, "Content-Length inválido.")
+        if tamanho > TAMANHO_MAX_CORPO:
+            raise ErroApi(413, "Corpo grande demais.")
+        if not tamanho:
+            return {}
+        try:
+            dados = json.loads(self.rfile.read(tamanho).decode("utf-8"))
+        except (UnicodeDecodeError, json.JSONDecodeError):
+            raise ErroApi(400, "JSON inválido.")
+        if not isinstance(dados, dict):
+            raise ErroApi(400, "O corpo deve ser um objeto JSON.")
+        return dados
+
+    def _tratar(self, metodo):
+        try:
+            # lê o corpo sempre, para não sobrar lixo na conexão keep-alive
+            corpo = self._corpo() if metodo in ("POST", "DELETE") else {}
+            partes = urlsplit(self.path)
+            caminho = [unquote(p) for p in partes.path.strip("/").split("/") if p]
+            query = {k: v[-1] for k, v in parse_qs(partes.query).items()}
+            codigo, dados = self.server.rotear(metodo, caminho, query, corpo)
+        except ErroApi as e:
+            codigo, dados = e.codigo, {"erro": e.mensagem}
+        except Exception as e:
+            codigo, dados = 500, {"erro": f"Erro interno: {e}"}
+        self._responder(codigo, dados)
+
+    def do_GET(self):
+        self._tratar("GET")
+
+    def do_POST(self):
+        self._tratar("POST")
+
+    def do_DELETE(self):
+        self._tratar("DELETE")
+
+class ServidorApi(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 64
+
+    def __init__(self, endereco, estado=None):
+        super().__init__(endereco, ManipuladorApi)
+        self.estado = estado or EstadoAgenda()
+        self.gravador = GravadorEmLote(self.estado)
+        self.gravador.start()
+
+    def rotear(self, metodo, caminho, query, corpo):
+        estado, gravador = self.estado, self.gravador
+
+        if metodo == "GET":
+            if caminho == ["saude"]:
+                return 200, {"ok": True, "recursos": RECURSOS, "servicos": catalogo.servicos()}
+            if len(caminho) == 2 and caminho[0] == "dia":
+                return 200, ver_dia(estado, _data(caminho[1]), _recurso(query.get("recurso")))
+            if caminho == ["livres"]:
+                servico = query.get("servico", "")
+                data_iso = _data(query.get("data"))
+                return 200, ver_livres(
+                    estado,
+                    data_iso,
+                    _duracao(servico, query.get("duracao"), data_iso),
+                    _recurso(query.get("recurso")),
+                )
+            if caminho == ["relatorio"]:
+                return 200, ver_relatorio(estado, _data(query.get("inicio")), _data(query.get("fim")))
+            if len(caminho) == 2 and caminho[0] == "telefone":
+                return 200, ver_telefone(estado, caminho[1])
+
+        if caminho and caminho[0] == "agendamentos":
+            if metodo == "POST" and len(caminho) == 1:
+                return 201, agendar(estado, gravador, corpo)
+            if metodo == "DELETE" and len(caminho) == 3:
+                recurso = _recurso(query.get("recurso") or corpo.get("recurso"), padrao=RECURSO_PADRAO)
+                return 200, cancelar(estado, gravador, _data(caminho[1]), _hora(caminho[2]), recurso)
+            if metodo == "POST" and len(caminho) == 4 and caminho[3] == "status":
+                recurso = _recurso(corpo.get("recurso") or query.get("recurso"), padrao=RECURSO_PADRAO)
+                return 200, mudar_status(
+                    estado, gravador, _data(caminho[1]), _hora(caminho[2]), recurso, corpo.get("status")
+                )
+
+        raise ErroApi(404, "Rota não encontrada.")
+
+    def server_close(self):
+        self.gravador.parar()
+        self.gravador.join(ESPERA_GRAVACAO_S)
+        super().server_close()
+
+def main():
+    parser = argparse.ArgumentParser(description="API local HTTP/JSON da agenda.")
+    parser.add_argument("--host", default=HOST_PADRAO,
+                        help="use 0.0.0.0 para aceitar tablets da rede local")
+    parser.add_argument("--porta", type=int, default=PORTA_PADRAO)
+    args = parser.parse_args()
+
+    servidor = ServidorApi((args.host, args.porta))
+    print(f"Agenda em http://{args.host}:{args.porta} (Ctrl+C para parar)")
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servidor.server_close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,324 @@
+"""
+Arquivo morto: meses fechados saem do agenda.json para
+arquivo_morto/agenda_AAAA.json.gz, com os resumos em indice.json.
+"""
+import gzip
+import json
+import os
+import re
+import stat
+from collections.abc import Mapping
+from datetime import datetime
+
+from agenda_nucleo import (
+    CHAVE_CLIENTE_ID,
+    CHAVE_VENDAS,
+    atendimentos_do_dia,
+    buscar_registros_cliente,
+    calcular_resumo_datas,
+    somar_resumos,
+)
+from agenda_sincronia import assinatura_arquivo, gravar_json, ler_json
+
+PASTA_ARQUIVO = "arquivo_morto"
+ARQUIVO_INDICE = "indice.json"
+MAX_ANOS_EM_MEMORIA = 2
+PADRAO_DATA = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+
+# ---------- O QUE PODE SER ARQUIVADO ----------
+
+def dia_quitado(dia):
+    """Tudo pago no dia? Atendimento cancelado não conta."""
+    if not isinstance(dia, dict):
+        return True
+    for _recurso, _hora, slot in atendimentos_do_dia(dia):
+        if slot.get("status") != "cancelado" and not slot.get("pago", False):
+            return False
+    vendas = dia.get(CHAVE_VENDAS, [])
+    if isinstance(vendas, list):
+        for v in vendas:
+            if isinstance(v, dict) and not v.get("pago", True):
+                return False
+    return True
+
+def dias_por_mes(agenda):
+    """{'AAAA-MM': [datas ISO]} dos dias da agenda."""
+    meses = {}
+    for data_iso, dia in list(agenda.items()):
+        if PADRAO_DATA.match(data_iso) and isinstance(dia, dict):
+            meses.setdefault(data_iso[:7], []).append(data_iso)
+    return meses
+
+def meses_para_arquivar(agenda, corte_iso):
+    """
+    Meses inteiros antes de `corte_iso` (AAAA-MM-DD).
+    Retorna (fechados, com_pendencia): listas de 'AAAA-MM' em ordem.
+    """
+    limite = corte_iso[:7]
+    fechados = []
+    com_pendencia = []
+    for mes, datas in sorted(dias_por_mes(agenda).items()):
+        if mes >= limite:
+            continue
+        if all(dia_quitado(agenda[d]) for d in datas):
+            fechados.append(mes)
+        else:
+            com_pendencia.append(mes)
+    return fechados, com_pendencia
+
+def corte_padrao(hoje=None):
+    """1º de janeiro do ano corrente: arquiva os anos que já passaram."""
+    hoje = hoje or datetime.now()
+    return f"{hoje.year}-01-01"
+
+def _chave_cliente(registro):
+    if registro.get(CHAVE_CLIENTE_ID):
+        return registro[CHAVE_CLIENTE_ID]
+    return "nome:" + (registro.get("cliente") or "").strip()
+
+def _clientes_dos_dias(dias):
+    """{id (ou 'nome:...'): quantidade de registros} de um conjunto de dias."""
+    clientes = {}
+    for dia in dias.values():
+        registros = [slot for _r, _h, slot in atendimentos_do_dia(dia)]
+        vendas = dia.get(CHAVE_VENDAS, [])
+        if isinstance(vendas, list):
+            registros += [v for v in vendas if isinstance(v, dict)]
+        for registro in registros:
+            chave = _chave_cliente(registro)
+            clientes[chave] = clientes.get(chave, 0) + 1
+    return clientes
+
+# ---------- ARQUIVO ----------
+
+class ArquivoMorto:
+    """Anos arquivados em `pasta`: um .json.gz por ano e o indice.json com os resumos."""
+
+    def __init__(self, pasta=PASTA_ARQUIVO):
+        self.pasta = pasta
+        self._anos_lidos = {}   # ano -> (assinatura do arquivo, dias)
+        self.recarregar()
+
+    @property
+    def caminho_indice(self):
+        return os.path.join(self.pasta, ARQUIVO_INDICE)
+
+    def recarregar(self):
+        """Relê o indice.json (pequeno; os .gz só são abertos quando preciso)."""
+        self._assinatura = assinatura_arquivo(self.caminho_indice)
+        self.indice = ler_json(self.caminho_indice)
+        self.indice.setdefault("anos", {})
+        self._dias = {d for info in self.meses().values() for d in info["dias"]}
+
+    def atualizar(self):
+        """Relê o índice só se outro terminal arquivou algo desde a última leitura (só stat)."""
+        if assinatura_arquivo(self.caminho_indice) != self._assinatura:
+            self.recarregar()
+
+    def anos(self):
+        return sorted(self.indice["anos"])
+
+    def meses(self):
+        """{'AAAA-MM': {'dias': [...], 'resumo': {...}}} de todos os anos."""
+        return {
+            mes: info
+            for ano in self.anos()
+            for mes, info in self.indice["anos"][ano]["meses"].items()
+        }
+
+    def dias(self):
+        return sorted(self._dias)
+
+    def tem_dia(self, data_iso):
+        return data_iso in self._dias
+
+    def dias_do_mes(self, ano, mes):
+        info = self.indice["anos"].get(str(ano), {}).get("meses", {}).get(f"{ano}-{mes:02d}")
+        return list(info["dias"]) if info else []
+
+    def _caminho(self, ano):
+        return os.path.join(self.pasta, f"agenda_{ano}.json.gz")
+
+    def ler_ano(self, ano):
+        """Dias de um ano arquivado ({data_iso: dia}); os últimos anos lidos ficam na memória."""
+        caminho = self._caminho(ano)
+        assinatura = assinatura_arquivo(caminho)
+        if assinatura is None:
+            return {}
+        lido = self._anos_lidos.get(ano)
+        if lido is not None and lido[0] == assinatura:
+            return lido[1]
+        with gzip.open(caminho, "rt", encoding="utf-8") as f:
+            dias = json.load(f)
+        self._anos_lidos[ano] = (assinatura, dias)
+        while len(self._anos_lidos) > MAX_ANOS_EM_MEMORIA:
+            del self._anos_lidos[next(iter(self._anos_lidos))]
+        return dias
+
+    def dia(self, data_iso):
+        """O dia arquivado (dict) ou None."""
+        if not self.tem_dia(data_iso):
+            return None
+        return self.ler_ano(data_iso[:4]).get(data_iso)
+
+    # --- gravação ---
+    def _gravar_ano(self, ano, dias):
+        """Grava o .gz num temporário, confere lendo de volta e só então troca o do ano."""
+        caminho = self._caminho(ano)
+        temporario = caminho + ".tmp"
+        try:
+            with gzip.open(temporario, "wt", encoding="utf-8") as f:
+                json.dump(dias, f, ensure_ascii=False, sort_keys=True)
+            with gzip.open(temporario, "rt", encoding="utf-8") as f:
+                if json.load(f) != dias:
+                    raise OSError(f"O arquivo de {ano} não foi gravado direito.")
+            if os.path.exists(caminho):
+                os.chmod(caminho, stat.S_IREAD | stat.S_IWRITE)
+            os.replace(temporario, caminho)
+        finally:
+            if os.path.exists(temporario):
+                os.remove(temporario)
+        os.chmod(caminho, stat.S_IREAD | stat.S_IRGRP | stat.S_IROTH)
+        self._anos_lidos.pop(ano, None)
+
+    def _gravar_indice(self):
+        gravar_json(self.caminho_indice, self.indice)
+        self._assinatura = assinatura_arquivo(self.caminho_indice)
+        self._dias = {d for info in self.meses().values() for d in info["dias"]}
+
+    def arquivar(self, agenda, meses, tarefa=None):
+        """
+        Copia os dias dos `meses` ('AAAA-MM') para o arquivo do ano
+        (juntando com o que já estava lá) e refaz os resumos. Não tira
+        nada da agenda: retorna as datas arquivadas para quem chamou tirar.
+        """
+        os.makedirs(self.pasta, exist_ok=True)
+        por_mes = dias_por_mes(agenda)
+        por_ano = {}
+        for mes in sorted(meses):
+            por_ano.setdefault(mes[:4], []).append(mes)
+
+        arquivados = []
+        for pos, (ano, meses_ano) in enumerate(sorted(por_ano.items())):
+            if tarefa is not None:
+                tarefa.passo(pos, len(por_ano))
+            dias = dict(self.ler_ano(ano))
+            info = self.indice["anos"].get(ano) or {
+                "arquivo": os.path.basename(self._caminho(ano)),
+                "meses": {},
+                "clientes": {},
+            }
+            for mes in meses_ano:
+                novos = por_mes.get(mes, [])
+                for data_iso in novos:
+                    dias[data_iso] = agenda[data_iso]
+                todos = sorted(set(info["meses"].get(mes, {}).get("dias", [])) | set(novos))
+                info["meses"][mes] = {
+                    "dias": todos,
+                    "resumo": calcular_resumo_datas(dias, todos),
+                }
+                arquivados += novos
+            info["clientes"] = _clientes_dos_dias(dias)
+            self._gravar_ano(ano, dias)
+            self.indice["anos"][ano] = info
+        self._gravar_indice()
+        return sorted(arquivados)
+
+    # --- consultas ---
+    def buscar(self, agenda, nome, id_cliente=None, tarefa=None):
+        """
+        Registros arquivados do cliente (mesmo formato de
+        buscar_registros_cliente, com "arquivado": True). Só abre os anos
+        em que o cliente aparece; dias que estão na agenda em uso ficam de fora.
+        """
+        chaves = {"nome:" + nome}
+        if id_cliente:
+            chaves.add(id_cliente)
+        anos = [a for a in self.anos() if chaves & set(self.indice["anos"][a].get("clientes", {}))]
+        resultados = []
+        for pos, ano in enumerate(anos):
+            if tarefa is not None:
+                tarefa.passo(pos, len(anos))
+            dias = {d: v for d, v in self.ler_ano(ano).items() if d not in agenda}
+            for r in buscar_registros_cliente(dias, nome, id_cliente=id_cliente):
+                r["arquivado"] = True
+                resultados.append(r)
+        return resultados
+
+def tirar_da_agenda(indice, arquivo, datas_iso):
+    """
+    Tira da agenda em uso (e do índice de ocupação) os dias que estão no
+    arquivo iguais ao daqui. Dia mexido depois de arquivado fica. Retorna os tirados.
+    """
+    tirados = []
+    for data_iso in datas_iso:
+        if data_iso in indice.agenda and arquivo.dia(data_iso) == indice.agenda[data_iso]:
+            del indice.agenda[data_iso]
+            indice.invalidar(data_iso)
+            tirados.append(data_iso)
+    return tirados
+
+def arquivar_meses(indice, arquivo, meses, tarefa=None):
+    """Arquiva os meses e tira os dias da agenda em uso. Retorna as datas tiradas."""
+    return tirar_da_agenda(indice, arquivo, arquivo.arquivar(indice.agenda, meses, tarefa))
+
+def resumo_periodo(agenda, arquivo, datas_iso, tarefa=None, fechados=None):
+    """
+    calcular_resumo_datas das `datas_iso` contando também o arquivo morto.
+    Mês arquivado pedido inteiro usa o resumo guardado; pedaço de mês
+    é calculado lendo o ano arquivado.
+
+    `fechados` ({dia: resumo}, de LivroCaixa.fechados()): dia com caixa
+    fechado entra com o resumo congelado no fechamento.
+    """
+    arquivo.atualizar()
+    fechados = fechados or {}
+    datas = set(datas_iso)
+    resumos = [fechados[d] for d in sorted(datas) if d in fechados]
+    datas -= set(fechados)
+    resumos.append(calcular_resumo_datas(agenda, sorted(d for d in datas if d in agenda), tarefa))
+    for mes, info in arquivo.meses().items():
+        pedidos = [d for d in info["dias"] if d in datas and d not in agenda]
+        if not pedidos:
+            continue
+        if len(pedidos) == len(info["dias"]):
+            resumos.append(info["resumo"])
+        else:
+            resumos.append(calcular_resumo_datas(arquivo.ler_ano(mes[:4]), pedidos))
+    return somar_resumos(resumos)
+
+def buscar_com_arquivo(agenda, arquivo, nome, tarefa=None, id_cliente=None):
+    """buscar_registros_cliente na agenda em uso + registros arquivados, por data/hora."""
+    arquivo.atualizar()
+    resultados = buscar_registros_cliente(agenda, nome, tarefa=tarefa, id_cliente=id_cliente)
+    resultados += arquivo.buscar(agenda, nome, id_cliente=id_cliente, tarefa=tarefa)
+    resultados.sort(key=lambda r: (r["data_iso"], r.get("hora", "--")))
+    return resultados
+
+class AgendaComArquivo(Mapping):
+    """Agenda em uso + dias arquivados, só para leitura (exportação, relatórios)."""
+
+    def __init__(self, agenda, arquivo):
+        self.agenda = agenda
+        self.arquivo = arquivo
+        arquivo.atualizar()
+
+    def __getitem__(self, data_iso):
+        if data_iso in self.agenda:
+            return self.agenda[data_iso]
+        dia = self.arquivo.dia(data_iso)
+        if dia is None:
+            raise KeyError(data_iso)
+        return dia
+
+    def __contains__(self, data_iso):
+        return data_iso in self.agenda or self.arquivo.tem_dia(data_iso)
+
+    def __iter__(self):
+        yield from self.agenda
+        for data_iso in self.arquivo.dias():
+            if data_iso not in self.agenda:
+                yield data_iso
+
+    def __len__(self):
+        return len(self.agenda) + sum(1 for d in self.arquivo.dias() if d not in self.agenda)
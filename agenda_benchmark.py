@@ -0,0 +1,434 @@
+"""
+Benchmark da agenda sobre uma agenda sintética, numa pasta temporária.
+
+Uso:
+    python agenda_benchmark.py [--clientes 500] [--anos 5]
+    python agenda_benchmark.py --saida base.json
+    python agenda_benchmark.py --comparar base.json
+    python agenda_benchmark.py --inicio
+"""
+import argparse
+import ast
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date, timedelta
+
+from agenda_intervalos import minutos_para_hora
+from agenda_nucleo import (
+    ABERTURA,
+    FECHAMENTO,
+    GRANULARIDADE,
+    RECURSOS,
+    ARQUIVO_AGENDA,
+    IndiceOcupacao,
+    buscar_registros_cliente,
+    calcular_resumo_datas,
+    carregar_agenda,
+    catalogo as catalogo_da_loja,
+    garantir_dia_na_agenda,
+    linhas_do_dia,
+    reservar_atendimento,
+    salvar_agenda,
+)
+
+NOMES = [
+    "Lucas", "Julio", "Bugre", "Diclei", "Elizandro", "Gildo", "Marcos", "Rafael",
+    "Bruno", "Thiago", "Felipe", "Gustavo", "André", "Diego", "Vinícius", "Mateus",
+]
+SOBRENOMES = [
+    "Cavalheiro", "Silva", "Souza", "Oliveira", "Pereira", "Ferreira", "Costa",
+    "Rodrigues", "Almeida", "Nascimento", "Lima", "Araújo", "Freitas", "Schmitt",
+]
+STATUS = ["confirmado", "pendente", "remarcar", "cancelado"]
+PESOS_STATUS = [70, 20, 6, 4]
+PACOTE_NOME = "Pacote Mensal 170"
+PACOTE_VALOR = 170.0
+
+# ---------- GERADOR DE DADOS ----------
+
+def gerar_clientes(n, rng):
+    clientes = {}
+    while len(clientes) < n:
+        nome = f"{rng.choice(NOMES)} {rng.choice(SOBRENOMES)}"
+        if nome in clientes:
+            nome = f"{nome} {len(clientes)}"
+        clientes[nome] = {
+            "nasc": f"{rng.randint(1, 28):02d}/{rng.randint(1, 12):02d}",
+            "tel": f"4799{rng.randint(1000000, 9999999)}",
+        }
+    return clientes
+
+def gerar_agenda(clientes, anos, rng, inicio=date(2024, 1, 1), ocupacao=0.6, fracao_pacote=0.1, catalogo=None):
+    """
+    Agenda sintética a partir de `inicio`, `anos` anos, de segunda a sábado.
+
+    Uma fração dos clientes é "fixo": mesmo dia da semana, horário e cadeira
+    toda semana, marcado como pacote. O resto do dia é preenchido ao acaso
+    até mais ou menos a `ocupacao` pedida, sem sobreposição (usa o mesmo
+    reservar_atendimento da interface). Serviços, durações e preços saem do
+    `catalogo` (o da loja, se não vier) na data de cada dia.
+    """
+    catalogo = catalogo or catalogo_da_loja
+    agenda = {}
+    indice = IndiceOcupacao(agenda)
+    nomes = list(clientes)
+    hoje = date.today()
+
+    fixos = []
+    for nome in rng.sample(nomes, int(len(nomes) * fracao_pacote)):
+        fixos.append({
+            "cliente": nome,
+            "dia_semana": rng.randint(0, 5),
+            "inicio": minutos_para_hora(ABERTURA + rng.randrange(0, FECHAMENTO - ABERTURA - 60, 30)),
+            "recurso": rng.choice(RECURSOS),
+        })
+
+    def atendimento(cliente, servico, duracao, dia, produtos, pacote=False):
+        data_iso = dia.isoformat()
+        extras = []
+        if not pacote and produtos and rng.random() < 0.15:
+            for produto in rng.sample(produtos, min(len(produtos), rng.randint(1, 2))):
+                extras.append({"nome": produto, "valor": catalogo.preco(produto, data_iso)})
+        return {
+            "cliente": cliente,
+            "telefone": clientes[cliente].get("tel", ""),
+            "servico": servico,
+            "duracao": duracao,
+            "obs": "Cliente fixo - pacote" if pacote else "",
+            "preco": catalogo.preco(servico, data_iso),
+            "pago": dia < hoje and rng.random() < 0.9,
+            "extras": extras,
+            "pacote": pacote,
+            "pacote_nome": PACOTE_NOME if pacote else None,
+            "pacote_valor_mensal": PACOTE_VALOR if pacote else 0.0,
+            "status": rng.choices(STATUS, PESOS_STATUS)[0],
+        }
+
+    dia = inicio
+    fim = inicio + timedelta(days=365 * anos)
+    semana = 0
+    while dia < fim:
+        if dia.weekday() == 6:  # domingo fechado
+            dia += timedelta(days=1)
+            semana += 1
+            continue
+
+        data_iso = dia.isoformat()
+        garantir_dia_na_agenda(agenda, data_iso)
+        servicos = catalogo.servicos(data_iso)
+        produtos = catalogo.produtos(data_iso)
+
+        for f in fixos:
+            if f["dia_semana"] != dia.weekday():
+                continue
+            servico = "Cabelo e Barba" if semana % 2 == 0 else "Barba"
+            duracao = servicos.get(servico)
+            if duracao and indice.cabe(data_iso, f["recurso"], f["inicio"], duracao):
+                reservar_atendimento(
+                    indice, data_iso, f["recurso"], f["inicio"],
+                    atendimento(f["cliente"], servico, duracao, dia, produtos, pacote=True)
+                )
+
+        for recurso in RECURSOS:
+            m = ABERTURA
+            while servicos and m < FECHAMENTO:
+                servico = rng.choice(list(servicos))
+                duracao = servicos[servico]
+                hora = minutos_para_hora(m)
+                if rng.random() < ocupacao and indice.cabe(data_iso, recurso, hora, duracao):
+                    reservar_atendimento(
+                        indice, data_iso, recurso, hora,
+                        atendimento(rng.choice(nomes), servico, duracao, dia, produtos)
+                    )
+                    m += duracao
+                else:
+                    m += 2 * GRANULARIDADE
+
+        vendas = []
+        for _ in range(rng.choice([0, 0, 0, 1, 1, 2]) if produtos else 0):
+            produto = rng.choice(produtos)
+            vendas.append({
+                "cliente": rng.choice(nomes) if rng.random() < 0.5 else "",
+                "produto": produto,
+                "valor": catalogo.preco(produto, data_iso),
+                "pago": rng.random() < 0.95,
+            })
+        if vendas:
+            agenda[data_iso]["_vendas_avulsas"] = vendas
+
+        dia += timedelta(days=1)
+
+    return agenda
+
+# ---------- MEDIÇÃO ----------
+
+def medir(nome, func, vezes):
+    """Roda `func` `vezes` vezes e devolve tempos em ms e operações por segundo."""
+    tempos = []
+    for _ in range(vezes):
+        t0 = time.perf_counter()
+        func()
+        tempos.append(time.perf_counter() - t0)
+    total = sum(tempos)
+    tempos.sort()
+    return {
+        "operacao": nome,
+        "vezes": vezes,
+        "media_ms": total / vezes * 1000,
+        "mediana_ms": tempos[len(tempos) // 2] * 1000,
+        "ops_s": vezes / total if total else float("inf"),
+    }
+
+def pico_memoria_kb(func):
+    """Pico de memória alocada (KB) enquanto `func` roda."""
+    tracemalloc.start()
+    try:
+        func()
+        _, pico = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return pico / 1024
+
+def rodar(n_clientes=200, anos=2, repeticoes=5, semente=42, catalogo=None):
+    catalogo = catalogo or catalogo_da_loja
+    rng = random.Random(semente)
+    clientes = gerar_clientes(n_clientes, rng)
+    agenda = gerar_agenda(clientes, anos, rng, catalogo=catalogo)
+
+    datas = sorted(agenda)
+    total_atendimentos = calcular_resumo_datas(agenda, datas)["total_atendimentos"]
+    duracoes = sorted(set(catalogo.servicos(datas[-1]).values()))
+    nomes = list(clientes)
+
+    pasta_original = os.getcwd()
+    pasta = tempfile.mkdtemp(prefix="agenda_bench_")
+    os.chdir(pasta)
+    try:
+        salvar_agenda(agenda)
+        tamanho_kb = os.path.getsize(ARQUIVO_AGENDA) / 1024
+
+        # índice "quente" reaproveitado entre as consultas, como na interface
+        indice_quente = IndiceOcupacao(agenda)
+
+        def livres_frio():
+            dia = rng.choice(datas)
+            indice = IndiceOcupacao(agenda)
+            for recurso in RECURSOS:
+                indice.horarios_livres(dia, recurso, rng.choice(duracoes))
+
+        def livres_quente():
+            dia = rng.choice(datas)
+            for recurso in RECURSOS:
+                indice_quente.horarios_livres(dia, recurso, rng.choice(duracoes))
+
+        def cabe():
+            dia = rng.choice(datas)
+            inicio = minutos_para_hora(ABERTURA + rng.randrange(0, FECHAMENTO - ABERTURA - 60, GRANULARIDADE))
+            indice_quente.cabe(dia, rng.choice(RECURSOS), inicio, rng.choice(duracoes))
+
+        def grade_do_dia():
+            dia = rng.choice(datas)
+            for recurso in RECURSOS:
+                list(linhas_do_dia(indice_quente, dia, recurso))
+
+        def resumo(n_dias):
+            def f():
+                pos = rng.randrange(0, max(1, len(datas) - n_dias))
+                calcular_resumo_datas(agenda, datas[pos:pos + n_dias])
+            return f
+
+        casos = [
+            ("carregar_agenda", carregar_agenda, repeticoes),
+            ("salvar_agenda", lambda: salvar_agenda(agenda), repeticoes),
+            ("buscar_cliente", lambda: buscar_registros_cliente(agenda, rng.choice(nomes)), repeticoes * 4),
+            ("horarios_livres (índice novo)", livres_frio, repeticoes * 100),
+            ("horarios_livres (índice pronto)", livres_quente, repeticoes * 100),
+            ("cabe (índice pronto)", cabe, repeticoes * 1000),
+            ("linhas_do_dia", grade_do_dia, repeticoes * 100),
+            ("resumo dia", resumo(1), repeticoes * 100),
+            ("resumo mês", resumo(26), repeticoes * 20),
+            ("resumo ano", resumo(313), repeticoes * 2),
+        ]
+        resultados = [medir(nome, func, vezes) for nome, func, vezes in casos]
+
+        memoria = {
+            "carregar_agenda": pico_memoria_kb(carregar_agenda),
+            "salvar_agenda": pico_memoria_kb(lambda: salvar_agenda(agenda)),
+            "resumo ano": pico_memoria_kb(resumo(313)),
+        }
+    finally:
+        os.chdir(pasta_original)
+        shutil.rmtree(pasta, ignore_errors=True)
+
+    return {
+        "parametros": {
+            "clientes": n_clientes,
+            "anos": anos,
+            "repeticoes": repeticoes,
+            "semente": semente,
+        },
+        "dados": {
+            "dias": len(datas),
+            "atendimentos": total_atendimentos,
+            "arquivo_kb": tamanho_kb,
+        },
+        "resultados": resultados,
+        "memoria_kb": memoria,
+    }
+
+# ---------- INÍCIO DO PROGRAMA ----------
+
+# Orçamento (ms) do que roda antes de a janela aparecer: os módulos da
+# agenda que a interface importa no topo e o tkinter. O resto (dados, calendário, feriados) fica para depois.
+ORCAMENTO_INICIO_MS = 300
+
+def modulos_da_interface(caminho=None):
+    """
+    Módulos agenda_* que agenda_interface.py importa no topo do arquivo (os
+    que rodam antes da janela). Lido do próprio código com ast, sem importar
+    a interface, para a lista não ficar velha quando entra um módulo novo;
+    import dentro de função (adiado) não entra.
+    """
+    caminho = caminho or os.path.join(os.path.dirname(os.path.abspath(__file__)), "agenda_interface.py")
+    with open(caminho, "r", encoding="utf-8") as f:
+        arvore = ast.parse(f.read(), caminho)
+    modulos = []
+    for no in arvore.body:
+        if isinstance(no, ast.ImportFrom):
+            nomes = [no.module or ""]
+        elif isinstance(no, ast.Import):
+            nomes = [a.name for a in no.names]
+        else:
+            continue
+        for nome in nomes:
+            if nome.startswith("agenda_") and nome not in modulos:
+                modulos.append(nome)
+    return modulos
+
+# (nome, código, entra no caminho até a janela?)
+ETAPAS_INICIO = [
+    ("imports da interface (agenda_*)", "import " + ", ".join(modulos_da_interface()), True),
+    ("tkinter", "import tkinter, tkinter.ttk, tkinter.messagebox", True),
+    ("tkcalendar (adiado)", "import tkcalendar", False),
+    ("holidays.Brazil() (adiado)", "import holidays; holidays.Brazil()", False),
+    ("webbrowser (adiado)", "import webbrowser", False),
+    ("carregar dados (adiado)",
+     "import agenda_nucleo as n, agenda_expediente as e; "
+     "n.carregar_agenda(); n.carregar_clientes(); e.carregar_expediente()", False),
+]
+
+def _tempo_em_processo_novo(codigo):
+    """Tempo (ms) de `codigo` num interpretador novo, rodando na pasta atual."""
+    script = (
+        "import time; t0 = time.perf_counter()\n"
+        f"{codigo}\n"
+        "print((time.perf_counter() - t0) * 1000)"
+    )
+    ambiente = dict(os.environ)
+    pasta_modulos = os.path.dirname(os.path.abspath(__file__))
+    ambiente["PYTHONPATH"] = pasta_modulos + os.pathsep + ambiente.get("PYTHONPATH", "")
+    proc = subprocess.run(
+        [sys.executable, "-c", script], capture_output=True, text=True, env=ambiente
+    )
+    if proc.returncode != 0:
+        return None
+    return float(proc.stdout.strip().splitlines()[-1])
+
+def medir_inicio(repeticoes=5):
+    """Mediana de cada etapa da abertura, cada uma num processo novo (cache de import frio)."""
+    etapas = []
+    for nome, codigo, antes_da_janela in ETAPAS_INICIO:
+        tempos = [_tempo_em_processo_novo(codigo) for _ in range(repeticoes)]
+        tempos = sorted(t for t in tempos if t is not None)
+        etapas.append({
+            "etapa": nome,
+            "antes_da_janela": antes_da_janela,
+            "mediana_ms": tempos[len(tempos) // 2] if tempos else None,
+        })
+    ate_janela = sum(e["mediana_ms"] or 0.0 for e in etapas if e["antes_da_janela"])
+    return {
+        "etapas": etapas,
+        "ate_janela_ms": ate_janela,
+        "orcamento_ms": ORCAMENTO_INICIO_MS,
+    }
+
+def imprimir_inicio(inicio):
+    print(f"{'Etapa':<34}{'mediana ms':>12}")
+    for e in inicio["etapas"]:
+        tempo = "não instalado" if e["mediana_ms"] is None else f"{e['mediana_ms']:.1f}"
+        print(f"{e['etapa']:<34}{tempo:>12}")
+    print()
+    situacao = "OK" if inicio["ate_janela_ms"] <= inicio["orcamento_ms"] else "ACIMA DO ORÇAMENTO"
+    print(f"Até a janela: {inicio['ate_janela_ms']:.1f} ms (orçamento {inicio['orcamento_ms']} ms) - {situacao}")
+
+# ---------- RELATÓRIO ----------
+
+def imprimir(relatorio, anterior=None):
+    p = relatorio["parametros"]
+    d = relatorio["dados"]
+    print(f"Clientes: {p['clientes']} | Anos: {p['anos']} | Semente: {p['semente']}")
+    print(f"Dias: {d['dias']} | Atendimentos: {d['atendimentos']} | agenda.json: {d['arquivo_kb']:.0f} KB")
+    print()
+
+    antes = {}
+    if anterior:
+        antes = {r["operacao"]: r for r in anterior.get("resultados", [])}
+
+    print(f"{'Operação':<34}{'vezes':>7}{'média ms':>12}{'ops/s':>12}" + ("   vs. anterior" if antes else ""))
+    for r in relatorio["resultados"]:
+        linha = f"{r['operacao']:<34}{r['vezes']:>7}{r['media_ms']:>12.3f}{r['ops_s']:>12.1f}"
+        base = antes.get(r["operacao"])
+        if base and base["media_ms"]:
+            variacao = (r["media_ms"] - base["media_ms"]) / base["media_ms"] * 100
+            linha += f"   {variacao:+.1f}%"
+        print(linha)
+
+    print()
+    print("Pico de memória:")
+    for nome, kb in relatorio["memoria_kb"].items():
+        print(f"  {nome:<32}{kb:>10.0f} KB")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark da agenda com dados sintéticos.")
+    parser.add_argument("--clientes", type=int, default=200)
+    parser.add_argument("--anos", type=int, default=2)
+    parser.add_argument("--repeticoes", type=int, default=5)
+    parser.add_argument("--semente", type=int, default=42)
+    parser.add_argument("--saida", help="grava o resultado em JSON")
+    parser.add_argument("--comparar", help="JSON de uma rodada anterior para comparar")
+    parser.add_argument("--inicio", action="store_true",
+                        help="mede só a abertura do programa (sai com erro se passar do orçamento)")
+    args = parser.parse_args()
+
+    if args.inicio:
+        inicio = medir_inicio(args.repeticoes)
+        imprimir_inicio(inicio)
+        if args.saida:
+            with open(args.saida, "w", encoding="utf-8") as f:
+                json.dump(inicio, f, ensure_ascii=False, indent=2)
+        if inicio["ate_janela_ms"] > inicio["orcamento_ms"]:
+            sys.exit(1)
+        return
+
+    relatorio = rodar(args.clientes, args.anos, args.repeticoes, args.semente)
+
+    anterior = None
+    if args.comparar:
+        with open(args.comparar, "r", encoding="utf-8") as f:
+            anterior = json.load(f)
+
+    imprimir(relatorio, anterior)
+
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as f:
+            json.dump(relatorio, f, ensure_ascii=False, indent=2)
+
+if __name__ == "__main__":
+    main()
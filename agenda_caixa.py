@@ -0,0 +1,229 @@
+"""
+Livro caixa: um lançamento por pagamento (caixa/lancamentos.jsonl) e o
+fechamento do dia (caixa/fechamentos.jsonl). Só se acrescenta linha;
+corrigir é lançar um estorno.
+"""
+import os
+import uuid
+from collections.abc import MutableMapping
+from datetime import datetime
+
+from agenda_nucleo import (
+    CHAVE_CLIENTE_ID,
+    calcular_resumo_datas,
+    iso_para_br,
+    preco_do_slot,
+)
+from agenda_sincronia import acrescentar_jsonl, assinatura_arquivo, ler_jsonl
+
+PASTA_CAIXA = "caixa"
+ARQUIVO_LANCAMENTOS = "lancamentos.jsonl"
+ARQUIVO_FECHAMENTOS = "fechamentos.jsonl"
+FORMAS_PAGAMENTO = ["Pix", "Cartão", "Dinheiro"]
+FORMA_DINHEIRO = "Dinheiro"
+
+# ---------- REFERÊNCIAS ----------
+
+def ref_atendimento(data_iso, recurso, hora):
+    return {"tipo": "atendimento", "data_iso": data_iso, "recurso": recurso, "hora": hora}
+
+def ref_venda(data_iso, posicao, id_venda=None):
+    """A venda é achada pelo id; "pos" só serve para lançamentos antigos, sem id."""
+    return {"tipo": "venda", "data_iso": data_iso, "id": id_venda, "pos": posicao}
+
+def ref_fatura(fatura_id):
+    return {"tipo": "fatura", "id": fatura_id}
+
+def valor_a_receber(registro, data_iso=None):
+    """Quanto o atendimento (serviço + extras) ou a venda vale."""
+    if "produto" in registro:
+        return float(registro.get("valor", 0.0))
+    return preco_do_slot(registro, data_iso) + sum(float(e.get("valor", 0.0)) for e in registro.get("extras", []))
+
+def descricao_registro(registro):
+    return registro.get("produto") or registro.get("servico", "")
+
+# ---------- CAIXA DO DIA ----------
+
+class ItensCaixa(MutableMapping):
+    """
+    Linhas da tabela do caixa do dia (iid -> item com "total" e "pago"),
+    com os totais recebido/pendente acertados a cada troca, sem somar tudo de novo.
+    """
+
+    def __init__(self):
+        self._itens = {}
+        self.totais = {"pago": 0.0, "pendente": 0.0}
+
+    def _somar(self, item, sinal):
+        self.totais["pago" if item["pago"] else "pendente"] += sinal * item["total"]
+
+    def __getitem__(self, iid):
+        return self._itens[iid]
+
+    def __setitem__(self, iid, item):
+        if iid in self._itens:
+            self._somar(self._itens[iid], -1)
+        self._itens[iid] = item
+        self._somar(item, +1)
+
+    def __delitem__(self, iid):
+        self._somar(self._itens.pop(iid), -1)
+
+    def __iter__(self):
+        return iter(self._itens)
+
+    def __len__(self):
+        return len(self._itens)
+
+    def clear(self):
+        self._itens.clear()
+        self.totais["pago"] = self.totais["pendente"] = 0.0
+
+class LivroCaixa:
+    """Lançamentos e fechamentos na memória, indexados por dia, relidos quando o arquivo cresce."""
+
+    def __init__(self, pasta=PASTA_CAIXA):
+        self.pasta = pasta
+        self._assinaturas = None
+        self._por_dia = {}       # dia -> [lançamentos]
+        self._por_id = {}
+        self._estornados = set()
+        self._fechamentos = {}   # dia -> último fechamento
+        self.recarregar()
+
+    def _caminho(self, nome):
+        return os.path.join(self.pasta, nome)
+
+    def _assinatura(self):
+        return tuple(assinatura_arquivo(self._caminho(nome)) for nome in (ARQUIVO_LANCAMENTOS, ARQUIVO_FECHAMENTOS))
+
+    def recarregar(self):
+        self._assinaturas = self._assinatura()
+        self._por_dia.clear()
+        self._por_id.clear()
+        self._estornados.clear()
+        self._fechamentos.clear()
+        for lanc in ler_jsonl(self._caminho(ARQUIVO_LANCAMENTOS)):
+            self._indexar(lanc)
+        for fechamento in ler_jsonl(self._caminho(ARQUIVO_FECHAMENTOS)):
+            self._fechamentos[fechamento["dia"]] = fechamento
+
+    def atualizar(self):
+        """Relê só se outro terminal lançou algo (só stat)."""
+        if self._assinatura() != self._assinaturas:
+            self.recarregar()
+
+    def _indexar(self, lanc):
+        self._por_dia.setdefault(lanc["dia"], []).append(lanc)
+        self._por_id[lanc["id"]] = lanc
+        if lanc.get("estorno_de"):
+            self._estornados.add(lanc["estorno_de"])
+
+    # --- lançamentos ---
+    def lancar(self, valor, forma, ref, registro=None, quando=None, estorno_de=None, descricao=None):
+        """Acrescenta um lançamento e retorna ele. `registro` (slot/venda) dá cliente e descrição."""
+        if forma not in FORMAS_PAGAMENTO:
+            raise ValueError(f"Forma de pagamento inválida: {forma!r}.")
+        quando = quando or datetime.now()
+        registro = registro or {}
+        lanc = {
+            "id": f"{quando:%Y%m%d%H%M%S}-{uuid.uuid4().hex[:6]}",
+            "quando": quando.strftime("%Y-%m-%dT%H:%M:%S"),
+            "dia": quando.strftime("%Y-%m-%d"),
+            "valor": round(float(valor), 2),
+            "forma": forma,
+            "ref": ref,
+            "cliente": registro.get("cliente", ""),
+            CHAVE_CLIENTE_ID: registro.get(CHAVE_CLIENTE_ID),
+            "descricao": descricao if descricao is not None else descricao_registro(registro),
+        }
+        if estorno_de:
+            lanc["estorno_de"] = estorno_de
+        acrescentar_jsonl(self._caminho(ARQUIVO_LANCAMENTOS), lanc)
+        self._indexar(lanc)
+        self._assinaturas = self._assinatura()
+        return lanc
+
+    def estornar(self, lanc_id, quando=None):
+        """Lança o valor contrário de um lançamento (o original continua no livro)."""
+        original = self._por_id.get(lanc_id)
+        if original is None:
+            raise ValueError("Lançamento não encontrado.")
+        if original.get("estorno_de") or self.estornado(lanc_id):
+            raise ValueError("Esse lançamento já é ou já tem um estorno.")
+        return self.lancar(
+            -original["valor"], original["forma"], original["ref"], original,
+            quando=quando, estorno_de=lanc_id, descricao=original.get("descricao", ""),
+        )
+
+    def estornado(self, lanc_id):
+        return lanc_id in self._estornados
+
+    def lancamentos_do_dia(self, dia):
+        return list(self._por_dia.get(dia, []))
+
+    def totais_do_dia(self, dia):
+        """{forma: total} do que entrou no dia (estornos descontados)."""
+        totais = {forma: 0.0 for forma in FORMAS_PAGAMENTO}
+        for lanc in self._por_dia.get(dia, []):
+            totais[lanc["forma"]] = totais.get(lanc["forma"], 0.0) + lanc["valor"]
+        return totais
+
+    # --- fechamento ---
+    def fechamento(self, dia):
+        return self._fechamentos.get(dia)
+
+    def fechar_dia(self, dia, agenda, contado_dinheiro=None, quando=None):
+        """
+        Congela o dia: totais por forma, dinheiro contado (opcional) e o
+        resumo da agenda daquele dia. Retorna o fechamento.
+        """
+        quando = quando or datetime.now()
+        por_forma = self.totais_do_dia(dia)
+        fechamento = {
+            "dia": dia,
+            "fechado_em": quando.strftime("%Y-%m-%dT%H:%M:%S"),
+            "por_forma": por_forma,
+            "total_recebido": round(sum(por_forma.values()), 2),
+            "lancamentos": len(self._por_dia.get(dia, [])),
+            "contado_dinheiro": contado_dinheiro,
+            "diferenca_dinheiro": (
+                round(contado_dinheiro - por_forma.get(FORMA_DINHEIRO, 0.0), 2)
+                if contado_dinheiro is not None else None
+            ),
+            "resumo": calcular_resumo_datas(agenda, [dia]),
+        }
+        acrescentar_jsonl(self._caminho(ARQUIVO_FECHAMENTOS), fechamento)
+        self._fechamentos[dia] = fechamento
+        self._assinaturas = self._assinatura()
+        return fechamento
+
+    def depois_do_fechamento(self, dia):
+        """Lançamentos do dia feitos depois do último fechamento (pede fechar de novo)."""
+        fechamento = self._fechamentos.get(dia)
+        if fechamento is None:
+            return []
+        return [l for l in self._por_dia.get(dia, []) if l["quando"] > fechamento["fechado_em"]]
+
+    def fechados(self):
+        """{dia: resumo congelado} para os relatórios."""
+        self.atualizar()
+        return {dia: f["resumo"] for dia, f in self._fechamentos.items()}
+
+def texto_lancamento(lanc):
+    hora = lanc["quando"][11:16]
+    sinal = "↩️ estorno " if lanc.get("estorno_de") else ""
+    return (f"{hora} {sinal}{lanc['forma']} R$ {lanc['valor']:.2f} - "
+            f"{lanc.get('cliente') or 'sem cliente'} - {lanc.get('descricao', '')}")
+
+def texto_fechamento(fechamento):
+    linhas = [f"Caixa de {iso_para_br(fechamento['dia'])} fechado em "
+              f"{fechamento['fechado_em'][8:10]}/{fechamento['fechado_em'][5:7]} {fechamento['fechado_em'][11:16]}"]
+    for forma, valor in fechamento["por_forma"].items():
+        linhas.append(f"  {forma}: R$ {valor:.2f}")
+    linhas.append(f"  Total recebido: R$ {fechamento['total_recebido']:.2f}")
+    if fechamento.get("contado_dinheiro") is not None:
+        linhas.append(f"  Dinheiro contado: R$ {fechamento['contado_dinheiro']:.2f} "
+                      f"(diferença R$ {fechamento['diferenca_dinheiro']:.2f})")
+    return "\n".join(linhas)
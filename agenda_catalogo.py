@@ -0,0 +1,175 @@
+"""
+Catálogo de serviços e produtos com preço por data (catalogo.json):
+
+    {"itens": {"Cabelo": [{"desde": "0000-01-01", "preco": 50.0, "duracao": 30},
+                          {"desde": "2026-11-01", "preco": 55.0}]}}
+
+Cada versão vale de "desde" até a próxima e repete o que não mudou; item
+com duração é serviço. Sem o arquivo, vale o catálogo de fábrica.
+"""
+import bisect
+import json
+import os
+from datetime import date, datetime
+
+ARQUIVO_CATALOGO = "catalogo.json"
+DESDE_SEMPRE = "0000-01-01"
+
+class Catalogo:
+    """catalogo.json na memória, com as versões de cada item em ordem de data."""
+
+    def __init__(self, caminho=ARQUIVO_CATALOGO, servicos_padrao=None, precos_padrao=None):
+        self.caminho = caminho
+        self._padrao = {}
+        for nome, preco in (precos_padrao or {}).items():
+            versao = {"desde": DESDE_SEMPRE, "preco": float(preco)}
+            if nome in (servicos_padrao or {}):
+                versao["duracao"] = int(servicos_padrao[nome])
+            self._padrao[nome] = [versao]
+        for nome, duracao in (servicos_padrao or {}).items():
+            self._padrao.setdefault(nome, [{"desde": DESDE_SEMPRE, "preco": 0.0, "duracao": int(duracao)}])
+        self._assinatura = False   # força a primeira leitura
+        self._itens = {}           # nome -> ([datas "desde"], [versões completas]) em ordem de data
+        self._vigentes = {}        # (nome, data) -> versão (cache das consultas)
+        self.atualizar()
+
+    # --- leitura ---
+    def _assinatura_arquivo(self):
+        try:
+            st = os.stat(self.caminho)
+            return (st.st_mtime_ns, st.st_size)
+        except OSError:
+            return None
+
+    def _ler(self):
+        """Itens do arquivo, ou o catálogo de fábrica se não houver (ou estiver ilegível)."""
+        try:
+            with open(self.caminho, "r", encoding="utf-8") as f:
+                itens = json.load(f).get("itens")
+            if isinstance(itens, dict):
+                return itens
+        except (OSError, json.JSONDecodeError, AttributeError):
+            pass
+        return {nome: [dict(v) for v in versoes] for nome, versoes in self._padrao.items()}
+
+    def atualizar(self):
+        """Relê o catálogo se o arquivo mudou (só stat). True se releu."""
+        assinatura = self._assinatura_arquivo()
+        if assinatura == self._assinatura:
+            return False
+        itens = {}
+        for nome, versoes in self._ler().items():
+            completas = []
+            atual = {}
+            for versao in sorted(versoes, key=lambda v: v.get("desde", DESDE_SEMPRE)):
+                atual = {**atual, "ativo": True, "desde": DESDE_SEMPRE, **versao}
+                completas.append(atual)
+            itens[nome] = ([v["desde"] for v in completas], completas)
+        # troca tudo de uma vez: relatório em segundo plano pode estar consultando
+        self._itens = itens
+        self._vigentes = {}
+        self._assinatura = assinatura
+        return True
+
+    # --- consultas ---
+    def vigente(self, item, data_iso=None):
+        """Versão do item valendo na data (hoje, se não vier), ou None."""
+        data_iso = data_iso or date.today().isoformat()
+        chave = (item, data_iso)
+        if chave in self._vigentes:
+            return self._vigentes[chave]
+        versao = None
+        desdes, versoes = self._itens.get(item, ((), ()))
+        pos = bisect.bisect_right(desdes, data_iso) - 1
+        if pos >= 0:
+            versao = versoes[pos]
+        self._vigentes[chave] = versao
+        return versao
+
+    def preco(self, item, data_iso=None, padrao=0.0):
+        versao = self.vigente(item, data_iso)
+        if versao is None or versao.get("preco") is None:
+            return padrao
+        return float(versao["preco"])
+
+    def duracao(self, item, data_iso=None):
+        versao = self.vigente(item, data_iso)
+        return None if versao is None or versao.get("duracao") is None else int(versao["duracao"])
+
+    def conhece(self, item):
+        return item in self._itens
+
+    def e_servico(self, item):
+        return any(v.get("duracao") is not None for v in self._itens.get(item, ((), ()))[1])
+
+    def _ativos(self, data_iso):
+        for nome in self._itens:
+            versao = self.vigente(nome, data_iso)
+            if versao is not None and versao.get("ativo", True):
+                yield nome, versao
+
+    def servicos(self, data_iso=None):
+        """{serviço: duração} dos serviços ativos na data, na ordem do arquivo."""
+        return {nome: int(v["duracao"]) for nome, v in self._ativos(data_iso) if v.get("duracao") is not None}
+
+    def produtos(self, data_iso=None):
+        """Produtos (itens sem duração) ativos na data, em ordem alfabética."""
+        return sorted(nome for nome, v in self._ativos(data_iso) if v.get("duracao") is None)
+
+    def itens(self, data_iso=None):
+        """Tudo o que pode ser vendido na data (serviços e produtos), em ordem alfabética."""
+        return sorted(nome for nome, _v in self._ativos(data_iso))
+
+    def versoes(self, item):
+        return [dict(v) for v in self._itens.get(item, ((), ()))[1]]
+
+    def nomes(self):
+        return list(self._itens)
+
+    # --- gravação ---
+    def alterar(self, item, desde, preco=None, duracao=None, ativo=True):
+        """
+        Acrescenta uma versão do item a partir de `desde` (substitui outra
+        com a mesma data). Cria o catalogo.json na primeira alteração.
+        """
+        from agenda_sincronia import alterar_json   # a sincronia importa o núcleo, que importa este módulo
+
+        datetime.strptime(desde, "%Y-%m-%d")
+        versao = {"desde": desde}
+        if preco is not None:
+            if float(preco) < 0:
+                raise ValueError("Preço inválido.")
+            versao["preco"] = round(float(preco), 2)
+        if duracao is not None:
+            if int(duracao) <= 0:
+                raise ValueError("Duração inválida.")
+            versao["duracao"] = int(duracao)
+        if not ativo:
+            versao["ativo"] = False
+        elif item not in self._itens and "preco" not in versao:
+            raise ValueError(f"Item novo precisa de preço: {item!r}.")
+
+        def aplicar(dados):
+            if not isinstance(dados.get("itens"), dict):
+                dados["itens"] = self._ler()   # primeira alteração: parte do catálogo de fábrica
+            versoes = [v for v in dados["itens"].get(item, []) if v.get("desde") != desde]
+            versoes.append(versao)
+            dados["itens"][item] = sorted(versoes, key=lambda v: v.get("desde", DESDE_SEMPRE))
+
+        alterar_json(self.caminho, aplicar)
+        self.atualizar()
+        return versao
+
+def texto_item(catalogo, nome, data_iso=None):
+    versao = catalogo.vigente(nome, data_iso)
+    if versao is None:
+        return f"{nome}: ainda não vale nessa data"
+    if not versao.get("ativo", True):
+        return f"{nome}: retirado desde {versao['desde']}"
+    texto = f"{nome}: R$ {catalogo.preco(nome, data_iso):.2f}"
+    if versao.get("duracao") is not None:
+        texto += f" ({versao['duracao']} min)"
+    proximas = [v for v in catalogo.versoes(nome) if v["desde"] > (data_iso or date.today().isoformat())]
+    if proximas:
+        texto += f" - muda em {proximas[0]['desde']}"
+    return texto
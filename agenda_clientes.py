@@ -0,0 +1,235 @@
+"""Clientes: duplicados, junção de cadastros e busca por telefone."""
+import re
+import unicodedata
+from difflib import SequenceMatcher
+
+from agenda_nucleo import (
+    CHAVE_CLIENTE_ID,
+    CadastroClientes,
+    atendimentos_do_dia,
+    grades_do_dia,
+    nome_do_registro,
+    proximo_atendimento,
+)
+from agenda_whatsapp import normalizar_telefone_br, telefone_valido
+
+NOTA_MINIMA = 0.75
+TAMANHO_MAX_BLOCO = 40   # blocos maiores (nome muito comum) não ajudam a achar par
+CHAVE_VENDAS = "_vendas_avulsas"
+VENDA = "venda"          # no lugar do recurso, numa referência de venda avulsa
+
+def chave_nome(nome):
+    """Nome sem acentos, minúsculo e com espaços simples, para achar duplicados."""
+    sem_acento = unicodedata.normalize("NFKD", nome or "")
+    sem_acento = "".join(c for c in sem_acento if not unicodedata.combining(c))
+    return " ".join(sem_acento.casefold().split())
+
+def tokens_nome(nome):
+    """Pedaços do nome sem números no fim ('Cavalheiro2' -> 'cavalheiro')."""
+    tokens = []
+    for t in chave_nome(nome).split():
+        t = re.sub(r"\d+$", "", t)
+        if t:
+            tokens.append(t)
+    return tokens
+
+# ---------- DUPLICADOS ----------
+
+def _perfil(nome, info):
+    """(tokens, telefone normalizado, aniversário), calculado uma vez por cliente."""
+    info = info if isinstance(info, dict) else {}
+    # cadastros bem antigos usavam "nascimento"
+    nasc = info.get("nasc") or info.get("nascimento") or ""
+    return tokens_nome(nome), normalizar_telefone_br(info.get("tel", "")), nasc
+
+def _blocos(perfis):
+    blocos = {}
+    for nome, (tokens, tel, _nasc) in perfis.items():
+        chaves = set()
+        if telefone_valido(tel):
+            chaves.add("tel:" + tel)
+        for t in tokens:
+            if len(t) >= 3:
+                chaves.add("nome:" + t)
+        if len(tokens) >= 2:
+            chaves.add(f"ini:{tokens[0]}:{tokens[-1][0]}")
+        for chave in chaves:
+            blocos.setdefault(chave, []).append(nome)
+    return blocos
+
+def _nota(perfil_a, perfil_b):
+    motivos = []
+    ta, tel_a, nasc_a = perfil_a
+    tb, tel_b, nasc_b = perfil_b
+    a, b = " ".join(ta), " ".join(tb)
+
+    nota = 0.0
+    if a and b:
+        comparador = SequenceMatcher(None, a, b)
+        # quick_ratio é um teto barato do ratio: abaixo disso o par nunca passa da nota mínima
+        if comparador.quick_ratio() >= 0.6:
+            nota = comparador.ratio()
+    if a == b and a:
+        nota = max(nota, 0.95)
+        motivos.append("mesmo nome")
+    elif ta and tb and (ta == tb[:len(ta)] or tb == ta[:len(tb)]):
+        nota = max(nota, 0.8)
+        motivos.append("nome contido no outro")
+    elif nota >= 0.8:
+        motivos.append("nomes parecidos")
+
+    if telefone_valido(tel_a) and tel_a == tel_b:
+        nota = max(nota, 0.9) + 0.05
+        motivos.append("mesmo telefone")
+    elif telefone_valido(tel_a) and telefone_valido(tel_b):
+        nota -= 0.15
+
+    if nasc_a and nasc_b:
+        if nasc_a == nasc_b:
+            nota += 0.05
+            motivos.append("mesmo aniversário")
+        else:
+            nota -= 0.2
+
+    return max(0.0, min(1.0, nota)), motivos
+
+def nota_semelhanca(nome_a, info_a, nome_b, info_b):
+    """(nota de 0 a 1, [motivos]) de dois cadastros serem a mesma pessoa."""
+    return _nota(_perfil(nome_a, info_a), _perfil(nome_b, info_b))
+
+def propor_fusoes(clientes, nota_minima=NOTA_MINIMA):
+    """Pares prováveis [(nota, nome_a, nome_b, motivos)], do mais provável ao menos."""
+    perfis = {nome: _perfil(nome, info) for nome, info in clientes.items()}
+    vistos = set()
+    propostas = []
+    for membros in _blocos(perfis).values():
+        if len(membros) < 2 or len(membros) > TAMANHO_MAX_BLOCO:
+            continue
+        for i, a in enumerate(membros):
+            for b in membros[i + 1:]:
+                par = (a, b) if a < b else (b, a)
+                if par in vistos:
+                    continue
+                vistos.add(par)
+                nota, motivos = _nota(perfis[par[0]], perfis[par[1]])
+                if nota >= nota_minima:
+                    propostas.append((nota, par[0], par[1], motivos))
+    propostas.sort(key=lambda p: (-p[0], p[1], p[2]))
+    return propostas
+
+# ---------- REFERÊNCIAS E JUNÇÃO ----------
+
+def indice_referencias(agenda, clientes=None, tarefa=None):
+    """
+    Uma passada pela agenda: nome -> [(data_iso, recurso, hora)] dos
+    atendimentos e [(data_iso, VENDA, posição)] das vendas avulsas.
+    Com `clientes`, o nome vem do cadastro pelo id (nome atual).
+    """
+    indice = {}
+    dias = list(agenda.items())
+    for pos, (data_iso, dia) in enumerate(dias):
+        if tarefa is not None and pos % 50 == 0:
+            tarefa.passo(pos, len(dias))
+        if not isinstance(dia, dict):
+            continue
+        for recurso, hora, slot in atendimentos_do_dia(dia):
+            nome = nome_do_registro(clientes, slot)
+            if nome:
+                indice.setdefault(nome, []).append((data_iso, recurso, hora))
+        vendas = dia.get(CHAVE_VENDAS, [])
+        if isinstance(vendas, list):
+            for idx, v in enumerate(vendas):
+                nome = nome_do_registro(clientes, v) if isinstance(v, dict) else ""
+                if nome:
+                    indice.setdefault(nome, []).append((data_iso, VENDA, idx))
+    return indice
+
+def _registro(agenda, ref):
+    """(registro, grade) apontados por uma referência; registro é None se sumiu."""
+    data_iso, recurso, pos = ref
+    dia = agenda.get(data_iso)
+    if recurso == VENDA:
+        vendas = dia.get(CHAVE_VENDAS, []) if isinstance(dia, dict) else []
+        if pos < len(vendas) and isinstance(vendas[pos], dict):
+            return vendas[pos], None
+        return None, None
+    for r, grade in grades_do_dia(dia):
+        if r == recurso:
+            slot = grade.get(pos)
+            return (slot if isinstance(slot, dict) else None), grade
+    return None, None
+
+def fundir_clientes(agenda, clientes, manter, absorver, indice):
+    """
+    Junta o cadastro `absorver` em `manter`: troca o nome em todos os
+    atendimentos e vendas (pelas posições do índice), completa telefone
+    e aniversário que faltarem e apaga o cadastro absorvido.
+    Retorna (quantidade de registros trocados, dias alterados).
+    """
+    if manter == absorver:
+        return 0, set()
+
+    if isinstance(clientes, CadastroClientes) and manter not in clientes:
+        clientes[manter] = {"nasc": "", "tel": ""}
+    id_manter = clientes.id_de(manter) if isinstance(clientes, CadastroClientes) else None
+
+    def trocar(registro):
+        registro["cliente"] = manter
+        if id_manter:
+            registro[CHAVE_CLIENTE_ID] = id_manter
+        else:
+            registro.pop(CHAVE_CLIENTE_ID, None)
+
+    trocados = 0
+    dias = set()
+    for ref in indice.pop(absorver, []):
+        registro, grade = _registro(agenda, ref)
+        if registro is None:
+            continue
+        if nome_do_registro(clientes, registro) != absorver:
+            continue
+        trocar(registro)
+        if grade is not None:
+            # cópias do formato antigo nos blocos seguintes
+            for h, slot in grade.items():
+                if h != ref[2] and isinstance(slot, dict) and slot.get("inicio") == ref[2]:
+                    trocar(slot)
+        indice.setdefault(manter, []).append(ref)
+        trocados += 1
+        dias.add(ref[0])
+
+    info_manter = dict(clientes.get(manter) or {"nasc": "", "tel": ""})
+    info_absorver = clientes.pop(absorver, None)
+    if isinstance(info_absorver, dict):
+        # cadastros bem antigos usavam "nascimento"
+        nasc = info_absorver.get("nasc") or info_absorver.get("nascimento")
+        if nasc and not (info_manter.get("nasc") or info_manter.get("nascimento")):
+            info_manter["nasc"] = nasc
+        if info_absorver.get("tel") and not info_manter.get("tel"):
+            info_manter["tel"] = info_absorver["tel"]
+    # grava de novo (não altera no lugar) para o índice de telefones acompanhar
+    clientes[manter] = info_manter
+    return trocados, dias
+
+# ---------- TELEFONE ----------
+
+def identificar_telefone(clientes, agenda, telefone, agora=None):
+    """
+    Clientes com esse telefone (pelo índice do cadastro), cada um como
+    {id, nome, tel, proximo}, onde proximo é (data_iso, recurso, hora,
+    servico) ou None. Lista vazia se o número não é de ninguém.
+    """
+    achados = []
+    for id_cliente in clientes.ids_do_telefone(telefone):
+        nome = clientes.nome_de(id_cliente)
+        proximo = proximo_atendimento(agenda, nome, id_cliente, agora)
+        if proximo is not None:
+            data_iso, recurso, hora, slot = proximo
+            proximo = (data_iso, recurso, hora, slot.get("servico", ""))
+        achados.append({
+            "id": id_cliente,
+            "nome": nome,
+            "tel": clientes[nome].get("tel", ""),
+            "proximo": proximo,
+        })
+    return achados
@@ -0,0 +1,152 @@
+"""
+Medição de tempo das operações mais usadas. Desligada por padrão; liga
+pela janela Diagnóstico ou com AGENDA_DIAGNOSTICO=1.
+"""
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from functools import wraps
+from logging.handlers import RotatingFileHandler
+
+ARQUIVO_CONFIG = "diagnostico.json"
+ARQUIVO_LOG = "diagnostico.log"
+LOG_TAMANHO_MAX = 512 * 1024
+LOG_ARQUIVOS = 3
+
+# limites (ms) das faixas do histograma; a última faixa é "acima de 5000"
+FAIXAS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+AMOSTRAS_POR_OPERACAO = 500
+LIMITE_LENTO_MS = 500
+
+def _ativo_no_inicio():
+    if os.environ.get("AGENDA_DIAGNOSTICO") == "1":
+        return True
+    if not os.path.exists(ARQUIVO_CONFIG):
+        return False
+    try:
+        with open(ARQUIVO_CONFIG, "r", encoding="utf-8") as f:
+            return bool(json.load(f).get("ativo", False))
+    except (OSError, json.JSONDecodeError):
+        return False
+
+_ativo = _ativo_no_inicio()
+_logger = None
+_estatisticas = {}
+_trava = threading.Lock()   # medições chegam da thread do Tk e das tarefas em segundo plano
+
+class Estatistica:
+    """Contagem, tempo total, histograma e últimas amostras de uma operação."""
+
+    def __init__(self):
+        self.chamadas = 0
+        self.total_ms = 0.0
+        self.maximo_ms = 0.0
+        self.faixas = [0] * (len(FAIXAS_MS) + 1)
+        self.amostras = deque(maxlen=AMOSTRAS_POR_OPERACAO)
+
+    def registrar(self, ms):
+        self.chamadas += 1
+        self.total_ms += ms
+        self.maximo_ms = max(self.maximo_ms, ms)
+        pos = 0
+        while pos < len(FAIXAS_MS) and ms > FAIXAS_MS[pos]:
+            pos += 1
+        self.faixas[pos] += 1
+        self.amostras.append(ms)
+
+    def percentil(self, p):
+        """Percentil `p` (0-100) das últimas amostras, em ms."""
+        if not self.amostras:
+            return 0.0
+        ordenadas = sorted(self.amostras)
+        pos = min(len(ordenadas) - 1, int(round(p / 100 * (len(ordenadas) - 1))))
+        return ordenadas[pos]
+
+def _log():
+    """Logger do arquivo (criado na primeira medição; chamar com _trava)."""
+    global _logger
+    if _logger is None:
+        _logger = logging.getLogger("agenda.diagnostico")
+        _logger.setLevel(logging.INFO)
+        _logger.propagate = False
+        handler = RotatingFileHandler(
+            ARQUIVO_LOG, maxBytes=LOG_TAMANHO_MAX, backupCount=LOG_ARQUIVOS, encoding="utf-8"
+        )
+        handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+        _logger.addHandler(handler)
+    return _logger
+
+def registrar(operacao, ms):
+    with _trava:
+        est = _estatisticas.get(operacao)
+        if est is None:
+            est = _estatisticas[operacao] = Estatistica()
+        est.registrar(ms)
+        try:
+            logger = _log()
+        except OSError:
+            return  # sem log não é motivo para travar a agenda
+
+    marca = " LENTO" if ms >= LIMITE_LENTO_MS else ""
+    logger.info("%s %.1f ms%s", operacao, ms, marca)
+
+def medido(operacao):
+    """Decorador: mede o tempo de cada chamada quando o diagnóstico está ligado."""
+    def decorador(func):
+        @wraps(func)
+        def envoltorio(*args, **kwargs):
+            if not _ativo:
+                return func(*args, **kwargs)
+            t0 = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                registrar(operacao, (time.perf_counter() - t0) * 1000)
+        return envoltorio
+    return decorador
+
+def esta_ativo():
+    return _ativo
+
+def ativar(ligado):
+    """Liga/desliga a medição e grava a escolha em diagnostico.json."""
+    global _ativo
+    _ativo = bool(ligado)
+    try:
+        with open(ARQUIVO_CONFIG, "w", encoding="utf-8") as f:
+            json.dump({"ativo": _ativo}, f)
+    except OSError:
+        pass
+
+def zerar():
+    with _trava:
+        _estatisticas.clear()
+
+def resumo():
+    """Lista de dicts por operação (mais lenta no p95 primeiro), para a janela."""
+    linhas = []
+    with _trava:
+        for operacao, est in _estatisticas.items():
+            linhas.append({
+                "operacao": operacao,
+                "chamadas": est.chamadas,
+                "media_ms": est.total_ms / est.chamadas if est.chamadas else 0.0,
+                "p50_ms": est.percentil(50),
+                "p95_ms": est.percentil(95),
+                "maximo_ms": est.maximo_ms,
+            })
+    linhas.sort(key=lambda l: l["p95_ms"], reverse=True)
+    return linhas
+
+def histograma(operacao):
+    """[(rótulo da faixa, contagem)] de uma operação."""
+    with _trava:
+        est = _estatisticas.get(operacao)
+        faixas = list(est.faixas) if est is not None else None
+    if faixas is None:
+        return []
+    rotulos = [f"≤ {limite} ms" for limite in FAIXAS_MS] + [f"> {FAIXAS_MS[-1]} ms"]
+    return list(zip(rotulos, faixas))
@@ -0,0 +1,328 @@
+"""Lista de espera (espera/lista.json) e oferta das vagas que ficam livres."""
+import os
+import uuid
+from datetime import datetime
+
+from agenda_nucleo import (
+    CHAVE_CLIENTE_ID,
+    CHAVE_VENDAS,
+    DIAS_SEMANA,
+    GRANULARIDADE,
+    catalogo,
+    hora_para_minutos,
+    iso_para_br,
+    minutos_para_hora,
+    reservar_atendimento,
+)
+from agenda_sincronia import alterar_json, assinatura_arquivo, ler_json
+
+PASTA_ESPERA = "espera"
+ARQUIVO_ESPERA = "lista.json"
+
+# pedido: aguardando -> oferecido -> atendido (ou volta a aguardando; desistiu encerra)
+# oferta: pendente -> aceita | recusada | expirada
+PEDIDO_ABERTO = ("aguardando", "oferecido")
+
+# ---------- PEDIDOS ----------
+
+def novo_pedido(cliente, servico, dias=(), datas=(), janelas=(), prioridade=0,
+                ate=None, obs="", cliente_id=None, quando=None):
+    """
+    Monta um pedido validado. `dias` são dias da semana (0 = segunda),
+    `datas` são datas ISO; sem nenhum dos dois vale qualquer dia. `janelas`
+    são pares ("HH:MM", "HH:MM"); sem janelas vale o expediente inteiro.
+    """
+    quando = quando or datetime.now()
+    if not (cliente or "").strip():
+        raise ValueError("Informe o cliente.")
+    if not catalogo.e_servico(servico):
+        raise ValueError(f"Serviço desconhecido: {servico!r}.")
+    dias = sorted({int(d) for d in dias})
+    if any(not 0 <= d <= 6 for d in dias):
+        raise ValueError("Dia da semana inválido.")
+    for d in list(datas) + ([ate] if ate else []):
+        datetime.strptime(d, "%Y-%m-%d")
+    faixas = []
+    for ini, fim in janelas:
+        a, b = hora_para_minutos(ini), hora_para_minutos(fim)
+        if a is None or b is None or a >= b:
+            raise ValueError(f"Faixa de horário inválida: {ini}-{fim}.")
+        faixas.append([minutos_para_hora(a), minutos_para_hora(b)])
+    return {
+        "id": f"{quando:%Y%m%d%H%M%S}-{uuid.uuid4().hex[:6]}",
+        "cliente": cliente.strip(),
+        CHAVE_CLIENTE_ID: cliente_id,
+        "servico": servico,
+        "dias": dias,
+        "datas": sorted(set(datas)),
+        "janelas": faixas,
+        "prioridade": int(prioridade),
+        "ate": ate,
+        "obs": obs,
+        "criado_em": quando.strftime("%Y-%m-%dT%H:%M:%S"),
+        "status": "aguardando",
+    }
+
+def aceita_dia(pedido, data_iso):
+    if pedido.get("ate") and data_iso > pedido["ate"]:
+        return False
+    if pedido.get("datas") or pedido.get("dias"):
+        dia_semana = datetime.strptime(data_iso, "%Y-%m-%d").weekday()
+        return data_iso in pedido.get("datas", []) or dia_semana in pedido.get("dias", [])
+    return True
+
+def aceita_horario(pedido, inicio, duracao):
+    """True se [inicio, inicio + duracao) cai inteiro numa das faixas do pedido."""
+    if not pedido.get("janelas"):
+        return True
+    ini = hora_para_minutos(inicio)
+    return any(hora_para_minutos(a) <= ini and ini + duracao <= hora_para_minutos(b)
+               for a, b in pedido["janelas"])
+
+def ordem_de_prioridade(pedido):
+    return (-int(pedido.get("prioridade", 0)), pedido.get("criado_em", ""))
+
+def id_vaga(dia, recurso, inicio):
+    return f"{dia} {recurso} {inicio}"
+
+# ---------- LISTA DE ESPERA ----------
+
+class ListaEspera:
+    """
+    lista.json na memória ({"pedidos": {id: pedido}, "ofertas": {id: oferta}}),
+    relido quando outro terminal grava.
+
+    Registra-se nos observadores do IndiceOcupacao: cada horário que fica
+    livre é anotado e só casado com os pedidos em processar(), depois que
+    a escrita inteira terminou (remarcar libera e reserva em seguida).
+    """
+
+    def __init__(self, ocupacao, pasta=PASTA_ESPERA):
+        self.ocupacao = ocupacao
+        self.pasta = pasta
+        self.pedidos = {}
+        self.ofertas = {}
+        self._assinatura = None
+        self._liberados = set()
+        ocupacao.observadores.append(self._ao_mudar)
+        self.recarregar()
+
+    @property
+    def caminho(self):
+        return os.path.join(self.pasta, ARQUIVO_ESPERA)
+
+    def recarregar(self):
+        self._assinatura = assinatura_arquivo(self.caminho)
+        dados = ler_json(self.caminho)
+        self.pedidos, self.ofertas = dados.get("pedidos", {}), dados.get("ofertas", {})
+
+    def atualizar(self):
+        """Relê só se o arquivo mudou (só stat)."""
+        if assinatura_arquivo(self.caminho) != self._assinatura:
+            self.recarregar()
+
+    def _gravar(self, pedidos=None, ofertas=None):
+        """Relê sob trava, aplica os pedidos/ofertas alterados e troca o arquivo."""
+        def aplicar(dados):
+            dados.setdefault("pedidos", {}).update(pedidos or {})
+            dados.setdefault("ofertas", {}).update(ofertas or {})
+
+        dados = alterar_json(self.caminho, aplicar)
+        self.pedidos, self.ofertas = dados["pedidos"], dados["ofertas"]
+        self._assinatura = assinatura_arquivo(self.caminho)
+
+    # --- pedidos ---
+    def pedir(self, pedido):
+        self.atualizar()
+        self._gravar(pedidos={pedido["id"]: pedido})
+        return pedido
+
+    def desistir(self, pid):
+        """Tira o pedido da fila; as ofertas pendentes dele expiram."""
+        self.atualizar()
+        pedido = dict(self.pedidos[pid], status="desistiu")
+        ofertas = {oid: dict(o, status="expirada") for oid, o in self.ofertas.items()
+                   if o["pedido"] == pid and o["status"] == "pendente"}
+        self._gravar(pedidos={pid: pedido}, ofertas=ofertas)
+
+    def abertos(self):
+        self.atualizar()
+        return sorted((p for p in self.pedidos.values() if p["status"] in PEDIDO_ABERTO),
+                      key=ordem_de_prioridade)
+
+    # --- vagas ---
+    def _ao_mudar(self, dia, lugar):
+        if dia is None or lugar is None or lugar[0] == CHAVE_VENDAS:
+            return   # releitura do dia inteiro não diz o que foi liberado
+        recurso, inicio = lugar
+        if self.ocupacao.inicio_em(dia, recurso, inicio) is None:
+            self._liberados.add((dia, recurso, inicio))
+
+    def espaco_livre(self, dia, recurso, inicio):
+        """(início, fim) em minutos do trecho livre e aberto que contém `inicio`, ou None."""
+        minuto = hora_para_minutos(inicio)
+        ints = self.ocupacao.intervalos(dia, recurso)
+        for abertura, fechamento in self.ocupacao.mascara(dia).abertos:
+            for ini, fim in ints.lacunas(abertura, fechamento):
+                if ini <= minuto < fim:
+                    return ini, fim
+        return None
+
+    def encaixes(self, pedido, dia, recurso, espaco, depois_de=None):
+        """Horários iniciais do serviço do pedido dentro do espaço livre e das faixas dele."""
+        duracao = catalogo.duracao(pedido["servico"], dia)
+        if duracao is None:
+            return []
+        ini, fim = espaco
+        inicios = self.ocupacao.intervalos(dia, recurso).inicios_livres(duracao, ini, fim, GRANULARIDADE)
+        return [minutos_para_hora(m) for m in inicios
+                if (depois_de is None or m > depois_de)
+                and aceita_horario(pedido, minutos_para_hora(m), duracao)]
+
+    def esquecer(self, dia):
+        """Descarta os horários anotados do dia (a gravação dele perdeu para outro terminal)."""
+        self._liberados = {l for l in self._liberados if l[0] != dia}
+
+    def processar(self, agora=None, dias=None):
+        """
+        Casa os horários liberados desde a última chamada com os pedidos
+        que aguardam (só os de `dias`, se vier). Retorna as ofertas novas
+        (já gravadas), na ordem da fila.
+        """
+        liberados = {l for l in self._liberados if dias is None or l[0] in dias}
+        if not liberados:
+            return []
+        self.atualizar()
+        agora = agora or datetime.now()
+        hoje = agora.strftime("%Y-%m-%d")
+        minuto_agora = agora.hour * 60 + agora.minute
+
+        fila = [p for p in self.pedidos.values() if p["status"] == "aguardando"]
+        fila.sort(key=ordem_de_prioridade)
+        novas, pedidos = {}, {}
+        vistos = set()
+        for dia, recurso, inicio in sorted(liberados):
+            if dia < hoje:
+                continue
+            espaco = self.espaco_livre(dia, recurso, inicio)
+            if espaco is None or (dia, recurso, espaco) in vistos:
+                continue
+            vistos.add((dia, recurso, espaco))
+            vaga = id_vaga(dia, recurso, minutos_para_hora(espaco[0]))
+            posicao = 0
+            for pedido in fila:
+                if pedido["id"] in pedidos or not aceita_dia(pedido, dia):
+                    continue
+                horarios = self.encaixes(pedido, dia, recurso, espaco,
+                                         minuto_agora if dia == hoje else None)
+                if not horarios:
+                    continue
+                posicao += 1
+                oferta = {
+                    "id": f"{agora:%Y%m%d%H%M%S}-{uuid.uuid4().hex[:6]}",
+                    "pedido": pedido["id"],
+                    "vaga": vaga,
+                    "posicao": posicao,
+                    "cliente": pedido["cliente"],
+                    CHAVE_CLIENTE_ID: pedido.get(CHAVE_CLIENTE_ID),
+                    "servico": pedido["servico"],
+                    "data_iso": dia,
+                    "recurso": recurso,
+                    "hora": horarios[0],
+                    "duracao": catalogo.duracao(pedido["servico"], dia),
+                    "criada_em": agora.strftime("%Y-%m-%dT%H:%M:%S"),
+                    "status": "pendente",
+                }
+                novas[oferta["id"]] = oferta
+                pedidos[pedido["id"]] = dict(pedido, status="oferecido")
+        if novas:
+            self._gravar(pedidos=pedidos, ofertas=novas)
+        # só esquece depois de gravar: se a gravação falhar, a próxima chamada tenta de novo
+        self._liberados -= liberados
+        return sorted(novas.values(), key=lambda o: (o["vaga"], o["posicao"]))
+
+    # --- ofertas ---
+    def pendentes(self):
+        """Ofertas pendentes na ordem em que devem ser feitas (vaga, posição na fila)."""
+        self.atualizar()
+        return sorted((o for o in self.ofertas.values() if o["status"] == "pendente"),
+                      key=lambda o: (o["data_iso"], o["hora"], o["vaga"], o["posicao"]))
+
+    def cabe(self, oferta):
+        return self.ocupacao.cabe(oferta["data_iso"], oferta["recurso"], oferta["hora"], oferta["duracao"])
+
+    def aceitar(self, oid):
+        """
+        Reserva o horário da oferta (sem gravar a agenda: quem chama grava).
+        As outras ofertas pendentes da mesma vaga que não cabem mais expiram.
+        Levanta ValueError se o horário já foi ocupado.
+        """
+        self.atualizar()
+        oferta = self.ofertas[oid]
+        if oferta["status"] != "pendente":
+            raise ValueError("Essa oferta não está mais pendente.")
+        if not self.cabe(oferta):
+            self._encerrar(oferta, "expirada")
+            raise ValueError("O horário oferecido já foi ocupado.")
+        data_iso = oferta["data_iso"]
+        pedido = self.pedidos.get(oferta["pedido"], {})
+        slot = reservar_atendimento(self.ocupacao, data_iso, oferta["recurso"], oferta["hora"], {
+            "cliente": oferta["cliente"],
+            CHAVE_CLIENTE_ID: oferta.get(CHAVE_CLIENTE_ID),
+            "servico": oferta["servico"],
+            "duracao": oferta["duracao"],
+            "obs": pedido.get("obs", ""),
+            "preco": catalogo.preco(oferta["servico"], data_iso),
+            "pago": False,
+            "extras": [],
+            "pacote": False,
+            "pacote_nome": None,
+            "pacote_valor_mensal": 0.0,
+            "status": "confirmado",
+        })
+        ofertas = {oid: dict(oferta, status="aceita")}
+        pedidos = {}
+        if pedido:
+            pedidos[pedido["id"]] = dict(pedido, status="atendido")
+        for outra in self.ofertas.values():
+            if outra["status"] == "pendente" and outra["id"] != oid:
+                if outra["pedido"] == oferta["pedido"] or not self.cabe(outra):
+                    ofertas[outra["id"]] = dict(outra, status="expirada")
+                    if outra["pedido"] != oferta["pedido"]:
+                        pedidos.update(self._voltar_a_aguardar(outra["pedido"]))
+        self._gravar(pedidos=pedidos, ofertas=ofertas)
+        return slot
+
+    def recusar(self, oid):
+        """O cliente não quis: a oferta sai da fila e o pedido volta a aguardar outra vaga."""
+        self.atualizar()
+        self._encerrar(self.ofertas[oid], "recusada")
+
+    def _voltar_a_aguardar(self, pid):
+        pedido = self.pedidos.get(pid)
+        if pedido and pedido["status"] == "oferecido":
+            return {pid: dict(pedido, status="aguardando")}
+        return {}
+
+    def _encerrar(self, oferta, status):
+        self._gravar(pedidos=self._voltar_a_aguardar(oferta["pedido"]),
+                     ofertas={oferta["id"]: dict(oferta, status=status)})
+
+def texto_pedido(pedido):
+    if pedido.get("datas"):
+        dias = ", ".join(iso_para_br(d) for d in pedido["datas"])
+    elif pedido.get("dias"):
+        dias = ", ".join(DIAS_SEMANA[d].split("-")[0] for d in pedido["dias"])
+    else:
+        dias = "qualquer dia"
+    faixas = ", ".join(f"{a}-{b}" for a, b in pedido.get("janelas", [])) or "qualquer hora"
+    texto = f"{pedido['cliente']} - {pedido['servico']} - {dias} - {faixas}"
+    if pedido.get("prioridade"):
+        texto += f" - prioridade {pedido['prioridade']}"
+    if pedido["status"] == "oferecido":
+        texto += " (oferta pendente)"
+    return texto
+
+def texto_oferta(oferta):
+    return (f"{iso_para_br(oferta['data_iso'])} {oferta['hora']} ({oferta['recurso']}) - "
+            f"{oferta['posicao']}º {oferta['cliente']} - {oferta['servico']}")
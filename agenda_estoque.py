@@ -0,0 +1,342 @@
+"""
+Estoque dos produtos: entradas, contagens e mínimos em
+estoque/movimentos.jsonl; as saídas vêm da agenda.
+"""
+import os
+import uuid
+from datetime import datetime
+
+from agenda_nucleo import (
+    CHAVE_VENDAS,
+    atendimentos_do_dia,
+    catalogo,
+    grades_do_dia,
+)
+from agenda_sincronia import acrescentar_jsonl, assinatura_arquivo, ler_jsonl
+
+PASTA_ESTOQUE = "estoque"
+ARQUIVO_MOVIMENTOS = "movimentos.jsonl"
+MINIMO_PADRAO = 2
+TIPOS_MOVIMENTO = ("entrada", "contagem", "minimo")
+
+def produtos_de_venda():
+    """Itens do catálogo que não são serviço (são os que têm estoque), mesmo os já retirados."""
+    return sorted(k for k in catalogo.nomes() if not catalogo.e_servico(k))
+
+def _qtd(registro):
+    try:
+        return max(int(registro.get("qtd", 1)), 0)
+    except (TypeError, ValueError):
+        return 1
+
+def _somar(itens, nome, qtd):
+    if qtd and catalogo.conhece(nome) and not catalogo.e_servico(nome):
+        itens[nome] = itens.get(nome, 0) + qtd
+
+def itens_do_slot(slot):
+    """{produto: qtd} dos extras do atendimento (cancelado não levou nada)."""
+    itens = {}
+    if slot.get("status") != "cancelado":
+        for extra in slot.get("extras", []):
+            _somar(itens, extra.get("nome", ""), _qtd(extra))
+    return itens
+
+def itens_das_vendas(vendas):
+    itens = {}
+    for venda in vendas or []:
+        if isinstance(venda, dict):
+            _somar(itens, venda.get("produto", ""), _qtd(venda))
+    return itens
+
+def _saidas_do_dia(dia, registro):
+    saidas = [((dia, r, h), itens_do_slot(slot)) for r, h, slot in atendimentos_do_dia(registro)]
+    if isinstance(registro, dict):
+        saidas.append(((dia, CHAVE_VENDAS, None), itens_das_vendas(registro.get(CHAVE_VENDAS))))
+    return saidas
+
+class Estoque:
+    """
+    Saldo por produto = contagem + entradas depois dela - vendas dos dias
+    depois dela. Tudo mantido em dicionários; saldo() e baixo() são O(1).
+    """
+
+    def __init__(self, ocupacao, pasta=PASTA_ESTOQUE, arquivo=None):
+        self.ocupacao = ocupacao
+        self.pasta = pasta
+        self.arquivo = arquivo   # ArquivoMorto (opcional): vendas dos dias já arquivados
+        self.montado = False
+        self._assinatura = None
+        self._movimentos = []
+        self._contagem = {}    # produto -> último movimento de contagem
+        self._entrou = {}      # produto -> entradas depois da contagem
+        self._minimo = {}      # produto -> estoque mínimo
+        self._lugares = {}     # (dia, recurso, hora) ou (dia, CHAVE_VENDAS, None) -> {produto: qtd}
+        self._por_dia = {}     # dia -> {lugares}
+        self._vendido = {}     # produto -> vendido depois da contagem
+        self._mudados = set()  # dias mexidos antes de montar (None: a agenda toda)
+        self.recarregar()
+        ocupacao.observadores.append(self._ao_mudar)
+
+    @property
+    def agenda(self):
+        return self.ocupacao.agenda
+
+    @property
+    def caminho(self):
+        return os.path.join(self.pasta, ARQUIVO_MOVIMENTOS)
+
+    # --- movimentos (arquivo) ---
+    def recarregar(self):
+        self._assinatura = assinatura_arquivo(self.caminho)
+        self._movimentos = []
+        self._contagem.clear()
+        self._entrou.clear()
+        self._minimo.clear()
+        for mov in ler_jsonl(self.caminho):
+            self._aplicar_movimento(mov)
+        if self.montado:
+            self._recontar_vendido()
+
+    def atualizar(self):
+        """Relê só se outro terminal lançou algo (só stat)."""
+        if assinatura_arquivo(self.caminho) != self._assinatura:
+            self.recarregar()
+
+    def _aplicar_movimento(self, mov):
+        self._movimentos.append(mov)
+        produto = mov["produto"]
+        if mov["tipo"] == "contagem":
+            self._contagem[produto] = mov
+            self._entrou[produto] = 0
+        elif mov["tipo"] == "entrada":
+            self._entrou[produto] = self._entrou.get(produto, 0) + mov["qtd"]
+        elif mov["tipo"] == "minimo":
+            self._minimo[produto] = mov["qtd"]
+
+    def lancar(self, tipo, produto, qtd, obs="", quando=None):
+        """Acrescenta uma entrada, contagem ou mínimo. Retorna o movimento."""
+        if tipo not in TIPOS_MOVIMENTO:
+            raise ValueError(f"Movimento inválido: {tipo!r}.")
+        if produto not in produtos_de_venda():
+            raise ValueError(f"Produto desconhecido: {produto!r}.")
+        qtd = int(qtd)
+        if qtd < 0 or (tipo == "entrada" and qtd == 0):
+            raise ValueError("Quantidade inválida.")
+        self.atualizar()
+        quando = quando or datetime.now()
+        mov = {
+            "id": f"{quando:%Y%m%d%H%M%S}-{uuid.uuid4().hex[:6]}",
+            "tipo": tipo,
+            "produto": produto,
+            "qtd": qtd,
+            "quando": quando.strftime("%Y-%m-%dT%H:%M:%S"),
+            "dia": quando.strftime("%Y-%m-%d"),
+            "obs": obs,
+        }
+        acrescentar_jsonl(self.caminho, mov)
+        self._aplicar_movimento(mov)
+        if tipo == "contagem" and self.montado:
+            self._vendido[produto] = self._vendido_desde(produto, mov["dia"])
+        self._assinatura = assinatura_arquivo(self.caminho)
+        return mov
+
+    # --- saídas (índice da agenda) ---
+    def montar(self, tarefa=None):
+        """Uma passada pela agenda (e pelo arquivo morto). Depois as escritas mantêm o índice."""
+        self.montado = False
+        return self.instalar(self.ler(self.agenda, tarefa))
+
+    def ler(self, agenda, tarefa=None):
+        """
+        A passada em si, sem mexer no índice: [(lugar, {produto: qtd})].
+        Em segundo plano, `agenda` é uma cópia (copia_dos_dias) e o
+        resultado vai para instalar() na thread do Tk.
+        """
+        dias = list(agenda)
+        if self.arquivo is not None:
+            self.arquivo.atualizar()
+            dias += [d for d in self.arquivo.dias() if d not in agenda]
+        saidas = []
+        for pos, dia in enumerate(dias):
+            if tarefa is not None and pos % 50 == 0:
+                tarefa.passo(pos, len(dias))
+            saidas += _saidas_do_dia(dia, agenda[dia] if dia in agenda else self.arquivo.dia(dia))
+        return saidas
+
+    def instalar(self, saidas):
+        """Põe o que ler() achou no índice e refaz os dias mexidos enquanto ele lia."""
+        if self.montado:
+            return self      # já montado na hora por outra consulta: é mais novo
+        self._lugares.clear()
+        self._por_dia.clear()
+        for lugar, itens in saidas:
+            self._definir(lugar, itens)
+        mudados, self._mudados = self._mudados, set()
+        if None in mudados:
+            return self.montar()
+        self.montado = True
+        self._recontar_vendido()
+        for dia in mudados:
+            self._ao_mudar(dia, None)
+        return self
+
+    def _garantir(self):
+        if not self.montado:
+            self.montar()
+
+    def _conta(self, produto, dia):
+        """A venda desse dia entra no saldo atual (é depois da última contagem)?"""
+        contagem = self._contagem.get(produto)
+        return contagem is None or dia > contagem["dia"]
+
+    def _vendido_desde(self, produto, dia_base):
+        return sum(itens.get(produto, 0) for (dia, _r, _h), itens in self._lugares.items() if dia > dia_base)
+
+    def _recontar_vendido(self):
+        self._vendido.clear()
+        for (dia, _r, _h), itens in self._lugares.items():
+            for produto, qtd in itens.items():
+                if self._conta(produto, dia):
+                    self._vendido[produto] = self._vendido.get(produto, 0) + qtd
+
+    def _definir(self, lugar, itens):
+        """Troca o que saiu num lugar e acerta o vendido pela diferença."""
+        dia = lugar[0]
+        antigos = self._lugares.pop(lugar, {})
+        for produto, qtd in antigos.items():
+            if self.montado and self._conta(produto, dia):
+                self._vendido[produto] -= qtd
+        if not itens:
+            lugares = self._por_dia.get(dia)
+            if lugares is not None:
+                lugares.discard(lugar)
+                if not lugares:
+                    del self._por_dia[dia]
+            return
+        self._lugares[lugar] = itens
+        self._por_dia.setdefault(dia, set()).add(lugar)
+        for produto, qtd in itens.items():
+            if self.montado and self._conta(produto, dia):
+                self._vendido[produto] = self._vendido.get(produto, 0) + qtd
+
+    def _indexar_dia(self, dia):
+        for lugar, itens in _saidas_do_dia(dia, self.agenda.get(dia)):
+            self._definir(lugar, itens)
+
+    def _ao_mudar(self, dia, lugar):
+        if not self.montado:
+            self._mudados.add(dia)
+            return
+        if dia is None:
+            self.montar()
+            return
+        if lugar is None:
+            if dia not in self.agenda:
+                return    # foi para o arquivo morto: as vendas do dia continuam valendo
+            for antigo in list(self._por_dia.get(dia, ())):
+                self._definir(antigo, {})
+            self._indexar_dia(dia)
+            return
+        recurso, hora = lugar
+        registro = self.agenda.get(dia)
+        if recurso == CHAVE_VENDAS:
+            # remover uma venda muda a posição das seguintes: refaz as do dia
+            vendas = registro.get(CHAVE_VENDAS) if isinstance(registro, dict) else None
+            self._definir((dia, CHAVE_VENDAS, None), itens_das_vendas(vendas))
+            return
+        itens = {}
+        for r, grade in grades_do_dia(registro):
+            slot = grade.get(hora) if r == recurso else None
+            if isinstance(slot, dict) and slot.get("inicio", hora) == hora:
+                itens = itens_do_slot(slot)
+        self._definir((dia, recurso, hora), itens)
+
+    # --- consultas ---
+    def controlado(self, produto):
+        """Só tem saldo o produto que já teve contagem ou entrada."""
+        return produto in self._contagem or produto in self._entrou
+
+    def saldo(self, produto):
+        """Quanto tem na prateleira agora (None se o produto não é controlado)."""
+        self._garantir()
+        if not self.controlado(produto):
+            return None
+        contagem = self._contagem.get(produto)
+        base = contagem["qtd"] if contagem else 0
+        return base + self._entrou.get(produto, 0) - self._vendido.get(produto, 0)
+
+    def minimo(self, produto):
+        return self._minimo.get(produto, MINIMO_PADRAO)
+
+    def baixo(self, produto):
+        """True se o produto controlado está no mínimo ou abaixo."""
+        saldo = self.saldo(produto)
+        return saldo is not None and saldo <= self.minimo(produto)
+
+    def alertas(self):
+        """[(produto, saldo, mínimo)] dos produtos no mínimo ou abaixo."""
+        self.atualizar()
+        return [(p, self.saldo(p), self.minimo(p)) for p in produtos_de_venda() if self.baixo(p)]
+
+    def _vendido_nos_dias(self, condicao):
+        self._garantir()
+        vendido = {}
+        for dia, lugares in self._por_dia.items():
+            if condicao(dia):
+                for lugar in lugares:
+                    for produto, qtd in self._lugares[lugar].items():
+                        vendido[produto] = vendido.get(produto, 0) + qtd
+        return vendido
+
+    def vendido_no_periodo(self, inicio_iso, fim_iso):
+        """{produto: qtd} vendido entre as datas (inclusive)."""
+        return self._vendido_nos_dias(lambda dia: inicio_iso <= dia <= fim_iso)
+
+    def giro(self, inicio_iso, fim_iso):
+        """
+        Por produto: vendido e reposto no período, saldo no fim dele e o
+        giro (vendido / (vendido + saldo no fim)). Produto sem controle
+        entra só com o vendido.
+        """
+        self.atualizar()
+        vendido = self.vendido_no_periodo(inicio_iso, fim_iso)
+        depois = self._vendido_nos_dias(lambda dia: dia > fim_iso)
+        linhas = []
+        for produto in produtos_de_venda():
+            entradas = sum(
+                m["qtd"] for m in self._movimentos
+                if m["tipo"] == "entrada" and m["produto"] == produto and inicio_iso <= m["dia"] <= fim_iso
+            )
+            entradas_depois = sum(
+                m["qtd"] for m in self._movimentos
+                if m["tipo"] == "entrada" and m["produto"] == produto and m["dia"] > fim_iso
+            )
+            saldo = self.saldo(produto)
+            saldo_fim = None if saldo is None else saldo + depois.get(produto, 0) - entradas_depois
+            qtd = vendido.get(produto, 0)
+            if not qtd and saldo is None:
+                continue
+            disponivel = qtd + (saldo_fim or 0)
+            linhas.append({
+                "produto": produto,
+                "vendido": qtd,
+                "entradas": entradas,
+                "saldo_fim": saldo_fim,
+                "giro": (qtd / disponivel) if saldo_fim is not None and disponivel > 0 else None,
+            })
+        return linhas
+
+def texto_saldo(estoque, produto):
+    saldo = estoque.saldo(produto)
+    if saldo is None:
+        return f"{produto}: sem controle"
+    alerta = "⚠️ " if estoque.baixo(produto) else ""
+    return f"{alerta}{produto}: {saldo} (mín. {estoque.minimo(produto)})"
+
+def texto_giro(linha):
+    texto = f"{linha['produto']}: vendeu {linha['vendido']}, entrou {linha['entradas']}"
+    if linha["saldo_fim"] is not None:
+        texto += f", sobrou {linha['saldo_fim']}"
+    if linha["giro"] is not None:
+        texto += f" - giro {linha['giro'] * 100:.0f}%"
+    return texto
@@ -0,0 +1,158 @@
+"""Expediente da barbearia (expediente.json): horário por dia da semana, pausas e bloqueios."""
+import json
+import os
+from datetime import datetime
+
+from agenda_intervalos import (
+    MascaraDia,
+    hora_para_minutos,
+    minutos_para_hora,
+    subtrair_periodos,
+)
+from agenda_nucleo import ABERTURA, FECHAMENTO, DIAS_SEMANA
+
+ARQUIVO_EXPEDIENTE = "expediente.json"
+
+def expediente_padrao():
+    """Mesmo horário todos os dias, sem pausas nem bloqueios (como era antes)."""
+    periodo = [minutos_para_hora(ABERTURA), minutos_para_hora(FECHAMENTO)]
+    return {
+        "dias": {nome: [list(periodo)] for nome in DIAS_SEMANA},
+        # {"inicio": "12:00", "fim": "13:00", "motivo": "Almoço", "dias": [...]}
+        # sem "dias" a pausa vale para todos os dias
+        "pausas": [],
+        # {"data": "AAAA-MM-DD", "inicio": "14:00", "fim": "18:00", "motivo": "Folga"}
+        # sem "inicio"/"fim" o bloqueio vale para o dia todo
+        "bloqueios": [],
+    }
+
+def _periodo_em_minutos(inicio, fim):
+    ini = hora_para_minutos(inicio)
+    # "24:00" não é hora válida, mas é um fim de dia válido
+    fim_min = 24 * 60 if fim == "24:00" else hora_para_minutos(fim)
+    if ini is None or fim_min is None or fim_min <= ini:
+        return None
+    return ini, fim_min
+
+def texto_para_periodos(texto):
+    """Converte '09:00-12:00, 13:00-21:00' em [['09:00', '12:00'], ...]. Vazio = fechado."""
+    periodos = []
+    for parte in texto.split(","):
+        parte = parte.strip()
+        if not parte:
+            continue
+        try:
+            inicio, fim = (p.strip() for p in parte.split("-"))
+        except ValueError:
+            raise ValueError(f"Período inválido: {parte}")
+        if _periodo_em_minutos(inicio, fim) is None:
+            raise ValueError(f"Período inválido: {parte}")
+        periodos.append([inicio, fim])
+    return periodos
+
+def periodos_para_texto(periodos):
+    return ", ".join(f"{ini}-{fim}" for ini, fim in periodos)
+
+class Expediente:
+    """Configuração do expediente + cache das máscaras já compiladas por data."""
+
+    def __init__(self, config=None):
+        self.config = config if config is not None else expediente_padrao()
+        self.config.setdefault("dias", {})
+        self.config.setdefault("pausas", [])
+        self.config.setdefault("bloqueios", [])
+        self._mascaras = {}
+        self._bloqueios_por_data = None
+
+    def invalidar(self):
+        """Descarta as máscaras compiladas (chamar depois de mudar a configuração)."""
+        self._mascaras.clear()
+        self._bloqueios_por_data = None
+
+    def _bloqueios_da_data(self, data_iso):
+        if self._bloqueios_por_data is None:
+            por_data = {}
+            for b in self.config["bloqueios"]:
+                por_data.setdefault(b.get("data"), []).append(b)
+            self._bloqueios_por_data = por_data
+        return self._bloqueios_por_data.get(data_iso, [])
+
+    def mascara(self, data_iso):
+        """MascaraDia da data (compilada na primeira consulta)."""
+        mascara = self._mascaras.get(data_iso)
+        if mascara is None:
+            mascara = self._compilar(data_iso)
+            self._mascaras[data_iso] = mascara
+        return mascara
+
+    def _compilar(self, data_iso):
+        try:
+            dt = datetime.strptime(data_iso, "%Y-%m-%d")
+        except (TypeError, ValueError):
+            return MascaraDia([])
+        nome_dia = DIAS_SEMANA[dt.weekday()]
+
+        abertos = []
+        for inicio, fim in self.config["dias"].get(nome_dia, []):
+            periodo = _periodo_em_minutos(inicio, fim)
+            if periodo:
+                abertos.append(periodo)
+
+        fechados = []
+        for p in self.config["pausas"]:
+            dias = p.get("dias")
+            if dias and nome_dia not in dias:
+                continue
+            periodo = _periodo_em_minutos(p.get("inicio"), p.get("fim"))
+            if periodo:
+                fechados.append(periodo + (p.get("motivo") or "Pausa",))
+
+        for b in self._bloqueios_da_data(data_iso):
+            if b.get("inicio") and b.get("fim"):
+                periodo = _periodo_em_minutos(b["inicio"], b["fim"])
+            else:
+                periodo = (0, 24 * 60)
+            if periodo:
+                fechados.append(periodo + (b.get("motivo") or "Bloqueado",))
+
+        abertos = subtrair_periodos(abertos, [(ini, fim) for ini, fim, _ in fechados])
+        return MascaraDia(abertos, fechados)
+
+    # ----- edição -----
+
+    def definir_dia(self, nome_dia, periodos):
+        self.config["dias"][nome_dia] = periodos
+        self.invalidar()
+
+    def definir_pausas(self, pausas):
+        self.config["pausas"] = pausas
+        self.invalidar()
+
+    def adicionar_bloqueio(self, data_iso, inicio=None, fim=None, motivo=""):
+        bloqueio = {"data": data_iso, "motivo": motivo}
+        if inicio and fim:
+            if _periodo_em_minutos(inicio, fim) is None:
+                raise ValueError("Período inválido.")
+            bloqueio["inicio"] = inicio
+            bloqueio["fim"] = fim
+        self.config["bloqueios"].append(bloqueio)
+        self.config["bloqueios"].sort(key=lambda b: (b.get("data", ""), b.get("inicio", "")))
+        self.invalidar()
+        return bloqueio
+
+    def remover_bloqueio(self, bloqueio):
+        self.config["bloqueios"].remove(bloqueio)
+        self.invalidar()
+
+def carregar_expediente():
+    if not os.path.exists(ARQUIVO_EXPEDIENTE):
+        return Expediente()
+    try:
+        with open(ARQUIVO_EXPEDIENTE, "r", encoding="utf-8") as f:
+            return Expediente(json.load(f))
+    except json.JSONDecodeError:
+        return Expediente()
+
+def salvar_expediente(expediente):
+    with open(ARQUIVO_EXPEDIENTE, "w", encoding="utf-8") as f:
+        json.dump(expediente.config, f, ensure_ascii=False, indent=2)
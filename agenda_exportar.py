@@ -0,0 +1,165 @@
+"""
+Exportação da agenda para CSV (para o contador).
+
+Uso:
+    python agenda_exportar.py --inicio 2025-01-01 --fim 2025-12-31 --saida 2025.csv
+"""
+import argparse
+import csv
+import os
+import sys
+from datetime import datetime, timedelta
+
+from agenda_nucleo import (
+    atendimentos_do_dia,
+    carregar_agenda,
+    carregar_clientes,
+    dia_semana_br,
+    iso_para_br,
+    nome_do_registro,
+    preco_do_slot,
+)
+
+COLUNAS = (
+    "data",
+    "dia_semana",
+    "tipo",
+    "cadeira",
+    "hora",
+    "cliente",
+    "descricao",
+    "duracao_min",
+    "status",
+    "valor",
+    "pago",
+    "pacote",
+    "obs",
+)
+
+TIPO_ATENDIMENTO = "ATENDIMENTO"
+TIPO_EXTRA = "EXTRA"
+TIPO_VENDA = "VENDA"
+TIPO_FATURA = "FATURA_PACOTE"
+
+def _valor(v):
+    try:
+        return f"{float(v):.2f}".replace(".", ",")
+    except (TypeError, ValueError):
+        return "0,00"
+
+def _sim_nao(v):
+    return "sim" if v else "não"
+
+def datas_do_periodo(inicio_iso, fim_iso):
+    """Gera as datas ISO de inicio a fim (inclusive), uma por vez."""
+    dia = datetime.strptime(inicio_iso, "%Y-%m-%d")
+    fim = datetime.strptime(fim_iso, "%Y-%m-%d")
+    while dia <= fim:
+        yield dia.strftime("%Y-%m-%d")
+        dia += timedelta(days=1)
+
+def linhas_do_dia_csv(data_iso, dia, clientes=None):
+    """Linhas (tuplas na ordem de COLUNAS) de um dia da agenda (nome atual pelo id, se houver `clientes`)."""
+    if not isinstance(dia, dict):
+        return
+    data_br = iso_para_br(data_iso)
+    semana = dia_semana_br(data_iso)
+
+    for recurso, hora, slot in atendimentos_do_dia(dia):
+        servico = slot.get("servico", "")
+        cliente = nome_do_registro(clientes, slot)
+        pago = _sim_nao(slot.get("pago", False))
+        pacote = slot.get("pacote_nome") or _sim_nao(slot.get("pacote", False))
+        yield (
+            data_br, semana, TIPO_ATENDIMENTO, recurso, hora,
+            cliente, servico, slot.get("duracao", ""),
+            slot.get("status", "pendente"),
+            _valor(preco_do_slot(slot, data_iso)),
+            pago, pacote, slot.get("obs", ""),
+        )
+        for extra in slot.get("extras", []):
+            yield (
+                data_br, semana, TIPO_EXTRA, recurso, hora,
+                cliente, extra.get("nome", "Produto"), "",
+                "", _valor(extra.get("valor", 0.0)), pago, "", "",
+            )
+
+    vendas = dia.get("_vendas_avulsas", [])
+    if isinstance(vendas, list):
+        for v in vendas:
+            if not isinstance(v, dict):
+                continue
+            yield (
+                data_br, semana, TIPO_VENDA, "", "",
+                nome_do_registro(clientes, v), v.get("produto", "Produto"), "",
+                "", _valor(v.get("valor", 0.0)), _sim_nao(v.get("pago", True)), "", "",
+            )
+
+def linhas_das_faturas(faturas, mes, data_iso, clientes=None):
+    """Linhas das faturas de pacote do mês ('AAAA-MM'), com a data `data_iso`."""
+    data_br = iso_para_br(data_iso)
+    semana = dia_semana_br(data_iso)
+    for fatura in faturas.do_mes(mes):
+        yield (
+            data_br, semana, TIPO_FATURA, "", "",
+            nome_do_registro(clientes, fatura), f"{fatura['pacote_nome']} ({mes})", "",
+            "paga" if fatura["pago"] else "pendente", _valor(fatura["valor"]),
+            _sim_nao(fatura["pago"]), fatura["pacote_nome"], "",
+        )
+
+def linhas_exportacao(agenda, inicio_iso, fim_iso, tarefa=None, clientes=None, faturas=None):
+    """
+    Gera as linhas do período, dia a dia (sem montar a lista inteira).
+    Com `faturas` (FaturasPacote), as faturas de cada mês do período saem
+    no primeiro dia dele, como no relatório do mês.
+    """
+    total = (datetime.strptime(fim_iso, "%Y-%m-%d") - datetime.strptime(inicio_iso, "%Y-%m-%d")).days + 1
+    for pos, data_iso in enumerate(datas_do_periodo(inicio_iso, fim_iso)):
+        if tarefa is not None and pos % 30 == 0:
+            tarefa.passo(pos, total)
+        if faturas is not None and (data_iso == inicio_iso or data_iso.endswith("-01")):
+            yield from linhas_das_faturas(faturas, data_iso[:7], data_iso, clientes)
+        yield from linhas_do_dia_csv(data_iso, agenda.get(data_iso), clientes)
+
+def exportar_csv(agenda, caminho, inicio_iso, fim_iso, tarefa=None, clientes=None, faturas=None):
+    """Grava o CSV do período em `caminho`. Retorna o número de linhas (sem o cabeçalho)."""
+    temporario = caminho + ".tmp"
+    linhas = 0
+    try:
+        with open(temporario, "w", encoding="utf-8-sig", newline="") as f:
+            escritor = csv.writer(f, delimiter=";")
+            escritor.writerow(COLUNAS)
+            for linha in linhas_exportacao(agenda, inicio_iso, fim_iso, tarefa, clientes, faturas):
+                escritor.writerow(linha)
+                linhas += 1
+        os.replace(temporario, caminho)
+    finally:
+        if os.path.exists(temporario):
+            os.remove(temporario)
+    return linhas
+
+def main():
+    from agenda_pacotes import FaturasPacote
+
+    parser = argparse.ArgumentParser(description="Exporta a agenda para CSV.")
+    parser.add_argument("--inicio", required=True, help="AAAA-MM-DD")
+    parser.add_argument("--fim", required=True, help="AAAA-MM-DD")
+    parser.add_argument("--saida", required=True, help="arquivo .csv")
+    args = parser.parse_args()
+
+    try:
+        datetime.strptime(args.inicio, "%Y-%m-%d")
+        datetime.strptime(args.fim, "%Y-%m-%d")
+        if args.fim < args.inicio:
+            raise ValueError("o fim vem antes do início")
+    except ValueError as e:
+        sys.exit(f"Período inválido: {e}")
+
+    linhas = exportar_csv(
+        carregar_agenda(), args.saida, args.inicio, args.fim,
+        clientes=carregar_clientes(), faturas=FaturasPacote(),
+    )
+    print(f"{linhas} linhas gravadas em {args.saida}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,202 @@
+"""Desfazer/refazer das mudanças na agenda em memória."""
+import copy
+
+from agenda_nucleo import CHAVE_VENDAS, grade_recurso, iso_para_br, vendas_do_dia
+
+MAX_OPERACOES = 100
+
+class HistoricoDesatualizado(Exception):
+    """A agenda mudou por fora e a operação não pode mais ser aplicada."""
+
+class Operacao:
+    def __init__(self, passos, descricao=""):
+        self.passos = passos          # [(dia, lugar, antes, depois)]
+        self.descricao = descricao or descrever(passos)
+
+    @property
+    def dias(self):
+        return sorted({dia for dia, _lugar, _antes, _depois in self.passos})
+
+def _liquido(passos):
+    """
+    Efeito de uma operação por horário: (primeiro antes, último depois).
+    Uma troca de horários passa duas vezes pelo mesmo lugar; o que conta
+    para desfazer/refazer é como estava no começo e como ficou no fim.
+
+    Vendas não se juntam: a posição de cada passo vale para a lista como
+    estava naquele passo (apagar duas vezes a posição 0 são duas vendas),
+    então ficam todos os passos delas, na ordem.
+    """
+    por_lugar = {}
+    vendas = []
+    for dia, lugar, antes, depois in passos:
+        if lugar[0] == CHAVE_VENDAS:
+            if antes != depois:
+                vendas.append((dia, lugar, antes, depois))
+            continue
+        chave = (dia, lugar)
+        primeiro = por_lugar[chave][0] if chave in por_lugar else antes
+        por_lugar[chave] = (primeiro, depois)
+    return [
+        (dia, lugar, antes, depois)
+        for (dia, lugar), (antes, depois) in por_lugar.items()
+        if antes != depois
+    ] + vendas
+
+def _nome(registro):
+    return (registro or {}).get("cliente") or "sem nome"
+
+def descrever(passos):
+    """Texto curto para o botão/aviso ('Cancelar Bugre 10:00 (28/11/2025)'...)."""
+    if not passos:
+        return ""
+    dia, lugar, antes, depois = passos[0]
+    quando = f"{lugar[1]} ({iso_para_br(dia)})" if lugar[0] != CHAVE_VENDAS else f"({iso_para_br(dia)})"
+    if len(passos) > 1:
+        if len(passos) == 2 and passos[0][2] is not None and passos[1][3] is not None:
+            verbo = "Alterar" if passos[0][:2] == passos[1][:2] else "Mover"
+            return f"{verbo} {_nome(antes)} {quando}"
+        return f"{len(passos)} mudanças a partir de {iso_para_br(dia)}"
+    if lugar[0] == CHAVE_VENDAS:
+        if antes is None:
+            return f"Venda {depois.get('produto', '')} {quando}"
+        return f"Alterar venda {antes.get('produto', '')} {quando}"
+    if antes is None:
+        return f"Agendar {_nome(depois)} {quando}"
+    if depois is None:
+        return f"Cancelar {_nome(antes)} {quando}"
+    return f"Alterar {_nome(antes)} {quando}"
+
+class HistoricoAgenda:
+    """Pilhas de desfazer/refazer ligadas a um IndiceOcupacao."""
+
+    def __init__(self, indice, limite=MAX_OPERACOES):
+        self.indice = indice
+        self.limite = limite
+        self._pendentes = []
+        self._desfazer = []
+        self._refazer = []
+        indice.ao_alterar = self._registrar
+
+    def _registrar(self, dia, lugar, antes, depois):
+        self._pendentes.append((dia, lugar, antes, depois))
+
+    def fechar(self, descricao=""):
+        """Junta as mudanças desde a última chamada numa operação. Retorna a Operacao (ou None)."""
+        if not self._pendentes:
+            return None
+        operacao = Operacao(self._pendentes, descricao)
+        self._pendentes = []
+        self._desfazer.append(operacao)
+        del self._desfazer[:-self.limite]
+        self._refazer.clear()
+        return operacao
+
+    def descartar(self):
+        """Tira do histórico a operação que não dá mais para desfazer."""
+        if self._desfazer:
+            self._desfazer.pop()
+
+    def limpar(self):
+        """Esquece tudo (ex.: depois de recarregar a agenda inteira)."""
+        self._pendentes = []
+        self._desfazer.clear()
+        self._refazer.clear()
+
+    def pode_desfazer(self):
+        return bool(self._desfazer)
+
+    def pode_refazer(self):
+        return bool(self._refazer)
+
+    def proximo_desfazer(self):
+        return self._desfazer[-1].descricao if self._desfazer else ""
+
+    def proximo_refazer(self):
+        return self._refazer[-1].descricao if self._refazer else ""
+
+    # --- aplicação ---
+    def _vendas(self, dia):
+        vendas = self.indice.agenda.get(dia, {}).get(CHAVE_VENDAS, [])
+        return vendas if isinstance(vendas, list) else []
+
+    def _atual(self, dia, lugar):
+        registro = self.indice._grade_existente(dia, lugar[0]).get(lugar[1])
+        return registro if isinstance(registro, dict) else None
+
+    def _desatualizado(self, trocas):
+        """Dia do primeiro registro que não está como a operação deixou (ou None)."""
+        vendas = {}   # dia -> cópia da lista, andando passo a passo
+        for dia, lugar, de, para in trocas:
+            if lugar[0] != CHAVE_VENDAS:
+                if self._atual(dia, lugar) != de:
+                    return dia
+                continue
+            lista = vendas.setdefault(dia, list(self._vendas(dia)))
+            pos = lugar[1]
+            if de is None:
+                if pos > len(lista):
+                    return dia
+                lista.insert(pos, para)
+            elif pos >= len(lista) or lista[pos] != de:
+                return dia
+            elif para is None:
+                del lista[pos]
+            else:
+                lista[pos] = para
+        return None
+
+    def _trocar(self, dia, lugar, de, para):
+        """Põe `para` no lugar de `de` (um dos dois pode ser None)."""
+        if lugar[0] == CHAVE_VENDAS:
+            vendas = vendas_do_dia(self.indice.agenda, dia)
+            pos = lugar[1]
+            if para is None:
+                del vendas[pos]
+            elif de is None:
+                vendas.insert(pos, copy.deepcopy(para))
+            else:
+                vendas[pos] = copy.deepcopy(para)
+            return
+        grade = grade_recurso(self.indice.agenda, dia, lugar[0])
+        grade[lugar[1]] = copy.deepcopy(para) if para is not None else None
+
+    def _aplicar(self, trocas):
+        """
+        trocas = [(dia, lugar, de, para)]: horários no efeito líquido, vendas
+        passo a passo. Confere tudo antes de mexer em qualquer coisa.
+        """
+        dia = self._desatualizado(trocas)
+        if dia is not None:
+            raise HistoricoDesatualizado(
+                f"O registro de {iso_para_br(dia)} mudou depois (outro terminal?)."
+            )
+        # na ordem: cada posição de venda vale para a lista como está naquele passo
+        for dia, lugar, de, para in trocas:
+            self._trocar(dia, lugar, de, para)
+        for dia in {t[0] for t in trocas}:
+            self.indice.invalidar(dia)
+        # além do dia inteiro, cada horário mexido: a lista de espera precisa saber o que ficou livre
+        for dia, lugar, _de, _para in trocas:
+            if lugar[0] != CHAVE_VENDAS:
+                for observador in self.indice.observadores:
+                    observador(dia, lugar)
+
+    def desfazer(self):
+        """Volta a última operação. Retorna a Operacao desfeita (ou None)."""
+        self.fechar()
+        if not self._desfazer:
+            return None
+        operacao = self._desfazer[-1]
+        self._aplicar([(d, lugar, depois, antes) for d, lugar, antes, depois in reversed(_liquido(operacao.passos))])
+        self._refazer.append(self._desfazer.pop())
+        return operacao
+
+    def refazer(self):
+        """Aplica de novo a última operação desfeita. Retorna a Operacao (ou None)."""
+        if not self._refazer:
+            return None
+        operacao = self._refazer[-1]
+        self._aplicar(_liquido(operacao.passos))
+        self._desfazer.append(self._refazer.pop())
+        return operacao
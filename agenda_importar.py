@@ -0,0 +1,199 @@
+"""Importação de clientes em lote (CSV ou vCard)."""
+import csv
+from datetime import datetime
+
+from agenda_clientes import chave_nome
+from agenda_whatsapp import normalizar_telefone_br
+
+# nomes de coluna aceitos no CSV (comparados sem acento/maiúsculas)
+COLUNAS_NOME = ("nome", "name", "cliente", "nome completo", "full name")
+COLUNAS_TEL = ("tel", "telefone", "celular", "fone", "phone", "whatsapp", "mobile phone")
+COLUNAS_NASC = ("nasc", "nascimento", "aniversario", "data de nascimento", "birthday")
+
+def validar_nasc(texto):
+    """Retorna o aniversário como DD/MM, '' se vazio, ou None se inválido."""
+    texto = (texto or "").strip()
+    if not texto:
+        return ""
+    if texto.startswith("--"):          # vCard sem ano: --MMDD ou --MM-DD
+        digitos = texto[2:].replace("-", "")
+        texto = f"2000-{digitos[:2]}-{digitos[2:4]}"
+    for formato in ("%d/%m", "%d/%m/%Y", "%Y-%m-%d", "%Y%m%d", "%d-%m-%Y"):
+        try:
+            # ano fictício bissexto para aceitar 29/02
+            if formato == "%d/%m":
+                dt = datetime.strptime(texto + "/2000", "%d/%m/%Y")
+            else:
+                dt = datetime.strptime(texto, formato)
+        except ValueError:
+            continue
+        return dt.strftime("%d/%m")
+    return None
+
+# ---------- LEITURA ----------
+
+def _achar_coluna(cabecalho, aceitas):
+    for nome in cabecalho:
+        if chave_nome(nome) in aceitas:
+            return nome
+    return None
+
+def ler_csv(caminho):
+    """Gera {linha, nome, tel, nasc} de um CSV com cabeçalho (separador ; ou ,)."""
+    with open(caminho, "r", encoding="utf-8-sig", newline="") as f:
+        amostra = f.read(4096)
+        f.seek(0)
+        try:
+            dialeto = csv.Sniffer().sniff(amostra, delimiters=";,\t")
+        except csv.Error:
+            dialeto = csv.excel
+        leitor = csv.DictReader(f, dialect=dialeto)
+        cabecalho = leitor.fieldnames or []
+        col_nome = _achar_coluna(cabecalho, COLUNAS_NOME)
+        if col_nome is None:
+            raise ValueError("O CSV precisa de uma coluna 'nome'.")
+        col_tel = _achar_coluna(cabecalho, COLUNAS_TEL)
+        col_nasc = _achar_coluna(cabecalho, COLUNAS_NASC)
+
+        for pos, linha in enumerate(leitor, start=2):
+            yield {
+                "linha": pos,
+                "nome": linha.get(col_nome) or "",
+                "tel": (linha.get(col_tel) or "") if col_tel else "",
+                "nasc": (linha.get(col_nasc) or "") if col_nasc else "",
+            }
+
+def _linhas_vcard(f):
+    """Junta as linhas dobradas do vCard (continuação começa com espaço/tab)."""
+    atual = None
+    for bruta in f:
+        bruta = bruta.rstrip("\r\n")
+        if bruta[:1] in (" ", "\t") and atual is not None:
+            atual += bruta[1:]
+            continue
+        if atual is not None:
+            yield atual
+        atual = bruta
+    if atual is not None:
+        yield atual
+
+def ler_vcard(caminho):
+    """Gera {linha, nome, tel, nasc} de um arquivo .vcf (um ou vários contatos)."""
+    with open(caminho, "r", encoding="utf-8-sig", errors="replace") as f:
+        contato = None
+        for pos, linha in enumerate(_linhas_vcard(f), start=1):
+            chave, _, valor = linha.partition(":")
+            propriedade = chave.split(";")[0].split(".")[-1].upper()
+            parametros = chave.upper()
+
+            if propriedade == "BEGIN" and valor.upper() == "VCARD":
+                contato = {"linha": pos, "nome": "", "tel": "", "nasc": "", "_n": "", "_tel_cel": ""}
+            elif contato is None:
+                continue
+            elif propriedade == "FN":
+                contato["nome"] = valor.strip()
+            elif propriedade == "N":
+                # Sobrenome;Nome;... -> "Nome Sobrenome"
+                partes = valor.split(";")
+                contato["_n"] = " ".join(p for p in (partes[1:2] + partes[:1]) if p).strip()
+            elif propriedade == "TEL":
+                if "CELL" in parametros and not contato["_tel_cel"]:
+                    contato["_tel_cel"] = valor.strip()
+                if not contato["tel"]:
+                    contato["tel"] = valor.strip()
+            elif propriedade == "BDAY":
+                contato["nasc"] = valor.strip()
+            elif propriedade == "END" and valor.upper() == "VCARD":
+                yield {
+                    "linha": contato["linha"],
+                    "nome": contato["nome"] or contato["_n"],
+                    "tel": contato["_tel_cel"] or contato["tel"],
+                    "nasc": contato["nasc"],
+                }
+                contato = None
+
+def ler_contatos(caminho):
+    """Escolhe o leitor pela extensão (.vcf/.vcard = vCard, resto = CSV)."""
+    if caminho.lower().endswith((".vcf", ".vcard")):
+        return ler_vcard(caminho)
+    return ler_csv(caminho)
+
+# ---------- IMPORTAÇÃO ----------
+
+class ResultadoImportacao:
+    def __init__(self, clientes):
+        self.clientes = clientes   # dicionário final (cópia), pronto para salvar
+        self.novos = []            # nomes adicionados
+        self.completados = []      # já existiam e ganharam telefone/aniversário
+        self.duplicados = []       # (linha, nome no arquivo, cliente existente)
+        self.invalidos = []        # (linha, motivo) - não importados
+        self.avisos = []           # (linha, texto) - importados com ressalva
+
+    def resumo(self):
+        return (
+            f"Novos: {len(self.novos)}\n"
+            f"Completados (telefone/aniversário): {len(self.completados)}\n"
+            f"Duplicados ignorados: {len(self.duplicados)}\n"
+            f"Inválidos: {len(self.invalidos)}\n"
+            f"Avisos: {len(self.avisos)}"
+        )
+
+def importar_clientes(clientes, registros, completar=True, tarefa=None):
+    """
+    Junta `registros` (de ler_contatos) aos `clientes` existentes, sem
+    alterar o dicionário recebido. Com `completar`, um duplicado que traz
+    telefone ou aniversário que o cadastro não tinha preenche o que falta.
+    """
+    final = {nome: dict(info) if isinstance(info, dict) else {} for nome, info in clientes.items()}
+    resultado = ResultadoImportacao(final)
+
+    # índice de duplicados: nome normalizado e telefone normalizado -> nome cadastrado
+    por_nome = {}
+    por_tel = {}
+    for nome, info in final.items():
+        por_nome.setdefault(chave_nome(nome), nome)
+        tel = normalizar_telefone_br(info.get("tel", ""))
+        if tel:
+            por_tel.setdefault(tel, nome)
+
+    for pos, reg in enumerate(registros):
+        if tarefa is not None and pos % 100 == 0:
+            tarefa.passo(pos)
+
+        linha = reg.get("linha", pos + 1)
+        nome = " ".join((reg.get("nome") or "").split())
+        if not nome:
+            resultado.invalidos.append((linha, "sem nome"))
+            continue
+
+        tel = normalizar_telefone_br(reg.get("tel", ""))
+        nasc = validar_nasc(reg.get("nasc"))
+        if nasc is None:
+            resultado.avisos.append((linha, f"{nome}: aniversário inválido ({reg.get('nasc')}), ficou em branco"))
+            nasc = ""
+
+        existente = por_nome.get(chave_nome(nome)) or (por_tel.get(tel) if tel else None)
+        if existente is not None:
+            info = final[existente]
+            mudou = False
+            if completar and tel and not normalizar_telefone_br(info.get("tel", "")):
+                info["tel"] = tel
+                por_tel.setdefault(tel, existente)
+                mudou = True
+            if completar and nasc and not info.get("nasc"):
+                info["nasc"] = nasc
+                mudou = True
+            if mudou:
+                if existente not in resultado.completados and existente not in resultado.novos:
+                    resultado.completados.append(existente)
+            else:
+                resultado.duplicados.append((linha, nome, existente))
+            continue
+
+        final[nome] = {"nasc": nasc, "tel": tel}
+        resultado.novos.append(nome)
+        por_nome[chave_nome(nome)] = nome
+        if tel:
+            por_tel[tel] = nome
+
+    return resultado
@@ -1,63 +1,150 @@
+import time
+_INICIO_PROCESSO = time.perf_counter()
+
 import tkinter as tk 
-from tkinter import messagebox, ttk, simpledialog
-import json
-import os
+from tkinter import messagebox, ttk, simpledialog, filedialog
 from datetime import datetime, timedelta
-from tkcalendar import Calendar
-import shutil
-import re
-import webbrowser
 from urllib.parse import quote
 import urllib.parse
-try:
-    import holidays
-    FERIADOS_BR = holidays.Brazil()  # feriados nacionais do Brasil
-except ImportError:
-    FERIADOS_BR = None
-
-ARQUIVO_AGENDA = "agenda.json"
-ARQUIVO_CLIENTES = "clientes.json"
-BACKUP_DIR = "backups"
+
+# tkcalendar, holidays e webbrowser são importados só quando usados
+# (calendário, aviso de feriado, WhatsApp), para a janela abrir mais rápido.
+
+from agenda_nucleo import (
+    ABERTURA,
+    FECHAMENTO,
+    DIAS_SEMANA,
+    HORARIOS_AGENDAMENTO,
+    RECURSOS,
+    RECURSO_PADRAO,
+    carregar_clientes,
+    salvar_clientes,
+    garantir_dia_na_agenda,
+    str_data_para_iso,
+    iso_para_br,
+    dia_semana_br,
+    hora_para_minutos,
+    minutos_para_hora,
+    fim_do_atendimento,
+    linhas_do_dia,
+    trocas_de_linhas,
+    grade_recurso,
+    atendimentos_do_dia,
+    IndiceOcupacao,
+    slot_em,
+    reservar_atendimento,
+    liberar_atendimento,
+    atualizar_atendimento,
+    adicionar_venda,
+    atualizar_venda,
+    vendas_do_dia,
+    posicao_da_venda,
+    calcular_resumo_datas,
+    preco_do_slot,
+    catalogo,
+    CHAVE_CLIENTE_ID,
+    CadastroClientes,
+    nome_do_registro,
+    migrar_agenda_para_ids,
+    fazer_backup,
+    copia_dos_dias,
+)
+from agenda_diagnostico import medido
+from agenda_historico import HistoricoAgenda, HistoricoDesatualizado
+from agenda_sincronia import SincroniaAgenda
+from agenda_tarefas import ExecutorTarefas
+from agenda_whatsapp import (
+    MODELO_CONFIRMACAO,
+    EnviadorTeste,
+    enviar_confirmacoes,
+    enviar_pelo_navegador,
+    montar_confirmacoes,
+    normalizar_telefone_br,
+)
+import agenda_diagnostico
+from agenda_arquivo_morto import (
+    AgendaComArquivo,
+    ArquivoMorto,
+    buscar_com_arquivo,
+    corte_padrao,
+    meses_para_arquivar,
+    resumo_periodo,
+    tirar_da_agenda,
+)
+from agenda_caixa import (
+    FORMAS_PAGAMENTO,
+    ItensCaixa,
+    LivroCaixa,
+    ref_atendimento,
+    ref_fatura,
+    ref_venda,
+    texto_fechamento,
+    texto_lancamento,
+    valor_a_receber,
+)
+from agenda_pacotes import (
+    FaturasPacote,
+    IndicePacotes,
+    conciliar_fatura,
+    chave_da_fatura,
+    resumo_pacotes,
+    texto_fatura,
+)
+from agenda_clientes import (
+    fundir_clientes,
+    identificar_telefone,
+    indice_referencias,
+    propor_fusoes,
+)
+from agenda_estoque import Estoque, produtos_de_venda, texto_giro, texto_saldo
+from agenda_catalogo import texto_item
+from agenda_espera import ListaEspera, novo_pedido, texto_oferta, texto_pedido
+from agenda_exportar import exportar_csv
+from agenda_importar import importar_clientes, ler_contatos
+from agenda_restaurar import (
+    VENDA,
+    comparar,
+    listar_backups,
+    restaurar_cliente,
+    restaurar_dia,
+)
+from agenda_expediente import (
+    Expediente,
+    carregar_expediente,
+    salvar_expediente,
+    texto_para_periodos,
+    periodos_para_texto,
+)
+
 FERIADOS_FIXOS = {}
 
-HORARIO_INICIO = (9, 0)    # 09:00
-HORARIO_FIM = (20, 30)     # 20:30
-INTERVALO = 30             # em minutos
+_feriados_br = None
+_feriados_carregados = False
 
-SERVICOS = {
-    "Cabelo": 30,
-    "Barba": 30,
-    "Cabelo e Barba": 60,
-    "Outro": 30,
-}
+def feriados_br():
+    """holidays.Brazil() criado na primeira consulta (None se a biblioteca não estiver instalada)."""
+    global _feriados_br, _feriados_carregados
+    if not _feriados_carregados:
+        _feriados_carregados = True
+        try:
+            import holidays
+            _feriados_br = holidays.Brazil()  # feriados nacionais do Brasil
+        except ImportError:
+            _feriados_br = None
+    return _feriados_br
 
-PRECO_SERVICOS = {
-    "Cabelo": 50.00,
-    "Barba": 40.00,
-    "Cabelo e Barba": 80.0,
-    "Outro": 80.0,
-    "Oleo para Barba": 60.00,
-    "Pomada para Cabelo Seco": 35.00,
-    "Pomada para Cabelo Brilhoso": 35.00,
-    "Balm para Barba": 35.00,
-    "Minoxidil 10%": 70.00,
-    "Escova Barba": 20.00,
-    "Sabonete Esfoliante": 20.00,
-    "Cera em pó p/ cabelo": 60.00,
-}
+def criar_calendario(parent, **opcoes):
+    """Calendar do tkcalendar, importado na primeira vez que um calendário é aberto."""
+    from tkcalendar import Calendar
+    return Calendar(parent, **opcoes)
 
-DIAS_SEMANA = [
-    "Segunda-feira",
-    "Terça-feira",
-    "Quarta-feira",
-    "Quinta-feira",
-    "Sexta-feira",
-    "Sábado",
-    "Domingo",
-]
+QUALQUER_CADEIRA = "Qualquer livre"
+MSG_FORA_DO_EXPEDIENTE = "Esse horário está fora do expediente (fechado, pausa ou bloqueio)."
 
 FIREFOX_PATH = r"C:\Program Files\Mozilla Firefox\firefox.exe"
 def abrir_whatsapp_firefox(numero, mensagem):
+    import webbrowser
+
     numero = "".join(ch for ch in numero if ch.isdigit())
     texto = urllib.parse.quote(mensagem)
 
@@ -74,23 +161,6 @@ def abrir_whatsapp_firefox(numero, mensagem):
         webbrowser.open(url)
 
 
-def normalizar_telefone_br(tel: str) -> str:
-    """Retorna só dígitos, com DDI 55 (ex: 5549999999999)."""
-    if not tel:
-        return ""
-    dig = re.sub(r"\D", "", tel)
-
-    # se vier com 55 já, ok
-    if dig.startswith("55") and len(dig) >= 12:
-        return dig
-
-    # se vier com 11 dígitos (DDD + 9 dígitos) ou 10 dígitos (DDD + 8)
-    if len(dig) in (10, 11):
-        return "55" + dig
-
-    # se vier com 9 ou 8 (sem DDD), não dá pra adivinhar direito -> retorna como está
-    return dig
-
 def copiar_para_area_transferencia(texto: str):
     root.clipboard_clear()
     root.clipboard_append(texto)
@@ -110,6 +180,7 @@ def whatsapp_confirmar_agendamento(nome_cliente: str, data_iso: str, hora: str):
 
     # se tiver telefone ok, abre WhatsApp; se não, só copia e avisa
     if tel_norm and tel_norm.startswith("55"):
+        import webbrowser
         url = f"https://wa.me/{tel_norm}?text={quote(msg)}"
         webbrowser.open(url)
         messagebox.showinfo("WhatsApp", "Mensagem copiada e WhatsApp aberto ✅")
@@ -117,116 +188,159 @@ def whatsapp_confirmar_agendamento(nome_cliente: str, data_iso: str, hora: str):
         messagebox.showinfo("WhatsApp", "Mensagem copiada ✅\n(Cliente sem telefone válido cadastrado)")
 
 
-# ---------- LÓGICA DA AGENDA ----------
+# ---------- DADOS ----------
 
-def carregar_agenda():
-    if not os.path.exists(ARQUIVO_AGENDA):
-        return {}
-    try:
-        with open(ARQUIVO_AGENDA, "r", encoding="utf-8") as f:
-            return json.load(f)
-    except json.JSONDecodeError:
-        return {}
-
-def salvar_agenda(agenda):
-    with open(ARQUIVO_AGENDA, "w", encoding="utf-8") as f:
-        json.dump(agenda, f, ensure_ascii=False, indent=2)
-    
-    # Salva o backup
-    backup = "agenda_backup.json"
-    with open(backup, "w", encoding="utf-8") as f:
-        json.dump(agenda, f, ensure_ascii=False, indent=2)
+# Começam vazios: carregar_dados() lê os arquivos depois que a janela já
+# apareceu na tela (ver INICIALIZAÇÃO no fim do arquivo).
+agenda = {}
+clientes = CadastroClientes()
+expediente = Expediente()
+ocupacao = IndiceOcupacao(agenda, expediente)
+historico = HistoricoAgenda(ocupacao)
+dados_carregados = False
 
-# ---------- CLIENTES (ANIVERSÁRIOS) ----------
+# leitura/gravação com trava e mescla por dia (mais de um terminal na mesma pasta)
+sincronia = SincroniaAgenda()
+VERIFICAR_OUTRO_TERMINAL_MS = 5000
 
-def carregar_clientes():
-    if not os.path.exists(ARQUIVO_CLIENTES):
-        return {}
-    try:
-        with open(ARQUIVO_CLIENTES, "r", encoding="utf-8") as f:
-            return json.load(f)
-    except json.JSONDecodeError:
-        return {}
-
-def salvar_clientes(clientes):
-    with open(ARQUIVO_CLIENTES, "w", encoding="utf-8") as f:
-        json.dump(clientes, f, ensure_ascii=False, indent=2)
-    
-    fazer_backup()
-
-def gerar_horarios():
-    horarios = []
-    hora, minuto = HORARIO_INICIO
-    fim_h, fim_m = HORARIO_FIM
-    while True:
-        horarios.append(f"{hora:02d}:{minuto:02d}")
-        if hora == fim_h and minuto == fim_m:
-            break
-        minuto += INTERVALO
-        if minuto >= 60:
-            minuto -= 60
-            hora += 1
-    return horarios
-
-HORARIOS = gerar_horarios()
-
-def garantir_dia_na_agenda(agenda, dia):
-    if dia not in agenda:
-        agenda[dia] = {h: None for h in HORARIOS}
-    else:
-        for h in HORARIOS:
-            agenda[dia].setdefault(h, None)
+# meses antigos, fora do agenda.json (relatórios e busca continuam vendo)
+arquivo_morto = ArquivoMorto()
 
-def str_data_para_iso(data_str):
-    """Converte 'DD/MM/AAAA' -> 'AAAA-MM-DD'."""
-    try:
-        dt = datetime.strptime(data_str, "%d/%m/%Y")
-        return dt.strftime("%Y-%m-%d")
-    except ValueError:
-        return None
+# pagamentos lançados (valor, forma, hora) e fechamentos de caixa
+livro_caixa = LivroCaixa()
 
-def iso_para_br(data_iso):
-    """Converte 'AAAA-MM-DD' -> 'DD/MM/AAAA'."""
-    try:
-        dt = datetime.strptime(data_iso, "%Y-%m-%d")
-        return dt.strftime("%d/%m/%Y")
-    except ValueError:
-        return data_iso
+# atendimentos de pacote por mês (mantido pelas escritas) e faturas mensais
+pacotes = IndicePacotes(ocupacao)
+faturas_pacote = FaturasPacote()
 
-def dia_semana_br(data_iso):
-    """Recebe 'AAAA-MM-DD' e retorna o dia da semana em PT-BR."""
-    try:
-        dt = datetime.strptime(data_iso, "%Y-%m-%d")
-        indice = dt.weekday()  # 0 = segunda, 6 = domingo
-        return DIAS_SEMANA[indice]
-    except ValueError:
-        return ""
-    
-def fazer_backup():
-    """Cria uma cópia de agenda.json e clientes.json na pasta backups/."""
-    os.makedirs(BACKUP_DIR, exist_ok=True)
-
-    timestamp = datetime.now().strftime("%Y%m%d-%H%M%S")
-
-    for arquivo in (ARQUIVO_AGENDA, ARQUIVO_CLIENTES):
-        if os.path.exists(arquivo):
-            nome_base, ext = os.path.splitext(os.path.basename(arquivo))
-            destino = os.path.join(
-                BACKUP_DIR,
-                f"{nome_base}_{timestamp}{ext}"
-            )
-            shutil.copy2(arquivo, destino)
+# saldo dos produtos: entradas/contagens no arquivo, saídas vindas da agenda
+estoque = Estoque(ocupacao, arquivo=arquivo_morto)
+
+# pedidos de quem quer um horário; vagas liberadas viram ofertas
+espera = ListaEspera(ocupacao)
+
+def gravar_agenda():
+    """
+    Salva a agenda. Se outro terminal gravou nesse meio tempo, os dias dele
+    são mesclados; horários que os dois ocuparam ficam com o outro terminal
+    e aparecem num aviso. Retorna False se algo não foi gravado.
 
-# ---------- CARREGA DADOS ----------
+    As mudanças feitas desde a última gravação viram um passo de desfazer.
+    """
+    historico.fechar()
+    atualizar_botoes_historico()
+    try:
+        resultado = sincronia.salvar(agenda)
+    except TimeoutError as e:
+        # a mudança continua na memória e vai junto no próximo salvamento
+        messagebox.showerror("Erro", f"{e}\nTente de novo em alguns segundos.")
+        return False
+
+    if resultado.recarregados:
+        for dia in resultado.recarregados:
+            ocupacao.invalidar(dia)
+            espera.esquecer(dia)   # dia mesclado com outro terminal: a vaga pode não estar mais livre
+        atualizar_lista_agenda()
 
-agenda = carregar_agenda()
-clientes = carregar_clientes()
+    if resultado.conflitos:
+        messagebox.showwarning(
+            "Outro terminal",
+            "Estes agendamentos NÃO foram gravados porque o horário foi ocupado "
+            "em outro terminal:\n\n" + "\n".join(resultado.mensagens_conflito())
+        )
+        for dia, _recurso, _hora, _slot in resultado.conflitos:
+            espera.esquecer(dia)
+        return False
+    # cancelou/remarcou: depois das mensagens da própria tela, avisa a lista de espera
+    root.after(0, avisar_lista_espera)
+    return True
+
+def avisar_lista_espera():
+    """Casa os horários liberados com a lista de espera e avisa se alguém cabe."""
+    try:
+        novas = espera.processar()
+    except (OSError, TimeoutError) as e:
+        messagebox.showerror("Erro", f"A lista de espera não foi atualizada:\n{e}")
+        return
+    if not novas:
+        return
+    linhas = [texto_oferta(o) for o in novas[:8]]
+    if len(novas) > 8:
+        linhas.append(f"... e mais {len(novas) - 8}")
+    if messagebox.askyesno(
+        "Lista de espera",
+        "Horário liberado serve para quem está na lista de espera:\n\n"
+        + "\n".join(linhas) + "\n\nAbrir a lista de espera?",
+    ):
+        janela_lista_espera()
+
+def verificar_outro_terminal():
+    """Traz os dias que outro terminal gravou (só um stat quando nada mudou)."""
+    if dados_carregados:
+        catalogo.atualizar()  # preço alterado em outro terminal vale sem reiniciar
+        try:
+            recarregados = sincronia.recarregar_alterados(agenda)
+        except TimeoutError:
+            recarregados = set()
+        if recarregados:
+            for dia in recarregados:
+                ocupacao.invalidar(dia)
+            atualizar_lista_agenda()
+    root.after(VERIFICAR_OUTRO_TERMINAL_MS, verificar_outro_terminal)
 
 # ---------- INTERFACE GRÁFICA ----------
 
 root = tk.Tk()
 root.title("Agenda - Barbearia Cavalheiros")
-root.geometry("540x650")
+root.geometry("640x890")
+
+# operações demoradas (relatório do mês, busca, pacote) rodam fora da thread do Tk
+tarefas = ExecutorTarefas(root)
+
+def executar_com_progresso(titulo, funcao, *args, ao_terminar, ao_fim=None, parent=None):
+    """
+    Roda funcao(tarefa, *args) em segundo plano com barra de progresso e
+    botão Cancelar. `ao_terminar(resultado)` e `ao_fim()` (sempre, mesmo
+    em erro ou cancelamento) rodam de volta na thread do Tk.
+    """
+    win = tk.Toplevel(parent or root)
+    win.title("Aguarde")
+    win.geometry("320x130")
+
+    tk.Label(win, text=titulo).pack(pady=(10, 5))
+    barra = ttk.Progressbar(win, mode="determinate", length=260, maximum=100)
+    barra.pack(pady=5)
+
+    def fechar():
+        if win.winfo_exists():
+            win.destroy()
+        if ao_fim is not None:
+            ao_fim()
+
+    def progredir(feito, total):
+        if total and win.winfo_exists():
+            barra["value"] = feito * 100 / total
+
+    def terminar(resultado):
+        fechar()
+        ao_terminar(resultado)
+
+    def falhar(erro):
+        fechar()
+        messagebox.showerror("Erro", f"Não foi possível concluir: {erro}", parent=parent)
+
+    tarefa = tarefas.executar(
+        funcao, *args,
+        descricao=titulo,
+        ao_terminar=terminar,
+        ao_falhar=falhar,
+        ao_cancelar=fechar,
+        ao_progredir=progredir,
+    )
+
+    tk.Button(win, text="Cancelar", command=tarefa.cancelar).pack(pady=5)
+    win.protocol("WM_DELETE_WINDOW", tarefa.cancelar)
+    return tarefa
 
 # ----- TOPO: DATA + BOTÕES -----
 
@@ -265,7 +379,7 @@ def abrir_calendario():
 
     win.geometry(f"{largura}x{altura}+{x}+{y}")
 
-    cal = Calendar(
+    cal = criar_calendario(
         win,
         selectmode="day",
         date_pattern="dd/mm/yyyy"
@@ -289,6 +403,24 @@ btn_hoje.pack(side=tk.LEFT)
 btn_calendario = tk.Button(frame_data, text="📅", command=abrir_calendario)
 btn_calendario.pack(side=tk.LEFT, padx=5)
 
+tk.Label(frame_data, text="Cadeira:").pack(side=tk.LEFT, padx=(10, 0))
+recurso_var = tk.StringVar(value=RECURSO_PADRAO)
+combo_recurso = ttk.Combobox(
+    frame_data,
+    textvariable=recurso_var,
+    values=RECURSOS,
+    state="readonly",
+    width=10
+)
+combo_recurso.pack(side=tk.LEFT, padx=5)
+combo_recurso.bind("<<ComboboxSelected>>", lambda event: atualizar_lista_agenda())
+
+# desfazer/refazer (Ctrl+Z / Ctrl+Y); funções em DESFAZER / REFAZER
+btn_desfazer = tk.Button(frame_data, text="↩️", state=tk.DISABLED, command=lambda: desfazer_ultima())
+btn_desfazer.pack(side=tk.LEFT, padx=(10, 0))
+btn_refazer = tk.Button(frame_data, text="↪️", state=tk.DISABLED, command=lambda: refazer_ultima())
+btn_refazer.pack(side=tk.LEFT, padx=5)
+
 # ----- DIA DA SEMANA + AVISO DE ANIVERSÁRIO -----
 
 dia_semana_var = tk.StringVar()
@@ -304,6 +436,22 @@ aviso_aniver_var = tk.StringVar()
 label_aniver = tk.Label(root, textvariable=aviso_aniver_var, font=("Arial", 9), fg="purple")
 label_aniver.pack(pady=(0, 5))
 
+# ----- TELEFONE: QUEM ESTÁ LIGANDO -----
+
+frame_telefone = tk.Frame(root)
+frame_telefone.pack()
+
+tk.Label(frame_telefone, text="📞 Telefone:").pack(side=tk.LEFT)
+telefone_var = tk.StringVar()
+telefone_entry = tk.Entry(frame_telefone, textvariable=telefone_var, width=18)
+telefone_entry.pack(side=tk.LEFT, padx=5)
+telefone_entry.bind("<Return>", lambda event: procurar_telefone())
+btn_telefone = tk.Button(frame_telefone, text="Procurar", command=lambda: procurar_telefone())
+btn_telefone.pack(side=tk.LEFT)
+
+telefone_info_var = tk.StringVar()
+tk.Label(root, textvariable=telefone_info_var, font=("Arial", 9), fg="blue").pack()
+
 # ----- LISTA DA AGENDA DO DIA -----
 
 # ----- ÁREA PRINCIPAL: AGENDA (ESQ) + STATUS (DIR) -----
@@ -343,6 +491,11 @@ tk.Button(frame_status, text="🔁 Remarcar",
 tk.Button(frame_status, text="❌ Cancelado",
           width=16, command=lambda: alterar_status_agendamento("cancelado")).pack(pady=4)
 
+# o que o ↩️ do topo vai desfazer
+historico_var = tk.StringVar()
+tk.Label(frame_status, textvariable=historico_var, font=("Arial", 8), fg="gray",
+         wraplength=130, justify="left").pack(pady=(8, 0))
+
 # ----- FUNÇÕES DE ATUALIZAÇÃO DA TELA -----
 
 def eh_feriado_data_iso(data_iso):
@@ -351,12 +504,13 @@ def eh_feriado_data_iso(data_iso):
     Retorna (eh_feriado: bool, nome_feriado: str ou None)
     """
     # Se tiver biblioteca de feriados
-    if FERIADOS_BR is not None:
+    feriados = feriados_br()
+    if feriados is not None:
         try:
             dt = datetime.strptime(data_iso, "%Y-%m-%d").date()
         except ValueError:
             return False, None
-        nome = FERIADOS_BR.get(dt)
+        nome = feriados.get(dt)
         if nome:
             return True, str(nome)
 
@@ -378,7 +532,8 @@ def atualizar_aviso_feriado():
     aviso_feriado_var.set("")
 
     # se não tiver biblioteca de feriados, não faz nada
-    if FERIADOS_BR is None:
+    feriados = feriados_br()
+    if feriados is None:
         return
 
     data_str = data_var.get().strip()
@@ -391,7 +546,7 @@ def atualizar_aviso_feriado():
     except ValueError:
         return
 
-    nome_feriado = FERIADOS_BR.get(dt)
+    nome_feriado = feriados.get(dt)
     if nome_feriado:
         aviso_feriado_var.set(f"📢 FERIADO: {nome_feriado}")
     else:
@@ -438,42 +593,81 @@ def atualizar_aviso_aniversario():
     else:
         aviso_aniver_var.set("")
 
+ICONES_STATUS = {
+    "pendente": "⏳",
+    "confirmado": "✅",
+    "remarcar": "🔁",
+    "cancelado": "❌",
+}
+
+# Estado do que está desenhado na lista principal. A cada atualização só
+# as linhas que mudaram são trocadas no Listbox, e o cabeçalho (dia da
+# semana, aniversário, feriado) só é refeito quando a data muda.
+linhas_na_tela = []
+cabecalho_na_tela = {"data_iso": None, "titulo": None}
+_textos_linha = {}  # (hora, status, cliente, servico) -> texto já montado
+
+def texto_linha_agenda(h, slot, motivo_fechado):
+    if slot is None and motivo_fechado:
+        return f"{h} - 🚫 {motivo_fechado.upper()}"
+    if slot is None:
+        return f"{h} - LIVRE"
+
+    chave = (h, slot.get("status", "pendente"), nome_do_registro(clientes, slot), slot.get("servico", ""))
+    texto = _textos_linha.get(chave)
+    if texto is None:
+        icone = ICONES_STATUS.get(chave[1], "⏳")
+        texto = f"{h} - {icone} {chave[2]} ({chave[3]})"
+        if len(_textos_linha) > 5000:
+            _textos_linha.clear()
+        _textos_linha[chave] = texto
+    return texto
+
+def aplicar_linhas_agenda(novas):
+    """Troca no Listbox só o que mudou entre `linhas_na_tela` e `novas`."""
+    selecao = lista_horarios.curselection()
+
+    for de, ate, linhas in trocas_de_linhas(linhas_na_tela, novas):
+        if ate > de:
+            lista_horarios.delete(de, ate - 1)
+        if linhas:
+            lista_horarios.insert(de, *linhas)
+
+    linhas_na_tela[:] = novas
+
+    if selecao and selecao[0] < len(novas):
+        lista_horarios.selection_set(selecao[0])
+
+@medido("atualizar_lista_agenda")
 def atualizar_lista_agenda():
+    if not dados_carregados:
+        return
+
     data_str = data_var.get().strip()
     data_iso = str_data_para_iso(data_str)
     if not data_iso:
         messagebox.showerror("Erro", "Data inválida. Use o formato DD/MM/AAAA.")
         return
 
-    garantir_dia_na_agenda(agenda, data_iso)
-    dia = agenda.setdefault(data_iso, {h: None for h in HORARIOS})
-
-    atualizar_dia_semana()
-    atualizar_aviso_aniversario()
-    atualizar_aviso_feriado()
-
-    lista_horarios.delete(0, tk.END)
-    label_dia.config(text=f"Agenda do dia {iso_para_br(data_iso)}")
-
-    for h in HORARIOS:
-        slot = dia.get(h)
-
-        if slot is None:
-            texto = f"{h} - LIVRE"
-        else:
-            status = slot.get("status", "pendente")
-            icone = {
-                "pendente": "⏳",
-                "confirmado": "✅",
-                "remarcar": "🔁",
-                "cancelado": "❌"
-            }.get(status, "⏳")
+    recurso = recurso_var.get() or RECURSO_PADRAO
+    grade_recurso(agenda, data_iso, recurso)
 
-            texto = f"{h} - {icone} {slot.get('cliente','')} ({slot.get('servico','')})"
+    if cabecalho_na_tela["data_iso"] != data_iso:
+        atualizar_dia_semana()
+        atualizar_aviso_aniversario()
+        atualizar_aviso_feriado()
+        cabecalho_na_tela["data_iso"] = data_iso
 
-        lista_horarios.insert(tk.END, texto)
+    titulo = f"Agenda do dia {iso_para_br(data_iso)} - {recurso}"
+    if cabecalho_na_tela["titulo"] != titulo:
+        label_dia.config(text=titulo)
+        cabecalho_na_tela["titulo"] = titulo
 
-    salvar_agenda(agenda)
+    # grade montada a partir dos intervalos (inclui inícios fora do bloco de 30 min)
+    aplicar_linhas_agenda([
+        texto_linha_agenda(h, slot, motivo_fechado)
+        for h, inicio, slot, motivo_fechado in linhas_do_dia(ocupacao, data_iso, recurso)
+    ])
 
 def alterar_status_agendamento(novo_status):
     data_str = data_var.get().strip()
@@ -489,21 +683,14 @@ def alterar_status_agendamento(novo_status):
     linha = lista_horarios.get(selecao[0])
     hora = linha.split(" - ")[0]
 
-    slot = agenda.get(data_iso, {}).get(hora)
+    recurso = recurso_var.get() or RECURSO_PADRAO
+    inicio, slot = slot_em(ocupacao, data_iso, recurso, hora)
     if not slot:
         return
 
-    inicio = slot.get("inicio", hora)
-    duracao = slot.get("duracao", 30)
-    blocos = duracao // INTERVALO
-    idx = HORARIOS.index(inicio)
-    blocos_h = HORARIOS[idx: idx + blocos]
+    atualizar_atendimento(ocupacao, data_iso, recurso, inicio, status=novo_status)
 
-    for h in blocos_h:
-        if agenda[data_iso].get(h):
-            agenda[data_iso][h]["status"] = novo_status
-
-    salvar_agenda(agenda)
+    gravar_agenda()
     atualizar_lista_agenda()
 
 # ----- JANELA DE NOVO AGENDAMENTO -----
@@ -521,7 +708,7 @@ def janela_agendar():
     # Janela do agendamento
     win = tk.Toplevel(root)
     win.title("Novo agendamento")
-    win.geometry("450x470")
+    win.geometry("450x520")
 
     tk.Label(win, text=f"Data: {iso_para_br(data_iso)}").pack(pady=5)
 
@@ -638,21 +825,53 @@ def janela_agendar():
     # SERVIÇO
     # -------------------------------------------
     tk.Label(win, text="Serviço:").pack()
-    servico_var = tk.StringVar(value="Cabelo")
-    for s in SERVICOS.keys():
-        tk.Radiobutton(win, text=s, variable=servico_var, value=s).pack(anchor="w")
-
-    # Horário
+    servicos_do_dia = catalogo.servicos(data_iso)
+    servico_var = tk.StringVar(value="Cabelo" if "Cabelo" in servicos_do_dia else next(iter(servicos_do_dia), ""))
+    for s in servicos_do_dia:
+        tk.Radiobutton(
+            win, text=s, variable=servico_var, value=s,
+            command=lambda: atualizar_horarios_livres()
+        ).pack(anchor="w")
+
+    # Horário (só os livres e dentro do expediente do dia)
     tk.Label(win, text="Horário inicial:").pack(pady=(10, 0))
-    horario_var = tk.StringVar(value=HORARIOS[0])
+    horario_var = tk.StringVar(value=HORARIOS_AGENDAMENTO[0])
     combo_horario = ttk.Combobox(
         win,
         textvariable=horario_var,
-        values=HORARIOS,
+        values=HORARIOS_AGENDAMENTO,
         state="readonly"
     )
     combo_horario.pack(pady=5)
 
+    # Cadeira
+    tk.Label(win, text="Cadeira:").pack()
+    recurso_ag_var = tk.StringVar(value=recurso_var.get() or RECURSO_PADRAO)
+    combo_recurso_ag = ttk.Combobox(
+        win,
+        textvariable=recurso_ag_var,
+        values=RECURSOS + [QUALQUER_CADEIRA],
+        state="readonly"
+    )
+    combo_recurso_ag.pack(pady=5)
+
+    def atualizar_horarios_livres(event=None):
+        duracao = servicos_do_dia.get(servico_var.get(), 30)
+        recurso = recurso_ag_var.get()
+        if recurso == QUALQUER_CADEIRA:
+            livres = set()
+            for r in RECURSOS:
+                livres.update(ocupacao.horarios_livres(data_iso, r, duracao))
+            livres = sorted(livres)
+        else:
+            livres = ocupacao.horarios_livres(data_iso, recurso, duracao)
+        combo_horario.config(values=livres)
+        if horario_var.get() not in livres:
+            horario_var.set(livres[0] if livres else "")
+
+    combo_recurso_ag.bind("<<ComboboxSelected>>", atualizar_horarios_livres)
+    atualizar_horarios_livres()
+
     # Observações
     tk.Label(win, text="Observações (opcional):").pack()
     obs_entry = tk.Entry(win)
@@ -677,49 +896,59 @@ def janela_agendar():
             return
 
         servico = servico_var.get()
-        duracao = SERVICOS[servico]
+        if servico not in servicos_do_dia:
+            messagebox.showerror("Erro", "Escolha o serviço.")
+            return
+        duracao = servicos_do_dia[servico]
         hora_inicial = horario_var.get()
         obs = obs_entry.get().strip()
 
-        if hora_inicial not in HORARIOS:
+        if hora_inicial not in HORARIOS_AGENDAMENTO:
             messagebox.showerror("Erro", "Horário inválido.")
             return
 
-        blocos = duracao // INTERVALO
-        indice = HORARIOS.index(hora_inicial)
-
-        blocos_horarios = HORARIOS[indice: indice + blocos]
+        if not ocupacao.aberto(data_iso, hora_inicial, duracao):
+            messagebox.showerror("Erro", MSG_FORA_DO_EXPEDIENTE)
+            return
 
-        # Verificar se todos os blocos estão livres
-        if any(agenda[data_iso].get(h) is not None for h in blocos_horarios):
+        # Verificar se todos os blocos estão livres (na cadeira escolhida ou em qualquer uma)
+        recurso = recurso_ag_var.get()
+        if recurso == QUALQUER_CADEIRA:
+            livres = ocupacao.recursos_livres(data_iso, hora_inicial, duracao)
+            if not livres:
+                messagebox.showerror(
+                    "Erro",
+                    "Nenhuma cadeira livre nesse período."
+                )
+                return
+            recurso = livres[0]
+        elif not ocupacao.cabe(data_iso, recurso, hora_inicial, duracao):
             messagebox.showerror(
                 "Erro",
                 "Um ou mais horários desse período já estão ocupados."
             )
             return
 
-        # Gravar agendamento
-        
-        preco = PRECO_SERVICOS.get(servico, 0.0)
+        # Gravar agendamento (preço do catálogo na data do atendimento)
+        preco = catalogo.preco(servico, data_iso)
 
-        for h in blocos_horarios:
-            agenda[data_iso][h] = {
+        reservar_atendimento(ocupacao, data_iso, recurso, hora_inicial, {
             "cliente": nome,
+            CHAVE_CLIENTE_ID: clientes.id_de(nome),
             "servico": servico,
             "duracao": duracao,
             "obs": obs,
-            "inicio": hora_inicial,
             "preco": preco,
             "pago": False,
             "extras": [],
-            "pacote": False,            
+            "pacote": False,
             "pacote_nome": None,
             "pacote_valor_mensal": 0.0,
             "status": "pendente",
-    }
-            
+        })
 
-        salvar_agenda(agenda)
+        gravar_agenda()
+        recurso_var.set(recurso)
         atualizar_lista_agenda()
         messagebox.showinfo("Sucesso", "Agendamento realizado com sucesso!")
         win.destroy()
@@ -728,46 +957,33 @@ def janela_agendar():
 
 # ----- CANCELAR HORÁRIO -----
 
-def cancelar_agendamento_em(data_iso, hora_inicio, parent=None):
+def cancelar_agendamento_em(data_iso, hora_inicio, parent=None, recurso=RECURSO_PADRAO):
     garantir_dia_na_agenda(agenda, data_iso)
 
-    slot = agenda.get(data_iso, {}).get(hora_inicio)
+    # garante que é o bloco inicial
+    hora_inicio, slot = slot_em(ocupacao, data_iso, recurso, hora_inicio)
     if not isinstance(slot, dict):
         messagebox.showinfo("Info", "Agendamento não encontrado.", parent=parent)
         return
 
-    # garante que é o bloco inicial
-    inicio = slot.get("inicio", hora_inicio)
-    if inicio != hora_inicio:
-        hora_inicio = inicio
-        slot = agenda.get(data_iso, {}).get(hora_inicio)
-        if not isinstance(slot, dict):
-            messagebox.showinfo("Info", "Agendamento não encontrado.", parent=parent)
-            return
-
     servico = slot.get("servico", "")
-    cliente = slot.get("cliente", "")
-    duracao = int(slot.get("duracao", 30))
+    cliente = nome_do_registro(clientes, slot)
 
     resp = messagebox.askyesno(
         "Confirmar",
-        f"Cancelar {servico} de {cliente} em {iso_para_br(data_iso)} às {hora_inicio}?",
+        f"Cancelar {servico} de {cliente} em {iso_para_br(data_iso)} às {hora_inicio} ({recurso})?",
         parent=parent
     )
     if not resp:
         return
 
-    blocos = duracao // INTERVALO
-    idx = HORARIOS.index(hora_inicio)
-    blocos_h = HORARIOS[idx: idx + blocos]
-
-    for h in blocos_h:
-        agenda[data_iso][h] = None
+    liberar_atendimento(ocupacao, data_iso, recurso, hora_inicio)
 
-    salvar_agenda(agenda)
+    gravar_agenda()
 
     # atualiza a tela principal pra essa data
     data_var.set(iso_para_br(data_iso))
+    recurso_var.set(recurso)
     atualizar_campos_de_data()
 
     messagebox.showinfo("Sucesso", "Agendamento cancelado ✅", parent=parent)
@@ -790,62 +1006,47 @@ def cancelar_horario():
         if not hora:
             return
 
-    if hora not in HORARIOS:
+    if hora_para_minutos(hora) is None:
         messagebox.showerror("Erro", "Horário inválido.")
         return
 
-    slot = agenda[data_iso].get(hora)
+    recurso = recurso_var.get() or RECURSO_PADRAO
+    inicio, slot = slot_em(ocupacao, data_iso, recurso, hora)
     if slot is None:
         messagebox.showinfo("Info", "Esse horário já está livre.")
         return
 
-    inicio = slot["inicio"]
-    duracao = slot["duracao"]
-    blocos = duracao // INTERVALO
-    indice_inicio = HORARIOS.index(inicio)
-    blocos_horarios = HORARIOS[indice_inicio: indice_inicio + blocos]
-
     resp = messagebox.askyesno(
         "Confirmar",
-        f"Cancelar {slot['servico']} de {slot['cliente']} às {inicio}?"
+        f"Cancelar {slot['servico']} de {nome_do_registro(clientes, slot)} às {inicio}?"
     )
     if not resp:
         return
 
-    for h in blocos_horarios:
-        agenda[data_iso][h] = None
+    liberar_atendimento(ocupacao, data_iso, recurso, inicio)
 
-    salvar_agenda(agenda)
+    gravar_agenda()
     atualizar_lista_agenda()
     messagebox.showinfo("Sucesso", "Horário cancelado com sucesso.")
 
 # ----- ADICIONAR PRODUTOS EM AGENDAMENTOS -----
-def adicionar_produto_em_agendamento(data_iso, hora_inicio, parent=None):
+def adicionar_produto_em_agendamento(data_iso, hora_inicio, parent=None, recurso=RECURSO_PADRAO):
     garantir_dia_na_agenda(agenda, data_iso)
 
-    slot = agenda.get(data_iso, {}).get(hora_inicio)
+    # garante bloco inicial
+    hora_inicio, slot = slot_em(ocupacao, data_iso, recurso, hora_inicio)
     if not isinstance(slot, dict):
         messagebox.showinfo("Info", "Agendamento não encontrado.", parent=parent)
         return
 
-    # garante bloco inicial
-    inicio = slot.get("inicio", hora_inicio)
-    if inicio != hora_inicio:
-        hora_inicio = inicio
-        slot = agenda.get(data_iso, {}).get(hora_inicio)
-        if not isinstance(slot, dict):
-            messagebox.showinfo("Info", "Agendamento não encontrado.", parent=parent)
-            return
-
     win = tk.Toplevel(parent if parent else root)
     win.title("Adicionar produto ao atendimento")
     win.geometry("380x260")
 
-    tk.Label(win, text=f"{slot.get('cliente','')} - {iso_para_br(data_iso)} {hora_inicio}", font=("Arial", 10, "bold")).pack(pady=5)
+    tk.Label(win, text=f"{nome_do_registro(clientes, slot)} - {iso_para_br(data_iso)} {hora_inicio}", font=("Arial", 10, "bold")).pack(pady=5)
 
     # lista só de produtos (tudo que NÃO é serviço)
-    produtos = [k for k in PRECO_SERVICOS.keys() if k not in SERVICOS]
-    produtos.sort()
+    produtos = catalogo.produtos(data_iso)
 
     tk.Label(win, text="Produto:").pack()
     prod_var = tk.StringVar(value=produtos[0] if produtos else "")
@@ -876,7 +1077,10 @@ def adicionar_produto_em_agendamento(data_iso, hora_inicio, parent=None):
             messagebox.showerror("Erro", "Quantidade inválida.", parent=win)
             return
 
-        valor_unit = float(PRECO_SERVICOS.get(produto, 0.0))
+        if not conferir_estoque(produto, qtd, parent=win):
+            return
+
+        valor_unit = catalogo.preco(produto, data_iso)
         valor_total = valor_unit * qtd
         obs = obs_var.get().strip()
 
@@ -884,47 +1088,43 @@ def adicionar_produto_em_agendamento(data_iso, hora_inicio, parent=None):
         if obs:
             extra["obs"] = obs
 
-        slot.setdefault("extras", [])
-        slot["extras"].append(extra)
-
         # aplica o mesmo extras em todos os blocos daquele atendimento
-        duracao = int(slot.get("duracao", 30))
-        blocos = duracao // INTERVALO
-        idx = HORARIOS.index(hora_inicio)
-        blocos_h = HORARIOS[idx: idx + blocos]
-        for h in blocos_h:
-            if isinstance(agenda[data_iso].get(h), dict):
-                agenda[data_iso][h]["extras"] = slot["extras"]
-
-        salvar_agenda(agenda)
+        extras = slot.get("extras", []) + [extra]
+        atualizar_atendimento(ocupacao, data_iso, recurso, hora_inicio, extras=extras)
+
+        gravar_agenda()
         data_var.set(iso_para_br(data_iso))
+        recurso_var.set(recurso)
         atualizar_campos_de_data()
         messagebox.showinfo("Sucesso", f"Produto adicionado ✅ (R$ {valor_total:.2f})", parent=win)
+        avisar_estoque_baixo(produto, parent=win)
         win.destroy()
 
     tk.Button(win, text="➕ Adicionar", command=salvar_extra).pack(pady=10)
 
 # ----- EDITAR AGENDAMENTO (AGORA PODE MUDAR DE DIA E TROCAR) -----
 
-def janela_editar_agendamento_em(data_iso, hora_inicio):
-    """Abre edição de um agendamento específico (data ISO e hora inicial)."""
+def servicos_para_editar(data_iso, servico_atual):
+    """Serviços do catálogo na data, mais o atual do atendimento se tiver saído do catálogo."""
+    servicos = list(catalogo.servicos(data_iso))
+    if servico_atual and servico_atual not in servicos:
+        servicos.append(servico_atual)
+    return servicos
+
+def janela_editar_agendamento_em(data_iso, hora_inicio, recurso=RECURSO_PADRAO):
+    """Abre edição de um agendamento específico (data ISO, hora inicial e cadeira)."""
     garantir_dia_na_agenda(agenda, data_iso)
 
-    slot = agenda.get(data_iso, {}).get(hora_inicio)
+    # garante que é o bloco inicial
+    inicio, slot = slot_em(ocupacao, data_iso, recurso, hora_inicio)
     if not isinstance(slot, dict):
         messagebox.showinfo("Info", "Agendamento não encontrado.")
         return
 
-    # garante que é o bloco inicial
-    inicio = slot.get("inicio", hora_inicio)
-    if inicio != hora_inicio:
-        hora_inicio = inicio
-        slot = agenda.get(data_iso, {}).get(hora_inicio)
-
-    cliente = slot.get("cliente", "")
+    cliente = nome_do_registro(clientes, slot)
+    cliente_id = slot.get(CHAVE_CLIENTE_ID)
     servico = slot.get("servico", "")
     obs = slot.get("obs", "")
-    inicio = slot.get("inicio", hora_inicio)
 
     pacote_flag = slot.get("pacote", False)
     pacote_nome = slot.get("pacote_nome")
@@ -937,19 +1137,19 @@ def janela_editar_agendamento_em(data_iso, hora_inicio):
     edit.title("Editar agendamento")
     edit.geometry("360x360")
 
-    tk.Label(edit, text=f"Data: {iso_para_br(data_iso)}", font=("Arial", 10, "bold")).pack(pady=3)
+    tk.Label(edit, text=f"Data: {iso_para_br(data_iso)} - {recurso}", font=("Arial", 10, "bold")).pack(pady=3)
     tk.Label(edit, text=f"Cliente: {cliente}", font=("Arial", 11, "bold")).pack(pady=5)
 
     # Serviço
     tk.Label(edit, text="Serviço:").pack()
     servico_var = tk.StringVar(value=servico)
-    for s in SERVICOS.keys():
+    for s in servicos_para_editar(data_iso, servico):
         tk.Radiobutton(edit, text=s, variable=servico_var, value=s).pack(anchor="w")
 
     # Horário inicial
     tk.Label(edit, text="Novo horário inicial:").pack(pady=(10, 0))
     horario_var = tk.StringVar(value=inicio)
-    combo_horario = ttk.Combobox(edit, textvariable=horario_var, values=HORARIOS, state="readonly")
+    combo_horario = ttk.Combobox(edit, textvariable=horario_var, values=HORARIOS_AGENDAMENTO, state="readonly")
     combo_horario.pack(pady=5)
 
     # Observações
@@ -963,52 +1163,39 @@ def janela_editar_agendamento_em(data_iso, hora_inicio):
         nova_obs = obs_entry.get().strip()
         novo_inicio = horario_var.get()
 
-        nova_duracao = SERVICOS[novo_servico]
-        blocos = nova_duracao // INTERVALO
-        idx = HORARIOS.index(novo_inicio)
-
-        if idx + blocos - 1 >= len(HORARIOS):
-            messagebox.showerror("Erro", "Esse serviço não cabe até o fim do expediente.", parent=edit)
+        nova_duracao = catalogo.duracao(novo_servico, data_iso) or int(slot.get("duracao") or 30)
+        if not ocupacao.aberto(data_iso, novo_inicio, nova_duracao):
+            messagebox.showerror("Erro", MSG_FORA_DO_EXPEDIENTE, parent=edit)
             return
 
-        novos_blocos = HORARIOS[idx: idx + blocos]
-
         # checar disponibilidade (permitindo usar os próprios blocos antigos)
-        dur_ant = slot.get("duracao", SERVICOS.get(servico, 30))
-        idx_ant = HORARIOS.index(inicio)
-        blocos_antigos = HORARIOS[idx_ant: idx_ant + (dur_ant // INTERVALO)]
-
-        for h in novos_blocos:
-            ocup = agenda[data_iso].get(h)
-            if ocup is not None and h not in blocos_antigos:
-                messagebox.showerror("Erro", "Um ou mais horários já estão ocupados.", parent=edit)
-                return
-
-        # liberar antigos
-        for h in blocos_antigos:
-            agenda[data_iso][h] = None
-
-        # aplicar novos
-        preco_novo = PRECO_SERVICOS.get(novo_servico, 0.0)
-        for h in novos_blocos:
-            agenda[data_iso][h] = {
-                "cliente": cliente,
-                "servico": novo_servico,
-                "duracao": nova_duracao,
-                "obs": nova_obs,
-                "inicio": novo_inicio,
-                "preco": preco_novo,
-                "pago": pago_original,
-                "extras": extras_orig,
-                "pacote": pacote_flag,
-                "pacote_nome": pacote_nome,
-                "pacote_valor_mensal": pacote_valor,
-            }
+        if not ocupacao.cabe(data_iso, recurso, novo_inicio, nova_duracao, ignorar_inicio=inicio):
+            messagebox.showerror("Erro", "Um ou mais horários já estão ocupados.", parent=edit)
+            return
 
-        salvar_agenda(agenda)
+        # liberar antigos e aplicar novos
+        liberar_atendimento(ocupacao, data_iso, recurso, inicio)
+
+        preco_novo = catalogo.preco(novo_servico, data_iso)
+        reservar_atendimento(ocupacao, data_iso, recurso, novo_inicio, {
+            "cliente": cliente,
+            CHAVE_CLIENTE_ID: cliente_id,
+            "servico": novo_servico,
+            "duracao": nova_duracao,
+            "obs": nova_obs,
+            "preco": preco_novo,
+            "pago": pago_original,
+            "extras": extras_orig,
+            "pacote": pacote_flag,
+            "pacote_nome": pacote_nome,
+            "pacote_valor_mensal": pacote_valor,
+        })
+
+        gravar_agenda()
 
         # atualiza a tela principal para a data editada
         data_var.set(iso_para_br(data_iso))
+        recurso_var.set(recurso)
         atualizar_campos_de_data()
 
         messagebox.showinfo("Sucesso", "Agendamento alterado!", parent=edit)
@@ -1017,7 +1204,7 @@ def janela_editar_agendamento_em(data_iso, hora_inicio):
     tk.Button(edit, text="💾 Salvar alterações", command=salvar_edicao).pack(pady=15)
 
 def janela_editar_agendamento():
-    """Abre uma tela para editar o agendamento selecionado (qualquer dia)."""
+    """Abre uma tela para editar o agendamento selecionado (qualquer dia ou cadeira)."""
     # 1) Pega a data atual da tela (data original)
     data_str = data_var.get().strip()
     data_iso = str_data_para_iso(data_str)
@@ -1035,22 +1222,19 @@ def janela_editar_agendamento():
     linha = lista_horarios.get(selecao[0])
     hora = linha.split(" - ")[0]
 
-    # 4) Pega o slot desse horário na agenda
-    slot = agenda.get(data_iso, {}).get(hora)
+    # 4) Pega o slot desse horário na agenda (na cadeira mostrada)
+    recurso_original = recurso_var.get() or RECURSO_PADRAO
+    inicio, slot = slot_em(ocupacao, data_iso, recurso_original, hora)
     if not slot:
         messagebox.showinfo("Info", "Esse horário está livre, não há o que editar.")
         return
 
     # Dados originais
-    cliente = slot.get("cliente", "")
+    cliente = nome_do_registro(clientes, slot)
+    cliente_id = slot.get(CHAVE_CLIENTE_ID)
     servico = slot.get("servico", "")
     obs = slot.get("obs", "")
-    inicio = slot.get("inicio", hora)
-    duracao_original = slot.get("duracao", SERVICOS.get(servico, 30))
     data_original_iso = data_iso
-    preco_original = slot.get("preco", PRECO_SERVICOS.get(servico, 0.0))
-    pago_original = slot.get("pago", False)
-    preco_original = slot.get("preco", PRECO_SERVICOS.get(servico, 0.0))
     extras_orig = slot.get("extras", [])
     pago_original = slot.get("pago", False)
     pacote_flag = slot.get("pacote", False)
@@ -1062,7 +1246,7 @@ def janela_editar_agendamento():
     # ---------------------------
     edit = tk.Toplevel(root)
     edit.title("Editar agendamento")
-    edit.geometry("380x420")
+    edit.geometry("380x470")
 
     tk.Label(edit, text=f"Cliente: {cliente}", font=("Arial", 11, "bold")).pack(pady=5)
 
@@ -1078,7 +1262,7 @@ def janela_editar_agendamento():
         win_data.title("Selecionar nova data")
         win_data.geometry("280x280")
 
-        cal = Calendar(
+        cal = criar_calendario(
             win_data,
             selectmode="day",
             date_pattern="dd/mm/yyyy"
@@ -1102,7 +1286,7 @@ def janela_editar_agendamento():
     # Serviço
     tk.Label(edit, text="Serviço:").pack()
     servico_var = tk.StringVar(value=servico)
-    for s in SERVICOS.keys():
+    for s in servicos_para_editar(data_iso, servico):
         tk.Radiobutton(edit, text=s, variable=servico_var, value=s).pack(anchor="w")
 
     # Horário inicial
@@ -1111,11 +1295,22 @@ def janela_editar_agendamento():
     combo_horario = ttk.Combobox(
         edit,
         textvariable=horario_var,
-        values=HORARIOS,
+        values=HORARIOS_AGENDAMENTO,
         state="readonly"
     )
     combo_horario.pack(pady=5)
 
+    # Cadeira
+    tk.Label(edit, text="Cadeira:").pack()
+    recurso_destino_var = tk.StringVar(value=recurso_original)
+    combo_recurso_dest = ttk.Combobox(
+        edit,
+        textvariable=recurso_destino_var,
+        values=RECURSOS,
+        state="readonly"
+    )
+    combo_recurso_dest.pack(pady=5)
+
     # Observações
     tk.Label(edit, text="Observações (opcional):").pack()
     obs_entry = tk.Entry(edit)
@@ -1128,8 +1323,9 @@ def janela_editar_agendamento():
         nova_obs = obs_entry.get().strip()
         novo_inicio = horario_var.get()
         nova_data_iso = data_destino_iso_var.get()
+        novo_recurso = recurso_destino_var.get() or recurso_original
 
-        if novo_inicio not in HORARIOS:
+        if novo_inicio not in HORARIOS_AGENDAMENTO:
             messagebox.showerror("Erro", "Horário inválido.", parent=edit)
             return
 
@@ -1139,106 +1335,71 @@ def janela_editar_agendamento():
 
         garantir_dia_na_agenda(agenda, nova_data_iso)
 
-        nova_duracao = SERVICOS[novo_servico]
-        blocos = nova_duracao // INTERVALO
-        indice = HORARIOS.index(novo_inicio)
-
-        
+        nova_duracao = catalogo.duracao(novo_servico, nova_data_iso) or int(slot.get("duracao") or 30)
+        if not ocupacao.aberto(nova_data_iso, novo_inicio, nova_duracao):
+            messagebox.showerror("Erro", MSG_FORA_DO_EXPEDIENTE, parent=edit)
+            return
 
-        novos_blocos = HORARIOS[indice: indice + blocos]
+        # Mesmo agendamento (mesma data e cadeira originais): seu intervalo não conta como conflito
+        mesmo_lugar = (nova_data_iso == data_original_iso and novo_recurso == recurso_original)
 
-        # Verificar conflitos nos blocos da nova data
-        conflito_outro = None
-        for h in novos_blocos:
-            slot_h = agenda[nova_data_iso].get(h)
-            if slot_h is None:
-                continue
+        # Verificar conflitos no intervalo da nova data/cadeira
+        inicios_conflito = set(ocupacao.conflitos(
+            nova_data_iso, novo_recurso, novo_inicio, nova_duracao,
+            ignorar_inicio=inicio if mesmo_lugar else None
+        ))
 
-            # Se for o mesmo agendamento (mesma data original e mesmos blocos), ignorar
-            if (nova_data_iso == data_original_iso and
-                slot_h.get("cliente") == cliente and
-                slot_h.get("inicio") == inicio):
-                continue
+        if len(inicios_conflito) > 1:
+            # Mais de um agendamento diferente nesse intervalo -> conflito não trocável
+            messagebox.showerror(
+                "Erro",
+                "Um ou mais horários desse período já estão ocupados!",
+                parent=edit
+            )
+            return
 
-            if conflito_outro is None:
-                conflito_outro = slot_h
-            else:
-                # Mais de um agendamento diferente nesse intervalo -> conflito não trocável
-                if (slot_h.get("cliente") != conflito_outro.get("cliente") or
-                    slot_h.get("inicio")  != conflito_outro.get("inicio")  or
-                    slot_h.get("duracao") != conflito_outro.get("duracao")):
-                    messagebox.showerror(
-                        "Erro",
-                        "Um ou mais horários desse período já estão ocupados!",
-                        parent=edit
-                    )
-                    return
+        preco_novo = catalogo.preco(novo_servico, nova_data_iso)
+        nosso_slot = {
+            "cliente": cliente,
+            CHAVE_CLIENTE_ID: cliente_id,
+            "servico": novo_servico,
+            "duracao": nova_duracao,
+            "obs": nova_obs,
+            "preco": preco_novo,
+            "pago": pago_original,
+            "extras": extras_orig,
+            "pacote": pacote_flag,
+            "pacote_nome": pacote_nome,
+            "pacote_valor_mensal": pacote_valor,
+            "status": slot.get("status", "pendente"),
+        }
 
         # Se não há conflito, apenas mover/editar normalmente
-        if conflito_outro is None:
-            # Liberar blocos antigos do agendamento original
-            blocos_antigos = HORARIOS[
-                HORARIOS.index(inicio) : HORARIOS.index(inicio) + (duracao_original // INTERVALO)
-            ]
-            for h in blocos_antigos:
-                agenda[data_original_iso][h] = None
-
-            # Aplicar novos blocos na nova data
-            preco_novo = PRECO_SERVICOS.get(novo_servico, 0.0)
-            for h in novos_blocos:
-                agenda[nova_data_iso][h] = {
-                    "cliente": cliente,
-                    "servico": novo_servico,
-                    "duracao": nova_duracao,
-                    "obs": nova_obs,
-                    "inicio": novo_inicio,
-                    "preco": preco_novo,
-                    "pago": pago_original,
-                    "extras": extras_orig,
-                    "pacote": pacote_flag,
-                    "pacote_nome": pacote_nome,
-                    "pacote_valor_mensal": pacote_valor,
-                }
+        if not inicios_conflito:
+            liberar_atendimento(ocupacao, data_original_iso, recurso_original, inicio)
+            reservar_atendimento(ocupacao, nova_data_iso, novo_recurso, novo_inicio, nosso_slot)
 
-            salvar_agenda(agenda)
+            gravar_agenda()
+            recurso_var.set(recurso_original)
             atualizar_lista_agenda()
             messagebox.showinfo("Sucesso", "Agendamento alterado!", parent=edit)
             edit.destroy()
             return
 
         # Há um único agendamento de outra pessoa nesse intervalo: tentar TROCA
-        outro_cliente = conflito_outro.get("cliente", "Outro cliente")
-        outro_servico = conflito_outro.get("servico")
+        outro_inicio, conflito_outro = slot_em(ocupacao, nova_data_iso, novo_recurso, inicios_conflito.pop())
+        outro_cliente = nome_do_registro(clientes, conflito_outro) or "Outro cliente"
         outro_duracao = conflito_outro.get("duracao", 30)
-        outro_inicio = conflito_outro.get("inicio", novo_inicio)
-        outro_preco = conflito_outro.get("preco", PRECO_SERVICOS.get(outro_servico, 0.0))
-        outro_pago = conflito_outro.get("pago", False)
-        outro_extras = conflito_outro.get("extras", [])
-
-        # Blocos atuais do "outro" na nova data
-        outro_blocos_nova_data = HORARIOS[
-            HORARIOS.index(outro_inicio) : HORARIOS.index(outro_inicio) + (outro_duracao // INTERVALO)
-        ]
-
-        # Blocos livres na data original para encaixar o outro cliente
-        outro_blocos_na_data_original = HORARIOS[
-            HORARIOS.index(inicio) : HORARIOS.index(inicio) + (outro_duracao // INTERVALO)
-        ]
 
         # Verifica se na data original só existe o nosso agendamento nesses blocos,
         # permitindo que o outro venha pra cá.
-        for h in outro_blocos_na_data_original:
-            slot_old = agenda[data_original_iso].get(h)
-            if slot_old is not None and not (
-                slot_old.get("cliente") == cliente and
-                slot_old.get("inicio") == inicio
-            ):
-                messagebox.showerror(
-                    "Erro",
-                    "O horário de origem não comporta uma troca com esse outro agendamento.",
-                    parent=edit
-                )
-                return
+        if not ocupacao.cabe(data_original_iso, recurso_original, inicio, outro_duracao, ignorar_inicio=inicio):
+            messagebox.showerror(
+                "Erro",
+                "O horário de origem não comporta uma troca com esse outro agendamento.",
+                parent=edit
+            )
+            return
 
         # Pergunta se o usuário quer trocar
         resp = messagebox.askyesno(
@@ -1252,46 +1413,20 @@ def janela_editar_agendamento():
             return
 
         # 1) Liberar blocos antigos do nosso agendamento na data original
-        blocos_nossos_originais = HORARIOS[
-            HORARIOS.index(inicio) : HORARIOS.index(inicio) + (duracao_original // INTERVALO)
-        ]
-        for h in blocos_nossos_originais:
-            agenda[data_original_iso][h] = None
+        liberar_atendimento(ocupacao, data_original_iso, recurso_original, inicio)
 
         # 2) Liberar blocos do outro cliente na data nova
-        for h in outro_blocos_nova_data:
-            agenda[nova_data_iso][h] = None
+        liberar_atendimento(ocupacao, nova_data_iso, novo_recurso, outro_inicio)
 
         # 3) Colocar nosso cliente na nova data/horário
-        preco_novo = PRECO_SERVICOS.get(novo_servico, 0.0)
-        for h in novos_blocos:
-                agenda[nova_data_iso][h] = {
-                    "cliente": cliente,
-                    "servico": novo_servico,
-                    "duracao": nova_duracao,
-                    "obs": nova_obs,
-                    "inicio": novo_inicio,
-                    "preco": preco_novo,
-                    "pago": pago_original,
-                    "extras": extras_orig,
-                    "pacote": pacote_flag,
-                    "pacote_nome": pacote_nome,
-                    "pacote_valor_mensal": pacote_valor,
-                    }
+        reservar_atendimento(ocupacao, nova_data_iso, novo_recurso, novo_inicio, nosso_slot)
 
         # 4) Colocar o outro cliente na data original, no horário antigo do nosso
-        for h in outro_blocos_na_data_original:
-            agenda[data_original_iso][h] = {
-                "cliente": outro_cliente,
-                "servico": outro_servico,
-                "duracao": outro_duracao,
-                "obs": conflito_outro.get("obs", ""),
-                "inicio": inicio,  # ele passa a começar onde o nosso começava
-                "preco": outro_preco,
-                "pago": outro_pago,
-            }
-
-        salvar_agenda(agenda)
+        #    (ele passa a começar onde o nosso começava)
+        reservar_atendimento(ocupacao, data_original_iso, recurso_original, inicio, conflito_outro)
+
+        gravar_agenda()
+        recurso_var.set(recurso_original)
         atualizar_lista_agenda()
         messagebox.showinfo("Sucesso", "Agendamentos trocados com sucesso!", parent=edit)
         edit.destroy()
@@ -1313,25 +1448,22 @@ def ver_detalhes_agendamento(event):
     linha = lista_horarios.get(selecao[0])
     hora = linha.split(" - ")[0]
 
-    slot = agenda.get(data_iso, {}).get(hora)
+    recurso = recurso_var.get() or RECURSO_PADRAO
+    inicio, slot = slot_em(ocupacao, data_iso, recurso, hora)
     if not slot:
         return
 
-    cliente = slot.get("cliente", "")
+    cliente = nome_do_registro(clientes, slot)
     servico = slot.get("servico", "")
-    inicio = slot.get("inicio", hora)
     duracao = slot.get("duracao", 0)
     obs = slot.get("obs", "")
     tel = slot.get("telefone", "")
 
-    fim_idx = HORARIOS.index(inicio) + (duracao // INTERVALO) - 1
-    if 0 <= fim_idx < len(HORARIOS):
-        hora_fim = HORARIOS[fim_idx]
-    else:
-        hora_fim = "?"
+    hora_fim = fim_do_atendimento(inicio, duracao) if duracao else "?"
 
     msg = (
         f"Cliente: {cliente}\n"
+        f"Cadeira: {recurso}\n"
         f"Serviço: {servico}\n"
         f"Horário: {inicio} - {hora_fim}\n"
         f"Duração: {duracao} minutos"
@@ -1458,14 +1590,220 @@ def abrir_aniversarios():
         entry_nasc.delete(0, tk.END)
         entry_tel.delete(0, tk.END)
 
-    tk.Button(win, text="💾 Salvar cliente", command=salvar_cliente_cmd).pack(pady=5)
+    def importar_cmd():
+        caminho = filedialog.askopenfilename(
+            parent=win,
+            title="Importar clientes",
+            filetypes=[("Contatos", "*.csv *.vcf *.vcard"), ("CSV", "*.csv"), ("vCard", "*.vcf *.vcard")],
+        )
+        if not caminho:
+            return
+
+        def concluir(resultado):
+            if resultado.novos or resultado.completados:
+                # só os novos/completados: quem foi editado durante a importação fica como está
+                for nome in resultado.novos + resultado.completados:
+                    clientes[nome] = resultado.clientes[nome]
+                salvar_clientes(clientes)  # um único save e um único backup
+                atualizar_lista_clientes()
+                atualizar_aviso_aniversario()
+
+            msg = resultado.resumo()
+            detalhes = [f"Linha {l}: {m}" for l, m in resultado.invalidos]
+            detalhes += [f"Linha {l}: {m}" for l, m in resultado.avisos]
+            detalhes += [f"Linha {l}: {n} = {e}" for l, n, e in resultado.duplicados]
+            if detalhes:
+                msg += "\n\n" + "\n".join(detalhes[:15])
+                if len(detalhes) > 15:
+                    msg += f"\n... e mais {len(detalhes) - 15}"
+            messagebox.showinfo("Importação", msg, parent=win)
+
+        copia = dict(clientes)
+        executar_com_progresso(
+            "Importando clientes...",
+            lambda tarefa: importar_clientes(copia, ler_contatos(caminho), tarefa=tarefa),
+            ao_terminar=concluir,
+            parent=win,
+        )
+
+    def renomear_cmd():
+        idxs = lista_cli.curselection()
+        if not idxs:
+            messagebox.showinfo("Info", "Selecione um cliente na lista.", parent=win)
+            return
+        nome = lista_cli.get(idxs[0]).split(" - ")[0]
+        novo = simpledialog.askstring("Renomear", f"Novo nome para {nome}:", initialvalue=nome, parent=win)
+        novo = (novo or "").strip()
+        if not novo or novo == nome:
+            return
+        try:
+            clientes.renomear(nome, novo)
+        except ValueError as e:
+            messagebox.showerror("Erro", str(e), parent=win)
+            return
+        # o histórico segue pelo id: não precisa mexer na agenda
+        salvar_clientes(clientes)
+        atualizar_lista_clientes()
+        atualizar_lista_agenda()
+
+    frame_btns_cli = tk.Frame(win)
+    frame_btns_cli.pack(pady=5)
+    tk.Button(frame_btns_cli, text="💾 Salvar cliente", command=salvar_cliente_cmd).pack(side=tk.LEFT, padx=5)
+    tk.Button(frame_btns_cli, text="✏️ Renomear", command=renomear_cmd).pack(side=tk.LEFT, padx=5)
+    tk.Button(frame_btns_cli, text="📥 Importar (CSV/vCard)", command=importar_cmd).pack(side=tk.LEFT, padx=5)
+    tk.Button(
+        frame_btns_cli,
+        text="🧩 Duplicados",
+        command=lambda: janela_duplicados(win, atualizar_lista_clientes),
+    ).pack(side=tk.LEFT, padx=5)
 
     atualizar_lista_clientes()
 
 
+def janela_duplicados(parent, ao_juntar=None):
+    """Lista cadastros que parecem a mesma pessoa e junta o par escolhido."""
+    propostas = propor_fusoes(clientes)
+    if not propostas:
+        messagebox.showinfo("Duplicados", "Nenhum cadastro duplicado encontrado ✅", parent=parent)
+        return
+
+    def abrir(indice):
+        win = tk.Toplevel(parent)
+        win.title("Clientes duplicados")
+        win.geometry("700x400")
+
+        tk.Label(
+            win,
+            text="Escolha o par e qual nome fica; atendimentos e vendas do outro passam para ele.",
+            font=("Arial", 9),
+            fg="gray"
+        ).pack(pady=5)
+
+        colunas = ("nota", "a", "b", "registros", "motivos")
+        tree = ttk.Treeview(win, columns=colunas, show="headings", height=12)
+        for col, titulo, largura in (
+            ("nota", "Nota", 50), ("a", "Cliente A", 160), ("b", "Cliente B", 160),
+            ("registros", "Atend. A/B", 80), ("motivos", "Por quê", 230),
+        ):
+            tree.heading(col, text=titulo)
+            tree.column(col, width=largura)
+        tree.pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
+
+        pares = {}
+
+        def atualizar():
+            tree.delete(*tree.get_children())
+            pares.clear()
+            for nota, a, b, motivos in propor_fusoes(clientes):
+                iid = tree.insert("", tk.END, values=(
+                    f"{nota:.2f}", a, b,
+                    f"{len(indice.get(a, []))}/{len(indice.get(b, []))}",
+                    ", ".join(motivos),
+                ))
+                pares[iid] = (a, b)
+
+        def juntar(lado):
+            sel = tree.selection()
+            if not sel or sel[0] not in pares:
+                messagebox.showinfo("Info", "Selecione um par.", parent=win)
+                return
+            a, b = pares[sel[0]]
+            manter, absorver = (a, b) if lado == "a" else (b, a)
+
+            if not messagebox.askyesno(
+                "Confirmar",
+                f"Juntar '{absorver}' em '{manter}'?\n"
+                f"{len(indice.get(absorver, []))} registro(s) passam para '{manter}' "
+                f"e o cadastro '{absorver}' é apagado.",
+                parent=win,
+            ):
+                return
+
+            trocados, dias = fundir_clientes(agenda, clientes, manter, absorver, indice)
+            if dias:
+                gravar_agenda()
+            salvar_clientes(clientes)
+            atualizar_lista_agenda()
+            if ao_juntar is not None:
+                ao_juntar()
+            atualizar()
+            messagebox.showinfo("Sucesso", f"{trocados} registro(s) atualizados ✅", parent=win)
+
+        frame_btns = tk.Frame(win)
+        frame_btns.pack(pady=8)
+        tk.Button(frame_btns, text="⬅ Manter A", command=lambda: juntar("a")).pack(side=tk.LEFT, padx=5)
+        tk.Button(frame_btns, text="Manter B ➡", command=lambda: juntar("b")).pack(side=tk.LEFT, padx=5)
+        tk.Button(frame_btns, text="Fechar", command=win.destroy).pack(side=tk.LEFT, padx=5)
+
+        atualizar()
+
+    # onde cada nome aparece: uma passada pela agenda, em segundo plano
+    executar_com_progresso(
+        "Procurando registros dos clientes...",
+        lambda tarefa, dias, cadastro: indice_referencias(dias, cadastro, tarefa=tarefa),
+        copia_dos_dias(agenda), CadastroClientes(clientes.para_json()),
+        ao_terminar=abrir,
+        parent=parent,
+    )
 
 # ----- JANELA DE CAIXA -----
 
+def escolher_forma_pagamento(parent, total):
+    """Pergunta a forma de pagamento (Pix/Cartão/Dinheiro). Retorna a forma ou None."""
+    resultado = {"forma": None}
+
+    w = tk.Toplevel(parent)
+    w.title("Forma de pagamento")
+    w.geometry("320x120")
+    w.grab_set()
+
+    tk.Label(w, text=f"Recebendo R$ {total:.2f}. Como foi pago?").pack(pady=10)
+
+    frame = tk.Frame(w)
+    frame.pack(pady=5)
+
+    def escolher(forma):
+        resultado["forma"] = forma
+        w.destroy()
+
+    for col, forma in enumerate(FORMAS_PAGAMENTO):
+        tk.Button(frame, text=forma, width=9, command=lambda f=forma: escolher(f)).grid(row=0, column=col, padx=4)
+
+    parent.wait_window(w)
+    return resultado["forma"]
+
+def lancar_pagamento(forma, ref, registro, parent=None):
+    """Lança no livro caixa o valor do atendimento/venda. False se não deu para gravar."""
+    valor = valor_a_receber(registro, ref.get("data_iso"))
+    if not valor:
+        return True   # atendimento de pacote sem extras: o valor está na fatura do mês
+    try:
+        livro_caixa.lancar(valor, forma, ref, registro)
+    except (OSError, TimeoutError) as e:
+        messagebox.showerror("Livro caixa", f"O pagamento não foi lançado no livro caixa:\n{e}", parent=parent)
+        return False
+    return True
+
+def conferir_estoque(produto, qtd, parent=None):
+    """Na hora da venda: False se não tem saldo e o usuário desistiu."""
+    estoque.atualizar()
+    saldo = estoque.saldo(produto)
+    if saldo is None or saldo >= qtd:
+        return True
+    return messagebox.askyesno(
+        "Estoque",
+        f"Pelo estoque só há {saldo} de {produto}.\nRegistrar a venda mesmo assim?",
+        parent=parent,
+    )
+
+def avisar_estoque_baixo(produto, parent=None):
+    if estoque.baixo(produto):
+        messagebox.showwarning(
+            "Estoque baixo",
+            f"{produto}: restam {estoque.saldo(produto)} (mínimo {estoque.minimo(produto)}). Hora de repor.",
+            parent=parent,
+        )
+
 def registrar_venda_avulsa():
     """Registra venda de produto sem precisar de agendamento."""
     data_str = data_var.get().strip()
@@ -1478,7 +1816,7 @@ def registrar_venda_avulsa():
 
     win = tk.Toplevel(root)
     win.title(f"Venda de produto - {data_str}")
-    win.geometry("350x260")
+    win.geometry("350x280")
 
     tk.Label(win, text=f"Data: {data_str}", font=("Arial", 10, "bold")).pack(pady=5)
 
@@ -1490,7 +1828,7 @@ def registrar_venda_avulsa():
 
     # Produto
     tk.Label(win, text="Produto:").pack()
-    itens_venda = sorted(PRECO_SERVICOS.keys())
+    itens_venda = catalogo.itens(data_iso)
     prod_var = tk.StringVar()
     combo_prod = ttk.Combobox(win, textvariable=prod_var, values=itens_venda, state="readonly")
     combo_prod.pack(pady=5, fill=tk.X, padx=20)
@@ -1504,15 +1842,21 @@ def registrar_venda_avulsa():
     def on_escolher_produto(event=None):
         nome = prod_var.get()
         if nome:
-            valor_padrao = PRECO_SERVICOS.get(nome, 0.0)
+            valor_padrao = catalogo.preco(nome, data_iso)
             valor_var.set(f"{valor_padrao:.2f}")
 
     combo_prod.bind("<<ComboboxSelected>>", on_escolher_produto)
 
-    # Pago agora?
+    # Pago agora? (e como)
+    frame_pago = tk.Frame(win)
+    frame_pago.pack(pady=5)
     pago_var = tk.BooleanVar(value=True)
-    chk_pago = tk.Checkbutton(win, text="Pago agora", variable=pago_var)
-    chk_pago.pack(pady=5)
+    chk_pago = tk.Checkbutton(frame_pago, text="Pago agora", variable=pago_var)
+    chk_pago.pack(side=tk.LEFT)
+    forma_var = tk.StringVar(value=FORMAS_PAGAMENTO[0])
+    ttk.Combobox(
+        frame_pago, textvariable=forma_var, values=FORMAS_PAGAMENTO, state="readonly", width=10
+    ).pack(side=tk.LEFT, padx=5)
 
     def confirmar_venda():
         produto = prod_var.get().strip()
@@ -1525,19 +1869,28 @@ def registrar_venda_avulsa():
             messagebox.showerror("Erro", "Valor inválido.", parent=win)
             return
 
+        if not conferir_estoque(produto, 1, parent=win):
+            return
+
         cliente = cliente_var.get().strip()
         venda = {
             "cliente": cliente if cliente else "",
+            CHAVE_CLIENTE_ID: clientes.id_de(cliente),
             "produto": produto,
             "valor": valor,
             "pago": bool(pago_var.get()),
                 }
+        if venda["pago"]:
+            venda["forma_pagamento"] = forma_var.get()
 
-        vendas = agenda[data_iso].setdefault("_vendas_avulsas", [])
-        vendas.append(venda)
+        posicao = adicionar_venda(ocupacao, data_iso, venda)
+        venda = vendas_do_dia(agenda, data_iso)[posicao]   # já com o id
+        if venda["pago"]:
+            lancar_pagamento(venda["forma_pagamento"], ref_venda(data_iso, posicao, venda["id"]), venda, parent=win)
 
-        salvar_agenda(agenda)
+        gravar_agenda()
         messagebox.showinfo("Sucesso", "Venda registrada com sucesso!", parent=win)
+        avisar_estoque_baixo(produto, parent=win)
         win.destroy()
 
     tk.Button(win, text="✅ Registrar venda", command=confirmar_venda).pack(pady=10)
@@ -1554,7 +1907,7 @@ def abrir_caixa_dia():
 
     win = tk.Toplevel(root)
     win.title(f"Caixa do dia - {data_str}")
-    win.geometry("700x420")
+    win.geometry("790x620")
 
     tk.Label(
         win,
@@ -1562,11 +1915,12 @@ def abrir_caixa_dia():
         font=("Arial", 12, "bold")
     ).pack(pady=5)
 
-    colunas = ("hora", "cliente", "descricao", "valor_servico", "extras", "total", "status")
-    tree = ttk.Treeview(win, columns=colunas, show="headings", height=13)
+    colunas = ("hora", "cadeira", "cliente", "descricao", "valor_servico", "extras", "total", "status")
+    tree = ttk.Treeview(win, columns=colunas, show="headings", height=13, selectmode="extended")
     tree.pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
 
     tree.heading("hora", text="Hora")
+    tree.heading("cadeira", text="Cadeira")
     tree.heading("cliente", text="Cliente")
     tree.heading("descricao", text="Serviço / Produto")
     tree.heading("valor_servico", text="Serviço/Prod (R$)")
@@ -1575,6 +1929,7 @@ def abrir_caixa_dia():
     tree.heading("status", text="Status")
 
     tree.column("hora", width=60, anchor="center")
+    tree.column("cadeira", width=90, anchor="center")
     tree.column("cliente", width=150)
     tree.column("descricao", width=170)
     tree.column("valor_servico", width=100, anchor="e")
@@ -1586,146 +1941,134 @@ def abrir_caixa_dia():
     label_totais = tk.Label(win, textvariable=totais_var, font=("Arial", 10, "bold"))
     label_totais.pack(pady=(0, 5))
 
-    # lista em memória; cada item tem 'tipo' e 'iid' da tree
-    atendimentos = []
-
-    def atualizar_lista_caixa():
-        atendimentos.clear()
-        tree.delete(*tree.get_children())
+    # iid da tree -> item (tipo, onde está na agenda e o que a linha mostra).
+    # Marcar como pago / adicionar produto só redesenha a linha mexida e
+    # ajusta os totais pela diferença, sem remontar a tabela.
+    itens = ItensCaixa()
+    totais = itens.totais
+
+    def valores_agendamento(recurso, h, slot):
+        servico = slot.get("servico", "")
+        preco_serv = preco_do_slot(slot, data_iso)
+        extras_total = sum(float(e.get("valor", 0.0)) for e in slot.get("extras", []))
+        return {
+            "tipo": "agendamento",
+            "hora": h,
+            "recurso": recurso,
+            "cliente": nome_do_registro(clientes, slot),
+            "descricao": servico,
+            "valor": preco_serv,
+            "extras": extras_total,
+            "total": preco_serv + extras_total,
+            "pago": bool(slot.get("pago", False)),
+            "forma": slot.get("forma_pagamento"),
+        }
+
+    def valores_venda(idx, v):
+        valor = float(v.get("valor", 0.0))
+        return {
+            "tipo": "venda",
+            "indice": idx,
+            "hora": "--",                    # sem horário específico
+            "recurso": "--",
+            "cliente": nome_do_registro(clientes, v) or "Venda avulsa",
+            "descricao": f"(Prod.) {v.get('produto', '')}",
+            "valor": valor,
+            "extras": 0.0,
+            "total": valor,
+            "pago": bool(v.get("pago", True)),
+            "forma": v.get("forma_pagamento"),
+        }
+
+    def linha_tree(item):
+        return (
+            item["hora"],
+            item["recurso"],
+            item["cliente"],
+            item["descricao"],
+            f"{item['valor']:.2f}",
+            f"{item['extras']:.2f}",
+            f"{item['total']:.2f}",
+            (f"Pago ({item['forma']})" if item["forma"] else "Pago") if item["pago"] else "Pendente",
+        )
 
-        total_pago = 0.0
-        total_pendente = 0.0
+    def mostrar_totais():
+        totais_var.set(
+            f"Total recebido: R$ {totais['pago']:.2f}   |   "
+            f"Total pendente: R$ {totais['pendente']:.2f}"
+        )
 
-        # 1) Agendamentos
-        for h in HORARIOS:
-            slot = agenda[data_iso].get(h)
-            if not slot:
-                continue
-            if slot.get("inicio") != h:
-                continue  # só o bloco inicial
-
-            cliente = slot.get("cliente", "")
-            servico = slot.get("servico", "")
-            preco_serv = float(slot.get("preco", PRECO_SERVICOS.get(servico, 0.0)))
-            extras_list = slot.get("extras", [])
-            extras_total = sum(float(e.get("valor", 0.0)) for e in extras_list)
-            total = preco_serv + extras_total
-            pago = bool(slot.get("pago", False))
-
-            status_txt = "Pago" if pago else "Pendente"
-            if pago:
-                total_pago += total
-            else:
-                total_pendente += total
+    def trocar_item(iid, novo):
+        """Substitui o item da linha `iid`, redesenha só ela e acerta os totais."""
+        itens[iid] = novo
+        tree.item(iid, values=linha_tree(novo))
 
-            iid = tree.insert(
-                "",
-                tk.END,
-                values=(
-                    h,
-                    cliente,
-                    servico,
-                    f"{preco_serv:.2f}",
-                    f"{extras_total:.2f}",
-                    f"{total:.2f}",
-                    status_txt,
-                )
-            )
+    def atualizar_lista_caixa():
+        itens.clear()
+        tree.delete(*tree.get_children())
 
-            atendimentos.append({
-                "tipo": "agendamento",
-                "iid": iid,
-                "hora": h,
-                "pago": pago,
-            })
+        novos = []
+        # 1) Agendamentos (só o bloco inicial, de todas as cadeiras)
+        for recurso, h, slot in sorted(atendimentos_do_dia(agenda[data_iso]), key=lambda a: (a[1], a[0])):
+            novos.append(valores_agendamento(recurso, h, slot))
 
         # 2) Vendas avulsas
-        vendas_avulsas = agenda[data_iso].get("_vendas_avulsas", [])
-        for idx, v in enumerate(vendas_avulsas):
-            cliente = v.get("cliente", "").strip() or "Venda avulsa"
-            produto = v.get("produto", "")
-            valor = float(v.get("valor", 0.0))
-            pago = bool(v.get("pago", True))
-            extras_total = 0.0
-            total = valor
-
-            status_txt = "Pago" if pago else "Pendente"
-            if pago:
-                total_pago += total
-            else:
-                total_pendente += total
-
-            iid = tree.insert(
-                "",
-                tk.END,
-                values=(
-                    "--",                    # sem horário específico
-                    cliente,
-                    f"(Prod.) {produto}",
-                    f"{valor:.2f}",
-                    f"{extras_total:.2f}",
-                    f"{total:.2f}",
-                    status_txt,
-                )
-            )
-
-            atendimentos.append({
-                "tipo": "venda",
-                "iid": iid,
-                "indice": idx,
-                "pago": pago,
-            })
+        for idx, v in enumerate(agenda[data_iso].get("_vendas_avulsas", [])):
+            novos.append(valores_venda(idx, v))
 
-        totais_var.set(
-            f"Total recebido: R$ {total_pago:.2f}   |   "
-            f"Total pendente: R$ {total_pendente:.2f}"
-        )
+        for item in novos:
+            iid = tree.insert("", tk.END, values=linha_tree(item))
+            itens[iid] = item
 
-    def encontrar_atendimento_por_iid(iid):
-        for a in atendimentos:
-            if a["iid"] == iid:
-                return a
-        return None
+        mostrar_totais()
 
     def marcar_como_pago():
         sel = tree.selection()
         if not sel:
-            messagebox.showinfo("Info", "Selecione um item para marcar como pago.", parent=win)
+            messagebox.showinfo("Info", "Selecione um ou mais itens para marcar como pago.", parent=win)
             return
 
-        item = sel[0]
-        at = encontrar_atendimento_por_iid(item)
-        if not at:
+        pendentes = [iid for iid in sel if iid in itens and not itens[iid]["pago"]]
+        if not pendentes:
+            messagebox.showinfo("Info", "Os itens selecionados já estão marcados como pagos.", parent=win)
             return
 
-        if at["pago"]:
-            messagebox.showinfo("Info", "Esse item já está marcado como pago.", parent=win)
+        # uma forma de pagamento para a seleção toda; cada item vira um lançamento
+        forma = escolher_forma_pagamento(win, sum(itens[iid]["total"] for iid in pendentes))
+        if not forma:
             return
 
-        if at["tipo"] == "agendamento":
-            hora_inicio = at["hora"]
-            slot = agenda[data_iso].get(hora_inicio)
-            if not slot:
-                return
-
-            dur = slot.get("duracao", 30)
-            blocos = dur // INTERVALO
-            idx_inicio = HORARIOS.index(hora_inicio)
-            blocos_h = HORARIOS[idx_inicio: idx_inicio + blocos]
-
-            for h in blocos_h:
-                if agenda[data_iso].get(h):
-                    agenda[data_iso][h]["pago"] = True
+        marcados = 0
+        for iid in pendentes:
+            at = itens[iid]
+            if at["tipo"] == "agendamento":
+                slot = atualizar_atendimento(
+                    ocupacao, data_iso, at["recurso"], at["hora"], pago=True, forma_pagamento=forma
+                )
+                if not slot:
+                    continue
+                lancar_pagamento(forma, ref_atendimento(data_iso, at["recurso"], at["hora"]), slot, parent=win)
+                trocar_item(iid, valores_agendamento(at["recurso"], at["hora"], slot))
+            else:
+                idx = at["indice"]
+                venda = atualizar_venda(ocupacao, data_iso, idx, pago=True, forma_pagamento=forma)
+                if not venda:
+                    continue
+                lancar_pagamento(forma, ref_venda(data_iso, idx, venda["id"]), venda, parent=win)
+                trocar_item(iid, valores_venda(idx, venda))
+            marcados += 1
 
-        elif at["tipo"] == "venda":
-            vendas_avulsas = agenda[data_iso].get("_vendas_avulsas", [])
-            idx = at["indice"]
-            if 0 <= idx < len(vendas_avulsas):
-                vendas_avulsas[idx]["pago"] = True
+        if not marcados:
+            return
 
-        salvar_agenda(agenda)
-        atualizar_lista_caixa()
-        messagebox.showinfo("Sucesso", "Item marcado como pago.", parent=win)
+        # um salvamento só para toda a seleção
+        gravar_agenda()
+        mostrar_totais()
+        mostrar_livro()
+        if marcados == 1:
+            messagebox.showinfo("Sucesso", "Item marcado como pago.", parent=win)
+        else:
+            messagebox.showinfo("Sucesso", f"{marcados} itens marcados como pagos.", parent=win)
 
     def adicionar_produto():
         sel = tree.selection()
@@ -1733,8 +2076,8 @@ def abrir_caixa_dia():
             messagebox.showinfo("Info", "Selecione um atendimento para adicionar produto.", parent=win)
             return
 
-        item = sel[0]
-        at = encontrar_atendimento_por_iid(item)
+        iid = sel[0]
+        at = itens.get(iid)
         if not at:
             return
 
@@ -1743,7 +2086,8 @@ def abrir_caixa_dia():
             return
 
         hora_inicio = at["hora"]
-        slot = agenda[data_iso].get(hora_inicio)
+        recurso = at["recurso"]
+        hora_inicio, slot = slot_em(ocupacao, data_iso, recurso, hora_inicio)
         if not slot:
             return
 
@@ -1752,7 +2096,7 @@ def abrir_caixa_dia():
         wprod.geometry("320x190")
 
         tk.Label(wprod, text="Produto:", font=("Arial", 10)).pack(pady=(10, 0))
-        itens_venda = sorted(PRECO_SERVICOS.keys())
+        itens_venda = catalogo.itens(data_iso)
         prod_var = tk.StringVar()
         combo_prod = ttk.Combobox(wprod, textvariable=prod_var, values=itens_venda, state="readonly")
         combo_prod.pack(pady=5, fill=tk.X, padx=20)
@@ -1765,7 +2109,7 @@ def abrir_caixa_dia():
         def on_escolher_prod(event=None):
             nome = prod_var.get()
             if nome:
-                valor_padrao = PRECO_SERVICOS.get(nome, 0.0)
+                valor_padrao = catalogo.preco(nome, data_iso)
                 valor_var.set(f"{valor_padrao:.2f}")
 
         combo_prod.bind("<<ComboboxSelected>>", on_escolher_prod)
@@ -1781,21 +2125,17 @@ def abrir_caixa_dia():
                 messagebox.showerror("Erro", "Valor inválido.", parent=wprod)
                 return
 
-            dur = slot.get("duracao", 30)
-            blocos = dur // INTERVALO
-            idx_inicio = HORARIOS.index(hora_inicio)
-            blocos_h = HORARIOS[idx_inicio: idx_inicio + blocos]
+            if not conferir_estoque(nome, 1, parent=wprod):
+                return
 
-            for h in blocos_h:
-                s = agenda[data_iso].get(h)
-                if not s:
-                    continue
-                lista_extras = s.get("extras", [])
-                lista_extras.append({"nome": nome, "valor": valor})
-                s["extras"] = lista_extras
+            lista_extras = slot.get("extras", []) + [{"nome": nome, "valor": valor}]
+            novo_slot = atualizar_atendimento(ocupacao, data_iso, recurso, hora_inicio, extras=lista_extras)
 
-            salvar_agenda(agenda)
-            atualizar_lista_caixa()
+            gravar_agenda()
+            if novo_slot and iid in itens:
+                trocar_item(iid, valores_agendamento(recurso, hora_inicio, novo_slot))
+                mostrar_totais()
+            avisar_estoque_baixo(nome, parent=wprod)
             wprod.destroy()
 
         tk.Button(wprod, text="✅ Adicionar", command=confirmar_produto).pack(pady=10)
@@ -1815,88 +2155,108 @@ def abrir_caixa_dia():
         command=adicionar_produto
     ).pack(side=tk.LEFT, padx=5)
 
-    atualizar_lista_caixa()
-
-# ------ JANELA DE RELATORIOS ------
-def calcular_resumo_datas(lista_datas_iso):
-    """
-    Recebe uma lista de datas (ISO) e calcula:
-    - total de atendimentos
-    - total em serviços
-    - total em produtos (extras + vendas avulsas)
-    - total recebido / pendente
-    - contagem de serviços e produtos
-    """
-    total_atendimentos = 0
-
-    total_servicos = 0.0      # só corte/barba/etc
-    total_produtos = 0.0      # extras + vendas avulsas
-    total_pago = 0.0
-    total_pendente = 0.0
-
-    contagem_servicos = {}
-    contagem_produtos = {}
-
-    for data_iso in lista_datas_iso:
-        dia = agenda.get(data_iso, {})
+    # ----- livro caixa: o que entrou na gaveta nesse dia -----
+    tk.Label(win, text=f"Livro caixa - recebido em {data_str}", font=("Arial", 10, "bold")).pack(pady=(8, 0))
+    lista_livro = tk.Listbox(win, height=6)
+    lista_livro.pack(fill=tk.X, padx=10, pady=3)
+    livro_var = tk.StringVar()
+    tk.Label(win, textvariable=livro_var, font=("Arial", 9), justify="left").pack()
+
+    lancamentos = []
+
+    def mostrar_livro():
+        livro_caixa.atualizar()
+        lancamentos[:] = livro_caixa.lancamentos_do_dia(data_iso)
+        lista_livro.delete(0, tk.END)
+        for lanc in lancamentos:
+            lista_livro.insert(tk.END, texto_lancamento(lanc))
+        totais_forma = livro_caixa.totais_do_dia(data_iso)
+        texto = "   |   ".join(f"{forma}: R$ {valor:.2f}" for forma, valor in totais_forma.items())
+        fechamento = livro_caixa.fechamento(data_iso)
+        if fechamento:
+            texto += f"\n🔒 Fechado às {fechamento['fechado_em'][11:16]}"
+            depois = livro_caixa.depois_do_fechamento(data_iso)
+            if depois:
+                texto += f" ({len(depois)} lançamento(s) depois: feche de novo)"
+        livro_var.set(texto)
+
+    def estornar_lancamento():
+        sel = lista_livro.curselection()
+        if not sel or sel[0] >= len(lancamentos):
+            messagebox.showinfo("Info", "Selecione um lançamento do livro caixa.", parent=win)
+            return
+        lanc = lancamentos[sel[0]]
+        if not messagebox.askyesno(
+            "Estornar",
+            f"Estornar {lanc['forma']} R$ {lanc['valor']:.2f} ({lanc.get('cliente') or 'sem cliente'})?\n"
+            "O item volta para pendente.",
+            parent=win,
+        ):
+            return
+        try:
+            livro_caixa.estornar(lanc["id"])
+        except ValueError as e:
+            messagebox.showerror("Erro", str(e), parent=win)
+            return
+        except (OSError, TimeoutError) as e:
+            messagebox.showerror("Livro caixa", f"O estorno não foi lançado:\n{e}", parent=win)
+            return
 
-        # 1) Atendimentos (agendamentos)
-        for h in HORARIOS:
-            slot = dia.get(h)
-            if not slot:
-                continue
-            if slot.get("inicio") != h:
-                continue  # só o bloco inicial
-
-            servico = slot.get("servico", "")
-            preco_serv = float(slot.get("preco", PRECO_SERVICOS.get(servico, 0.0)))
-            extras_list = slot.get("extras", [])
-            extras_total = sum(float(e.get("valor", 0.0)) for e in extras_list)
-            total = preco_serv + extras_total
-            pago = bool(slot.get("pago", False))
-
-            total_atendimentos += 1
-            total_servicos += preco_serv
-            total_produtos += extras_total
-
-            contagem_servicos[servico] = contagem_servicos.get(servico, 0) + 1
-            for e in extras_list:
-                nome_prod = e.get("nome", "Produto")
-                contagem_produtos[nome_prod] = contagem_produtos.get(nome_prod, 0) + 1
-
-            if pago:
-                total_pago += total
+        ref = lanc["ref"]
+        if ref["tipo"] == "atendimento":
+            inicio, slot = slot_em(ocupacao, ref["data_iso"], ref["recurso"], ref["hora"])
+            if slot and slot.get("pago"):
+                atualizar_atendimento(
+                    ocupacao, ref["data_iso"], ref["recurso"], inicio, pago=False, forma_pagamento=None
+                )
+        elif ref["tipo"] == "fatura":
+            if ref["id"] in faturas_pacote.faturas:
+                faturas_pacote.marcar_paga(ref["id"])
+        else:
+            # pelo id: apagar uma venda anterior muda a posição das seguintes
+            pos = posicao_da_venda(agenda, ref["data_iso"], ref["id"]) if ref.get("id") else ref["pos"]
+            if pos is None:
+                messagebox.showwarning(
+                    "Livro caixa",
+                    "Estorno lançado, mas a venda não está mais na agenda para voltar a pendente.",
+                    parent=win,
+                )
             else:
-                total_pendente += total
-
-        # 2) Vendas avulsas
-        vendas_avulsas = dia.get("_vendas_avulsas", [])
-        for v in vendas_avulsas:
-            produto = v.get("produto", "Produto")
-            valor = float(v.get("valor", 0.0))
-            pago = bool(v.get("pago", True))
+                atualizar_venda(ocupacao, ref["data_iso"], pos, pago=False, forma_pagamento=None)
+        gravar_agenda()
+        atualizar_lista_caixa()
+        mostrar_livro()
 
-            total_produtos += valor
-            contagem_produtos[produto] = contagem_produtos.get(produto, 0) + 1
+    def fechar_caixa():
+        contado = simpledialog.askstring(
+            "Fechar caixa",
+            "Dinheiro contado na gaveta (R$)\nDeixe vazio para não conferir:",
+            parent=win,
+        )
+        if contado is None:
+            return
+        try:
+            contado = float(contado.replace(",", ".")) if contado.strip() else None
+        except ValueError:
+            messagebox.showerror("Erro", "Valor inválido.", parent=win)
+            return
+        try:
+            fechamento = livro_caixa.fechar_dia(data_iso, agenda, contado)
+        except (OSError, TimeoutError) as e:
+            messagebox.showerror("Livro caixa", f"O caixa não foi fechado:\n{e}", parent=win)
+            return
+        mostrar_livro()
+        messagebox.showinfo("Caixa fechado", texto_fechamento(fechamento), parent=win)
 
-            if pago:
-                total_pago += valor
-            else:
-                total_pendente += valor
+    livro_btns = tk.Frame(win)
+    livro_btns.pack(pady=5)
+    tk.Button(livro_btns, text="↩️ Estornar lançamento", command=estornar_lancamento).pack(side=tk.LEFT, padx=5)
+    tk.Button(livro_btns, text="🔒 Fechar caixa", command=fechar_caixa).pack(side=tk.LEFT, padx=5)
 
-    total_geral = total_pago + total_pendente
-
-    return {
-        "total_atendimentos": total_atendimentos,
-        "total_servicos": total_servicos,
-        "total_produtos": total_produtos,
-        "total_pago": total_pago,
-        "total_pendente": total_pendente,
-        "total_geral": total_geral,
-        "contagem_servicos": contagem_servicos,
-        "contagem_produtos": contagem_produtos,
-    }
+    atualizar_lista_caixa()
+    mostrar_livro()
 
+# ------ JANELA DE RELATORIOS ------
 def abrir_relatorio_dia():
     """Relatório do dia atual mostrado na tela."""
     data_str = data_var.get().strip()
@@ -1905,15 +2265,19 @@ def abrir_relatorio_dia():
         messagebox.showerror("Erro", "Data inválida. Use o formato DD/MM/AAAA.")
         return
 
-    if data_iso not in agenda:
+    fonte = AgendaComArquivo(agenda, arquivo_morto)
+    if data_iso not in fonte:
         messagebox.showinfo("Info", "Não há dados para essa data.")
         return
 
-    resumo = calcular_resumo_datas([data_iso])
+    # caixa fechado: vale o que foi congelado no fechamento
+    livro_caixa.atualizar()
+    fechamento = livro_caixa.fechamento(data_iso)
+    resumo = fechamento["resumo"] if fechamento else calcular_resumo_datas(fonte, [data_iso])
 
     win = tk.Toplevel(root)
     win.title(f"Relatório diário - {data_str}")
-    win.geometry("480x420")
+    win.geometry("480x560")
 
     tk.Label(
         win,
@@ -1931,6 +2295,19 @@ def abrir_relatorio_dia():
     txt.append(f"Total PENDENTE: R$ {resumo['total_pendente']:.2f}")
     txt.append(f"Total GERAL (pago + pendente): R$ {resumo['total_geral']:.2f}")
     txt.append("")
+    if fechamento:
+        txt.append("🔒 " + texto_fechamento(fechamento))
+    else:
+        por_forma = livro_caixa.totais_do_dia(data_iso)
+        txt.append("Livro caixa (caixa aberto): " + ", ".join(
+            f"{forma} R$ {valor:.2f}" for forma, valor in por_forma.items()
+        ))
+    txt.append("")
+    txt.append("Por cadeira:")
+    for recurso in RECURSOS:
+        rec = resumo["por_recurso"].get(recurso, {"atendimentos": 0, "total": 0.0})
+        txt.append(f"  - {recurso}: {rec['atendimentos']} atend. / R$ {rec['total']:.2f}")
+    txt.append("")
     txt.append("Serviços mais realizados:")
 
     # top 5 serviços
@@ -1977,7 +2354,7 @@ def abrir_relatorio_mes():
 
     tk.Label(sel, text="Escolha uma data do mês desejado:", font=("Arial", 10)).pack(pady=5)
 
-    cal = Calendar(
+    cal = criar_calendario(
         sel,
         selectmode="day",
         date_pattern="dd/mm/yyyy"
@@ -2004,6 +2381,8 @@ def abrir_relatorio_mes():
                 continue
             if d.year == ano and d.month == mes:
                 datas_mes.append(data_iso)
+        # mês que já foi para o arquivo morto
+        datas_mes += [d for d in arquivo_morto.dias_do_mes(ano, mes) if d not in agenda]
 
         if not datas_mes:
             messagebox.showinfo(
@@ -2020,12 +2399,21 @@ def abrir_relatorio_mes():
 
 
 def mostrar_relatorio_mes(datas_mes, mes, ano):
-    """Mostra o relatório consolidado de um mês."""
-    resumo = calcular_resumo_datas(datas_mes)
+    """Calcula o relatório do mês em segundo plano e abre a janela quando terminar."""
+    executar_com_progresso(
+        f"Calculando relatório de {mes:02d}/{ano}...",
+        lambda tarefa, dias, fechados: resumo_periodo(
+            dias, arquivo_morto, datas_mes, tarefa=tarefa, fechados=fechados
+        ),
+        copia_dos_dias(agenda, datas_mes), livro_caixa.fechados(),
+        ao_terminar=lambda resumo: exibir_relatorio_mes(resumo, datas_mes, mes, ano),
+    )
 
+def exibir_relatorio_mes(resumo, datas_mes, mes, ano):
+    """Mostra o relatório consolidado de um mês."""
     win = tk.Toplevel(root)
     win.title(f"Relatório mensal - {mes:02d}/{ano}")
-    win.geometry("520x440")
+    win.geometry("520x500")
 
     tk.Label(
         win,
@@ -2044,6 +2432,17 @@ def mostrar_relatorio_mes(datas_mes, mes, ano):
     txt.append(f"Total PENDENTE: R$ {resumo['total_pendente']:.2f}")
     txt.append(f"Total GERAL (pago + pendente): R$ {resumo['total_geral']:.2f}")
     txt.append("")
+    # pacotes entram pela fatura do mês, fora dos totais acima
+    r_pac = resumo_pacotes(faturas_pacote, [f"{ano:04d}-{mes:02d}"])
+    txt.append(f"Pacotes: {resumo.get('atendimentos_pacote', 0)} atend. / "
+               f"{r_pac['faturas']} fatura(s) R$ {r_pac['total']:.2f} "
+               f"(pago R$ {r_pac['pago']:.2f}, pendente R$ {r_pac['pendente']:.2f})")
+    txt.append("")
+    txt.append("Por cadeira:")
+    for recurso in RECURSOS:
+        rec = resumo["por_recurso"].get(recurso, {"atendimentos": 0, "total": 0.0})
+        txt.append(f"  - {recurso}: {rec['atendimentos']} atend. / R$ {rec['total']:.2f}")
+    txt.append("")
     txt.append("Serviços mais realizados no mês:")
 
     servicos = sorted(
@@ -2081,6 +2480,328 @@ def mostrar_relatorio_mes(datas_mes, mes, ano):
     )
     lbl.pack(padx=10, pady=10, anchor="w")
 
+    primeiro = datetime(ano, mes, 1)
+    ultimo = (primeiro + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+    tk.Button(
+        win,
+        text="📤 Exportar CSV do mês",
+        command=lambda: exportar_csv_periodo(
+            primeiro.strftime("%Y-%m-%d"), ultimo.strftime("%Y-%m-%d"), parent=win
+        ),
+    ).pack(pady=5)
+
+# ----- EXPORTAÇÃO CSV -----
+
+def exportar_csv_periodo(inicio_iso, fim_iso, parent=None):
+    """Pergunta onde salvar e exporta o período em segundo plano."""
+    caminho = filedialog.asksaveasfilename(
+        parent=parent or root,
+        title="Salvar CSV",
+        defaultextension=".csv",
+        filetypes=[("CSV", "*.csv")],
+        initialfile=f"agenda_{inicio_iso}_a_{fim_iso}.csv",
+    )
+    if not caminho:
+        return
+
+    def concluido(linhas):
+        messagebox.showinfo(
+            "Exportação",
+            f"{linhas} linha(s) exportada(s) para:\n{caminho}",
+            parent=parent,
+        )
+
+    executar_com_progresso(
+        "Exportando CSV...",
+        lambda tarefa, dias, cadastro: exportar_csv(
+            AgendaComArquivo(dias, arquivo_morto), caminho, inicio_iso, fim_iso,
+            tarefa=tarefa, clientes=cadastro, faturas=faturas_pacote,
+        ),
+        copia_dos_dias(agenda, [d for d in agenda if inicio_iso <= d <= fim_iso]),
+        CadastroClientes(clientes.para_json()),
+        ao_terminar=concluido,
+        parent=parent,
+    )
+
+def janela_exportar_csv():
+    """Escolhe o período (padrão: mês atual até hoje) e exporta para CSV."""
+    win = tk.Toplevel(root)
+    win.title("Exportar CSV")
+    win.geometry("320x170")
+
+    hoje = datetime.now()
+
+    frame = tk.Frame(win)
+    frame.pack(pady=10)
+    tk.Label(frame, text="De (DD/MM/AAAA):").grid(row=0, column=0, sticky="e")
+    de_var = tk.StringVar(value=hoje.replace(day=1).strftime("%d/%m/%Y"))
+    tk.Entry(frame, textvariable=de_var, width=12).grid(row=0, column=1, padx=5, pady=3)
+    tk.Label(frame, text="Até (DD/MM/AAAA):").grid(row=1, column=0, sticky="e")
+    ate_var = tk.StringVar(value=hoje.strftime("%d/%m/%Y"))
+    tk.Entry(frame, textvariable=ate_var, width=12).grid(row=1, column=1, padx=5, pady=3)
+
+    tk.Label(
+        win,
+        text="Atendimentos, produtos extras, vendas avulsas e faturas de pacote",
+        font=("Arial", 9),
+        fg="gray"
+    ).pack()
+
+    def exportar():
+        de_iso = str_data_para_iso(de_var.get().strip())
+        ate_iso = str_data_para_iso(ate_var.get().strip())
+        if not de_iso or not ate_iso or ate_iso < de_iso:
+            messagebox.showerror("Erro", "Período inválido. Use DD/MM/AAAA.", parent=win)
+            return
+        exportar_csv_periodo(de_iso, ate_iso, parent=win)
+
+    tk.Button(win, text="📤 Exportar", command=exportar).pack(pady=10)
+
+# ----- JANELA DE BACKUPS (COMPARAR / RESTAURAR) -----
+
+def janela_backups():
+    """Compara dois backups (ou um backup e os dados atuais) e restaura um dia ou um cliente."""
+    backups = listar_backups()
+    if not backups:
+        messagebox.showinfo("Backups", "Nenhum backup encontrado na pasta backups/.")
+        return
+
+    ATUAIS = "Agora (dados em uso)"
+    opcoes = [b.texto() for b in backups]
+    por_texto = {b.texto(): b for b in backups}
+
+    win = tk.Toplevel(root)
+    win.title("Backups")
+    win.geometry("820x480")
+
+    frame_sel = tk.Frame(win)
+    frame_sel.pack(pady=8)
+    tk.Label(frame_sel, text="Backup:").grid(row=0, column=0, sticky="e")
+    de_var = tk.StringVar(value=opcoes[0])
+    ttk.Combobox(frame_sel, textvariable=de_var, values=opcoes, state="readonly", width=22).grid(
+        row=0, column=1, padx=5
+    )
+    tk.Label(frame_sel, text="comparar com:").grid(row=0, column=2, sticky="e")
+    para_var = tk.StringVar(value=ATUAIS)
+    ttk.Combobox(frame_sel, textvariable=para_var, values=[ATUAIS] + opcoes, state="readonly", width=22).grid(
+        row=0, column=3, padx=5
+    )
+
+    colunas = ("data", "hora", "cadeira", "tipo", "antes", "depois", "campos")
+    tree = ttk.Treeview(win, columns=colunas, show="headings", height=14)
+    for col, titulo, largura in (
+        ("data", "Data", 80), ("hora", "Hora", 50), ("cadeira", "Cadeira", 80),
+        ("tipo", "Mudança", 70), ("antes", "No backup", 170), ("depois", "Depois", 170),
+        ("campos", "Campos", 150),
+    ):
+        tree.heading(col, text=titulo)
+        tree.column(col, width=largura)
+    tree.pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
+
+    info_var = tk.StringVar(value="")
+    tk.Label(win, textvariable=info_var, font=("Arial", 9), fg="gray").pack()
+
+    diferencas = {}
+
+    def texto_registro(registro, recurso):
+        if registro is None:
+            return ""
+        if recurso == VENDA:
+            return f"{registro.get('produto', '')} ({nome_do_registro(clientes, registro) or 'sem cliente'})"
+        return f"{nome_do_registro(clientes, registro)} - {registro.get('servico', '')}"
+
+    def mostrar(lista):
+        if not win.winfo_exists():
+            return
+        tree.delete(*tree.get_children())
+        diferencas.clear()
+        for d in lista:
+            venda = d["recurso"] == VENDA
+            iid = tree.insert("", tk.END, values=(
+                iso_para_br(d["data_iso"]),
+                "--" if venda else d["hora"],
+                "(venda)" if venda else d["recurso"],
+                d["tipo"],
+                texto_registro(d["antes"], d["recurso"]),
+                texto_registro(d["depois"], d["recurso"]),
+                ", ".join(d["campos"]),
+            ))
+            diferencas[iid] = d
+        info_var.set(f"{len(lista)} diferença(s).")
+
+    def fonte(texto):
+        return copia_dos_dias(agenda) if texto == ATUAIS else por_texto[texto].caminho
+
+    def comparar_cmd():
+        if de_var.get() == para_var.get():
+            messagebox.showinfo("Info", "Escolha dois pontos diferentes.", parent=win)
+            return
+        info_var.set("Comparando...")
+        executar_com_progresso(
+            "Comparando backups...",
+            lambda tarefa, a, b: comparar(a, b, tarefa),
+            fonte(de_var.get()), fonte(para_var.get()),
+            ao_terminar=mostrar,
+            parent=win,
+        )
+
+    def selecionada():
+        sel = tree.selection()
+        if not sel or sel[0] not in diferencas:
+            messagebox.showinfo("Info", "Selecione uma diferença na lista.", parent=win)
+            return None
+        return diferencas[sel[0]]
+
+    def concluir(resultado):
+        gravar_agenda()   # entra no desfazer (↩️) como qualquer mudança
+        atualizar_lista_agenda()
+        messagebox.showinfo("Restaurado", resultado.resumo(), parent=win)
+        if para_var.get() == ATUAIS:
+            comparar_cmd()
+
+    def restaurar_dia_cmd():
+        d = selecionada()
+        if d is None:
+            return
+        backup = por_texto[de_var.get()]
+        if not messagebox.askyesno(
+            "Restaurar dia",
+            f"Voltar o dia {iso_para_br(d['data_iso'])} inteiro para como estava em {backup.texto()}?\n"
+            "Os outros dias não mudam.",
+            parent=win,
+        ):
+            return
+        fazer_backup()  # o estado de agora também fica guardado
+        concluir(restaurar_dia(ocupacao, backup.caminho, d["data_iso"]))
+
+    def restaurar_cliente_cmd():
+        d = selecionada()
+        if d is None:
+            return
+        registro = d["antes"] if d["antes"] is not None else d["depois"]
+        nome = nome_do_registro(clientes, registro)
+        if not nome:
+            messagebox.showinfo("Info", "Esse registro não tem cliente.", parent=win)
+            return
+        backup = por_texto[de_var.get()]
+        if not messagebox.askyesno(
+            "Restaurar cliente",
+            f"Voltar todos os atendimentos de {nome} para como estavam em {backup.texto()}?\n"
+            "Os outros clientes não mudam.",
+            parent=win,
+        ):
+            return
+        fazer_backup()
+        id_cliente = registro.get(CHAVE_CLIENTE_ID) or clientes.id_de(nome)
+        concluir(restaurar_cliente(ocupacao, backup.caminho, nome, id_cliente))
+
+    frame_btns = tk.Frame(win)
+    frame_btns.pack(pady=8)
+    tk.Button(frame_btns, text="🔍 Comparar", command=comparar_cmd).pack(side=tk.LEFT, padx=5)
+    tk.Button(frame_btns, text="📅 Restaurar o dia", command=restaurar_dia_cmd).pack(side=tk.LEFT, padx=5)
+    tk.Button(frame_btns, text="👤 Restaurar o cliente", command=restaurar_cliente_cmd).pack(side=tk.LEFT, padx=5)
+    tk.Button(frame_btns, text="Fechar", command=win.destroy).pack(side=tk.LEFT, padx=5)
+
+    comparar_cmd()
+
+# ----- JANELA DO ARQUIVO MORTO -----
+
+def janela_arquivo_morto():
+    """Mostra os meses arquivados e arquiva os meses fechados antes de uma data."""
+    win = tk.Toplevel(root)
+    win.title("Arquivo morto")
+    win.geometry("460x460")
+
+    tk.Label(win, text="Arquivo morto", font=("Arial", 12, "bold")).pack(pady=5)
+    tk.Label(
+        win,
+        text="Meses inteiros antes da data, com tudo pago, saem da agenda em uso.\n"
+             "Relatórios, busca e exportação continuam vendo esses meses.",
+        font=("Arial", 9),
+        fg="gray",
+    ).pack()
+
+    frame_corte = tk.Frame(win)
+    frame_corte.pack(pady=8)
+    tk.Label(frame_corte, text="Arquivar antes de:").pack(side=tk.LEFT)
+    corte_var = tk.StringVar(value=iso_para_br(corte_padrao()))
+    tk.Entry(frame_corte, textvariable=corte_var, width=12).pack(side=tk.LEFT, padx=5)
+
+    lista = tk.Listbox(win, height=14, width=60)
+    lista.pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
+
+    info_var = tk.StringVar(value="")
+    tk.Label(win, textvariable=info_var, font=("Arial", 9), fg="gray").pack()
+
+    fechados = []
+
+    def mostrar_arquivados():
+        lista.delete(0, tk.END)
+        meses = arquivo_morto.meses()
+        for mes, info in sorted(meses.items(), reverse=True):
+            r = info["resumo"]
+            lista.insert(
+                tk.END,
+                f"🗄️ {mes[5:]}/{mes[:4]} - {len(info['dias'])} dia(s) - "
+                f"{r['total_atendimentos']} atend. - R$ {r['total_geral']:.2f}",
+            )
+        if not meses:
+            lista.insert(tk.END, "Nenhum mês arquivado ainda.")
+
+    def ver_meses():
+        corte = str_data_para_iso(corte_var.get().strip())
+        if not corte:
+            messagebox.showerror("Erro", "Data inválida. Use o formato DD/MM/AAAA.", parent=win)
+            return
+        fechados[:], com_pendencia = meses_para_arquivar(agenda, corte)
+        mostrar_arquivados()
+        for mes in reversed(com_pendencia):
+            lista.insert(0, f"⏳ {mes[5:]}/{mes[:4]} - tem pendência, fica na agenda")
+        for mes in reversed(fechados):
+            lista.insert(0, f"✅ {mes[5:]}/{mes[:4]} - pronto para arquivar")
+        info_var.set(f"{len(fechados)} mês(es) para arquivar, {len(com_pendencia)} com pendência.")
+
+    def concluir(datas):
+        tirados = tirar_da_agenda(ocupacao, arquivo_morto, datas)
+        historico.limpar()  # o desfazer não alcança dias que saíram da agenda
+        gravar_agenda()
+        atualizar_lista_agenda()
+        messagebox.showinfo(
+            "Arquivo morto",
+            f"{len(tirados)} dia(s) arquivado(s) em {arquivo_morto.pasta}/.",
+            parent=win,
+        )
+        if win.winfo_exists():
+            ver_meses()
+
+    def arquivar_cmd():
+        if not fechados:
+            messagebox.showinfo("Info", "Nenhum mês fechado para arquivar.", parent=win)
+            return
+        if not messagebox.askyesno(
+            "Arquivar",
+            f"Arquivar {len(fechados)} mês(es)? Eles saem da agenda em uso e ficam só para consulta.",
+            parent=win,
+        ):
+            return
+        gravar_agenda()
+        fazer_backup()  # cópia da agenda inteira antes de tirar os meses
+        executar_com_progresso(
+            "Arquivando meses...",
+            lambda tarefa, dias, meses: arquivo_morto.arquivar(dias, meses, tarefa),
+            copia_dos_dias(agenda, [d for d in agenda if d[:7] in fechados]), list(fechados),
+            ao_terminar=concluir,
+            parent=win,
+        )
+
+    frame_btns = tk.Frame(win)
+    frame_btns.pack(pady=8)
+    tk.Button(frame_btns, text="🔎 Ver meses", command=ver_meses).pack(side=tk.LEFT, padx=5)
+    tk.Button(frame_btns, text="🗄️ Arquivar", command=arquivar_cmd).pack(side=tk.LEFT, padx=5)
+    tk.Button(frame_btns, text="Fechar", command=win.destroy).pack(side=tk.LEFT, padx=5)
+
+    ver_meses()
+
 # ------ JANELA DE CLIENTES FIXOS DE PACOTE ------
 
 def janela_pacote_cliente():
@@ -2091,7 +2812,7 @@ def janela_pacote_cliente():
 
     win = tk.Toplevel(root)
     win.title("Cliente fixo / Pacote")
-    win.geometry("420x440")
+    win.geometry("420x470")
 
     tk.Label(win, text="Configurar cliente fixo (pacote)", font=("Arial", 12, "bold")).pack(pady=5)
 
@@ -2113,8 +2834,8 @@ def janela_pacote_cliente():
     combo_dia.grid(row=1, column=1, padx=5, pady=2, sticky="w")
 
     tk.Label(frame_cli, text="Horário:").grid(row=2, column=0, sticky="e")
-    hora_var = tk.StringVar(value=HORARIOS[0])
-    combo_hora = ttk.Combobox(frame_cli, textvariable=hora_var, values=HORARIOS, state="readonly")
+    hora_var = tk.StringVar(value=HORARIOS_AGENDAMENTO[0])
+    combo_hora = ttk.Combobox(frame_cli, textvariable=hora_var, values=HORARIOS_AGENDAMENTO, state="readonly")
     combo_hora.grid(row=2, column=1, padx=5, pady=2, sticky="w")
 
     tk.Label(frame_cli, text="Data inicial (DD/MM/AAAA):").grid(row=3, column=0, sticky="e")
@@ -2127,13 +2848,18 @@ def janela_pacote_cliente():
     entry_semanas = tk.Entry(frame_cli, textvariable=semanas_var, width=6)
     entry_semanas.grid(row=4, column=1, padx=5, pady=2, sticky="w")
 
+    tk.Label(frame_cli, text="Cadeira:").grid(row=5, column=0, sticky="e")
+    recurso_pac_var = tk.StringVar(value=recurso_var.get() or RECURSO_PADRAO)
+    combo_recurso_pac = ttk.Combobox(frame_cli, textvariable=recurso_pac_var, values=RECURSOS, state="readonly")
+    combo_recurso_pac.grid(row=5, column=1, padx=5, pady=2, sticky="w")
+
     # -------------------------
     # SERVIÇOS ALTERNADOS
     # -------------------------
     frame_serv = tk.Frame(win)
     frame_serv.pack(fill=tk.X, padx=10, pady=10)
 
-    servicos_lista = list(SERVICOS.keys())
+    servicos_lista = list(catalogo.servicos())
 
     tk.Label(frame_serv, text="Semana ímpar:").grid(row=0, column=0, sticky="e")
     serv_impar_var = tk.StringVar(value="Barba")
@@ -2221,6 +2947,19 @@ def janela_pacote_cliente():
     # -------------------------
     # BOTÃO PRINCIPAL: CRIAR PACOTE
     # -------------------------
+    def planejar_semanas(tarefa, dt, semanas):
+        """
+        Data de cada semana e o feriado em que cai (None se não for feriado).
+        Roda em segundo plano: só lê, não grava nada na agenda.
+        """
+        plano = []
+        for semana_idx in range(semanas):
+            tarefa.passo(semana_idx, semanas)
+            eh_fer, nome_fer = eh_feriado_data_iso(dt.strftime("%Y-%m-%d"))
+            plano.append((semana_idx, dt, (nome_fer or "Feriado") if eh_fer else None))
+            dt += timedelta(days=7)
+        return plano
+
     def criar_pacote():
         nome_cli = cli_var.get().strip()
         if not nome_cli:
@@ -2234,13 +2973,18 @@ def janela_pacote_cliente():
         alvo_weekday = DIAS_SEMANA.index(dia_semana_str)  # 0=segunda
 
         hora_ini = hora_var.get()
-        if hora_ini not in HORARIOS:
+        if hora_ini not in HORARIOS_AGENDAMENTO:
             messagebox.showerror("Erro", "Horário inválido.", parent=win)
             return
 
+        recurso = recurso_pac_var.get()
+        if recurso not in RECURSOS:
+            messagebox.showerror("Erro", "Cadeira inválida.", parent=win)
+            return
+
         serv_impar = serv_impar_var.get()
         serv_par = serv_par_var.get()
-        if serv_impar not in SERVICOS or serv_par not in SERVICOS:
+        if serv_impar not in servicos_lista or serv_par not in servicos_lista:
             messagebox.showerror("Erro", "Serviços inválidos.", parent=win)
             return
 
@@ -2271,91 +3015,599 @@ def janela_pacote_cliente():
         obs = obs_var.get().strip()
         pacote_nome = pacote_nome_var.get().strip() or "Pacote"
 
-        criados = 0
-        conflitos = 0
+        btn_criar.config(state=tk.DISABLED)
+
+        def reativar_botao():
+            if btn_criar.winfo_exists():
+                btn_criar.config(state=tk.NORMAL)
+
+        # feriados de todas as semanas são vistos em segundo plano;
+        # as perguntas e a gravação ficam na thread do Tk (gravar_pacote)
+        executar_com_progresso(
+            f"Conferindo {semanas} semanas...",
+            planejar_semanas, dt, semanas,
+            ao_terminar=lambda plano: gravar_pacote(
+                plano, nome_cli, hora_ini, recurso, serv_impar, serv_par,
+                val_mensal, obs, pacote_nome
+            ),
+            ao_fim=reativar_botao,
+            parent=win,
+        )
+
+    def gravar_pacote(plano, nome_cli, hora_ini, recurso, serv_impar, serv_par,
+                      val_mensal, obs, pacote_nome):
+        if not win.winfo_exists():
+            return
+
         ajustados_por_feriado = 0
         pulados_por_feriado = 0
+        datas = []
 
-        for semana_idx in range(semanas):
-            # data "base" daquela semana
-            dt_base = dt
-            data_iso_base = dt_base.strftime("%Y-%m-%d")
-
-            # checa feriado
-            eh_fer, nome_fer = eh_feriado_data_iso(data_iso_base)
+        for semana_idx, dt_base, nome_fer in plano:
             dt_slot = dt_base
 
-            if eh_fer:
-                acao, dt_escolhida = escolher_acao_feriado(dt_base, nome_fer or "Feriado", nome_cli)
+            if nome_fer:
+                acao, dt_escolhida = escolher_acao_feriado(dt_base, nome_fer, nome_cli)
                 if acao == "pular":
                     pulados_por_feriado += 1
-                    dt += timedelta(days=7)
                     continue
                 else:
                     ajustados_por_feriado += 1
                     dt_slot = dt_escolhida
+            datas.append((semana_idx, dt_slot))
+
+        criados, conflitos, fechados = reservar_pacote(
+            datas, nome_cli, hora_ini, recurso, serv_impar, serv_par, val_mensal, obs, pacote_nome
+        )
+        recurso_var.set(recurso)
+        atualizar_lista_agenda()
+
+        msg = f"Foram criados {criados} atendimentos de pacote."
+        if ajustados_por_feriado > 0:
+            msg += f"\n{ajustados_por_feriado} foram ajustados por caírem em feriado."
+        if pulados_por_feriado > 0:
+            msg += f"\n{pulados_por_feriado} semanas foram PULADAS por escolha sua nos feriados."
+        if conflitos > 0:
+            msg += f"\n{conflitos} semanas foram ignoradas por conflito de horário."
+        if fechados > 0:
+            msg += f"\n{fechados} semanas caíram com a barbearia fechada (expediente/bloqueio)."
+
+        messagebox.showinfo("Concluído", msg, parent=win)
+        win.destroy()
+
+    # só a reserva e a gravação: as perguntas dos feriados não entram no tempo medido
+    @medido("criar_pacote")
+    def reservar_pacote(datas, nome_cli, hora_ini, recurso, serv_impar, serv_par,
+                        val_mensal, obs, pacote_nome):
+        criados = 0
+        conflitos = 0
+        fechados = 0
 
+        for semana_idx, dt_slot in datas:
             data_iso_slot = dt_slot.strftime("%Y-%m-%d")
             garantir_dia_na_agenda(agenda, data_iso_slot)
 
             # escolhe serviço alternando (0 = 1ª semana = ímpar "humana")
             servico = serv_impar if (semana_idx % 2 == 0) else serv_par
-            duracao = SERVICOS[servico]
-            blocos = duracao // INTERVALO
-            idx_hora = HORARIOS.index(hora_ini)
+            duracao = catalogo.duracao(servico, data_iso_slot)
 
-            if idx_hora + blocos - 1 >= len(HORARIOS):
-                conflitos += 1
-                dt += timedelta(days=7)
+            # barbearia fechada nesse dia/horário (folga, pausa, bloqueio)
+            if not ocupacao.aberto(data_iso_slot, hora_ini, duracao):
+                fechados += 1
                 continue
 
-            blocos_h = HORARIOS[idx_hora: idx_hora + blocos]
-
-            # verifica conflito na data escolhida
-            if any(agenda[data_iso_slot].get(h) is not None for h in blocos_h):
+            # verifica conflito na data/cadeira escolhida
+            if not ocupacao.cabe(data_iso_slot, recurso, hora_ini, duracao):
                 conflitos += 1
-                dt += timedelta(days=7)
                 continue
 
-            preco = PRECO_SERVICOS.get(servico, 0.0)
-
-            for h in blocos_h:
-                agenda[data_iso_slot][h] = {
-                    "cliente": nome_cli,
-                    "servico": servico,
-                    "duracao": duracao,
-                    "obs": obs,
-                    "inicio": hora_ini,
-                    "preco": preco,
-                    "pago": False,
-                    "extras": [],
-                    "pacote": True,
-                    "pacote_nome": pacote_nome,
-                    "pacote_valor_mensal": val_mensal,
-                }
+            preco = catalogo.preco(servico, data_iso_slot)
+
+            reservar_atendimento(ocupacao, data_iso_slot, recurso, hora_ini, {
+                "cliente": nome_cli,
+                CHAVE_CLIENTE_ID: clientes.id_de(nome_cli),
+                "servico": servico,
+                "duracao": duracao,
+                "obs": obs,
+                "preco": preco,
+                "pago": False,
+                "extras": [],
+                "pacote": True,
+                "pacote_nome": pacote_nome,
+                "pacote_valor_mensal": val_mensal,
+            })
 
             criados += 1
-            dt += timedelta(days=7)  # próxima semana
 
-        salvar_agenda(agenda)
-        atualizar_lista_agenda()
+        gravar_agenda()
+        return criados, conflitos, fechados
 
-        msg = f"Foram criados {criados} atendimentos de pacote."
-        if ajustados_por_feriado > 0:
-            msg += f"\n{ajustados_por_feriado} foram ajustados por caírem em feriado."
-        if pulados_por_feriado > 0:
-            msg += f"\n{pulados_por_feriado} semanas foram PULADAS por escolha sua nos feriados."
-        if conflitos > 0:
-            msg += f"\n{conflitos} semanas foram ignoradas por conflito de horário."
+    btn_criar = tk.Button(win, text="✅ Criar agendamentos de pacote", command=criar_pacote)
+    btn_criar.pack(pady=15)
 
-        messagebox.showinfo("Concluído", msg, parent=win)
-        win.destroy()
+# ----- JANELA DE FATURAS DE PACOTE -----
+
+def janela_faturas_pacote():
+    """Gera, confere e recebe as faturas mensais dos pacotes."""
+    win = tk.Toplevel(root)
+    win.title("Faturas de pacote")
+    win.geometry("620x460")
+
+    tk.Label(win, text="Faturas de pacote", font=("Arial", 12, "bold")).pack(pady=5)
+    tk.Label(
+        win,
+        text="Uma fatura por pacote ativo no mês, com o valor mensal do pacote.\n"
+             "Os atendimentos do pacote não cobram o preço avulso.",
+        font=("Arial", 9),
+        fg="gray",
+    ).pack()
+
+    frame_mes = tk.Frame(win)
+    frame_mes.pack(pady=8)
+    tk.Label(frame_mes, text="Mês (MM/AAAA):").pack(side=tk.LEFT)
+    mes_var = tk.StringVar(value=datetime.now().strftime("%m/%Y"))
+    tk.Entry(frame_mes, textvariable=mes_var, width=10).pack(side=tk.LEFT, padx=5)
+
+    lista = tk.Listbox(win, height=14, width=90)
+    lista.pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
+
+    info_var = tk.StringVar(value="")
+    tk.Label(win, textvariable=info_var, font=("Arial", 9), fg="gray").pack()
+
+    faturas = []
+
+    def mes_escolhido():
+        try:
+            return datetime.strptime(mes_var.get().strip(), "%m/%Y").strftime("%Y-%m")
+        except ValueError:
+            messagebox.showerror("Erro", "Mês inválido. Use o formato MM/AAAA.", parent=win)
+            return None
+
+    def mostrar():
+        mes = mes_escolhido()
+        if not mes:
+            return
+        faturas[:] = faturas_pacote.do_mes(mes)
+        lista.delete(0, tk.END)
+        for fatura in faturas:
+            lista.insert(tk.END, texto_fatura(fatura, conciliar_fatura(pacotes, fatura)))
+        faturados = {chave_da_fatura(f) for f in faturas}
+        sem_fatura = [c for c in pacotes.ativos_no_mes(mes) if c not in faturados]
+        if not faturas:
+            lista.insert(tk.END, "Nenhuma fatura nesse mês.")
+        r = resumo_pacotes(faturas_pacote, [mes])
+        texto = (f"{r['faturas']} fatura(s): R$ {r['total']:.2f} "
+                 f"(pago R$ {r['pago']:.2f}, pendente R$ {r['pendente']:.2f})")
+        if sem_fatura:
+            texto += f"  |  {len(sem_fatura)} pacote(s) ativo(s) sem fatura"
+        info_var.set(texto)
+
+    def gerar():
+        mes = mes_escolhido()
+        if not mes:
+            return
+        try:
+            novas = faturas_pacote.faturar_mes(pacotes, mes)
+        except (OSError, TimeoutError) as e:
+            messagebox.showerror("Erro", f"As faturas não foram gravadas:\n{e}", parent=win)
+            return
+        mostrar()
+        messagebox.showinfo("Faturas", f"{len(novas)} fatura(s) nova(s).", parent=win)
+
+    def selecionada():
+        sel = lista.curselection()
+        if not sel or sel[0] >= len(faturas):
+            messagebox.showinfo("Info", "Selecione uma fatura.", parent=win)
+            return None
+        return faturas[sel[0]]
+
+    def pagar():
+        fatura = selecionada()
+        if fatura is None:
+            return
+        if fatura["pago"]:
+            messagebox.showinfo("Info", "Essa fatura já está paga.", parent=win)
+            return
+        forma = escolher_forma_pagamento(win, fatura["valor"])
+        if not forma:
+            return
+        try:
+            lanc = livro_caixa.lancar(
+                fatura["valor"], forma, ref_fatura(fatura["id"]), fatura,
+                descricao=f"{fatura['pacote_nome']} {fatura['mes'][5:]}/{fatura['mes'][:4]}",
+            )
+            faturas_pacote.marcar_paga(fatura["id"], forma, lanc["id"])
+        except (OSError, TimeoutError) as e:
+            messagebox.showerror("Erro", f"O pagamento não foi lançado:\n{e}", parent=win)
+            return
+        mostrar()
+
+    def ver_atendimentos():
+        fatura = selecionada()
+        if fatura is None:
+            return
+        linhas = [texto_fatura(fatura, conciliar_fatura(pacotes, fatura)), ""]
+        for o in pacotes.ocorrencias(chave_da_fatura(fatura), fatura["mes"]):
+            linhas.append(f"{iso_para_br(o['data_iso'])} {o['hora']} {o['recurso']} - {o['status']}")
+        if len(linhas) == 2:
+            linhas.append("Nenhum atendimento na agenda em uso (mês arquivado?).")
+        messagebox.showinfo("Atendimentos do pacote", "\n".join(linhas), parent=win)
+
+    frame_btns = tk.Frame(win)
+    frame_btns.pack(pady=8)
+    tk.Button(frame_btns, text="🔎 Ver mês", command=mostrar).pack(side=tk.LEFT, padx=5)
+    tk.Button(frame_btns, text="🧾 Gerar faturas", command=gerar).pack(side=tk.LEFT, padx=5)
+    tk.Button(frame_btns, text="💰 Receber", command=pagar).pack(side=tk.LEFT, padx=5)
+    tk.Button(frame_btns, text="📋 Atendimentos", command=ver_atendimentos).pack(side=tk.LEFT, padx=5)
+    tk.Button(frame_btns, text="Fechar", command=win.destroy).pack(side=tk.LEFT, padx=5)
+
+    if pacotes.montado:
+        mostrar()
+    else:
+        # primeira vez: uma passada pela agenda; depois o índice se mantém sozinho
+        executar_com_progresso(
+            "Lendo os pacotes da agenda...",
+            lambda tarefa, dias: pacotes.ler(dias, tarefa),
+            copia_dos_dias(agenda),
+            ao_terminar=lambda lidos: pacotes.instalar(lidos) and win.winfo_exists() and mostrar(),
+            parent=win,
+        )
+
+# ----- JANELA DE ESTOQUE -----
+
+def janela_estoque():
+    """Saldo dos produtos, reposição, contagem, mínimo e giro do mês."""
+    win = tk.Toplevel(root)
+    win.title("Estoque")
+    win.geometry("520x480")
+
+    tk.Label(win, text="Estoque de produtos", font=("Arial", 12, "bold")).pack(pady=5)
+    tk.Label(
+        win,
+        text="As vendas (extras e avulsas) já descontam sozinhas.\n"
+             "Lance aqui o que chegou e, de vez em quando, a contagem da prateleira.",
+        font=("Arial", 9),
+        fg="gray",
+    ).pack()
+
+    lista = tk.Listbox(win, height=12, width=70)
+    lista.pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
+
+    info_var = tk.StringVar(value="")
+    tk.Label(win, textvariable=info_var, font=("Arial", 9), fg="gray", justify="left").pack()
+
+    produtos = produtos_de_venda()
+
+    def mostrar():
+        estoque.atualizar()
+        lista.delete(0, tk.END)
+        for produto in produtos:
+            lista.insert(tk.END, texto_saldo(estoque, produto))
+        alertas = estoque.alertas()
+        info_var.set(f"⚠️ {len(alertas)} produto(s) no mínimo ou abaixo." if alertas else "")
+
+    def selecionado():
+        sel = lista.curselection()
+        if not sel or sel[0] >= len(produtos):
+            messagebox.showinfo("Info", "Selecione um produto.", parent=win)
+            return None
+        return produtos[sel[0]]
+
+    def lancar(tipo, pergunta):
+        produto = selecionado()
+        if produto is None:
+            return
+        qtd = simpledialog.askinteger("Estoque", f"{produto}: {pergunta}", parent=win, minvalue=0)
+        if qtd is None:
+            return
+        try:
+            estoque.lancar(tipo, produto, qtd)
+        except ValueError as e:
+            messagebox.showerror("Erro", str(e), parent=win)
+            return
+        except (OSError, TimeoutError) as e:
+            messagebox.showerror("Erro", f"O movimento não foi gravado:\n{e}", parent=win)
+            return
+        mostrar()
+
+    def giro_do_mes():
+        primeiro = datetime.now().replace(day=1)
+        ultimo = (primeiro + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+        linhas = [texto_giro(l) for l in estoque.giro(primeiro.strftime("%Y-%m-%d"), ultimo.strftime("%Y-%m-%d"))]
+        messagebox.showinfo(
+            "Giro do mês",
+            "\n".join(linhas) if linhas else "Nenhum produto vendido ou controlado no mês.",
+            parent=win,
+        )
+
+    frame_btns = tk.Frame(win)
+    frame_btns.pack(pady=8)
+    tk.Button(frame_btns, text="➕ Entrada",
+              command=lambda: lancar("entrada", "quantas unidades chegaram?")).pack(side=tk.LEFT, padx=4)
+    tk.Button(frame_btns, text="🔢 Contagem",
+              command=lambda: lancar("contagem", "quantas tem na prateleira agora?")).pack(side=tk.LEFT, padx=4)
+    tk.Button(frame_btns, text="⚠️ Mínimo",
+              command=lambda: lancar("minimo", "avisar quando chegar a quanto?")).pack(side=tk.LEFT, padx=4)
+    tk.Button(frame_btns, text="📊 Giro do mês", command=giro_do_mes).pack(side=tk.LEFT, padx=4)
+    tk.Button(frame_btns, text="Fechar", command=win.destroy).pack(side=tk.LEFT, padx=4)
+
+    if estoque.montado:
+        mostrar()
+    else:
+        # primeira vez: uma passada pela agenda; depois as vendas atualizam sozinhas
+        executar_com_progresso(
+            "Lendo as vendas da agenda...",
+            lambda tarefa, dias: estoque.ler(dias, tarefa),
+            copia_dos_dias(agenda),
+            ao_terminar=lambda lidos: estoque.instalar(lidos) and win.winfo_exists() and mostrar(),
+            parent=win,
+        )
+
+# ----- JANELA DE PREÇOS -----
+
+def janela_precos():
+    """Catálogo com o preço de hoje; alteração vale a partir da data informada."""
+    win = tk.Toplevel(root)
+    win.title("Preços")
+    win.geometry("480x420")
+
+    tk.Label(win, text="Preços de serviços e produtos", font=("Arial", 12, "bold")).pack(pady=5)
+    tk.Label(
+        win,
+        text="Preço novo vale a partir da data escolhida.\n"
+             "Atendimento já marcado continua com o preço que foi gravado.",
+        font=("Arial", 9),
+        fg="gray",
+    ).pack()
+
+    lista = tk.Listbox(win, height=12, width=60)
+    lista.pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
+
+    nomes = []
+
+    def mostrar():
+        catalogo.atualizar()
+        nomes[:] = catalogo.nomes()
+        lista.delete(0, tk.END)
+        for nome in nomes:
+            lista.insert(tk.END, texto_item(catalogo, nome))
+
+    def alterar_preco():
+        sel = lista.curselection()
+        if not sel or sel[0] >= len(nomes):
+            messagebox.showinfo("Info", "Selecione um item.", parent=win)
+            return
+        item = nomes[sel[0]]
+        preco = simpledialog.askstring(
+            "Preços", f"{item}: preço novo (R$)", parent=win,
+            initialvalue=f"{catalogo.preco(item):.2f}".replace(".", ","),
+        )
+        if not preco:
+            return
+        desde = simpledialog.askstring(
+            "Preços", "Vale a partir de (DD/MM/AAAA):", parent=win,
+            initialvalue=datetime.now().strftime("%d/%m/%Y"),
+        )
+        if not desde:
+            return
+        try:
+            desde_iso = datetime.strptime(desde.strip(), "%d/%m/%Y").strftime("%Y-%m-%d")
+            catalogo.alterar(item, desde_iso, preco=float(preco.replace(",", ".")))
+        except ValueError as e:
+            messagebox.showerror("Erro", f"Valor inválido: {e}", parent=win)
+            return
+        except (OSError, TimeoutError) as e:
+            messagebox.showerror("Erro", f"O catálogo não foi gravado:\n{e}", parent=win)
+            return
+        mostrar()
+
+    frame_btns = tk.Frame(win)
+    frame_btns.pack(pady=8)
+    tk.Button(frame_btns, text="✏️ Alterar preço", command=alterar_preco).pack(side=tk.LEFT, padx=4)
+    tk.Button(frame_btns, text="Fechar", command=win.destroy).pack(side=tk.LEFT, padx=4)
+
+    mostrar()
+
+# ----- JANELA DA LISTA DE ESPERA -----
+
+def janela_novo_pedido(parent, ao_salvar):
+    """Formulário de pedido: cliente, serviço, dias da semana, faixa de horário e prioridade."""
+    w = tk.Toplevel(parent)
+    w.title("Novo pedido")
+    w.geometry("360x470")
+
+    tk.Label(w, text="Cliente:").pack()
+    nome_var = tk.StringVar()
+    ttk.Combobox(w, textvariable=nome_var, values=sorted(clientes.keys()), state="normal").pack(
+        pady=5, fill=tk.X, padx=20)
+
+    tk.Label(w, text="Serviço:").pack()
+    servicos = list(catalogo.servicos())
+    servico_var = tk.StringVar(value=servicos[0] if servicos else "")
+    ttk.Combobox(w, textvariable=servico_var, values=servicos, state="readonly").pack(pady=5)
+
+    tk.Label(w, text="Dias que servem (nenhum = qualquer dia):").pack(pady=(5, 0))
+    frame_dias = tk.Frame(w)
+    frame_dias.pack()
+    dias_vars = []
+    for i, nome_dia in enumerate(DIAS_SEMANA):
+        var = tk.BooleanVar(value=False)
+        tk.Checkbutton(frame_dias, text=nome_dia.split("-")[0], variable=var).grid(
+            row=i // 3, column=i % 3, sticky="w")
+        dias_vars.append(var)
+
+    tk.Label(w, text="Entre (vazio = qualquer hora):").pack(pady=(5, 0))
+    frame_faixa = tk.Frame(w)
+    frame_faixa.pack()
+    de_var = tk.StringVar()
+    ate_hora_var = tk.StringVar()
+    horas = [""] + HORARIOS_AGENDAMENTO
+    ttk.Combobox(frame_faixa, textvariable=de_var, values=horas, width=7, state="readonly").pack(side=tk.LEFT)
+    tk.Label(frame_faixa, text=" e ").pack(side=tk.LEFT)
+    ttk.Combobox(frame_faixa, textvariable=ate_hora_var, values=horas + [minutos_para_hora(FECHAMENTO)],
+                 width=7, state="readonly").pack(side=tk.LEFT)
+
+    tk.Label(w, text="Prioridade (maior é oferecido primeiro):").pack(pady=(5, 0))
+    prioridade_var = tk.StringVar(value="0")
+    ttk.Combobox(w, textvariable=prioridade_var, values=["0", "1", "2", "3"], width=5, state="readonly").pack()
+
+    tk.Label(w, text="Observações (opcional):").pack(pady=(5, 0))
+    obs_entry = tk.Entry(w)
+    obs_entry.pack(fill=tk.X, padx=20)
+
+    def salvar():
+        nome = nome_var.get().strip()
+        if nome not in clientes:
+            messagebox.showerror("Erro", "Escolha um cliente cadastrado.", parent=w)
+            return
+        janelas = []
+        if de_var.get() or ate_hora_var.get():
+            janelas.append((de_var.get() or minutos_para_hora(ABERTURA),
+                            ate_hora_var.get() or minutos_para_hora(FECHAMENTO)))
+        try:
+            pedido = novo_pedido(
+                nome, servico_var.get(),
+                dias=[i for i, var in enumerate(dias_vars) if var.get()],
+                janelas=janelas,
+                prioridade=int(prioridade_var.get() or 0),
+                obs=obs_entry.get().strip(),
+                cliente_id=clientes.id_de(nome),
+            )
+            espera.pedir(pedido)
+        except ValueError as e:
+            messagebox.showerror("Erro", str(e), parent=w)
+            return
+        except (OSError, TimeoutError) as e:
+            messagebox.showerror("Erro", f"O pedido não foi gravado:\n{e}", parent=w)
+            return
+        w.destroy()
+        ao_salvar()
+
+    tk.Button(w, text="✅ Colocar na lista", command=salvar).pack(pady=10)
+
+def janela_lista_espera():
+    """Pedidos aguardando horário e as ofertas das vagas liberadas, na ordem da fila."""
+    win = tk.Toplevel(root)
+    win.title("Lista de espera")
+    win.geometry("620x560")
+
+    tk.Label(win, text="Aguardando horário", font=("Arial", 12, "bold")).pack(pady=5)
+    lista_pedidos = tk.Listbox(win, height=9, width=85)
+    lista_pedidos.pack(fill=tk.BOTH, expand=True, padx=10)
+
+    frame_ped = tk.Frame(win)
+    frame_ped.pack(pady=5)
+
+    tk.Label(win, text="Ofertas de vagas liberadas", font=("Arial", 12, "bold")).pack(pady=5)
+    tk.Label(
+        win,
+        text="Ofereça na ordem da lista; se o cliente não quiser, passe para o próximo.",
+        font=("Arial", 9),
+        fg="gray",
+    ).pack()
+    lista_ofertas = tk.Listbox(win, height=9, width=85)
+    lista_ofertas.pack(fill=tk.BOTH, expand=True, padx=10)
+
+    frame_of = tk.Frame(win)
+    frame_of.pack(pady=8)
+
+    pedidos = []
+    ofertas = []
+
+    def mostrar():
+        pedidos[:] = espera.abertos()
+        ofertas[:] = espera.pendentes()
+        lista_pedidos.delete(0, tk.END)
+        for pedido in pedidos:
+            lista_pedidos.insert(tk.END, texto_pedido(pedido))
+        lista_ofertas.delete(0, tk.END)
+        for oferta in ofertas:
+            lista_ofertas.insert(tk.END, texto_oferta(oferta) + ("" if espera.cabe(oferta) else " (já ocupado)"))
+
+    def escolhido(lista, itens, o_que):
+        sel = lista.curselection()
+        if not sel or sel[0] >= len(itens):
+            messagebox.showinfo("Info", f"Selecione {o_que}.", parent=win)
+            return None
+        return itens[sel[0]]
+
+    def desistir():
+        pedido = escolhido(lista_pedidos, pedidos, "um pedido")
+        if pedido is None:
+            return
+        if not messagebox.askyesno("Confirmar", f"Tirar {pedido['cliente']} da lista de espera?", parent=win):
+            return
+        try:
+            espera.desistir(pedido["id"])
+        except (OSError, TimeoutError) as e:
+            messagebox.showerror("Erro", f"A lista não foi gravada:\n{e}", parent=win)
+            return
+        mostrar()
+
+    def avisar():
+        oferta = escolhido(lista_ofertas, ofertas, "uma oferta")
+        if oferta is None:
+            return
+        tel = (clientes.get(oferta["cliente"]) or {}).get("tel", "")
+        if not normalizar_telefone_br(tel):
+            messagebox.showinfo("Info", f"{oferta['cliente']} não tem telefone cadastrado.", parent=win)
+            return
+        mensagem = (f"Olá, {oferta['cliente']}! Abriu um horário para {oferta['servico']} "
+                    f"em {iso_para_br(oferta['data_iso'])} às {oferta['hora']}. Quer ficar com ele?")
+        try:
+            enviar_pelo_navegador(tel, mensagem)
+        except OSError as e:
+            messagebox.showerror("Erro", str(e), parent=win)
+
+    def aceitar():
+        oferta = escolhido(lista_ofertas, ofertas, "uma oferta")
+        if oferta is None:
+            return
+        try:
+            espera.aceitar(oferta["id"])
+        except ValueError as e:
+            messagebox.showerror("Erro", str(e), parent=win)
+            mostrar()
+            return
+        except (OSError, TimeoutError) as e:
+            messagebox.showerror("Erro", f"A lista não foi gravada:\n{e}", parent=win)
+            return
+        gravar_agenda()
+        data_var.set(iso_para_br(oferta["data_iso"]))
+        recurso_var.set(oferta["recurso"])
+        atualizar_campos_de_data()
+        messagebox.showinfo(
+            "Sucesso",
+            f"{oferta['cliente']} agendado em {iso_para_br(oferta['data_iso'])} às {oferta['hora']} ✅",
+            parent=win,
+        )
+        mostrar()
+
+    def recusar():
+        oferta = escolhido(lista_ofertas, ofertas, "uma oferta")
+        if oferta is None:
+            return
+        try:
+            espera.recusar(oferta["id"])
+        except (OSError, TimeoutError) as e:
+            messagebox.showerror("Erro", f"A lista não foi gravada:\n{e}", parent=win)
+            return
+        mostrar()
 
-    tk.Button(win, text="✅ Criar agendamentos de pacote", command=criar_pacote).pack(pady=15)
+    tk.Button(frame_ped, text="➕ Novo pedido",
+              command=lambda: janela_novo_pedido(win, mostrar)).pack(side=tk.LEFT, padx=4)
+    tk.Button(frame_ped, text="🗑️ Desistiu", command=desistir).pack(side=tk.LEFT, padx=4)
+
+    tk.Button(frame_of, text="💬 Avisar no WhatsApp", command=avisar).pack(side=tk.LEFT, padx=4)
+    tk.Button(frame_of, text="✅ Aceitou", command=aceitar).pack(side=tk.LEFT, padx=4)
+    tk.Button(frame_of, text="❌ Não quis", command=recusar).pack(side=tk.LEFT, padx=4)
+    tk.Button(frame_of, text="Fechar", command=win.destroy).pack(side=tk.LEFT, padx=4)
+
+    mostrar()
 
 # ----- JANELA DE BUSCA POR CLIENTE -----
 
-def janela_buscar_cliente():
+def janela_buscar_cliente(nome_inicial=None):
     if not clientes:
         messagebox.showinfo("Info", "Nenhum cliente cadastrado ainda.")
         return
@@ -2390,7 +3642,6 @@ def janela_buscar_cliente():
     lbl_info.pack(pady=(0, 5), padx=10, anchor="w")
 
     def buscar():
-        nonlocal mapa_itens
         nome = nome_var.get().strip()
         lista_res.delete(0, tk.END)
         mapa_itens.clear()
@@ -2400,62 +3651,27 @@ def janela_buscar_cliente():
             messagebox.showerror("Erro", "Selecione um cliente.", parent=win)
             return
 
-        resultados = []
-
-        for data_iso, dia in agenda.items():
-            if not isinstance(dia, dict):
-                continue
-
-            # Agendamentos
-            for hora, slot in dia.items():
-                if isinstance(hora, str) and hora.startswith("_"):
-                    continue
-                if not isinstance(slot, dict):
-                    continue
-                if slot.get("inicio") != hora:
-                    continue
+        lista_res.insert(tk.END, "Buscando...")
+        executar_com_progresso(
+            f"Buscando registros de {nome}...",
+            lambda tarefa, dias, id_cliente: buscar_com_arquivo(
+                dias, arquivo_morto, nome, tarefa=tarefa, id_cliente=id_cliente
+            ),
+            copia_dos_dias(agenda), clientes.id_de(nome),
+            ao_terminar=mostrar_resultados,
+            parent=win,
+        )
 
-                if slot.get("cliente") == nome:
-                    resultados.append({
-                        "tipo": "AGENDAMENTO",
-                        "data_iso": data_iso,
-                        "hora": hora,
-                        "servico": slot.get("servico", ""),
-                        "obs": slot.get("obs", ""),
-                        "pago": bool(slot.get("pago", False)),
-                        "total": float(slot.get("preco", PRECO_SERVICOS.get(slot.get("servico",""), 0.0))) +
-                                 sum(float(e.get("valor", 0.0)) for e in slot.get("extras", [])),
-                        "pacote": bool(slot.get("pacote", False)),
-                        "pacote_nome": slot.get("pacote_nome"),
-                        "extras": slot.get("extras", []),
-                    })
-
-            # Vendas avulsas (se tiver cliente preenchido)
-            vendas = dia.get("_vendas_avulsas", [])
-            if isinstance(vendas, list):
-                for idx, v in enumerate(vendas):
-                    if not isinstance(v, dict):
-                        continue
-                    if v.get("cliente", "").strip() == nome:
-                        resultados.append({
-                            "tipo": "VENDA",
-                            "data_iso": data_iso,
-                            "indice": idx,
-                            "produto": v.get("produto", ""),
-                            "valor": float(v.get("valor", 0.0)),
-                            "pago": bool(v.get("pago", True)),
-                        })
+    def mostrar_resultados(resultados):
+        if not win.winfo_exists():
+            return
+        lista_res.delete(0, tk.END)
+        mapa_itens.clear()
 
         if not resultados:
             lista_res.insert(tk.END, "Nenhum registro encontrado para esse cliente.")
             return
 
-        # ordena por data/hora (venda vai com hora '--' no display)
-        def chave_ord(r):
-            h = r.get("hora", "--")
-            return (r["data_iso"], h)
-        resultados.sort(key=chave_ord)
-
         for r in resultados:
             data_br = iso_para_br(r["data_iso"])
             if r["tipo"] == "AGENDAMENTO":
@@ -2463,12 +3679,14 @@ def janela_buscar_cliente():
                 serv = r.get("servico", "")
                 tag_pac = " (PACOTE)" if r.get("pacote") else ""
                 status = "Pago" if r.get("pago") else "Pendente"
-                linha = f"{data_br} - {hora} - {serv}{tag_pac} - R$ {r.get('total',0.0):.2f} - {status} [AG]"
+                linha = f"{data_br} - {hora} - {r.get('recurso')} - {serv}{tag_pac} - R$ {r.get('total',0.0):.2f} - {status} [AG]"
             else:
                 prod = r.get("produto", "")
                 status = "Pago" if r.get("pago") else "Pendente"
                 linha = f"{data_br} - -- - (Venda) {prod} - R$ {r.get('valor',0.0):.2f} - {status} [VD]"
 
+            if r.get("arquivado"):
+                linha += " [ARQ]"
             lista_res.insert(tk.END, linha)
             mapa_itens.append(r)
 
@@ -2489,7 +3707,7 @@ def janela_buscar_cliente():
             status = "Pago" if r.get("pago") else "Pendente"
 
             info_var.set(
-                f"📅 {data_br} às {r.get('hora')}\n"
+                f"📅 {data_br} às {r.get('hora')} ({r.get('recurso')})\n"
                 f"✂️ Serviço: {r.get('servico')}\n"
                 f"📦 Pacote: {pacote_txt}\n"
                 f"🧴 Extras: {extras_txt}\n"
@@ -2505,6 +3723,17 @@ def janela_buscar_cliente():
 
     lista_res.bind("<<ListboxSelect>>", item_selecionado)
 
+    def somente_leitura(r):
+        """Registro do arquivo morto: dá para ver, não para mexer."""
+        if r.get("arquivado"):
+            messagebox.showinfo(
+                "Arquivo morto",
+                f"{iso_para_br(r['data_iso'])} está no arquivo morto (somente leitura).",
+                parent=win,
+            )
+            return True
+        return False
+
     
 
     def ir_para_data():
@@ -2513,7 +3742,11 @@ def janela_buscar_cliente():
             return
         idx = lista_res.curselection()[0]
         r = mapa_itens[idx]
+        if somente_leitura(r):
+            return
         data_var.set(iso_para_br(r["data_iso"]))
+        if r.get("recurso"):
+            recurso_var.set(r["recurso"])
         atualizar_campos_de_data()
         win.lift()
 
@@ -2528,10 +3761,12 @@ def janela_buscar_cliente():
             return
         idx = lista_res.curselection()[0]
         r = mapa_itens[idx]
+        if somente_leitura(r):
+            return
         if r["tipo"] != "AGENDAMENTO":
             messagebox.showinfo("Info", "Somente agendamentos podem ser editados aqui.", parent=win)
             return
-        janela_editar_agendamento_em(r["data_iso"], r["hora"])
+        janela_editar_agendamento_em(r["data_iso"], r["hora"], r.get("recurso", RECURSO_PADRAO))
 
     def abrir_caixa_data():
         if not lista_res.curselection():
@@ -2539,6 +3774,8 @@ def janela_buscar_cliente():
             return
         idx = lista_res.curselection()[0]
         r = mapa_itens[idx]
+        if somente_leitura(r):
+            return
         data_var.set(iso_para_br(r["data_iso"]))
         atualizar_campos_de_data()
         abrir_caixa_dia()
@@ -2551,6 +3788,8 @@ def janela_buscar_cliente():
         if idx < 0 or idx >= len(mapa_itens):
             return
         r = mapa_itens[idx]
+        if somente_leitura(r):
+            return
         if r.get("tipo") != "VENDA":
             messagebox.showinfo("Info", "Selecione uma VENDA avulsa.", parent=win)
             return
@@ -2566,8 +3805,12 @@ def janela_buscar_cliente():
             messagebox.showinfo("Info", "Essa venda já está como paga.", parent=win)
             return
 
-        vendas[i]["pago"] = True
-        salvar_agenda(agenda)
+        forma = escolher_forma_pagamento(win, float(vendas[i].get("valor", 0.0)))
+        if not forma:
+            return
+        venda = atualizar_venda(ocupacao, r["data_iso"], i, pago=True, forma_pagamento=forma)
+        lancar_pagamento(forma, ref_venda(r["data_iso"], i, venda["id"]), venda, parent=win)
+        gravar_agenda()
         buscar()
         info_var.set("Venda marcada como paga ✅")
 
@@ -2583,10 +3826,12 @@ def janela_buscar_cliente():
         if idx < 0 or idx >= len(mapa_itens):
             return
         r = mapa_itens[idx]
+        if somente_leitura(r):
+            return
         if r.get("tipo") != "AGENDAMENTO":
             messagebox.showinfo("Info", "Selecione um AGENDAMENTO para cancelar.", parent=win)
             return
-        cancelar_agendamento_em(r["data_iso"], r.get("hora"), parent=win)
+        cancelar_agendamento_em(r["data_iso"], r.get("hora"), parent=win, recurso=r.get("recurso", RECURSO_PADRAO))
         buscar()
 
     def adicionar_produto_selecionado():
@@ -2597,10 +3842,12 @@ def janela_buscar_cliente():
         if idx < 0 or idx >= len(mapa_itens):
             return
         r = mapa_itens[idx]
+        if somente_leitura(r):
+            return
         if r.get("tipo") != "AGENDAMENTO":
             messagebox.showinfo("Info", "Selecione um AGENDAMENTO para adicionar produto.", parent=win)
             return
-        adicionar_produto_em_agendamento(r["data_iso"], r.get("hora"), parent=win)
+        adicionar_produto_em_agendamento(r["data_iso"], r.get("hora"), parent=win, recurso=r.get("recurso", RECURSO_PADRAO))
         buscar()
 
     tk.Button(btns, text="🔍 Buscar", command=buscar, width=14).grid(row=0, column=0, padx=5, pady=3)
@@ -2612,6 +3859,490 @@ def janela_buscar_cliente():
     tk.Button(btns, text="🧴 Add produto", command=adicionar_produto_selecionado, width=14).grid(row=1, column=2, padx=5, pady=3)
     tk.Button(btns, text="✅ Pagar venda", command=marcar_venda_paga, width=14).grid(row=1, column=3, padx=5, pady=3)
 
+    if nome_inicial in clientes:
+        nome_var.set(nome_inicial)
+        buscar()
+
+# ----- JANELA DE EXPEDIENTE (HORÁRIOS, PAUSAS E BLOQUEIOS) -----
+
+def janela_expediente():
+    """Configura horário por dia da semana, pausa fixa (almoço) e bloqueios avulsos."""
+    win = tk.Toplevel(root)
+    win.title("Expediente")
+    win.geometry("480x600")
+
+    tk.Label(win, text="Horário de funcionamento", font=("Arial", 12, "bold")).pack(pady=5)
+    tk.Label(
+        win,
+        text="Ex.: 09:00-12:00, 13:00-21:00  (vazio = fechado)",
+        font=("Arial", 9),
+        fg="gray"
+    ).pack()
+
+    frame_dias = tk.Frame(win)
+    frame_dias.pack(fill=tk.X, padx=10, pady=5)
+
+    dias_vars = {}
+    for i, nome in enumerate(DIAS_SEMANA):
+        tk.Label(frame_dias, text=f"{nome}:").grid(row=i, column=0, sticky="e")
+        var = tk.StringVar(value=periodos_para_texto(expediente.config["dias"].get(nome, [])))
+        tk.Entry(frame_dias, textvariable=var, width=30).grid(row=i, column=1, padx=5, pady=2, sticky="w")
+        dias_vars[nome] = var
+
+    # pausas sem "dias" valem para todos os dias; as específicas ficam como estão
+    pausas_gerais = [p for p in expediente.config["pausas"] if not p.get("dias")]
+    pausas_especificas = [p for p in expediente.config["pausas"] if p.get("dias")]
+
+    tk.Label(frame_dias, text="Pausa (todos os dias):").grid(row=len(DIAS_SEMANA), column=0, sticky="e")
+    pausa_var = tk.StringVar(value=periodos_para_texto([[p["inicio"], p["fim"]] for p in pausas_gerais]))
+    tk.Entry(frame_dias, textvariable=pausa_var, width=30).grid(
+        row=len(DIAS_SEMANA), column=1, padx=5, pady=2, sticky="w"
+    )
+
+    def salvar_horarios():
+        try:
+            novos_dias = {nome: texto_para_periodos(var.get()) for nome, var in dias_vars.items()}
+            novas_pausas = [
+                {"inicio": ini, "fim": fim, "motivo": "Pausa"}
+                for ini, fim in texto_para_periodos(pausa_var.get())
+            ]
+        except ValueError as e:
+            messagebox.showerror("Erro", str(e), parent=win)
+            return
+
+        for nome, periodos in novos_dias.items():
+            expediente.definir_dia(nome, periodos)
+        expediente.definir_pausas(novas_pausas + pausas_especificas)
+
+        salvar_expediente(expediente)
+        atualizar_lista_agenda()
+        messagebox.showinfo("Sucesso", "Expediente salvo ✅", parent=win)
+
+    tk.Button(win, text="💾 Salvar horários", command=salvar_horarios).pack(pady=5)
+
+    # ----- bloqueios avulsos -----
+    tk.Label(win, text="Bloqueios (folga, curso, véspera...)", font=("Arial", 11, "bold")).pack(pady=(10, 0))
+
+    lista_bloq = tk.Listbox(win, height=7)
+    lista_bloq.pack(fill=tk.X, padx=10, pady=5)
+
+    def atualizar_lista_bloqueios():
+        lista_bloq.delete(0, tk.END)
+        for b in expediente.config["bloqueios"]:
+            periodo = f"{b['inicio']}-{b['fim']}" if b.get("inicio") else "dia todo"
+            linha = f"{iso_para_br(b.get('data', ''))} - {periodo}"
+            if b.get("motivo"):
+                linha += f" - {b['motivo']}"
+            lista_bloq.insert(tk.END, linha)
+
+    frame_bloq = tk.Frame(win)
+    frame_bloq.pack(fill=tk.X, padx=10)
+
+    tk.Label(frame_bloq, text="Data (DD/MM/AAAA):").grid(row=0, column=0, sticky="e")
+    bloq_data_var = tk.StringVar(value=data_var.get())
+    tk.Entry(frame_bloq, textvariable=bloq_data_var, width=12).grid(row=0, column=1, padx=5, pady=2, sticky="w")
+
+    tk.Label(frame_bloq, text="Período (vazio = dia todo):").grid(row=1, column=0, sticky="e")
+    bloq_periodo_var = tk.StringVar()
+    tk.Entry(frame_bloq, textvariable=bloq_periodo_var, width=14).grid(row=1, column=1, padx=5, pady=2, sticky="w")
+
+    tk.Label(frame_bloq, text="Motivo:").grid(row=2, column=0, sticky="e")
+    bloq_motivo_var = tk.StringVar(value="Folga")
+    tk.Entry(frame_bloq, textvariable=bloq_motivo_var, width=22).grid(row=2, column=1, padx=5, pady=2, sticky="w")
+
+    def adicionar_bloqueio():
+        data_iso_bloq = str_data_para_iso(bloq_data_var.get().strip())
+        if not data_iso_bloq:
+            messagebox.showerror("Erro", "Data inválida. Use o formato DD/MM/AAAA.", parent=win)
+            return
+        try:
+            periodos = texto_para_periodos(bloq_periodo_var.get())
+        except ValueError as e:
+            messagebox.showerror("Erro", str(e), parent=win)
+            return
+        inicio, fim = periodos[0] if periodos else (None, None)
+
+        expediente.adicionar_bloqueio(data_iso_bloq, inicio, fim, bloq_motivo_var.get().strip())
+        salvar_expediente(expediente)
+
+        # avisa se já tinha gente marcada no período bloqueado
+        afetados = [
+            a for a in atendimentos_do_dia(agenda.get(data_iso_bloq, {}))
+            if not ocupacao.aberto(data_iso_bloq, a[1], a[2].get("duracao", 30))
+        ]
+        atualizar_lista_bloqueios()
+        atualizar_lista_agenda()
+        if afetados:
+            messagebox.showwarning(
+                "Atenção",
+                f"Bloqueio salvo, mas já há {len(afetados)} atendimento(s) marcados nesse período.",
+                parent=win
+            )
+
+    def remover_bloqueio():
+        sel = lista_bloq.curselection()
+        if not sel:
+            messagebox.showinfo("Info", "Selecione um bloqueio.", parent=win)
+            return
+        expediente.remover_bloqueio(expediente.config["bloqueios"][sel[0]])
+        salvar_expediente(expediente)
+        atualizar_lista_bloqueios()
+        atualizar_lista_agenda()
+
+    frame_bloq_btns = tk.Frame(win)
+    frame_bloq_btns.pack(pady=5)
+    tk.Button(frame_bloq_btns, text="➕ Bloquear", command=adicionar_bloqueio).pack(side=tk.LEFT, padx=5)
+    tk.Button(frame_bloq_btns, text="🗑 Remover", command=remover_bloqueio).pack(side=tk.LEFT, padx=5)
+
+    atualizar_lista_bloqueios()
+
+# ----- JANELA DE DIAGNÓSTICO (TEMPOS DAS OPERAÇÕES) -----
+
+def janela_diagnostico():
+    """Mostra p50/p95 das operações medidas e liga/desliga a medição."""
+    win = tk.Toplevel(root)
+    win.title("Diagnóstico")
+    win.geometry("560x460")
+
+    tk.Label(win, text="Tempo das operações", font=("Arial", 12, "bold")).pack(pady=5)
+
+    ativo_var = tk.BooleanVar(value=agenda_diagnostico.esta_ativo())
+
+    def alternar():
+        agenda_diagnostico.ativar(ativo_var.get())
+
+    tk.Checkbutton(
+        win,
+        text=f"Registrar tempos (grava em {agenda_diagnostico.ARQUIVO_LOG})",
+        variable=ativo_var,
+        command=alternar
+    ).pack()
+
+    colunas = ("operacao", "chamadas", "p50", "p95", "maximo")
+    tree = ttk.Treeview(win, columns=colunas, show="headings", height=10)
+    tree.heading("operacao", text="Operação")
+    tree.heading("chamadas", text="Chamadas")
+    tree.heading("p50", text="p50 (ms)")
+    tree.heading("p95", text="p95 (ms)")
+    tree.heading("maximo", text="Máx (ms)")
+    tree.column("operacao", width=180)
+    tree.column("chamadas", width=70, anchor="e")
+    tree.column("p50", width=80, anchor="e")
+    tree.column("p95", width=80, anchor="e")
+    tree.column("maximo", width=80, anchor="e")
+    tree.pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
+
+    hist_var = tk.StringVar(value="Selecione uma operação para ver o histograma.")
+    tk.Label(win, textvariable=hist_var, justify="left", font=("Courier", 9)).pack(padx=10, anchor="w")
+
+    def atualizar():
+        tree.delete(*tree.get_children())
+        for linha in agenda_diagnostico.resumo():
+            tree.insert("", tk.END, iid=linha["operacao"], values=(
+                linha["operacao"],
+                linha["chamadas"],
+                f"{linha['p50_ms']:.1f}",
+                f"{linha['p95_ms']:.1f}",
+                f"{linha['maximo_ms']:.1f}",
+            ))
+        if not agenda_diagnostico.esta_ativo():
+            hist_var.set("Medição desligada. Marque a opção acima para começar.")
+
+    def mostrar_histograma(event=None):
+        sel = tree.selection()
+        if not sel:
+            return
+        faixas = [(rotulo, n) for rotulo, n in agenda_diagnostico.histograma(sel[0]) if n]
+        maior = max((n for _, n in faixas), default=0)
+        linhas = []
+        for rotulo, n in faixas:
+            barra = "█" * max(1, round(n / maior * 30))
+            linhas.append(f"{rotulo:>10} {barra} {n}")
+        hist_var.set("\n".join(linhas) or "Sem amostras.")
+
+    def zerar():
+        agenda_diagnostico.zerar()
+        atualizar()
+
+    tree.bind("<<TreeviewSelect>>", mostrar_histograma)
+
+    frame_btns = tk.Frame(win)
+    frame_btns.pack(pady=5)
+    tk.Button(frame_btns, text="🔄 Atualizar", command=atualizar).pack(side=tk.LEFT, padx=5)
+    tk.Button(frame_btns, text="🧹 Zerar", command=zerar).pack(side=tk.LEFT, padx=5)
+
+    atualizar()
+
+# ----- CONFIRMAÇÕES POR WHATSAPP EM LOTE -----
+
+ARQUIVO_WHATSAPP_TESTE = "whatsapp_teste.log"
+
+def janela_confirmacoes_whatsapp():
+    """Manda a confirmação para todos os pendentes de um período (padrão: amanhã)."""
+    win = tk.Toplevel(root)
+    win.title("Confirmações por WhatsApp")
+    win.geometry("620x560")
+
+    amanha = (datetime.now() + timedelta(days=1)).strftime("%d/%m/%Y")
+
+    frame_periodo = tk.Frame(win)
+    frame_periodo.pack(pady=5)
+    tk.Label(frame_periodo, text="De:").pack(side=tk.LEFT)
+    de_var = tk.StringVar(value=amanha)
+    tk.Entry(frame_periodo, textvariable=de_var, width=12).pack(side=tk.LEFT, padx=5)
+    tk.Label(frame_periodo, text="Até:").pack(side=tk.LEFT)
+    ate_var = tk.StringVar(value=amanha)
+    tk.Entry(frame_periodo, textvariable=ate_var, width=12).pack(side=tk.LEFT, padx=5)
+
+    tk.Label(
+        win,
+        text="Mensagem: {primeiro_nome} {cliente} {quando} {data} {hora} {servico}",
+        font=("Arial", 9),
+        fg="gray"
+    ).pack()
+    txt_modelo = tk.Text(win, height=4, wrap="word")
+    txt_modelo.pack(fill=tk.X, padx=10, pady=5)
+    txt_modelo.insert("1.0", MODELO_CONFIRMACAO)
+
+    teste_var = tk.BooleanVar(value=False)
+    tk.Checkbutton(
+        win,
+        text=f"Modo teste (não abre o WhatsApp, grava em {ARQUIVO_WHATSAPP_TESTE})",
+        variable=teste_var,
+    ).pack()
+
+    colunas = ("data", "hora", "cadeira", "cliente", "telefone")
+    tree = ttk.Treeview(win, columns=colunas, show="headings", height=12)
+    for col, titulo, largura in (
+        ("data", "Data", 90), ("hora", "Hora", 60), ("cadeira", "Cadeira", 90),
+        ("cliente", "Cliente", 200), ("telefone", "Telefone", 130),
+    ):
+        tree.heading(col, text=titulo)
+        tree.column(col, width=largura)
+    tree.pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
+
+    label_info = tk.Label(win, text="")
+    label_info.pack()
+
+    itens = []
+
+    def montar_lista():
+        de_iso = str_data_para_iso(de_var.get().strip())
+        ate_iso = str_data_para_iso(ate_var.get().strip())
+        if not de_iso or not ate_iso or ate_iso < de_iso:
+            messagebox.showerror("Erro", "Período inválido. Use DD/MM/AAAA.", parent=win)
+            return False
+
+        inicio = datetime.strptime(de_iso, "%Y-%m-%d")
+        fim = datetime.strptime(ate_iso, "%Y-%m-%d")
+        datas = [(inicio + timedelta(days=i)).strftime("%Y-%m-%d") for i in range((fim - inicio).days + 1)]
+
+        try:
+            novos, sem_telefone = montar_confirmacoes(
+                agenda, clientes, datas, txt_modelo.get("1.0", tk.END).strip()
+            )
+        except (KeyError, IndexError, ValueError) as e:
+            messagebox.showerror("Erro", f"Modelo de mensagem inválido: {e}", parent=win)
+            return False
+
+        itens[:] = novos
+        tree.delete(*tree.get_children())
+        for item in itens:
+            tree.insert("", tk.END, values=(
+                iso_para_br(item["data_iso"]), item["hora"], item["recurso"],
+                item["cliente"], item["telefone"],
+            ))
+
+        info = f"{len(itens)} para enviar"
+        if sem_telefone:
+            nomes = sorted({i["cliente"] for i in sem_telefone})
+            info += f" | sem telefone válido: {', '.join(nomes)}"
+        label_info.config(text=info)
+        return True
+
+    def registrar_envios(enviados, falhas):
+        """Na thread do Tk: marca quem recebeu e oferece confirmar os status."""
+        agora = datetime.now().strftime("%Y-%m-%d %H:%M")
+        marcados = []
+        for item in enviados:
+            inicio, slot = slot_em(ocupacao, item["data_iso"], item["recurso"], item["hora"])
+            if slot is not None and nome_do_registro(clientes, slot) == item["cliente"]:
+                atualizar_atendimento(
+                    ocupacao, item["data_iso"], item["recurso"], inicio, confirmacao_enviada=agora
+                )
+                marcados.append((item["data_iso"], item["recurso"], inicio))
+        if marcados:
+            gravar_agenda()
+
+        msg = f"{len(enviados)} mensagem(ns) enviada(s)."
+        if falhas:
+            msg += "\n\nFalharam:\n" + "\n".join(f"{i['cliente']}: {erro}" for i, erro in falhas)
+        messagebox.showinfo("WhatsApp", msg, parent=win)
+
+        if marcados and messagebox.askyesno(
+            "Confirmar", f"Marcar os {len(marcados)} enviados como confirmados?", parent=win
+        ):
+            for data_iso, recurso, inicio in marcados:
+                atualizar_atendimento(ocupacao, data_iso, recurso, inicio, status="confirmado")
+            gravar_agenda()
+            atualizar_lista_agenda()
+
+        if win.winfo_exists():
+            montar_lista()
+            btn_enviar.config(state=tk.NORMAL)
+
+    def enviar():
+        if not montar_lista():
+            return
+        if not itens:
+            messagebox.showinfo("Info", "Nenhum agendamento pendente para confirmar.", parent=win)
+            return
+
+        if teste_var.get():
+            enviador = EnviadorTeste(ARQUIVO_WHATSAPP_TESTE)
+        else:
+            enviador = enviar_pelo_navegador
+
+        enviados, falhas = [], []
+        btn_enviar.config(state=tk.DISABLED)
+        executar_com_progresso(
+            f"Enviando {len(itens)} confirmação(ões)...",
+            enviar_confirmacoes, list(itens), enviador, enviados, falhas,
+            ao_terminar=lambda total: None,
+            ao_fim=lambda: registrar_envios(enviados, falhas),
+            parent=win,
+        )
+
+    frame_btns = tk.Frame(win)
+    frame_btns.pack(pady=10)
+    tk.Button(frame_btns, text="🔄 Montar lista", command=montar_lista).pack(side=tk.LEFT, padx=5)
+    btn_enviar = tk.Button(frame_btns, text="📲 Enviar confirmações", command=enviar)
+    btn_enviar.pack(side=tk.LEFT, padx=5)
+    tk.Button(frame_btns, text="Fechar", command=win.destroy).pack(side=tk.LEFT, padx=5)
+
+    montar_lista()
+
+# ----- DESFAZER / REFAZER -----
+
+def atualizar_botoes_historico():
+    if not dados_carregados:
+        return
+    btn_desfazer.config(state=tk.NORMAL if historico.pode_desfazer() else tk.DISABLED)
+    btn_refazer.config(state=tk.NORMAL if historico.pode_refazer() else tk.DISABLED)
+    if historico.pode_desfazer():
+        historico_var.set(f"Desfazer: {historico.proximo_desfazer()}")
+    elif historico.pode_refazer():
+        historico_var.set(f"Refazer: {historico.proximo_refazer()}")
+    else:
+        historico_var.set("")
+
+def _aplicar_historico(acao, titulo):
+    """Desfaz/refaz na memória, grava só os dias mexidos e mostra o primeiro deles."""
+    if not dados_carregados:
+        return
+    try:
+        operacao = acao()
+    except HistoricoDesatualizado as e:
+        if titulo == "Desfazer" and messagebox.askyesno(
+            titulo, f"{e}\n\nNão dá para desfazer essa mudança. Tirar ela do histórico?"
+        ):
+            historico.descartar()
+        elif titulo == "Refazer":
+            messagebox.showwarning(titulo, f"{e}\n\nNão dá para refazer essa mudança.")
+        atualizar_botoes_historico()
+        return
+    if operacao is None:
+        return
+
+    gravar_agenda()
+    data_var.set(iso_para_br(operacao.dias[0]))
+    atualizar_campos_de_data()
+    atualizar_botoes_historico()
+
+def desfazer_ultima():
+    _aplicar_historico(historico.desfazer, "Desfazer")
+
+def refazer_ultima():
+    _aplicar_historico(historico.refazer, "Refazer")
+
+root.bind("<Control-z>", lambda event: desfazer_ultima())
+root.bind("<Control-y>", lambda event: refazer_ultima())
+
+# ----- TELEFONE: IDENTIFICAR CLIENTE -----
+
+def procurar_telefone(telefone=None):
+    """
+    Acha o cliente pelo telefone (índice do cadastro, sem percorrer a
+    lista), mostra o próximo atendimento na tela principal e abre o
+    histórico dele.
+    """
+    if not dados_carregados:
+        return
+    if telefone is None:
+        telefone = telefone_var.get().strip()
+    else:
+        telefone_var.set(telefone)
+    if not telefone:
+        return
+
+    achados = identificar_telefone(clientes, agenda, telefone)
+    if not achados:
+        telefone_info_var.set(f"Nenhum cliente com o telefone {telefone}.")
+        return
+    if len(achados) == 1:
+        abrir_cliente_do_telefone(achados[0])
+        return
+
+    # mesmo número em mais de um cadastro (ex.: pai e filho): o usuário escolhe
+    win = tk.Toplevel(root)
+    win.title("Clientes com esse telefone")
+    win.geometry("360x220")
+    tk.Label(win, text=f"Telefone {telefone}:").pack(pady=5)
+    lista = tk.Listbox(win, height=6, width=40)
+    lista.pack(padx=10, fill=tk.BOTH, expand=True)
+    for a in achados:
+        lista.insert(tk.END, a["nome"])
+    lista.selection_set(0)
+
+    def abrir():
+        if not lista.curselection():
+            return
+        achado = achados[lista.curselection()[0]]
+        win.destroy()
+        abrir_cliente_do_telefone(achado)
+
+    lista.bind("<Double-Button-1>", lambda event: abrir())
+    tk.Button(win, text="Abrir", command=abrir).pack(pady=5)
+
+def abrir_cliente_do_telefone(achado):
+    proximo = achado["proximo"]
+    if proximo is None:
+        telefone_info_var.set(f"📞 {achado['nome']} - sem atendimento marcado.")
+    else:
+        data_iso, recurso, hora, servico = proximo
+        telefone_info_var.set(
+            f"📞 {achado['nome']} - próximo: {iso_para_br(data_iso)} às {hora} ({recurso}) {servico}"
+        )
+        data_var.set(iso_para_br(data_iso))
+        recurso_var.set(recurso)
+        atualizar_campos_de_data()
+        for i in range(lista_horarios.size()):
+            if lista_horarios.get(i).startswith(hora):
+                lista_horarios.selection_clear(0, tk.END)
+                lista_horarios.selection_set(i)
+                lista_horarios.see(i)
+                break
+    janela_buscar_cliente(achado["nome"])
+
+def chamada_recebida(telefone):
+    """
+    Entrada para um identificador de chamadas ou integração de mensagens
+    rodando no mesmo processo: pode ser chamada de outra thread, a busca
+    roda na thread do Tk. Fora do processo, use GET /telefone/<numero>
+    da agenda_api.
+    """
+    root.after(0, procurar_telefone, telefone)
+
 # ----- BOTÕES INFERIORES -----
 
 frame_botoes = tk.Frame(root)
@@ -2699,10 +4430,153 @@ btn_pacote = tk.Button(
 )
 btn_pacote.grid(row=5, column=0, padx=5, pady=5)
 
+btn_expediente = tk.Button(
+    frame_botoes,
+    text="🕒 Expediente",
+    width=20,
+    command=janela_expediente,
+)
+btn_expediente.grid(row=5, column=1, padx=5, pady=5)
+
+btn_diagnostico = tk.Button(
+    frame_botoes,
+    text="🩺 Diagnóstico",
+    width=20,
+    command=janela_diagnostico,
+)
+btn_diagnostico.grid(row=6, column=0, padx=5, pady=5)
+
+btn_confirmacoes = tk.Button(
+    frame_botoes,
+    text="📲 Confirmações",
+    width=20,
+    command=janela_confirmacoes_whatsapp,
+)
+btn_confirmacoes.grid(row=6, column=1, padx=5, pady=5)
+
+btn_exportar = tk.Button(
+    frame_botoes,
+    text="📤 Exportar CSV",
+    width=20,
+    command=janela_exportar_csv,
+)
+btn_exportar.grid(row=7, column=0, padx=5, pady=5)
+
+btn_backups = tk.Button(
+    frame_botoes,
+    text="🗂️ Backups",
+    width=20,
+    command=janela_backups,
+)
+btn_backups.grid(row=7, column=1, padx=5, pady=5)
+
+btn_arquivo = tk.Button(
+    frame_botoes,
+    text="🗄️ Arquivo morto",
+    width=20,
+    command=janela_arquivo_morto,
+)
+btn_arquivo.grid(row=8, column=0, padx=5, pady=5)
+
+btn_faturas = tk.Button(
+    frame_botoes,
+    text="📦 Faturas de pacote",
+    width=20,
+    command=janela_faturas_pacote,
+)
+btn_faturas.grid(row=8, column=1, padx=5, pady=5)
+
+btn_estoque = tk.Button(
+    frame_botoes,
+    text="🧴 Estoque",
+    width=20,
+    command=janela_estoque,
+)
+btn_estoque.grid(row=9, column=0, padx=5, pady=5)
+
+btn_precos = tk.Button(
+    frame_botoes,
+    text="🏷️ Preços",
+    width=20,
+    command=janela_precos,
+)
+btn_precos.grid(row=9, column=1, padx=5, pady=5)
+
+btn_espera = tk.Button(
+    frame_botoes,
+    text="⏳ Lista de espera",
+    width=20,
+    command=janela_lista_espera,
+)
+btn_espera.grid(row=10, column=0, padx=5, pady=5)
+
 
 
 # ----- INICIALIZAÇÃO -----
 
-set_data_hoje()  # já chama atualizar_campos_de_data() por dentro
+# botões que só fazem sentido com os dados na memória
+botoes_dependentes = frame_botoes.winfo_children() + frame_status.winfo_children() + [
+    btn_hoje, btn_calendario, combo_recurso, btn_telefone,
+]
+
+def mostrar_carregando():
+    label_dia.config(text="Carregando agenda...")
+    aplicar_linhas_agenda(["⏳ Carregando agenda..."])
+    for w in botoes_dependentes:
+        if isinstance(w, (tk.Button, ttk.Combobox)):
+            w.config(state=tk.DISABLED)
+
+@medido("carregar_dados")
+def carregar_dados():
+    """Lê agenda, clientes e expediente e mostra o dia de hoje."""
+    global agenda, clientes, expediente, ocupacao, historico, pacotes, estoque, espera, dados_carregados
+
+    agenda = sincronia.carregar()
+    arquivo_morto.recarregar()
+    livro_caixa.recarregar()
+    faturas_pacote.recarregar()
+    clientes = carregar_clientes()
+    expediente = carregar_expediente()
+    ocupacao = IndiceOcupacao(agenda, expediente)
+    historico = HistoricoAgenda(ocupacao)
+    pacotes = IndicePacotes(ocupacao)
+    estoque = Estoque(ocupacao, arquivo=arquivo_morto)
+    espera = ListaEspera(ocupacao)
+
+    if clientes.migrado:
+        # clientes.json ainda no formato antigo (por nome): guarda uma cópia,
+        # liga atendimentos e vendas aos ids e grava no formato novo
+        fazer_backup()
+        _marcados, dias, _sem_cadastro = migrar_agenda_para_ids(agenda, clientes)
+        salvar_clientes(clientes)
+        if dias:
+            gravar_agenda()
+
+    dados_carregados = True
+
+    for w in botoes_dependentes:
+        if isinstance(w, tk.Button):
+            w.config(state=tk.NORMAL)
+        elif isinstance(w, ttk.Combobox):
+            w.config(state="readonly")
+
+    set_data_hoje()  # já chama atualizar_campos_de_data() por dentro
+    atualizar_botoes_historico()
+    root.after(VERIFICAR_OUTRO_TERMINAL_MS, verificar_outro_terminal)
+
+def fechar_programa():
+    tarefas.encerrar()  # cancela o que estiver rodando em segundo plano
+    root.destroy()
+
+root.protocol("WM_DELETE_WINDOW", fechar_programa)
+
+mostrar_carregando()
+
+# desenha a janela antes de ler os arquivos
+root.update()
+if agenda_diagnostico.esta_ativo():
+    agenda_diagnostico.registrar("janela_pronta", (time.perf_counter() - _INICIO_PROCESSO) * 1000)
+
+root.after(0, carregar_dados)
 
 root.mainloop()
\ No newline at end of file
@@ -0,0 +1,158 @@
+"""Horários por intervalos (minuto inicial, minuto final) de cada cadeira num dia."""
+from bisect import bisect_left, bisect_right
+
+
+def hora_para_minutos(hora):
+    """Converte 'HH:MM' -> minutos desde 00:00 (ou None se for inválido)."""
+    try:
+        h, m = hora.split(":")
+        h, m = int(h), int(m)
+    except (AttributeError, ValueError):
+        return None
+    if not (0 <= h < 24 and 0 <= m < 60):
+        return None
+    return h * 60 + m
+
+def minutos_para_hora(minutos):
+    """Converte minutos desde 00:00 -> 'HH:MM'."""
+    return f"{minutos // 60:02d}:{minutos % 60:02d}"
+
+def gerar_grade(inicio_min, fim_min, passo):
+    """Horários 'HH:MM' de `inicio_min` até antes de `fim_min`, de `passo` em `passo`."""
+    return [minutos_para_hora(m) for m in range(inicio_min, fim_min, passo)]
+
+
+class IntervalosDia:
+    """
+    Atendimentos de uma cadeira num dia, ordenados pelo minuto inicial.
+
+    Dentro de uma mesma cadeira os intervalos não se sobrepõem, então os
+    finais também ficam ordenados e dá pra usar bisect nas duas listas.
+    """
+
+    def __init__(self):
+        self.inicios = []
+        self.fins = []
+
+    def __len__(self):
+        return len(self.inicios)
+
+    def __iter__(self):
+        return iter(zip(self.inicios, self.fins))
+
+    def adicionar(self, inicio, fim):
+        pos = bisect_left(self.inicios, inicio)
+        self.inicios.insert(pos, inicio)
+        self.fins.insert(pos, fim)
+
+    def remover(self, inicio):
+        pos = bisect_left(self.inicios, inicio)
+        if pos < len(self.inicios) and self.inicios[pos] == inicio:
+            del self.inicios[pos]
+            del self.fins[pos]
+            return True
+        return False
+
+    def em(self, minuto):
+        """Minuto inicial do atendimento que cobre `minuto`, ou None."""
+        pos = bisect_right(self.inicios, minuto) - 1
+        if pos >= 0 and self.fins[pos] > minuto:
+            return self.inicios[pos]
+        return None
+
+    def sobrepostos(self, inicio, fim, ignorar=None):
+        """Inícios dos atendimentos que batem com [inicio, fim)."""
+        pos = bisect_right(self.fins, inicio)
+        achados = []
+        while pos < len(self.inicios) and self.inicios[pos] < fim:
+            if self.inicios[pos] != ignorar:
+                achados.append(self.inicios[pos])
+            pos += 1
+        return achados
+
+    def livre(self, inicio, fim, ignorar=None):
+        return not self.sobrepostos(inicio, fim, ignorar)
+
+    def lacunas(self, abertura, fechamento, ignorar=None):
+        """Intervalos livres (inicio, fim) entre `abertura` e `fechamento`."""
+        livres = []
+        cursor = abertura
+        pos = bisect_right(self.fins, abertura)
+        while pos < len(self.inicios) and self.inicios[pos] < fechamento:
+            ini, fim = self.inicios[pos], self.fins[pos]
+            pos += 1
+            if ini == ignorar:
+                continue
+            if ini > cursor:
+                livres.append((cursor, ini))
+            cursor = max(cursor, fim)
+        if cursor < fechamento:
+            livres.append((cursor, fechamento))
+        return livres
+
+    def inicios_livres(self, duracao, abertura, fechamento, passo, ignorar=None):
+        """Minutos iniciais (alinhados ao passo) em que cabe um serviço de `duracao`."""
+        inicios = []
+        for ini, fim in self.lacunas(abertura, fechamento, ignorar):
+            # alinha no passo contando a partir da abertura
+            m = ini + (-(ini - abertura)) % passo
+            while m + duracao <= fim:
+                inicios.append(m)
+                m += passo
+        return inicios
+
+
+class MascaraDia:
+    """
+    Disponibilidade já calculada de uma data: períodos abertos e, para a
+    tela, os períodos fechados com o motivo (pausa, bloqueio...).
+
+    Também guarda um inteiro com um bit por minuto aberto, então testar se
+    um atendimento cabe é uma conta de bits, sem percorrer os períodos.
+    """
+
+    def __init__(self, abertos, fechados=()):
+        self.abertos = sorted(abertos)
+        self.fechados = sorted(fechados)
+        self.bits = 0
+        for ini, fim in self.abertos:
+            self.bits |= ((1 << (fim - ini)) - 1) << ini
+
+    def aberto(self, inicio, fim):
+        """True se todos os minutos de [inicio, fim) estão abertos."""
+        if fim <= inicio:
+            return False
+        faixa = (1 << (fim - inicio)) - 1
+        return (self.bits >> inicio) & faixa == faixa
+
+    def limites(self):
+        """(primeiro minuto aberto, último minuto aberto) ou None se o dia está fechado."""
+        if not self.abertos:
+            return None
+        return self.abertos[0][0], self.abertos[-1][1]
+
+    def motivo_em(self, minuto):
+        """Motivo de o minuto estar fechado ('' se estiver aberto)."""
+        if (self.bits >> minuto) & 1:
+            return ""
+        for ini, fim, motivo in self.fechados:
+            if ini <= minuto < fim:
+                return motivo
+        return "Fechado"
+
+
+def subtrair_periodos(abertos, retirar):
+    """Tira os períodos `retirar` de `abertos` (listas de (inicio, fim))."""
+    resultado = list(abertos)
+    for r_ini, r_fim in retirar:
+        novos = []
+        for ini, fim in resultado:
+            if r_fim <= ini or r_ini >= fim:
+                novos.append((ini, fim))
+                continue
+            if ini < r_ini:
+                novos.append((ini, r_ini))
+            if r_fim < fim:
+                novos.append((r_fim, fim))
+        resultado = novos
+    return resultado
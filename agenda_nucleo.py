@@ -0,0 +1,947 @@
+"""Núcleo da agenda (sem Tkinter): arquivos, horários, clientes, cadeiras e ocupação."""
+import copy
+import json
+import os
+import re
+import shutil
+import uuid
+from collections.abc import MutableMapping
+from datetime import datetime
+from difflib import SequenceMatcher
+
+from agenda_catalogo import ARQUIVO_CATALOGO, Catalogo
+from agenda_diagnostico import medido
+from agenda_intervalos import (
+    IntervalosDia,
+    MascaraDia,
+    hora_para_minutos,
+    minutos_para_hora,
+    gerar_grade,
+)
+
+ARQUIVO_AGENDA = "agenda.json"
+ARQUIVO_CLIENTES = "clientes.json"
+BACKUP_DIR = "backups"
+
+HORARIO_INICIO = (9, 0)    # 09:00
+HORARIO_FIM = (20, 30)     # 20:30 (último bloco da grade)
+INTERVALO = 30             # em minutos, só para a grade da tela
+GRANULARIDADE = 15         # em minutos, passo dos horários iniciais ao agendar
+
+SERVICOS = {
+    "Cabelo": 30,
+    "Barba": 30,
+    "Cabelo e Barba": 60,
+    "Outro": 30,
+}
+
+PRECO_SERVICOS = {
+    "Cabelo": 50.00,
+    "Barba": 40.00,
+    "Cabelo e Barba": 80.0,
+    "Outro": 80.0,
+    "Oleo para Barba": 60.00,
+    "Pomada para Cabelo Seco": 35.00,
+    "Pomada para Cabelo Brilhoso": 35.00,
+    "Balm para Barba": 35.00,
+    "Minoxidil 10%": 70.00,
+    "Escova Barba": 20.00,
+    "Sabonete Esfoliante": 20.00,
+    "Cera em pó p/ cabelo": 60.00,
+}
+
+# SERVICOS/PRECO_SERVICOS são o catálogo de fábrica: valem enquanto não
+# existe catalogo.json. Preço e duração em uso vêm de `catalogo`, por data.
+catalogo = Catalogo(ARQUIVO_CATALOGO, SERVICOS, PRECO_SERVICOS)
+
+DIAS_SEMANA = [
+    "Segunda-feira",
+    "Terça-feira",
+    "Quarta-feira",
+    "Quinta-feira",
+    "Sexta-feira",
+    "Sábado",
+    "Domingo",
+]
+
+# Cadeiras (barbeiros) que atendem em paralelo.
+# A primeira usa a grade "antiga" do dia (agenda[dia][hora]), então arquivos
+# antigos continuam valendo; as outras ficam em agenda[dia]["_recursos"].
+RECURSOS = ["Cadeira 1", "Cadeira 2"]
+RECURSO_PADRAO = RECURSOS[0]
+CHAVE_RECURSOS = "_recursos"
+CHAVE_VENDAS = "_vendas_avulsas"
+
+# ---------- ARQUIVOS ----------
+
+@medido("carregar_agenda")
+def carregar_agenda():
+    if not os.path.exists(ARQUIVO_AGENDA):
+        return {}
+    try:
+        with open(ARQUIVO_AGENDA, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except json.JSONDecodeError:
+        return {}
+
+@medido("salvar_agenda")
+def salvar_agenda(agenda):
+    with open(ARQUIVO_AGENDA, "w", encoding="utf-8") as f:
+        json.dump(agenda, f, ensure_ascii=False, indent=2)
+
+    # Salva o backup
+    backup = "agenda_backup.json"
+    with open(backup, "w", encoding="utf-8") as f:
+        json.dump(agenda, f, ensure_ascii=False, indent=2)
+
+def carregar_clientes():
+    dados = {}
+    if os.path.exists(ARQUIVO_CLIENTES):
+        try:
+            with open(ARQUIVO_CLIENTES, "r", encoding="utf-8") as f:
+                dados = json.load(f)
+        except json.JSONDecodeError:
+            dados = {}
+    return CadastroClientes(dados)
+
+def salvar_clientes(clientes):
+    if isinstance(clientes, CadastroClientes):
+        clientes = clientes.para_json()
+    with open(ARQUIVO_CLIENTES, "w", encoding="utf-8") as f:
+        json.dump(clientes, f, ensure_ascii=False, indent=2)
+
+    fazer_backup()
+
+@medido("fazer_backup")
+def fazer_backup():
+    """Cria uma cópia de agenda.json e clientes.json na pasta backups/."""
+    os.makedirs(BACKUP_DIR, exist_ok=True)
+
+    timestamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+
+    for arquivo in (ARQUIVO_AGENDA, ARQUIVO_CLIENTES):
+        if os.path.exists(arquivo):
+            nome_base, ext = os.path.splitext(os.path.basename(arquivo))
+            destino = os.path.join(
+                BACKUP_DIR,
+                f"{nome_base}_{timestamp}{ext}"
+            )
+            shutil.copy2(arquivo, destino)
+
+# ---------- CLIENTES ----------
+
+CHAVE_CLIENTE_ID = "cliente_id"
+DIGITOS_FINAL_TELEFONE = 8   # sem DDD e sem o 9 da frente, o número ainda bate
+
+def novo_id_cliente():
+    return uuid.uuid4().hex[:12]
+
+def normalizar_telefone_br(tel: str) -> str:
+    """Retorna só dígitos, com DDI 55 (ex: 5549999999999)."""
+    if not tel:
+        return ""
+    dig = re.sub(r"\D", "", tel)
+
+    # se vier com 55 já, ok
+    if dig.startswith("55") and len(dig) >= 12:
+        return dig
+
+    # se vier com 11 dígitos (DDD + 9 dígitos) ou 10 dígitos (DDD + 8)
+    if len(dig) in (10, 11):
+        return "55" + dig
+
+    # se vier com 9 ou 8 (sem DDD), não dá pra adivinhar direito -> retorna como está
+    return dig
+
+class CadastroClientes(MutableMapping):
+    """
+    Clientes com id fixo. No arquivo fica id -> {"nome", "nasc", "tel"};
+    atendimentos e vendas guardam "cliente_id" (e o nome da época, só
+    como reserva para quem não tem cadastro).
+
+    Para a tela continua parecendo um dicionário por nome
+    (clientes[nome], nome in clientes, clientes.items()), e renomear só
+    troca o nome no cadastro: o histórico segue pelo id.
+
+    Um clientes.json antigo (nome -> dados) é lido normalmente e ganha ids
+    na memória; `migrado` fica True até alguém gravar no formato novo
+    (ver migrar_agenda_para_ids).
+
+    Também mantém o índice de telefones (normalizado e últimos dígitos ->
+    ids), atualizado a cada gravação de cadastro; por isso o telefone se
+    troca com clientes[nome] = {...}, não mexendo no dicionário devolvido.
+    """
+
+    def __init__(self, dados=None):
+        self._por_id = {}
+        self._id_por_nome = {}
+        self._ids_por_tel = {}
+        self._ids_por_final = {}
+        dados = dados or {}
+        self.migrado = bool(dados) and not all(
+            isinstance(info, dict) and "nome" in info for info in dados.values()
+        )
+        for chave, info in dados.items():
+            info = dict(info) if isinstance(info, dict) else {}
+            if self.migrado:
+                # formato antigo: a chave é o nome; "nascimento" é de cadastros bem antigos
+                info["nome"] = chave
+                if "nasc" not in info and "nascimento" in info:
+                    info["nasc"] = info.pop("nascimento")
+                chave = novo_id_cliente()
+            self._por_id[chave] = info
+            self._id_por_nome[info["nome"]] = chave
+            self._indexar_telefone(chave, info)
+
+    # --- índice de telefones ---
+    def _chaves_telefone(self, info):
+        tel = normalizar_telefone_br(info.get("tel", ""))
+        if len(tel) < DIGITOS_FINAL_TELEFONE:
+            return None, None
+        return tel, tel[-DIGITOS_FINAL_TELEFONE:]
+
+    def _indexar_telefone(self, id_cliente, info):
+        tel, final = self._chaves_telefone(info)
+        if tel:
+            self._ids_por_tel.setdefault(tel, set()).add(id_cliente)
+            self._ids_por_final.setdefault(final, set()).add(id_cliente)
+
+    def _desindexar_telefone(self, id_cliente, info):
+        tel, final = self._chaves_telefone(info)
+        for mapa, chave in ((self._ids_por_tel, tel), (self._ids_por_final, final)):
+            ids = mapa.get(chave)
+            if ids:
+                ids.discard(id_cliente)
+                if not ids:
+                    del mapa[chave]
+
+    def ids_do_telefone(self, tel):
+        """
+        Ids dos clientes com esse telefone: primeiro pelo número completo
+        (normalizado); se não achar, pelos últimos dígitos (ligação sem DDD
+        ou número antigo sem o 9).
+        """
+        tel = normalizar_telefone_br(tel)
+        if len(tel) < DIGITOS_FINAL_TELEFONE:
+            return []
+        ids = self._ids_por_tel.get(tel) or self._ids_por_final.get(tel[-DIGITOS_FINAL_TELEFONE:], ())
+        return sorted(ids, key=lambda i: self._por_id[i]["nome"])
+
+    def nomes_do_telefone(self, tel):
+        return [self._por_id[i]["nome"] for i in self.ids_do_telefone(tel)]
+
+    # --- dicionário por nome ---
+    def __getitem__(self, nome):
+        return self._por_id[self._id_por_nome[nome]]
+
+    def __setitem__(self, nome, info):
+        info = dict(info)
+        info["nome"] = nome
+        id_cliente = self._id_por_nome.get(nome) or novo_id_cliente()
+        if id_cliente in self._por_id:
+            self._desindexar_telefone(id_cliente, self._por_id[id_cliente])
+        self._por_id[id_cliente] = info
+        self._id_por_nome[nome] = id_cliente
+        self._indexar_telefone(id_cliente, info)
+
+    def __delitem__(self, nome):
+        id_cliente = self._id_por_nome.pop(nome)
+        self._desindexar_telefone(id_cliente, self._por_id.pop(id_cliente))
+
+    def __iter__(self):
+        return iter(list(self._id_por_nome))
+
+    def __len__(self):
+        return len(self._id_por_nome)
+
+    # --- por id ---
+    def id_de(self, nome):
+        """Id do cliente com esse nome (None se não tiver cadastro)."""
+        return self._id_por_nome.get(nome)
+
+    def nome_de(self, id_cliente):
+        info = self._por_id.get(id_cliente)
+        return info.get("nome") if info else None
+
+    def renomear(self, nome_antigo, nome_novo):
+        """Troca o nome mantendo o id (o histórico continua ligado)."""
+        if nome_novo in self._id_por_nome and nome_novo != nome_antigo:
+            raise ValueError(f"Já existe um cliente chamado {nome_novo}.")
+        id_cliente = self._id_por_nome.pop(nome_antigo)
+        self._por_id[id_cliente]["nome"] = nome_novo
+        self._id_por_nome[nome_novo] = id_cliente
+        return id_cliente
+
+    def para_json(self):
+        return {id_cliente: dict(info) for id_cliente, info in self._por_id.items()}
+
+def nome_do_registro(clientes, registro):
+    """Nome atual do cliente de um atendimento/venda (pelo id; sem id, o nome gravado)."""
+    id_cliente = registro.get(CHAVE_CLIENTE_ID)
+    if id_cliente and isinstance(clientes, CadastroClientes):
+        nome = clientes.nome_de(id_cliente)
+        if nome:
+            return nome
+    return (registro.get("cliente") or "").strip()
+
+def migrar_agenda_para_ids(agenda, clientes):
+    """
+    Uma passada pela agenda colocando "cliente_id" nos atendimentos e
+    vendas cujo nome tem cadastro. Nomes sem cadastro ficam como estão.
+    Retorna (registros marcados, dias alterados, nomes sem cadastro).
+    """
+    marcados = 0
+    dias = set()
+    sem_cadastro = set()
+    for data_iso, dia in agenda.items():
+        if not isinstance(dia, dict):
+            continue
+        registros = [slot for _r, grade in grades_do_dia(dia) for slot in grade.values()]
+        vendas = dia.get("_vendas_avulsas", [])
+        if isinstance(vendas, list):
+            registros += vendas
+        for reg in registros:
+            if not isinstance(reg, dict) or reg.get(CHAVE_CLIENTE_ID):
+                continue
+            nome = (reg.get("cliente") or "").strip()
+            if not nome:
+                continue
+            id_cliente = clientes.id_de(nome)
+            if id_cliente is None:
+                sem_cadastro.add(nome)
+                continue
+            reg[CHAVE_CLIENTE_ID] = id_cliente
+            marcados += 1
+            dias.add(data_iso)
+    clientes.migrado = False
+    return marcados, dias, sem_cadastro
+
+# ---------- GRADE DE HORÁRIOS ----------
+
+def gerar_horarios():
+    horarios = []
+    hora, minuto = HORARIO_INICIO
+    fim_h, fim_m = HORARIO_FIM
+    while True:
+        horarios.append(f"{hora:02d}:{minuto:02d}")
+        if hora == fim_h and minuto == fim_m:
+            break
+        minuto += INTERVALO
+        if minuto >= 60:
+            minuto -= 60
+            hora += 1
+    return horarios
+
+HORARIOS = gerar_horarios()
+
+# expediente em minutos: da abertura até o fim do último bloco
+ABERTURA = HORARIO_INICIO[0] * 60 + HORARIO_INICIO[1]
+FECHAMENTO = HORARIO_FIM[0] * 60 + HORARIO_FIM[1] + INTERVALO
+
+# horários que podem ser escolhidos como início de um atendimento
+HORARIOS_AGENDAMENTO = gerar_grade(ABERTURA, FECHAMENTO, GRANULARIDADE)
+
+# usada quando o índice não recebe um Expediente (agenda_expediente)
+MASCARA_PADRAO = MascaraDia([(ABERTURA, FECHAMENTO)])
+
+def garantir_dia_na_agenda(agenda, dia):
+    if dia not in agenda:
+        agenda[dia] = {h: None for h in HORARIOS}
+    else:
+        for h in HORARIOS:
+            agenda[dia].setdefault(h, None)
+
+def str_data_para_iso(data_str):
+    """Converte 'DD/MM/AAAA' -> 'AAAA-MM-DD'."""
+    try:
+        dt = datetime.strptime(data_str, "%d/%m/%Y")
+        return dt.strftime("%Y-%m-%d")
+    except ValueError:
+        return None
+
+def iso_para_br(data_iso):
+    """Converte 'AAAA-MM-DD' -> 'DD/MM/AAAA'."""
+    try:
+        dt = datetime.strptime(data_iso, "%Y-%m-%d")
+        return dt.strftime("%d/%m/%Y")
+    except ValueError:
+        return data_iso
+
+def dia_semana_br(data_iso):
+    """Recebe 'AAAA-MM-DD' e retorna o dia da semana em PT-BR."""
+    try:
+        dt = datetime.strptime(data_iso, "%Y-%m-%d")
+        indice = dt.weekday()  # 0 = segunda, 6 = domingo
+        return DIAS_SEMANA[indice]
+    except ValueError:
+        return ""
+
+def duracao_do_slot(slot):
+    """Duração em minutos (slots antigos sem 'duracao' valem um bloco)."""
+    try:
+        return max(1, int(slot.get("duracao") or INTERVALO))
+    except (TypeError, ValueError):
+        return INTERVALO
+
+def fim_do_atendimento(inicio, duracao):
+    """Hora 'HH:MM' em que termina um atendimento."""
+    return minutos_para_hora(hora_para_minutos(inicio) + int(duracao))
+
+def preco_do_slot(slot, data_iso=None):
+    """
+    Preço do serviço cobrado no atendimento: o gravado nele ou, em slot
+    antigo sem "preco", o do catálogo na data do atendimento. Atendimento
+    de pacote não cobra avulso: entra na fatura mensal (agenda_pacotes).
+    """
+    if slot.get("pacote"):
+        return 0.0
+    if "preco" in slot:
+        return float(slot["preco"])
+    return catalogo.preco(slot.get("servico", ""), data_iso)
+
+# ---------- CADEIRAS (RECURSOS) ----------
+
+def grade_recurso(agenda, dia, recurso=RECURSO_PADRAO):
+    """Retorna o dicionário hora -> slot de uma cadeira no dia (cria se faltar)."""
+    garantir_dia_na_agenda(agenda, dia)
+    if recurso == RECURSO_PADRAO:
+        return agenda[dia]
+
+    grades = agenda[dia].setdefault(CHAVE_RECURSOS, {})
+    grade = grades.setdefault(recurso, {})
+    for h in HORARIOS:
+        grade.setdefault(h, None)
+    return grade
+
+def grades_do_dia(dia):
+    """Gera (recurso, grade) das cadeiras que já têm grade no dia, sem criar nada."""
+    if not isinstance(dia, dict):
+        return
+    yield RECURSO_PADRAO, dia
+    outras = dia.get(CHAVE_RECURSOS, {})
+    if isinstance(outras, dict):
+        for recurso, grade in outras.items():
+            if recurso != RECURSO_PADRAO and isinstance(grade, dict):
+                yield recurso, grade
+
+def atendimentos_da_grade(grade):
+    """
+    Gera (hora_inicio, slot) dos atendimentos de uma grade, em ordem.
+
+    Cópias antigas (o mesmo atendimento repetido nos blocos seguintes) são
+    puladas: só conta a chave igual ao "inicio" do slot.
+    """
+    for h in sorted(grade):
+        if h.startswith("_"):
+            continue
+        slot = grade[h]
+        if isinstance(slot, dict) and slot.get("inicio", h) == h:
+            yield h, slot
+
+def atendimentos_do_dia(dia):
+    """Gera (recurso, hora_inicio, slot) dos atendimentos de todas as cadeiras."""
+    for recurso, grade in grades_do_dia(dia):
+        for h, slot in atendimentos_da_grade(grade):
+            yield recurso, h, slot
+
+class IndiceOcupacao:
+    """
+    Ocupação por (dia, cadeira) como intervalos em minutos (IntervalosDia).
+
+    Cada par é montado sob demanda a partir da grade e depois mantido pelas
+    funções de escrita deste módulo. Procurar vaga em N cadeiras custa N
+    buscas binárias, em vez de varrer o dia inteiro a cada cadeira.
+
+    Se receber um Expediente, horário de funcionamento, pausas e bloqueios
+    vêm da máscara da data; sem ele vale HORARIO_INICIO/HORARIO_FIM.
+
+    `ao_alterar`, se definido, é chamado pelas funções de escrita abaixo
+    com (dia, lugar, antes, depois) a cada mudança: lugar é (recurso,
+    hora_inicio) ou (CHAVE_VENDAS, posição) e antes/depois são cópias do
+    registro (None quando não existia / deixou de existir). É o que o
+    desfazer (agenda_historico) usa.
+
+    `observadores` são funções (dia, lugar) avisadas das mesmas escritas e
+    também de invalidar() (lugar None = o dia inteiro mudou; dia None =
+    tudo). Servem para índices derivados, como o de pacotes.
+    """
+
+    def __init__(self, agenda, expediente=None):
+        self.agenda = agenda
+        self.expediente = expediente
+        self._intervalos = {}
+        self.ao_alterar = None
+        self.observadores = []
+
+    def mascara(self, dia):
+        if self.expediente is None:
+            return MASCARA_PADRAO
+        return self.expediente.mascara(dia)
+
+    def aberto(self, dia, inicio, duracao):
+        """True se a barbearia está aberta durante todo o atendimento."""
+        ini = hora_para_minutos(inicio)
+        if ini is None:
+            return False
+        return self.mascara(dia).aberto(ini, ini + int(duracao))
+
+    def _grade_existente(self, dia, recurso):
+        for r, grade in grades_do_dia(self.agenda.get(dia)):
+            if r == recurso:
+                return grade
+        return {}
+
+    def intervalos(self, dia, recurso=RECURSO_PADRAO):
+        chave = (dia, recurso)
+        ints = self._intervalos.get(chave)
+        if ints is None:
+            ints = IntervalosDia()
+            for h, slot in atendimentos_da_grade(self._grade_existente(dia, recurso)):
+                ini = hora_para_minutos(h)
+                if ini is not None:
+                    ints.adicionar(ini, ini + duracao_do_slot(slot))
+            self._intervalos[chave] = ints
+        return ints
+
+    def invalidar(self, dia=None):
+        """Descarta o índice de um dia (ou de tudo) para ser remontado na próxima consulta."""
+        for observador in self.observadores:
+            observador(dia, None)
+        if dia is None:
+            self._intervalos.clear()
+            return
+        for chave in [c for c in self._intervalos if c[0] == dia]:
+            del self._intervalos[chave]
+
+    def inicio_em(self, dia, recurso, hora):
+        """Hora inicial do atendimento que ocupa `hora`, ou None se estiver livre."""
+        minuto = hora_para_minutos(hora)
+        if minuto is None:
+            return None
+        ini = self.intervalos(dia, recurso).em(minuto)
+        return None if ini is None else minutos_para_hora(ini)
+
+    def conflitos(self, dia, recurso, inicio, duracao, ignorar_inicio=None):
+        """Horas iniciais dos atendimentos que batem com o período pedido."""
+        ini = hora_para_minutos(inicio)
+        ignorar = hora_para_minutos(ignorar_inicio) if ignorar_inicio else None
+        achados = self.intervalos(dia, recurso).sobrepostos(ini, ini + int(duracao), ignorar)
+        return [minutos_para_hora(m) for m in achados]
+
+    def cabe(self, dia, recurso, inicio, duracao, ignorar_inicio=None):
+        """True se o serviço cabe no expediente do dia e não bate com outro atendimento."""
+        if not self.aberto(dia, inicio, duracao):
+            return False
+        return not self.conflitos(dia, recurso, inicio, duracao, ignorar_inicio)
+
+    def recursos_livres(self, dia, inicio, duracao):
+        """Cadeiras em que o serviço cabe nesse horário, na ordem de RECURSOS."""
+        return [r for r in RECURSOS if self.cabe(dia, r, inicio, duracao)]
+
+    def horarios_livres(self, dia, recurso, duracao, ignorar_inicio=None):
+        """Horários iniciais (de GRANULARIDADE em GRANULARIDADE) em que o serviço cabe."""
+        ignorar = hora_para_minutos(ignorar_inicio) if ignorar_inicio else None
+        ints = self.intervalos(dia, recurso)
+        inicios = []
+        for abertura, fechamento in self.mascara(dia).abertos:
+            inicios.extend(ints.inicios_livres(
+                int(duracao), abertura, fechamento, GRANULARIDADE, ignorar
+            ))
+        return [minutos_para_hora(m) for m in inicios]
+
+def horarios_do_dia(indice, dia):
+    """
+    Horários que podem ser início de atendimento no dia: de GRANULARIDADE
+    em GRANULARIDADE a partir da abertura de cada período do expediente.
+    """
+    horarios = []
+    for abertura, fechamento in indice.mascara(dia).abertos:
+        horarios.extend(gerar_grade(abertura, fechamento, GRANULARIDADE))
+    return horarios
+
+def linhas_do_dia(indice, dia, recurso=RECURSO_PADRAO):
+    """
+    Grade da tela: lista de (hora, hora_inicio, slot, motivo_fechado) com os
+    blocos de INTERVALO dentro do expediente do dia e mais os inícios que
+    caem fora da grade (ex.: 09:15). Em hora livre, hora_inicio e slot são
+    None; motivo_fechado é '' quando a barbearia está aberta.
+    """
+    grade = indice._grade_existente(dia, recurso)
+    ints = indice.intervalos(dia, recurso)
+    mascara = indice.mascara(dia)
+    limites = mascara.limites() or (ABERTURA, FECHAMENTO)
+
+    horas = set(gerar_grade(limites[0], limites[1], INTERVALO))
+    horas.update(minutos_para_hora(ini) for ini, _ in ints)
+
+    linhas = []
+    for h in sorted(horas):
+        minuto = hora_para_minutos(h)
+        ini = ints.em(minuto)
+        motivo = mascara.motivo_em(minuto)
+        if ini is None:
+            linhas.append((h, None, None, motivo))
+        else:
+            inicio = minutos_para_hora(ini)
+            linhas.append((h, inicio, grade.get(inicio), motivo))
+    return linhas
+
+def trocas_de_linhas(antigas, novas):
+    """
+    O que muda numa lista na tela para ir de `antigas` a `novas`: lista de
+    (de, ate, linhas) = apagar antigas[de:ate] e pôr `linhas` no lugar.
+    Vem de trás para frente, para os índices de cima continuarem valendo.
+    """
+    operacoes = SequenceMatcher(a=antigas, b=novas, autojunk=False).get_opcodes()
+    return [(i1, i2, novas[j1:j2]) for op, i1, i2, j1, j2 in reversed(operacoes) if op != "equal"]
+
+# ---------- ESCRITA (MANTÉM O ÍNDICE) ----------
+
+def slot_em(indice, dia, recurso, hora):
+    """Retorna (hora_inicio, slot) do atendimento que ocupa `hora`, ou (None, None)."""
+    inicio = indice.inicio_em(dia, recurso, hora)
+    if inicio is None:
+        return None, None
+    slot = indice._grade_existente(dia, recurso).get(inicio)
+    if isinstance(slot, dict):
+        return inicio, slot
+    return None, None
+
+def _apagar_copias_antigas(grade, inicio):
+    """Limpa as cópias do atendimento nos blocos seguintes (formato antigo)."""
+    for h, slot in grade.items():
+        if h != inicio and isinstance(slot, dict) and slot.get("inicio") == inicio:
+            grade[h] = None
+
+def _copia(registro):
+    return copy.deepcopy(registro) if isinstance(registro, dict) else None
+
+def _copia_dados(valor):
+    if isinstance(valor, dict):
+        return {k: _copia_dados(v) for k, v in valor.items()}
+    if isinstance(valor, list):
+        return [_copia_dados(v) for v in valor]
+    return valor
+
+def copia_dos_dias(agenda, dias=None):
+    """
+    Cópia funda dos `dias` (todos, se None) para uma tarefa em segundo
+    plano ler: enquanto ela roda, a thread do Tk segue mexendo na agenda
+    (edições, outro terminal). Só dict/list/valores do JSON, mais rápido
+    que deepcopy.
+    """
+    if dias is None:
+        dias = list(agenda)
+    return {dia: _copia_dados(agenda[dia]) for dia in dias if dia in agenda}
+
+def _avisar(indice, dia, lugar, antes, depois):
+    """Repassa a mudança para indice.ao_alterar (antes já copiado; depois é copiado aqui)."""
+    if indice.ao_alterar is not None:
+        indice.ao_alterar(dia, lugar, antes, _copia(depois))
+    for observador in indice.observadores:
+        observador(dia, lugar)
+
+def reservar_atendimento(indice, dia, recurso, inicio, dados):
+    """Grava `dados` como atendimento começando em `inicio`. Retorna o slot gravado."""
+    grade = grade_recurso(indice.agenda, dia, recurso)
+    antes = _copia(grade.get(inicio)) if indice.ao_alterar else None
+    # monta o índice antes de mexer na grade, senão ele já nasce com o slot novo
+    ints = indice.intervalos(dia, recurso)
+    slot = dict(dados)
+    slot["inicio"] = inicio
+    slot["extras"] = list(dados.get("extras", []))
+    grade[inicio] = slot
+
+    ini = hora_para_minutos(inicio)
+    ints.remover(ini)   # reserva por cima de outro atendimento no mesmo início
+    ints.adicionar(ini, ini + duracao_do_slot(slot))
+    _avisar(indice, dia, (recurso, inicio), antes, slot)
+    return slot
+
+def liberar_atendimento(indice, dia, recurso, inicio):
+    """Apaga o atendimento que começa em `inicio`. Retorna o slot removido."""
+    grade = grade_recurso(indice.agenda, dia, recurso)
+    slot = grade.get(inicio)
+    if not isinstance(slot, dict):
+        return None
+    grade[inicio] = None
+    _apagar_copias_antigas(grade, inicio)
+    indice.intervalos(dia, recurso).remover(hora_para_minutos(inicio))
+    _avisar(indice, dia, (recurso, inicio), _copia(slot) if indice.ao_alterar else None, None)
+    return slot
+
+def atualizar_atendimento(indice, dia, recurso, inicio, **campos):
+    """Altera campos (status, pago, extras...) do atendimento que começa em `inicio`."""
+    grade = grade_recurso(indice.agenda, dia, recurso)
+    slot = grade.get(inicio)
+    if not isinstance(slot, dict):
+        return None
+    antes = _copia(slot) if indice.ao_alterar else None
+    for campo, valor in campos.items():
+        slot[campo] = list(valor) if isinstance(valor, list) else valor
+    _apagar_copias_antigas(grade, inicio)
+    _avisar(indice, dia, (recurso, inicio), antes, slot)
+    return slot
+
+def vendas_do_dia(agenda, dia):
+    """Lista de vendas avulsas do dia (criada vazia se ainda não existe)."""
+    if dia not in agenda:
+        garantir_dia_na_agenda(agenda, dia)
+    vendas = agenda[dia].get(CHAVE_VENDAS)
+    if not isinstance(vendas, list):
+        vendas = agenda[dia][CHAVE_VENDAS] = []
+    return vendas
+
+def novo_id_venda():
+    return uuid.uuid4().hex[:12]
+
+def posicao_da_venda(agenda, dia, id_venda):
+    """Posição atual da venda com esse id na lista do dia, ou None."""
+    vendas = agenda.get(dia, {}).get(CHAVE_VENDAS) if isinstance(agenda.get(dia), dict) else None
+    for pos, venda in enumerate(vendas if isinstance(vendas, list) else []):
+        if isinstance(venda, dict) and venda.get("id") == id_venda:
+            return pos
+    return None
+
+def adicionar_venda(indice, dia, venda):
+    """
+    Acrescenta uma venda avulsa no dia. Retorna a posição dela na lista.
+
+    A venda ganha um "id" (se ainda não tem): a posição muda quando uma
+    venda anterior é apagada, o id não (é o que o livro caixa guarda).
+    """
+    vendas = vendas_do_dia(indice.agenda, dia)
+    venda = dict(venda)
+    venda.setdefault("id", novo_id_venda())
+    vendas.append(venda)
+    _avisar(indice, dia, (CHAVE_VENDAS, len(vendas) - 1), None, vendas[-1])
+    return len(vendas) - 1
+
+def atualizar_venda(indice, dia, posicao, **campos):
+    """Altera campos (pago, valor...) da venda avulsa na `posicao` do dia."""
+    vendas = vendas_do_dia(indice.agenda, dia)
+    if not (0 <= posicao < len(vendas)) or not isinstance(vendas[posicao], dict):
+        return None
+    venda = vendas[posicao]
+    antes = _copia(venda) if indice.ao_alterar else None
+    venda.update(campos)
+    venda.setdefault("id", novo_id_venda())   # venda antiga ganha id na primeira alteração
+    _avisar(indice, dia, (CHAVE_VENDAS, posicao), antes, venda)
+    return venda
+
+def substituir_venda(indice, dia, posicao, nova):
+    """Troca a venda na `posicao` por `nova` inteira; o "id" da que estava lá fica."""
+    vendas = vendas_do_dia(indice.agenda, dia)
+    if not (0 <= posicao < len(vendas)) or not isinstance(vendas[posicao], dict):
+        return None
+    antiga = vendas[posicao]
+    venda = dict(nova)
+    venda["id"] = antiga.get("id") or venda.get("id") or novo_id_venda()
+    vendas[posicao] = venda
+    _avisar(indice, dia, (CHAVE_VENDAS, posicao), _copia(antiga) if indice.ao_alterar else None, venda)
+    return venda
+
+def remover_venda(indice, dia, posicao):
+    """Apaga a venda avulsa na `posicao` do dia. Retorna a venda removida."""
+    vendas = vendas_do_dia(indice.agenda, dia)
+    if not (0 <= posicao < len(vendas)):
+        return None
+    venda = vendas.pop(posicao)
+    _avisar(indice, dia, (CHAVE_VENDAS, posicao), _copia(venda) if indice.ao_alterar else None, None)
+    return venda
+
+# ---------- BUSCA ----------
+
+def _e_do_cliente(registro, nome, id_cliente):
+    if id_cliente and registro.get(CHAVE_CLIENTE_ID):
+        return registro[CHAVE_CLIENTE_ID] == id_cliente
+    return (registro.get("cliente") or "").strip() == nome
+
+@medido("buscar")
+def buscar_registros_cliente(agenda, nome, tarefa=None, id_cliente=None):
+    """
+    Atendimentos (todas as cadeiras) e vendas avulsas de um cliente,
+    ordenados por data/hora. Vendas vão com hora '--'.
+
+    Com `id_cliente`, registros que têm id são achados por ele (mesmo
+    que o cliente tenha sido renomeado); os antigos, sem id, pelo nome.
+
+    `tarefa` (agenda_tarefas.Tarefa) recebe o progresso quando a busca
+    roda em segundo plano.
+    """
+    resultados = []
+
+    # cópia da lista de dias: a tela pode criar um dia novo durante a busca
+    dias = list(agenda.items())
+    for pos, (data_iso, dia) in enumerate(dias):
+        if tarefa is not None and pos % 50 == 0:
+            tarefa.passo(pos, len(dias))
+        if not isinstance(dia, dict):
+            continue
+
+        for recurso, hora, slot in atendimentos_do_dia(dia):
+            if _e_do_cliente(slot, nome, id_cliente):
+                resultados.append({
+                    "tipo": "AGENDAMENTO",
+                    "data_iso": data_iso,
+                    "hora": hora,
+                    "recurso": recurso,
+                    "servico": slot.get("servico", ""),
+                    "obs": slot.get("obs", ""),
+                    "pago": bool(slot.get("pago", False)),
+                    "total": preco_do_slot(slot, data_iso) +
+                             sum(float(e.get("valor", 0.0)) for e in slot.get("extras", [])),
+                    "pacote": bool(slot.get("pacote", False)),
+                    "pacote_nome": slot.get("pacote_nome"),
+                    "extras": slot.get("extras", []),
+                })
+
+        vendas = dia.get("_vendas_avulsas", [])
+        if isinstance(vendas, list):
+            for idx, v in enumerate(vendas):
+                if not isinstance(v, dict):
+                    continue
+                if _e_do_cliente(v, nome, id_cliente):
+                    resultados.append({
+                        "tipo": "VENDA",
+                        "data_iso": data_iso,
+                        "indice": idx,
+                        "produto": v.get("produto", ""),
+                        "valor": float(v.get("valor", 0.0)),
+                        "pago": bool(v.get("pago", True)),
+                    })
+
+    resultados.sort(key=lambda r: (r["data_iso"], r.get("hora", "--")))
+    return resultados
+
+def proximo_atendimento(agenda, nome, id_cliente=None, agora=None):
+    """
+    (data_iso, recurso, hora, slot) do próximo atendimento não cancelado
+    do cliente, a partir de `agora` (datetime; padrão: agora), ou None.
+    Só olha os dias de hoje em diante, não o histórico inteiro.
+    """
+    agora = agora or datetime.now()
+    hoje = agora.strftime("%Y-%m-%d")
+    hora_agora = agora.strftime("%H:%M")
+    for data_iso in sorted(d for d in agenda if d >= hoje):
+        achados = [
+            (hora, recurso, slot)
+            for recurso, hora, slot in atendimentos_do_dia(agenda[data_iso])
+            if _e_do_cliente(slot, nome, id_cliente)
+            and slot.get("status") != "cancelado"
+            and (data_iso > hoje or hora >= hora_agora)
+        ]
+        if achados:
+            hora, recurso, slot = min(achados, key=lambda a: (a[0], a[1]))
+            return data_iso, recurso, hora, slot
+    return None
+
+# ---------- RELATÓRIOS ----------
+
+@medido("calcular_resumo_datas")
+def calcular_resumo_datas(agenda, lista_datas_iso, tarefa=None):
+    """
+    Recebe uma lista de datas (ISO) e calcula:
+    - total de atendimentos
+    - total em serviços (atendimentos de pacote só contam; o valor vem
+      das faturas do pacote, ver agenda_pacotes)
+    - total em produtos (extras + vendas avulsas)
+    - total recebido / pendente
+    - contagem de serviços e produtos
+    - atendimentos e faturamento por cadeira
+
+    `tarefa` (agenda_tarefas.Tarefa) recebe o progresso quando o relatório
+    roda em segundo plano.
+    """
+    total_atendimentos = 0
+    atendimentos_pacote = 0
+
+    total_servicos = 0.0      # só corte/barba/etc
+    total_produtos = 0.0      # extras + vendas avulsas
+    total_pago = 0.0
+    total_pendente = 0.0
+
+    contagem_servicos = {}
+    contagem_produtos = {}
+    por_recurso = {}
+
+    for pos, data_iso in enumerate(lista_datas_iso):
+        if tarefa is not None and pos % 20 == 0:
+            tarefa.passo(pos, len(lista_datas_iso))
+        dia = agenda.get(data_iso, {})
+
+        # 1) Atendimentos (agendamentos), em todas as cadeiras
+        for recurso, h, slot in atendimentos_do_dia(dia):
+            servico = slot.get("servico", "")
+            preco_serv = preco_do_slot(slot, data_iso)
+            extras_list = slot.get("extras", [])
+            extras_total = sum(float(e.get("valor", 0.0)) for e in extras_list)
+            total = preco_serv + extras_total
+            pago = bool(slot.get("pago", False))
+
+            total_atendimentos += 1
+            if slot.get("pacote"):
+                atendimentos_pacote += 1
+            total_servicos += preco_serv
+            total_produtos += extras_total
+
+            contagem_servicos[servico] = contagem_servicos.get(servico, 0) + 1
+            for e in extras_list:
+                nome_prod = e.get("nome", "Produto")
+                contagem_produtos[nome_prod] = contagem_produtos.get(nome_prod, 0) + 1
+
+            rec = por_recurso.setdefault(recurso, {"atendimentos": 0, "total": 0.0})
+            rec["atendimentos"] += 1
+            rec["total"] += total
+
+            if pago:
+                total_pago += total
+            else:
+                total_pendente += total
+
+        # 2) Vendas avulsas
+        vendas_avulsas = dia.get("_vendas_avulsas", [])
+        for v in vendas_avulsas:
+            produto = v.get("produto", "Produto")
+            valor = float(v.get("valor", 0.0))
+            pago = bool(v.get("pago", True))
+
+            total_produtos += valor
+            contagem_produtos[produto] = contagem_produtos.get(produto, 0) + 1
+
+            if pago:
+                total_pago += valor
+            else:
+                total_pendente += valor
+
+    total_geral = total_pago + total_pendente
+
+    return {
+        "total_atendimentos": total_atendimentos,
+        "atendimentos_pacote": atendimentos_pacote,
+        "total_servicos": total_servicos,
+        "total_produtos": total_produtos,
+        "total_pago": total_pago,
+        "total_pendente": total_pendente,
+        "total_geral": total_geral,
+        "contagem_servicos": contagem_servicos,
+        "contagem_produtos": contagem_produtos,
+        "por_recurso": por_recurso,
+    }
+
+def somar_resumos(resumos):
+    """Junta vários resumos de calcular_resumo_datas num só (ex.: meses arquivados + dias em uso)."""
+    total = calcular_resumo_datas({}, [])
+    for resumo in resumos:
+        for chave in ("total_atendimentos", "atendimentos_pacote", "total_servicos",
+                      "total_produtos", "total_pago", "total_pendente", "total_geral"):
+            total[chave] += resumo.get(chave, 0)
+        for chave in ("contagem_servicos", "contagem_produtos"):
+            contagem = total[chave]
+            for nome, qtd in resumo.get(chave, {}).items():
+                contagem[nome] = contagem.get(nome, 0) + qtd
+        for recurso, dados in resumo.get("por_recurso", {}).items():
+            rec = total["por_recurso"].setdefault(recurso, {"atendimentos": 0, "total": 0.0})
+            rec["atendimentos"] += dados.get("atendimentos", 0)
+            rec["total"] += dados.get("total", 0.0)
+    return total
@@ -0,0 +1,313 @@
+"""Pacotes mensais: índice dos atendimentos de pacote e faturas do mês (pacotes/faturas.json)."""
+import os
+from datetime import date, datetime
+
+from agenda_nucleo import (
+    CHAVE_CLIENTE_ID,
+    CHAVE_VENDAS,
+    atendimentos_do_dia,
+    grades_do_dia,
+)
+from agenda_sincronia import alterar_json, assinatura_arquivo, ler_json
+
+PASTA_PACOTES = "pacotes"
+ARQUIVO_FATURAS = "faturas.json"
+
+# ---------- ÍNDICE DE PACOTES ----------
+
+def chave_pacote(slot):
+    """(cliente_id ou nome, nome do pacote): o mesmo cliente pode ter mais de um pacote."""
+    return (slot.get(CHAVE_CLIENTE_ID) or slot.get("cliente", ""), slot.get("pacote_nome") or "Pacote")
+
+def _de_pacote(registro):
+    return [(r, h, slot) for r, h, slot in atendimentos_do_dia(registro) if slot.get("pacote")]
+
+class IndicePacotes:
+    """
+    Atendimentos de pacote agrupados por pacote e mês.
+
+    Registra-se nos observadores do IndiceOcupacao: cada escrita refaz só
+    aquele horário e cada invalidar() (outro terminal, desfazer, arquivo
+    morto) refaz só aquele dia.
+    """
+
+    def __init__(self, ocupacao):
+        self.ocupacao = ocupacao
+        self.montado = False
+        self._lugares = {}        # (dia, recurso, hora) -> (chave, status, valor_mensal)
+        self._por_dia = {}        # dia -> {lugares}
+        self._meses = {}          # chave -> mês -> {lugares}
+        self._info = {}           # chave -> cliente, cliente_id, pacote_nome
+        self._mudados = set()     # dias mexidos antes de montar (None: a agenda toda)
+        ocupacao.observadores.append(self._ao_mudar)
+
+    @property
+    def agenda(self):
+        return self.ocupacao.agenda
+
+    def montar(self, tarefa=None):
+        """Uma passada pela agenda. Roda uma vez; depois o índice se mantém sozinho."""
+        self.montado = False
+        return self.instalar(self.ler(self.agenda, tarefa))
+
+    def ler(self, agenda, tarefa=None):
+        """
+        A passada em si, sem mexer no índice: [(dia, recurso, hora, slot)].
+        Em segundo plano, `agenda` é uma cópia (copia_dos_dias) e o
+        resultado vai para instalar() na thread do Tk.
+        """
+        ocorrencias = []
+        dias = list(agenda)
+        for pos, dia in enumerate(dias):
+            if tarefa is not None and pos % 50 == 0:
+                tarefa.passo(pos, len(dias))
+            ocorrencias += [(dia, r, h, slot) for r, h, slot in _de_pacote(agenda.get(dia))]
+        return ocorrencias
+
+    def instalar(self, ocorrencias):
+        """Põe o que ler() achou no índice e refaz os dias mexidos enquanto ele lia."""
+        if self.montado:
+            return self      # já montado na hora por outra consulta: é mais novo
+        self._lugares.clear()
+        self._por_dia.clear()
+        self._meses.clear()
+        for ocorrencia in ocorrencias:
+            self._incluir(*ocorrencia)
+        mudados, self._mudados = self._mudados, set()
+        if None in mudados:
+            return self.montar()
+        self.montado = True
+        for dia in mudados:
+            self._ao_mudar(dia, None)
+        return self
+
+    def _garantir(self):
+        if not self.montado:
+            self.montar()
+
+    # --- manutenção ---
+    def _incluir(self, dia, recurso, hora, slot):
+        chave = chave_pacote(slot)
+        lugar = (dia, recurso, hora)
+        self._lugares[lugar] = (chave, slot.get("status", "pendente"),
+                                float(slot.get("pacote_valor_mensal", 0.0) or 0.0))
+        self._por_dia.setdefault(dia, set()).add(lugar)
+        self._meses.setdefault(chave, {}).setdefault(dia[:7], set()).add(lugar)
+        self._info[chave] = {
+            "cliente": slot.get("cliente", ""),
+            CHAVE_CLIENTE_ID: slot.get(CHAVE_CLIENTE_ID),
+            "pacote_nome": chave[1],
+        }
+
+    def _tirar(self, lugar):
+        dados = self._lugares.pop(lugar, None)
+        if dados is None:
+            return
+        dia = lugar[0]
+        self._por_dia[dia].discard(lugar)
+        if not self._por_dia[dia]:
+            del self._por_dia[dia]
+        meses = self._meses[dados[0]]
+        meses[dia[:7]].discard(lugar)
+        if not meses[dia[:7]]:
+            del meses[dia[:7]]
+
+    def _indexar_dia(self, dia):
+        for recurso, hora, slot in _de_pacote(self.agenda.get(dia)):
+            self._incluir(dia, recurso, hora, slot)
+
+    def _ao_mudar(self, dia, lugar):
+        if not self.montado:
+            self._mudados.add(dia)
+            return
+        if dia is None:
+            self.montado = False        # remonta na próxima consulta
+            return
+        if lugar is None:
+            for antigo in list(self._por_dia.get(dia, ())):
+                self._tirar(antigo)
+            self._indexar_dia(dia)
+            return
+        recurso, hora = lugar
+        if recurso == CHAVE_VENDAS:
+            return
+        self._tirar((dia, recurso, hora))
+        for r, grade in grades_do_dia(self.agenda.get(dia)):
+            slot = grade.get(hora) if r == recurso else None
+            if isinstance(slot, dict) and slot.get("pacote") and slot.get("inicio", hora) == hora:
+                self._incluir(dia, recurso, hora, slot)
+
+    # --- consultas ---
+    def pacotes(self):
+        """[(chave, info)] dos pacotes que têm algum atendimento na agenda."""
+        self._garantir()
+        return [(chave, self._info[chave]) for chave, meses in self._meses.items() if meses]
+
+    def meses(self, chave):
+        self._garantir()
+        return sorted(self._meses.get(chave, ()))
+
+    def ocorrencias(self, chave, mes):
+        """Atendimentos do pacote no mês ('AAAA-MM'), em ordem de data."""
+        self._garantir()
+        lista = []
+        for lugar in self._meses.get(chave, {}).get(mes, ()):
+            _chave, status, valor = self._lugares[lugar]
+            dia, recurso, hora = lugar
+            lista.append({"data_iso": dia, "recurso": recurso, "hora": hora,
+                          "status": status, "valor_mensal": valor})
+        lista.sort(key=lambda o: (o["data_iso"], o["hora"]))
+        return lista
+
+    def ativos_no_mes(self, mes):
+        """{chave: ocorrências} dos pacotes com algum atendimento não cancelado no mês."""
+        self._garantir()
+        ativos = {}
+        for chave, meses in self._meses.items():
+            if mes not in meses:
+                continue
+            ocorrencias = self.ocorrencias(chave, mes)
+            if any(o["status"] != "cancelado" for o in ocorrencias):
+                ativos[chave] = ocorrencias
+        return ativos
+
+    def info(self, chave):
+        self._garantir()
+        return self._info.get(chave, {})
+
+# ---------- CONCILIAÇÃO ----------
+
+def conciliar(ocorrencias, hoje=None):
+    """
+    Conta as ocorrências do mês: realizadas (já passaram e não foram
+    canceladas nem ficaram para remarcar), futuras, canceladas e a remarcar.
+    """
+    hoje = hoje or date.today().isoformat()
+    contagem = {"previstas": 0, "realizadas": 0, "futuras": 0, "canceladas": 0, "remarcar": 0}
+    for o in ocorrencias:
+        if o["status"] == "cancelado":
+            contagem["canceladas"] += 1
+            continue
+        contagem["previstas"] += 1
+        if o["status"] == "remarcar":
+            contagem["remarcar"] += 1
+        elif o["data_iso"] < hoje:
+            contagem["realizadas"] += 1
+        else:
+            contagem["futuras"] += 1
+    return contagem
+
+def situacao(contagem):
+    """Texto curto da conciliação para a tela."""
+    partes = [f"{contagem['realizadas']}/{contagem['previstas']} realizadas"]
+    if contagem["futuras"]:
+        partes.append(f"{contagem['futuras']} por vir")
+    if contagem["remarcar"]:
+        partes.append(f"{contagem['remarcar']} a remarcar")
+    if contagem["canceladas"]:
+        partes.append(f"{contagem['canceladas']} cancelada(s)")
+    return ", ".join(partes)
+
+# ---------- FATURAS ----------
+
+def id_fatura(mes, chave):
+    return f"{mes}|{chave[0]}|{chave[1]}"
+
+def chave_da_fatura(fatura):
+    return (fatura.get(CHAVE_CLIENTE_ID) or fatura["cliente"], fatura["pacote_nome"])
+
+class FaturasPacote:
+    """faturas.json na memória ({id: fatura}), relido quando outro terminal grava."""
+
+    def __init__(self, pasta=PASTA_PACOTES):
+        self.pasta = pasta
+        self.faturas = {}
+        self._assinatura = None
+        self.recarregar()
+
+    @property
+    def caminho(self):
+        return os.path.join(self.pasta, ARQUIVO_FATURAS)
+
+    def recarregar(self):
+        self._assinatura = assinatura_arquivo(self.caminho)
+        self.faturas = ler_json(self.caminho)
+
+    def atualizar(self):
+        """Relê só se o arquivo mudou (só stat)."""
+        if assinatura_arquivo(self.caminho) != self._assinatura:
+            self.recarregar()
+
+    def _gravar(self, alteradas):
+        """Relê sob trava, aplica as faturas alteradas e troca o arquivo."""
+        self.faturas = alterar_json(self.caminho, lambda faturas: faturas.update(alteradas))
+        self._assinatura = assinatura_arquivo(self.caminho)
+
+    def do_mes(self, mes):
+        self.atualizar()
+        return sorted((f for f in self.faturas.values() if f["mes"] == mes),
+                      key=lambda f: (f["cliente"].lower(), f["pacote_nome"]))
+
+    def faturar_mes(self, indice, mes, quando=None):
+        """
+        Gera a fatura dos pacotes ativos no mês que ainda não têm. Retorna
+        as faturas novas (rodar de novo no mesmo mês não duplica).
+        """
+        self.atualizar()
+        quando = quando or datetime.now()
+        novas = {}
+        for chave, ocorrencias in indice.ativos_no_mes(mes).items():
+            fid = id_fatura(mes, chave)
+            if fid in self.faturas:
+                continue
+            info = indice.info(chave)
+            valores = [o["valor_mensal"] for o in ocorrencias if o["status"] != "cancelado"]
+            novas[fid] = {
+                "id": fid,
+                "mes": mes,
+                "cliente": info.get("cliente", ""),
+                CHAVE_CLIENTE_ID: info.get(CHAVE_CLIENTE_ID),
+                "pacote_nome": info.get("pacote_nome", ""),
+                "valor": round(valores[0] if valores else 0.0, 2),
+                "previstas": conciliar(ocorrencias)["previstas"],
+                "gerada_em": quando.strftime("%Y-%m-%dT%H:%M:%S"),
+                "pago": False,
+                "forma_pagamento": None,
+                "lancamento": None,
+            }
+        if novas:
+            self._gravar(novas)
+        return list(novas.values())
+
+    def marcar_paga(self, fid, forma=None, lancamento=None):
+        """Marca a fatura paga (forma e lançamento do caixa) ou, sem forma, pendente de novo."""
+        self.atualizar()
+        fatura = dict(self.faturas[fid])
+        fatura["pago"] = forma is not None
+        fatura["forma_pagamento"] = forma
+        fatura["lancamento"] = lancamento
+        self._gravar({fid: fatura})
+        return fatura
+
+def conciliar_fatura(indice, fatura, hoje=None):
+    """Conciliação da fatura com o que está hoje na agenda."""
+    return conciliar(indice.ocorrencias(chave_da_fatura(fatura), fatura["mes"]), hoje)
+
+def resumo_pacotes(faturas, meses):
+    """Receita de pacotes dos meses ('AAAA-MM'): faturas, total, pago, pendente e por pacote."""
+    resumo = {"faturas": 0, "total": 0.0, "pago": 0.0, "pendente": 0.0, "por_pacote": {}}
+    for mes in meses:
+        for fatura in faturas.do_mes(mes):
+            resumo["faturas"] += 1
+            resumo["total"] += fatura["valor"]
+            resumo["pago" if fatura["pago"] else "pendente"] += fatura["valor"]
+            nome = fatura["pacote_nome"]
+            resumo["por_pacote"][nome] = resumo["por_pacote"].get(nome, 0.0) + fatura["valor"]
+    return resumo
+
+def texto_fatura(fatura, contagem=None):
+    status = f"Paga ({fatura['forma_pagamento']})" if fatura["pago"] else "Pendente"
+    texto = f"{fatura['cliente']} - {fatura['pacote_nome']} - R$ {fatura['valor']:.2f} - {status}"
+    if contagem is not None:
+        texto += f" - {situacao(contagem)}"
+    return texto
@@ -0,0 +1,343 @@
+"""Backups: comparar e restaurar um dia ou um cliente."""
+import glob
+import hashlib
+import json
+import os
+import re
+from datetime import datetime
+
+from agenda_nucleo import (
+    BACKUP_DIR,
+    CHAVE_VENDAS,
+    _e_do_cliente,
+    adicionar_venda,
+    atendimentos_do_dia,
+    duracao_do_slot,
+    iso_para_br,
+    liberar_atendimento,
+    posicao_da_venda,
+    remover_venda,
+    reservar_atendimento,
+    substituir_venda,
+)
+
+VENDA = "venda"             # no lugar da cadeira, numa diferença de venda avulsa
+TAMANHO_BLOCO = 64 * 1024
+PADRAO_BACKUP = re.compile(r"agenda_(\d{8}-\d{6})\.json$")
+
+# ---------- BACKUPS ----------
+
+class Backup:
+    def __init__(self, carimbo, caminho):
+        self.carimbo = carimbo      # "AAAAMMDD-HHMMSS"
+        self.caminho = caminho
+        self.quando = datetime.strptime(carimbo, "%Y%m%d-%H%M%S")
+
+    @property
+    def caminho_clientes(self):
+        caminho = os.path.join(os.path.dirname(self.caminho), f"clientes_{self.carimbo}.json")
+        return caminho if os.path.exists(caminho) else None
+
+    def texto(self):
+        return self.quando.strftime("%d/%m/%Y %H:%M:%S")
+
+def listar_backups(pasta=BACKUP_DIR):
+    """Backups da agenda, do mais novo para o mais antigo."""
+    backups = []
+    for caminho in glob.glob(os.path.join(pasta, "agenda_*.json")):
+        achado = PADRAO_BACKUP.search(os.path.basename(caminho))
+        if achado:
+            backups.append(Backup(achado.group(1), caminho))
+    backups.sort(key=lambda b: b.carimbo, reverse=True)
+    return backups
+
+# ---------- LEITURA DIA A DIA ----------
+
+def ler_dias(caminho, dias=None):
+    """
+    Gera (data_iso, dia) de um agenda.json lendo aos pedaços: só um dia
+    fica decodificado por vez. Com `dias`, devolve apenas esses.
+    """
+    decodificador = json.JSONDecoder()
+    with open(caminho, "r", encoding="utf-8") as f:
+        buf = ""
+        pos = 0
+        fim_arquivo = False
+
+        def garantir(n=1):
+            """Lê mais do arquivo até ter `n` caracteres depois de pos (se houver)."""
+            nonlocal buf, pos, fim_arquivo
+            while len(buf) - pos < n and not fim_arquivo:
+                bloco = f.read(TAMANHO_BLOCO)
+                if not bloco:
+                    fim_arquivo = True
+                buf = buf[pos:] + bloco
+                pos = 0
+            return len(buf) - pos >= n
+
+        def pular_espacos(extra=""):
+            nonlocal pos
+            while garantir() and (buf[pos].isspace() or buf[pos] in extra):
+                pos += 1
+
+        def decodificar():
+            nonlocal buf, pos, fim_arquivo
+            while True:
+                try:
+                    valor, fim = decodificador.raw_decode(buf, pos)
+                except json.JSONDecodeError:
+                    if fim_arquivo:
+                        raise
+                    # valor cortado no fim do pedaço: lê mais e tenta de novo
+                    bloco = f.read(TAMANHO_BLOCO)
+                    if not bloco:
+                        fim_arquivo = True
+                    buf = buf[pos:] + bloco
+                    pos = 0
+                    continue
+                pos = fim
+                return valor
+
+        pular_espacos()
+        if not garantir() or buf[pos] != "{":
+            return
+        pos += 1
+        while True:
+            pular_espacos(",")
+            if not garantir() or buf[pos] == "}":
+                return
+            chave = decodificar()
+            pular_espacos(":")
+            dia = decodificar()
+            if dias is None or chave in dias:
+                yield chave, dia
+
+def _dias_da_fonte(fonte, dias=None):
+    """fonte = caminho de um backup ou a própria agenda (dict)."""
+    if isinstance(fonte, dict):
+        for data_iso in list(fonte):
+            if dias is None or data_iso in dias:
+                yield data_iso, fonte[data_iso]
+    else:
+        yield from ler_dias(fonte, dias)
+
+# ---------- COMPARAÇÃO ----------
+
+def conteudo_do_dia(dia):
+    """
+    O que importa num dia para comparar: {(recurso, hora): slot} dos
+    atendimentos e a lista de vendas. Grade vazia, versão e cópias do
+    formato antigo ficam de fora.
+    """
+    if not isinstance(dia, dict):
+        return {}, []
+    atendimentos = {(r, h): slot for r, h, slot in atendimentos_do_dia(dia)}
+    vendas = dia.get(CHAVE_VENDAS, [])
+    return atendimentos, (vendas if isinstance(vendas, list) else [])
+
+def _sem_id(venda):
+    """Backup de antes dos ids tem a mesma venda sem o "id": ele não conta na comparação."""
+    return {k: v for k, v in venda.items() if k != "id"} if isinstance(venda, dict) else venda
+
+def _impressao(dia):
+    atendimentos, vendas = conteudo_do_dia(dia)
+    texto = json.dumps(
+        [sorted(([r, h], s) for (r, h), s in atendimentos.items()), [_sem_id(v) for v in vendas]],
+        sort_keys=True, ensure_ascii=False,
+    )
+    return hashlib.blake2b(texto.encode("utf-8"), digest_size=16).digest()
+
+def _campos_diferentes(antes, depois):
+    chaves = (set(antes) | set(depois)) - {"inicio", "id"}
+    return sorted(k for k in chaves if antes.get(k) != depois.get(k))
+
+def comparar_dia(data_iso, dia_a, dia_b):
+    """Diferenças de um dia: lista de dicts (data_iso, recurso, hora, tipo, antes, depois, campos)."""
+    at_a, vendas_a = conteudo_do_dia(dia_a)
+    at_b, vendas_b = conteudo_do_dia(dia_b)
+    diferencas = []
+
+    def anotar(recurso, hora, antes, depois):
+        if antes == depois:
+            return
+        if antes is None:
+            tipo, campos = "novo", []
+        elif depois is None:
+            tipo, campos = "removido", []
+        else:
+            tipo, campos = "alterado", _campos_diferentes(antes, depois)
+            if not campos:
+                return
+        diferencas.append({
+            "data_iso": data_iso, "recurso": recurso, "hora": hora, "tipo": tipo,
+            "antes": antes, "depois": depois, "campos": campos,
+        })
+
+    for recurso, hora in sorted(set(at_a) | set(at_b), key=lambda c: (c[1], c[0])):
+        anotar(recurso, hora, at_a.get((recurso, hora)), at_b.get((recurso, hora)))
+    for i in range(max(len(vendas_a), len(vendas_b))):
+        anotar(
+            VENDA, i,
+            vendas_a[i] if i < len(vendas_a) else None,
+            vendas_b[i] if i < len(vendas_b) else None,
+        )
+    return diferencas
+
+def comparar(fonte_a, fonte_b, tarefa=None):
+    """
+    Diferenças de fonte_a para fonte_b (caminho de backup ou a agenda em
+    uso), ordenadas por data. Cada fonte é lida uma vez só guardando a
+    impressão dos dias; depois só os dias diferentes são lidos de novo.
+    """
+    impressoes_a = {}
+    for pos, (data_iso, dia) in enumerate(_dias_da_fonte(fonte_a)):
+        if tarefa is not None and pos % 50 == 0:
+            tarefa.passo(pos)
+        impressoes_a[data_iso] = _impressao(dia)
+
+    vazio = _impressao({})
+    mudaram = {}
+    for pos, (data_iso, dia) in enumerate(_dias_da_fonte(fonte_b)):
+        if tarefa is not None and pos % 50 == 0:
+            tarefa.passo(pos)
+        if impressoes_a.pop(data_iso, vazio) != _impressao(dia):
+            mudaram[data_iso] = dia
+    # dias que só existem em A e não estavam vazios
+    for data_iso, impressao in impressoes_a.items():
+        if impressao != vazio:
+            mudaram[data_iso] = None
+
+    antigos = dict(_dias_da_fonte(fonte_a, set(mudaram)))
+    diferencas = []
+    for data_iso in sorted(mudaram):
+        diferencas.extend(comparar_dia(data_iso, antigos.get(data_iso), mudaram[data_iso]))
+    return diferencas
+
+def resumo_diferenca(d):
+    """Uma linha de texto para a lista da tela / terminal."""
+    registro = d["depois"] if d["depois"] is not None else d["antes"]
+    if d["recurso"] == VENDA:
+        oque = f"venda {registro.get('produto', '')} ({registro.get('cliente') or 'sem cliente'})"
+        onde = iso_para_br(d["data_iso"])
+    else:
+        oque = f"{registro.get('cliente', '')} - {registro.get('servico', '')}"
+        onde = f"{iso_para_br(d['data_iso'])} {d['hora']} {d['recurso']}"
+    texto = f"{onde}: {d['tipo']} {oque}"
+    if d["campos"]:
+        texto += f" [{', '.join(d['campos'])}]"
+    return texto
+
+# ---------- RESTAURAÇÃO ----------
+
+class ResultadoRestauracao:
+    def __init__(self):
+        self.alterados = 0
+        self.dias = set()
+        self.conflitos = []   # (data_iso, recurso, hora, motivo)
+
+    def resumo(self):
+        texto = f"{self.alterados} registro(s) restaurado(s) em {len(self.dias)} dia(s)."
+        if self.conflitos:
+            texto += "\n\nNão restaurados (horário ocupado):\n" + "\n".join(
+                f"{iso_para_br(d)} {h} {r}: {motivo}" for d, r, h, motivo in self.conflitos
+            )
+        return texto
+
+def _aplicar_diferencas(indice, diferencas, resultado):
+    """Leva cada diferença (atual -> backup) para a agenda pelas funções de escrita."""
+    # primeiro libera, depois reserva: um atendimento que mudou de hora não bate nele mesmo
+    for d in diferencas:
+        if d["recurso"] != VENDA and d["antes"] is not None:
+            liberar_atendimento(indice, d["data_iso"], d["recurso"], d["hora"])
+    for d in diferencas:
+        if d["recurso"] != VENDA and d["depois"] is not None:
+            # fora do expediente de hoje tudo bem (é histórico); só não pode bater com outro
+            if indice.conflitos(d["data_iso"], d["recurso"], d["hora"], duracao_do_slot(d["depois"])):
+                resultado.conflitos.append((d["data_iso"], d["recurso"], d["hora"], "bate com outro atendimento"))
+                if d["antes"] is not None:
+                    reservar_atendimento(indice, d["data_iso"], d["recurso"], d["hora"], d["antes"])
+                continue
+            reservar_atendimento(indice, d["data_iso"], d["recurso"], d["hora"], d["depois"])
+        resultado.alterados += 1
+        resultado.dias.add(d["data_iso"])
+
+    # vendas por posição: apaga as que sobram do fim para o começo
+    vendas = [d for d in diferencas if d["recurso"] == VENDA]
+    for d in sorted(vendas, key=lambda d: -d["hora"]):
+        if d["depois"] is None:
+            remover_venda(indice, d["data_iso"], d["hora"])
+    for d in sorted(vendas, key=lambda d: d["hora"]):
+        venda = d["depois"]
+        if d["antes"] is None:
+            if venda.get("id") and posicao_da_venda(indice.agenda, d["data_iso"], venda["id"]) is not None:
+                venda = _sem_id(venda)    # a mesma venda já está no dia: a volta ganha id novo
+            adicionar_venda(indice, d["data_iso"], venda)
+        elif venda is not None:
+            # campo que não existia no backup sai; o id (ligado ao livro caixa) fica
+            substituir_venda(indice, d["data_iso"], d["hora"], venda)
+
+def restaurar_dia(indice, caminho, data_iso):
+    """Volta um dia da agenda em uso (indice.agenda) para como estava no backup."""
+    resultado = ResultadoRestauracao()
+    dia_backup = next((dia for _d, dia in ler_dias(caminho, {data_iso})), None)
+    diferencas = comparar_dia(data_iso, indice.agenda.get(data_iso), dia_backup)
+    _aplicar_diferencas(indice, diferencas, resultado)
+    return resultado
+
+def restaurar_cliente(indice, caminho, nome, id_cliente=None, tarefa=None):
+    """
+    Volta os atendimentos de um cliente para como estavam no backup: os
+    que ele tinha lá voltam (se o horário estiver livre) e os que ele
+    ganhou depois saem. Outros clientes não são tocados. Vendas avulsas
+    que sumiram voltam; as mais novas ficam.
+    """
+    resultado = ResultadoRestauracao()
+    agenda = indice.agenda
+
+    # dias do backup em que o cliente aparece
+    do_backup = {}
+    for pos, (data_iso, dia) in enumerate(ler_dias(caminho)):
+        if tarefa is not None and pos % 50 == 0:
+            tarefa.passo(pos)
+        atendimentos, vendas = conteudo_do_dia(dia)
+        meus = {c: s for c, s in atendimentos.items() if _e_do_cliente(s, nome, id_cliente)}
+        minhas_vendas = [v for v in vendas if isinstance(v, dict) and _e_do_cliente(v, nome, id_cliente)]
+        if meus or minhas_vendas:
+            do_backup[data_iso] = (meus, minhas_vendas)
+
+    # dias de agora em que o cliente aparece
+    agora = {}
+    for data_iso in list(agenda):
+        atendimentos, vendas = conteudo_do_dia(agenda[data_iso])
+        meus = {c: s for c, s in atendimentos.items() if _e_do_cliente(s, nome, id_cliente)}
+        if meus or data_iso in do_backup:
+            agora[data_iso] = (meus, vendas)
+
+    diferencas = []
+    for data_iso in sorted(set(do_backup) | set(agora)):
+        meus_backup, vendas_backup = do_backup.get(data_iso, ({}, []))
+        meus_agora, vendas_agora = agora.get(data_iso, ({}, []))
+        for chave in sorted(set(meus_backup) | set(meus_agora), key=lambda c: (c[1], c[0])):
+            antes, depois = meus_agora.get(chave), meus_backup.get(chave)
+            if antes == depois:
+                continue
+            recurso, hora = chave
+            ocupante = conteudo_do_dia(agenda.get(data_iso))[0].get(chave)
+            if antes is None and ocupante is not None:
+                # o horário é de outra pessoa agora
+                resultado.conflitos.append((data_iso, recurso, hora, f"ocupado por {ocupante.get('cliente', '')}"))
+                continue
+            diferencas.append({
+                "data_iso": data_iso, "recurso": recurso, "hora": hora,
+                "tipo": "", "antes": antes, "depois": depois, "campos": [],
+            })
+        for venda in vendas_backup:
+            if _sem_id(venda) not in [_sem_id(v) for v in vendas_agora]:
+                diferencas.append({
+                    "data_iso": data_iso, "recurso": VENDA, "hora": len(vendas_agora),
+                    "tipo": "novo", "antes": None, "depois": venda, "campos": [],
+                })
+                vendas_agora = vendas_agora + [venda]
+
+    _aplicar_diferencas(indice, diferencas, resultado)
+    return resultado
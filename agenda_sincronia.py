@@ -0,0 +1,380 @@
+"""
+Agenda compartilhada entre terminais: trava no arquivo, "_versao" por dia
+e mescla do que outro terminal gravou ao salvar.
+"""
+import json
+import os
+import time
+from contextlib import contextmanager
+
+from agenda_diagnostico import medido
+from agenda_intervalos import IntervalosDia, hora_para_minutos
+from agenda_nucleo import (
+    ARQUIVO_AGENDA,
+    CHAVE_RECURSOS,
+    RECURSO_PADRAO,
+    duracao_do_slot,
+    iso_para_br,
+)
+
+CHAVE_VERSAO = "_versao"
+CHAVE_VENDAS = "_vendas_avulsas"
+ESPERA_TRAVA = 10.0  # segundos
+
+try:
+    import msvcrt
+
+    def _travar(f):
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+
+    def _destravar(f):
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+except ImportError:
+    import fcntl
+
+    def _travar(f):
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+
+    def _destravar(f):
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+@contextmanager
+def trava_arquivo(caminho, espera=ESPERA_TRAVA):
+    """Trava exclusiva entre processos em `caminho`.lock (espera até `espera` segundos)."""
+    with open(caminho + ".lock", "a+b") as f:
+        inicio = time.monotonic()
+        while True:
+            try:
+                _travar(f)
+                break
+            except OSError:
+                if time.monotonic() - inicio > espera:
+                    raise TimeoutError(f"{caminho} está travado por outro terminal.")
+                time.sleep(0.05)
+        try:
+            yield
+        finally:
+            _destravar(f)
+
+# ---------- ARQUIVOS ----------
+# Os outros arquivos compartilhados (caixa, estoque, espera, faturas,
+# catálogo, arquivo morto) usam estas mesmas funções.
+
+def assinatura_arquivo(caminho):
+    """(mtime, tamanho) do arquivo, ou None se não existe. Mudou: alguém gravou."""
+    try:
+        st = os.stat(caminho)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+def ler_json(caminho, padrao=None):
+    """Conteúdo do arquivo; `padrao` (ou {}) se não existe ou está ilegível."""
+    try:
+        with open(caminho, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return {} if padrao is None else padrao
+
+def gravar_json(caminho, dados):
+    """Grava num temporário e troca: quem lê nunca pega o arquivo pela metade."""
+    with open(caminho + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(dados, f, ensure_ascii=False, indent=2)
+    os.replace(caminho + ".tmp", caminho)
+
+def alterar_json(caminho, alterar, padrao=None):
+    """
+    Relê o arquivo com a trava, aplica alterar(dados) e grava. O que outro
+    terminal gravou antes continua lá. Retorna os dados gravados.
+    """
+    pasta = os.path.dirname(caminho)
+    if pasta:
+        os.makedirs(pasta, exist_ok=True)
+    with trava_arquivo(caminho):
+        dados = ler_json(caminho, padrao)
+        alterar(dados)
+        gravar_json(caminho, dados)
+    return dados
+
+def ler_jsonl(caminho):
+    """Uma linha JSON por registro; linha ilegível (ex.: cortada por queda de energia) é pulada."""
+    registros = []
+    try:
+        with open(caminho, "r", encoding="utf-8") as f:
+            for linha in f:
+                linha = linha.strip()
+                if not linha:
+                    continue
+                try:
+                    registros.append(json.loads(linha))
+                except json.JSONDecodeError:
+                    continue
+    except OSError:
+        pass
+    return registros
+
+def acrescentar_jsonl(caminho, registro):
+    """Acrescenta uma linha com a trava e fsync (o registro não se perde)."""
+    pasta = os.path.dirname(caminho)
+    if pasta:
+        os.makedirs(pasta, exist_ok=True)
+    linha = (json.dumps(registro, ensure_ascii=False) + "\n").encode("utf-8")
+    with trava_arquivo(caminho):
+        with open(caminho, "a+b") as f:
+            if f.seek(0, os.SEEK_END):
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b"\n":
+                    linha = b"\n" + linha   # a última linha ficou cortada: não gruda nela
+            f.write(linha)
+            f.flush()
+            os.fsync(f.fileno())
+
+@medido("salvar_agenda")
+def _gravar_agenda(caminho, agenda):
+    gravar_json(caminho, agenda)
+    # a cópia de segurança ao lado, como salvar_agenda faz com agenda_backup.json
+    gravar_json(os.path.splitext(caminho)[0] + "_backup.json", agenda)
+
+def versao_do_dia(dia):
+    if isinstance(dia, dict):
+        try:
+            return int(dia.get(CHAVE_VERSAO, 0))
+        except (TypeError, ValueError):
+            return 0
+    return 0
+
+def _impressao(dia):
+    """JSON canônico do dia (sem a versão), para comparar conteúdo."""
+    if isinstance(dia, dict) and CHAVE_VERSAO in dia:
+        dia = {k: v for k, v in dia.items() if k != CHAVE_VERSAO}
+    return json.dumps(dia, sort_keys=True, ensure_ascii=False)
+
+# ---------- MESCLA ----------
+
+def _mesclar_grade(base, local, disco, alterados_aqui):
+    """Mescla hora -> slot. Guarda em `alterados_aqui` as horas que ficaram com a versão daqui."""
+    mesclada = {}
+    conflitos = []
+    for h in set(base) | set(local) | set(disco):
+        b, l, d = base.get(h), local.get(h), disco.get(h)
+        if l == b:
+            mesclada[h] = d
+        elif d == b or d == l:
+            mesclada[h] = l
+            if d != l:
+                alterados_aqui.add(h)
+        else:
+            # os dois mexeram no mesmo bloco: fica o que já estava no disco
+            mesclada[h] = d
+            if isinstance(l, dict):
+                conflitos.append((h, l))
+    return mesclada, conflitos
+
+def _tirar_sobreposicoes(grade, alterados_aqui):
+    """Remove da grade mesclada os atendimentos daqui que batem com outro."""
+    conflitos = []
+    ocupado = IntervalosDia()
+    # primeiro o que veio do disco, depois o daqui: quem sobra é o daqui
+    horas = sorted(
+        (h for h, slot in grade.items()
+         if isinstance(slot, dict) and slot.get("inicio", h) == h and hora_para_minutos(h) is not None),
+        key=lambda h: (h in alterados_aqui, h),
+    )
+    for h in horas:
+        slot = grade[h]
+        ini = hora_para_minutos(h)
+        fim = ini + duracao_do_slot(slot)
+        if ocupado.livre(ini, fim):
+            ocupado.adicionar(ini, fim)
+        else:
+            grade[h] = None
+            conflitos.append((h, slot))
+    return conflitos
+
+def _mesclar_vendas(base, local, disco):
+    base = base or []
+    local = local or []
+    disco = disco or []
+    if local == base:
+        return disco
+    if disco == base:
+        return local
+    # parte do disco, aplica o que mudou aqui nas vendas antigas e junta as novas
+    mescladas = list(disco)
+    for i, venda in enumerate(local[:len(base)]):
+        if i < len(mescladas) and venda != base[i] and mescladas[i] == base[i]:
+            mescladas[i] = venda
+    mescladas.extend(local[len(base):])
+    return mescladas
+
+def mesclar_dia(base, local, disco):
+    """
+    Mescla de três vias de um dia (base = como estava na última leitura).
+    Retorna (dia_mesclado, conflitos) com conflitos = [(recurso, hora, slot)].
+    """
+    conflitos = []
+
+    def grade_sem_especiais(dia):
+        return {k: v for k, v in dia.items() if not k.startswith("_")}
+
+    alterados = set()
+    mesclado, c = _mesclar_grade(
+        grade_sem_especiais(base), grade_sem_especiais(local), grade_sem_especiais(disco), alterados
+    )
+    c += _tirar_sobreposicoes(mesclado, alterados)
+    conflitos += [(RECURSO_PADRAO, h, slot) for h, slot in c]
+
+    rec_b = base.get(CHAVE_RECURSOS) or {}
+    rec_l = local.get(CHAVE_RECURSOS) or {}
+    rec_d = disco.get(CHAVE_RECURSOS) or {}
+    if rec_b or rec_l or rec_d:
+        recursos = {}
+        for recurso in set(rec_b) | set(rec_l) | set(rec_d):
+            alterados = set()
+            grade, c = _mesclar_grade(
+                rec_b.get(recurso) or {}, rec_l.get(recurso) or {}, rec_d.get(recurso) or {}, alterados
+            )
+            c += _tirar_sobreposicoes(grade, alterados)
+            conflitos += [(recurso, h, slot) for h, slot in c]
+            recursos[recurso] = grade
+        mesclado[CHAVE_RECURSOS] = recursos
+
+    vendas = _mesclar_vendas(base.get(CHAVE_VENDAS), local.get(CHAVE_VENDAS), disco.get(CHAVE_VENDAS))
+    if vendas:
+        mesclado[CHAVE_VENDAS] = vendas
+
+    # outras chaves especiais: a daqui se mudou, senão a do disco
+    for k in (set(base) | set(local) | set(disco)):
+        if k.startswith("_") and k not in (CHAVE_RECURSOS, CHAVE_VENDAS, CHAVE_VERSAO):
+            mesclado[k] = local.get(k) if local.get(k) != base.get(k) else disco.get(k)
+
+    return mesclado, conflitos
+
+# ---------- SINCRONIA ----------
+
+class ResultadoSalvar:
+    def __init__(self):
+        self.recarregados = set()   # dias trazidos/mesclados do disco (ou que saíram dele)
+        self.conflitos = []         # (dia, recurso, hora, slot) que não foram gravados
+
+    def mensagens_conflito(self):
+        return [
+            f"{iso_para_br(dia)} {hora} ({recurso}): {slot.get('cliente', '')} - {slot.get('servico', '')}"
+            for dia, recurso, hora, slot in self.conflitos
+        ]
+
+class SincroniaAgenda:
+    """Leitura/gravação da agenda com trava e mescla por dia."""
+
+    def __init__(self, arquivo=ARQUIVO_AGENDA):
+        self.arquivo = arquivo
+        self._base = {}        # dia -> JSON do dia na última leitura/gravação
+        self._versoes = {}     # dia -> _versao na última leitura/gravação
+        self._assinatura = None
+
+    def _lembrar(self, data_iso, dia):
+        self._base[data_iso] = _impressao(dia)
+        self._versoes[data_iso] = versao_do_dia(dia)
+
+    def carregar(self):
+        with trava_arquivo(self.arquivo):
+            agenda = ler_json(self.arquivo)
+            self._assinatura = assinatura_arquivo(self.arquivo)
+        self._base.clear()
+        self._versoes.clear()
+        for data_iso, dia in agenda.items():
+            self._lembrar(data_iso, dia)
+        return agenda
+
+    def mudou_no_disco(self):
+        return assinatura_arquivo(self.arquivo) != self._assinatura
+
+    def dias_alterados_aqui(self, agenda):
+        return [
+            data_iso for data_iso, dia in agenda.items()
+            if isinstance(dia, dict) and self._base.get(data_iso) != _impressao(dia)
+        ]
+
+    def _aplicar_disco(self, agenda, disco, alterados_aqui, resultado):
+        """Traz para `agenda` os dias que o outro terminal gravou depois da nossa leitura."""
+        for data_iso, dia_disco in disco.items():
+            if not isinstance(dia_disco, dict):
+                continue
+            if versao_do_dia(dia_disco) <= self._versoes.get(data_iso, 0):
+                continue
+
+            dia_local = agenda.get(data_iso)
+            if data_iso in alterados_aqui and isinstance(dia_local, dict):
+                base = json.loads(self._base[data_iso]) if data_iso in self._base else {}
+                mesclado, conflitos = mesclar_dia(base, dia_local, dia_disco)
+                resultado.conflitos += [(data_iso, r, h, s) for r, h, s in conflitos]
+                novo = mesclado
+            else:
+                novo = dia_disco
+
+            # troca o conteúdo sem trocar o objeto (a tela guarda referências)
+            if isinstance(dia_local, dict):
+                dia_local.clear()
+                dia_local.update(novo)
+            else:
+                agenda[data_iso] = novo
+            agenda[data_iso][CHAVE_VERSAO] = versao_do_dia(dia_disco)
+            # a base passa a ser o disco: o que sobrar de diferença é mudança daqui
+            self._versoes[data_iso] = versao_do_dia(dia_disco)
+            self._base[data_iso] = _impressao(dia_disco)
+            resultado.recarregados.add(data_iso)
+
+        if not disco:
+            return  # arquivo vazio ou ilegível: não apaga nada daqui
+        for data_iso in list(self._versoes):
+            if data_iso in disco or data_iso in alterados_aqui or data_iso not in agenda:
+                continue
+            del agenda[data_iso]
+            del self._versoes[data_iso]
+            self._base.pop(data_iso, None)
+            resultado.recarregados.add(data_iso)
+
+    def salvar(self, agenda):
+        """Mescla com o disco (se outro terminal gravou), sobe a versão dos dias alterados e grava."""
+        resultado = ResultadoSalvar()
+        with trava_arquivo(self.arquivo):
+            alterados_aqui = set(self.dias_alterados_aqui(agenda))
+
+            if self.mudou_no_disco():
+                self._aplicar_disco(agenda, ler_json(self.arquivo), alterados_aqui, resultado)
+
+            for data_iso in alterados_aqui:
+                dia = agenda[data_iso]
+                if _impressao(dia) == self._base.get(data_iso):
+                    continue  # a mescla deixou igual ao disco
+                dia[CHAVE_VERSAO] = self._versoes.get(data_iso, 0) + 1
+                self._lembrar(data_iso, dia)
+
+            _gravar_agenda(self.arquivo, agenda)
+            self._assinatura = assinatura_arquivo(self.arquivo)
+        return resultado
+
+    def recarregar_alterados(self, agenda):
+        """
+        Verificação barata (só stat) se outro terminal gravou; se sim, traz
+        os dias novos. Dias com mudança daqui ainda não salva ficam para a
+        mescla do próximo salvar(). Retorna os dias recarregados.
+        """
+        if not self.mudou_no_disco():
+            return set()
+        resultado = ResultadoSalvar()
+        with trava_arquivo(self.arquivo):
+            alterados_aqui = set(self.dias_alterados_aqui(agenda))
+            disco = ler_json(self.arquivo)
+            pendentes = {d for d in alterados_aqui if d in disco}
+            self._aplicar_disco(
+                agenda,
+                {d: v for d, v in disco.items() if d not in pendentes},
+                alterados_aqui,
+                resultado,
+            )
+            if not pendentes:
+                self._assinatura = assinatura_arquivo(self.arquivo)
+        return resultado.recarregados
@@ -0,0 +1,102 @@
+"""
+Tarefas em segundo plano. A função lê uma cópia dos dados
+(copia_dos_dias); o resultado volta para a thread do Tk pelo `ao_terminar`.
+"""
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+INTERVALO_VERIFICACAO_MS = 50
+
+class TarefaCancelada(Exception):
+    """Levantada dentro da função quando a tarefa foi cancelada."""
+
+class Tarefa:
+    def __init__(self, descricao=""):
+        self.descricao = descricao
+        self.feito = 0
+        self.total = 0
+        self._cancelar = threading.Event()
+
+    def cancelar(self):
+        self._cancelar.set()
+
+    @property
+    def cancelada(self):
+        return self._cancelar.is_set()
+
+    def passo(self, feito, total=None):
+        """Informa o progresso; interrompe a função se a tarefa foi cancelada."""
+        if self._cancelar.is_set():
+            raise TarefaCancelada()
+        self.feito = feito
+        if total is not None:
+            self.total = total
+
+class ExecutorTarefas:
+    """Pool de threads + fila de resultados verificada pelo `after` do Tk."""
+
+    def __init__(self, root, max_threads=2):
+        self.root = root
+        self._pool = ThreadPoolExecutor(max_workers=max_threads, thread_name_prefix="agenda")
+        self._resultados = queue.Queue()
+        self._em_andamento = {}  # Tarefa -> ao_progredir
+        self._verificando = False
+
+    def executar(self, funcao, *args, descricao="", ao_terminar=None, ao_falhar=None,
+                 ao_cancelar=None, ao_progredir=None):
+        """
+        Roda funcao(tarefa, *args) em segundo plano e devolve a Tarefa.
+
+        Os callbacks são chamados na thread do Tk:
+        ao_terminar(resultado), ao_falhar(erro), ao_cancelar(),
+        ao_progredir(feito, total).
+        """
+        tarefa = Tarefa(descricao)
+        self._em_andamento[tarefa] = ao_progredir
+
+        def rodar():
+            try:
+                resultado = funcao(tarefa, *args)
+            except TarefaCancelada:
+                self._resultados.put((tarefa, ao_cancelar, ()))
+            except Exception as erro:
+                self._resultados.put((tarefa, ao_falhar, (erro,)))
+            else:
+                if tarefa.cancelada:
+                    self._resultados.put((tarefa, ao_cancelar, ()))
+                else:
+                    self._resultados.put((tarefa, ao_terminar, (resultado,)))
+
+        self._pool.submit(rodar)
+        self._agendar_verificacao()
+        return tarefa
+
+    def _agendar_verificacao(self):
+        if not self._verificando:
+            self._verificando = True
+            self.root.after(INTERVALO_VERIFICACAO_MS, self._verificar)
+
+    def _verificar(self):
+        self._verificando = False
+
+        while True:
+            try:
+                tarefa, callback, args = self._resultados.get_nowait()
+            except queue.Empty:
+                break
+            self._em_andamento.pop(tarefa, None)
+            if callback is not None:
+                callback(*args)
+
+        for tarefa, ao_progredir in list(self._em_andamento.items()):
+            if ao_progredir is not None:
+                ao_progredir(tarefa.feito, tarefa.total)
+
+        if self._em_andamento:
+            self._agendar_verificacao()
+
+    def encerrar(self):
+        for tarefa in list(self._em_andamento):
+            tarefa.cancelar()
+        self._pool.shutdown(wait=False)
@@ -0,0 +1,132 @@
+"""Confirmações por WhatsApp em lote."""
+import time
+from datetime import datetime, timedelta
+from urllib.parse import quote
+
+from agenda_nucleo import (
+    atendimentos_do_dia,
+    iso_para_br,
+    nome_do_registro,
+    normalizar_telefone_br,
+)
+
+INTERVALO_ENVIO_S = 8.0   # para o WhatsApp não achar que é spam
+
+MODELO_CONFIRMACAO = (
+    "Olá {primeiro_nome}, tudo bem? Passando pra confirmar seu horário "
+    "{quando} às {hora} ({servico}) na Barbearia Cavalheiros. Posso confirmar?"
+)
+
+def telefone_valido(tel_norm):
+    return bool(tel_norm) and tel_norm.startswith("55") and len(tel_norm) >= 12
+
+def url_whatsapp(tel_norm, mensagem):
+    return f"https://wa.me/{tel_norm}?text={quote(mensagem)}"
+
+def texto_quando(data_iso, hoje=None):
+    """'hoje', 'amanhã' ou 'no dia DD/MM/AAAA'."""
+    hoje = hoje or datetime.now().strftime("%Y-%m-%d")
+    amanha = (datetime.strptime(hoje, "%Y-%m-%d") + timedelta(days=1)).strftime("%Y-%m-%d")
+    if data_iso == hoje:
+        return "hoje"
+    if data_iso == amanha:
+        return "amanhã"
+    return f"no dia {iso_para_br(data_iso)}"
+
+def montar_confirmacoes(agenda, clientes, datas_iso, modelo=MODELO_CONFIRMACAO,
+                        hoje=None, reenviar=False):
+    """
+    Mensagens dos atendimentos pendentes nas datas pedidas.
+
+    Retorna (itens, sem_telefone). Cada item é um dict com data_iso,
+    recurso, hora, cliente, telefone (já normalizado) e mensagem. Quem já
+    recebeu ("confirmacao_enviada") fica de fora, a não ser com reenviar.
+    """
+    telefones = {}  # cada cliente é normalizado uma vez só
+    itens = []
+    sem_telefone = []
+
+    for data_iso in datas_iso:
+        for recurso, hora, slot in atendimentos_do_dia(agenda.get(data_iso)):
+            if slot.get("status", "pendente") != "pendente":
+                continue
+            if slot.get("confirmacao_enviada") and not reenviar:
+                continue
+
+            nome = nome_do_registro(clientes, slot)
+            if nome not in telefones:
+                info = clientes.get(nome, {})
+                tel = slot.get("telefone") or (info.get("tel", "") if isinstance(info, dict) else "")
+                telefones[nome] = normalizar_telefone_br(tel)
+            tel_norm = telefones[nome]
+
+            item = {
+                "data_iso": data_iso,
+                "recurso": recurso,
+                "hora": hora,
+                "cliente": nome,
+                "telefone": tel_norm,
+            }
+            if not telefone_valido(tel_norm):
+                sem_telefone.append(item)
+                continue
+
+            item["mensagem"] = modelo.format(
+                cliente=nome,
+                primeiro_nome=nome.split()[0] if nome.split() else nome,
+                quando=texto_quando(data_iso, hoje),
+                data=iso_para_br(data_iso),
+                hora=hora,
+                servico=slot.get("servico", ""),
+            )
+            itens.append(item)
+
+    itens.sort(key=lambda i: (i["data_iso"], i["hora"], i["recurso"]))
+    return itens, sem_telefone
+
+# ---------- ENVIADORES ----------
+
+def enviar_pelo_navegador(telefone, mensagem):
+    """Abre o WhatsApp (wa.me) com a mensagem pronta no navegador padrão."""
+    import webbrowser
+    if not webbrowser.open(url_whatsapp(telefone, mensagem)):
+        raise OSError("Não foi possível abrir o navegador.")
+
+class EnviadorTeste:
+    """Não manda nada: guarda (telefone, mensagem) e, se pedir, grava em arquivo."""
+
+    def __init__(self, arquivo=None):
+        self.arquivo = arquivo
+        self.enviados = []
+
+    def __call__(self, telefone, mensagem):
+        self.enviados.append((telefone, mensagem))
+        if self.arquivo:
+            with open(self.arquivo, "a", encoding="utf-8") as f:
+                f.write(f"{datetime.now():%Y-%m-%d %H:%M:%S} {telefone} {mensagem}\n")
+
+# ---------- FILA ----------
+
+def enviar_confirmacoes(tarefa, itens, enviar, enviados, falhas, intervalo=INTERVALO_ENVIO_S):
+    """
+    Manda as mensagens em ordem, no máximo uma a cada `intervalo` segundos.
+    Roda em segundo plano: `enviados` e `falhas` (listas da tela) vão
+    sendo preenchidas, então valem mesmo se a tarefa for cancelada no meio.
+    """
+    ultimo = None
+    for pos, item in enumerate(itens):
+        tarefa.passo(pos, len(itens))
+        if ultimo is not None:
+            # espera em pedaços curtos para o Cancelar responder logo
+            while time.monotonic() - ultimo < intervalo:
+                tarefa.passo(pos)
+                time.sleep(min(0.2, intervalo))
+        ultimo = time.monotonic()
+        try:
+            enviar(item["telefone"], item["mensagem"])
+        except Exception as erro:
+            falhas.append((item, str(erro)))
+        else:
+            enviados.append(item)
+    tarefa.passo(len(itens), len(itens))
+    return len(enviados)
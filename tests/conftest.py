@@ -0,0 +1,42 @@
+"""
+Testes dos módulos sem Tkinter.
+
+Os módulos usam caminhos relativos (agenda.json, caixa/, estoque/...):
+cada teste roda numa pasta temporária vazia, nunca na pasta do programa.
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agenda_nucleo import IndiceOcupacao  # noqa: E402
+
+DIA = "2030-01-07"   # segunda-feira, longe de "hoje"
+
+@pytest.fixture(autouse=True)
+def pasta_vazia(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+@pytest.fixture
+def indice():
+    return IndiceOcupacao({})
+
+def atendimento(cliente, servico="Cabelo", duracao=30, **campos):
+    """Slot mínimo como a tela grava."""
+    slot = {
+        "cliente": cliente,
+        "servico": servico,
+        "duracao": duracao,
+        "obs": "",
+        "pago": False,
+        "extras": [],
+        "pacote": False,
+        "pacote_nome": None,
+        "pacote_valor_mensal": 0.0,
+        "status": "pendente",
+    }
+    slot.update(campos)
+    return slot
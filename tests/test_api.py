@@ -0,0 +1,75 @@
+import http.client
+import json
+import threading
+
+import pytest
+
+from agenda_api import ServidorApi
+from agenda_nucleo import CadastroClientes, salvar_clientes
+from conftest import DIA
+
+@pytest.fixture
+def api():
+    clientes = CadastroClientes()
+    clientes["Ana"] = {"nasc": "", "tel": "47999990000"}
+    clientes["Bia"] = {"nasc": "", "tel": "47988880000"}
+    salvar_clientes(clientes)
+    servidor = ServidorApi(("127.0.0.1", 0))
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    conexao = http.client.HTTPConnection("127.0.0.1", servidor.server_address[1], timeout=30)
+
+    def chamar(metodo, caminho, corpo=None):
+        conexao.request(metodo, caminho, body=json.dumps(corpo) if corpo else None,
+                        headers={"Content-Type": "application/json"})
+        resposta = conexao.getresponse()
+        return resposta.status, json.loads(resposta.read())
+
+    yield chamar
+    conexao.close()
+    servidor.shutdown()
+    servidor.server_close()
+
+def disco():
+    with open("agenda.json", "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def test_agendar_grava_e_aparece_no_dia(api):
+    codigo, criado = api("POST", "/agendamentos", {"data": DIA, "hora": "10:00", "cliente": "Ana", "servico": "Cabelo"})
+    assert codigo == 201
+    recurso = criado["recurso"]
+    assert disco()[DIA]["10:00"]["cliente"] == "Ana"
+
+    _codigo, dia = api("GET", f"/dia/{DIA}?recurso={recurso.replace(' ', '%20')}")
+    linhas = {l["hora"]: l for l in dia["recursos"][recurso]}
+    assert linhas["10:00"]["atendimento"]["cliente"] == "Ana"
+
+def test_mesmo_horario_na_mesma_cadeira_e_409(api):
+    corpo = {"data": DIA, "hora": "10:00", "cliente": "Ana", "servico": "Cabelo", "recurso": "Cadeira 1"}
+    assert api("POST", "/agendamentos", corpo)[0] == 201
+    assert api("POST", "/agendamentos", dict(corpo, cliente="Bia"))[0] == 409
+
+def test_entrada_invalida_e_400(api):
+    assert api("POST", "/agendamentos", {"data": "07/01/2030", "hora": "10:00", "cliente": "Ana"})[0] == 400
+    assert api("POST", "/agendamentos", {"data": DIA, "hora": "10:07", "cliente": "Ana", "servico": "Cabelo"})[0] == 400
+    assert api("POST", "/agendamentos", {"data": DIA, "hora": "10:00", "cliente": "Zé", "servico": "Cabelo"})[0] == 400
+    assert api("GET", "/nada")[0] == 404
+
+def test_status_e_cancelar(api):
+    corpo = {"data": DIA, "hora": "10:00", "cliente": "Ana", "servico": "Cabelo", "recurso": "Cadeira 1"}
+    api("POST", "/agendamentos", corpo)
+
+    codigo, alterado = api("POST", f"/agendamentos/{DIA}/10:00/status", {"status": "confirmado", "recurso": "Cadeira 1"})
+    assert (codigo, alterado["status"]) == (200, "confirmado")
+    assert api("POST", f"/agendamentos/{DIA}/10:00/status", {"status": "talvez", "recurso": "Cadeira 1"})[0] == 400
+
+    assert api("DELETE", f"/agendamentos/{DIA}/10:00?recurso=Cadeira%201")[0] == 200
+    assert disco()[DIA]["10:00"] is None
+    assert api("DELETE", f"/agendamentos/{DIA}/10:00?recurso=Cadeira%201")[0] == 404
+
+def test_livres_e_relatorio(api):
+    api("POST", "/agendamentos", {"data": DIA, "hora": "10:00", "cliente": "Ana", "servico": "Cabelo", "recurso": "Cadeira 1"})
+    _codigo, livres = api("GET", f"/livres?data={DIA}&duracao=30&recurso=Cadeira%201")
+    assert "10:00" not in livres["livres"]["Cadeira 1"] and "10:30" in livres["livres"]["Cadeira 1"]
+    _codigo, relatorio = api("GET", f"/relatorio?inicio={DIA}&fim={DIA}")
+    assert relatorio["total_atendimentos"] == 1
+    assert api("GET", f"/relatorio?inicio={DIA}&fim=2030-01-01")[0] == 400
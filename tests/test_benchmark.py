@@ -0,0 +1,67 @@
+import random
+from datetime import date
+
+from agenda_benchmark import gerar_agenda, gerar_clientes, rodar
+from agenda_catalogo import Catalogo
+from agenda_intervalos import hora_para_minutos as minutos
+from agenda_nucleo import CHAVE_VENDAS, atendimentos_do_dia
+
+def registros(agenda):
+    for dia in sorted(agenda):
+        for _recurso, _hora, slot in atendimentos_do_dia(agenda[dia]):
+            yield dia, slot
+
+def test_precos_e_duracoes_saem_do_catalogo():
+    catalogo = Catalogo("catalogo.json", {"Cabelo": 30, "Barba": 20}, {"Cabelo": 50.0, "Barba": 30.0, "Pomada": 40.0})
+    catalogo.alterar("Cabelo", "2030-01-15", preco=60.0)
+    catalogo.alterar("Barba", "2030-01-15", duracao=40)
+    rng = random.Random(1)
+
+    agenda = gerar_agenda(gerar_clientes(20, rng), 1, rng, inicio=date(2030, 1, 1), catalogo=catalogo)
+
+    vistos = set()
+    for dia, slot in registros(agenda):
+        depois = dia >= "2030-01-15"
+        vistos.add((slot["servico"], depois))
+        assert slot["preco"] == catalogo.preco(slot["servico"], dia)
+        assert slot["duracao"] == {"Cabelo": 30, "Barba": 40 if depois else 20}[slot["servico"]]
+        assert all(e == {"nome": "Pomada", "valor": 40.0} for e in slot["extras"])
+    assert {("Cabelo", False), ("Cabelo", True), ("Barba", False), ("Barba", True)} <= vistos
+    vendas = [v for dia in agenda.values() for v in dia.get(CHAVE_VENDAS, [])]
+    assert vendas and all((v["produto"], v["valor"]) == ("Pomada", 40.0) for v in vendas)
+
+def test_gerar_agenda_repete_com_a_mesma_semente():
+    def gerar():
+        rng = random.Random(7)
+        return gerar_agenda(gerar_clientes(30, rng), 1, rng, inicio=date(2030, 1, 1))
+    agenda = gerar()
+    assert agenda == gerar()
+    assert all(date.fromisoformat(dia).weekday() != 6 for dia in agenda)
+
+def test_clientes_fixos_voltam_toda_semana_no_mesmo_horario():
+    rng = random.Random(3)
+    agenda = gerar_agenda(gerar_clientes(40, rng), 1, rng, inicio=date(2030, 1, 1), fracao_pacote=0.2)
+    horarios = {}
+    for dia in agenda:
+        for recurso, hora, slot in atendimentos_do_dia(agenda[dia]):
+            if slot["pacote"]:
+                horarios.setdefault(slot["cliente"], set()).add((date.fromisoformat(dia).weekday(), recurso, hora))
+    assert 0 < len(horarios) <= 8          # um fixo pode cair no horário de outro
+    assert all(len(lugares) == 1 for lugares in horarios.values())
+
+def test_ocupacao_sem_sobreposicao():
+    rng = random.Random(5)
+    agenda = gerar_agenda(gerar_clientes(30, rng), 1, rng, inicio=date(2030, 1, 1), ocupacao=0.9)
+    for dia in agenda:
+        fins = {}
+        for recurso, hora, slot in atendimentos_do_dia(agenda[dia]):
+            inicio = minutos(hora)
+            assert inicio >= fins.get(recurso, 0)
+            fins[recurso] = inicio + slot["duracao"]
+
+def test_rodar_mede_todas_as_operacoes():
+    relatorio = rodar(n_clientes=10, anos=1, repeticoes=1)
+    assert relatorio["dados"]["atendimentos"] > 0
+    assert {r["operacao"] for r in relatorio["resultados"]} >= {"carregar_agenda", "salvar_agenda", "resumo ano"}
+    assert all(r["vezes"] >= 1 and r["media_ms"] >= 0 for r in relatorio["resultados"])
+    assert set(relatorio["memoria_kb"]) == {"carregar_agenda", "salvar_agenda", "resumo ano"}
@@ -0,0 +1,52 @@
+import json
+
+from agenda_nucleo import (
+    CHAVE_CLIENTE_ID,
+    CHAVE_VENDAS,
+    RECURSO_PADRAO,
+    CadastroClientes,
+    adicionar_venda,
+    carregar_clientes,
+    migrar_agenda_para_ids,
+    nome_do_registro,
+    reservar_atendimento,
+    salvar_clientes,
+)
+from conftest import DIA, atendimento
+
+def test_cadastro_antigo_por_nome_ganha_ids():
+    clientes = CadastroClientes({"Ana": {"nascimento": "15/03", "tel": "47999990000"}, "Bia": {}})
+    assert clientes.migrado
+    assert clientes["Ana"] == {"nome": "Ana", "nasc": "15/03", "tel": "47999990000"}
+    assert clientes.id_de("Ana") and clientes.id_de("Ana") != clientes.id_de("Bia")
+
+def test_migrar_agenda_liga_os_registros_ao_id(indice):
+    clientes = CadastroClientes({"Ana": {"tel": ""}})
+    reservar_atendimento(indice, DIA, RECURSO_PADRAO, "10:00", atendimento("Ana"))
+    reservar_atendimento(indice, DIA, RECURSO_PADRAO, "11:00", atendimento("Sem Cadastro"))
+    adicionar_venda(indice, DIA, {"produto": "Pomada", "valor": 40.0, "cliente": "Ana"})
+
+    assert migrar_agenda_para_ids(indice.agenda, clientes) == (2, {DIA}, {"Sem Cadastro"})
+    assert not clientes.migrado
+    assert indice.agenda[DIA]["10:00"][CHAVE_CLIENTE_ID] == clientes.id_de("Ana")
+    assert indice.agenda[DIA][CHAVE_VENDAS][0][CHAVE_CLIENTE_ID] == clientes.id_de("Ana")
+    assert CHAVE_CLIENTE_ID not in indice.agenda[DIA]["11:00"]
+
+def test_renomear_mantem_o_historico(indice):
+    clientes = CadastroClientes({"Ana": {"tel": ""}})
+    reservar_atendimento(indice, DIA, RECURSO_PADRAO, "10:00", atendimento("Ana"))
+    migrar_agenda_para_ids(indice.agenda, clientes)
+
+    id_ana = clientes.renomear("Ana", "Ana Souza")
+
+    assert clientes.id_de("Ana Souza") == id_ana and "Ana" not in clientes
+    assert nome_do_registro(clientes, indice.agenda[DIA]["10:00"]) == "Ana Souza"
+
+def test_gravado_no_formato_novo_e_relido_com_os_mesmos_ids():
+    clientes = CadastroClientes({"Ana": {"tel": ""}})
+    salvar_clientes(clientes)
+    with open("clientes.json", encoding="utf-8") as f:
+        assert json.load(f) == {clientes.id_de("Ana"): {"nome": "Ana", "tel": ""}}
+    relidos = carregar_clientes()
+    assert not relidos.migrado
+    assert relidos.id_de("Ana") == clientes.id_de("Ana")
@@ -0,0 +1,98 @@
+from datetime import datetime
+
+import pytest
+
+from agenda_caixa import (
+    ARQUIVO_LANCAMENTOS,
+    ItensCaixa,
+    LivroCaixa,
+    ler_jsonl,
+    ref_atendimento,
+    ref_venda,
+    valor_a_receber,
+)
+from conftest import DIA, atendimento
+
+MANHA = datetime(2030, 1, 7, 10, 0)
+TARDE = datetime(2030, 1, 7, 15, 0)
+
+def test_totais_por_forma():
+    livro = LivroCaixa()
+    livro.lancar(50, "Pix", ref_atendimento(DIA, "Cadeira 1", "10:00"), atendimento("Ana"), quando=MANHA)
+    livro.lancar(40, "Dinheiro", ref_atendimento(DIA, "Cadeira 1", "11:00"), atendimento("Bia"), quando=MANHA)
+    livro.lancar(35, "Pix", ref_venda(DIA, 0, "v1"), {"produto": "Balm para Barba"}, quando=TARDE)
+    assert livro.totais_do_dia(DIA) == {"Pix": 85.0, "Cartão": 0.0, "Dinheiro": 40.0}
+    assert [l["descricao"] for l in livro.lancamentos_do_dia(DIA)] == ["Cabelo", "Cabelo", "Balm para Barba"]
+
+def test_forma_invalida_nao_lanca():
+    livro = LivroCaixa()
+    with pytest.raises(ValueError):
+        livro.lancar(50, "Cheque", ref_atendimento(DIA, "Cadeira 1", "10:00"))
+    assert ler_jsonl(f"caixa/{ARQUIVO_LANCAMENTOS}") == []
+
+def test_estorno_lanca_o_contrario_e_so_uma_vez():
+    livro = LivroCaixa()
+    original = livro.lancar(50, "Cartão", ref_atendimento(DIA, "Cadeira 1", "10:00"), atendimento("Ana"), quando=MANHA)
+    estorno = livro.estornar(original["id"], quando=TARDE)
+
+    assert estorno["valor"] == -50.0
+    assert estorno["estorno_de"] == original["id"]
+    assert estorno["ref"] == original["ref"]
+    assert livro.estornado(original["id"])
+    assert livro.totais_do_dia(DIA)["Cartão"] == 0.0
+    assert len(livro.lancamentos_do_dia(DIA)) == 2     # o original continua no livro
+    with pytest.raises(ValueError):
+        livro.estornar(original["id"])
+    with pytest.raises(ValueError):
+        livro.estornar(estorno["id"])
+
+def test_outro_terminal_le_os_lancamentos_e_estornos():
+    livro = LivroCaixa()
+    original = livro.lancar(50, "Pix", ref_atendimento(DIA, "Cadeira 1", "10:00"), quando=MANHA)
+    livro.estornar(original["id"], quando=TARDE)
+
+    outro = LivroCaixa()
+    assert outro.estornado(original["id"])
+    assert outro.totais_do_dia(DIA)["Pix"] == 0.0
+
+def test_linha_final_cortada_e_ignorada():
+    livro = LivroCaixa()
+    livro.lancar(50, "Pix", ref_atendimento(DIA, "Cadeira 1", "10:00"), quando=MANHA)
+    with open(f"caixa/{ARQUIVO_LANCAMENTOS}", "a", encoding="utf-8") as f:
+        f.write('{"id": "cortado", "valor"')
+    assert [l["valor"] for l in LivroCaixa().lancamentos_do_dia(DIA)] == [50.0]
+
+def test_fechamento_congela_os_totais_e_confere_a_gaveta():
+    livro = LivroCaixa()
+    livro.lancar(40, "Dinheiro", ref_atendimento(DIA, "Cadeira 1", "10:00"), quando=MANHA)
+    livro.lancar(50, "Pix", ref_atendimento(DIA, "Cadeira 1", "11:00"), quando=MANHA)
+    fechamento = livro.fechar_dia(DIA, {}, contado_dinheiro=35.0, quando=datetime(2030, 1, 7, 12, 0))
+
+    assert fechamento["total_recebido"] == 90.0
+    assert fechamento["diferenca_dinheiro"] == -5.0
+    assert livro.depois_do_fechamento(DIA) == []
+    tarde = livro.lancar(20, "Dinheiro", ref_atendimento(DIA, "Cadeira 1", "14:00"), quando=TARDE)
+    assert livro.depois_do_fechamento(DIA) == [tarde]
+    assert LivroCaixa().fechamento(DIA)["total_recebido"] == 90.0
+
+def test_valor_a_receber():
+    slot = atendimento("Ana", preco=50.0, extras=[{"nome": "Balm para Barba", "valor": 35.0}])
+    assert valor_a_receber(slot, DIA) == 85.0
+    assert valor_a_receber(dict(slot, pacote=True), DIA) == 35.0    # o serviço vai na fatura
+    assert valor_a_receber({"produto": "Minoxidil 10%", "valor": 70.0}) == 70.0
+
+def test_referencia_de_venda_guarda_o_id():
+    assert ref_venda(DIA, 2, "abc") == {"tipo": "venda", "data_iso": DIA, "id": "abc", "pos": 2}
+
+def test_itens_do_caixa_acertam_os_totais_a_cada_troca():
+    itens = ItensCaixa()
+    itens["I1"] = {"total": 50.0, "pago": False}
+    itens["I2"] = {"total": 35.0, "pago": True}
+    assert itens.totais == {"pago": 35.0, "pendente": 50.0}
+
+    itens["I1"] = {"total": 85.0, "pago": True}      # pagou com um extra
+    assert itens.totais == {"pago": 120.0, "pendente": 0.0}
+    del itens["I2"]
+    assert itens.totais == {"pago": 85.0, "pendente": 0.0}
+    itens.clear()
+    assert (len(itens), itens.totais) == (0, {"pago": 0.0, "pendente": 0.0})
@@ -0,0 +1,71 @@
+from datetime import datetime
+
+from agenda_clientes import fundir_clientes, identificar_telefone, indice_referencias, propor_fusoes
+from agenda_nucleo import (
+    CHAVE_CLIENTE_ID,
+    CHAVE_VENDAS,
+    RECURSO_PADRAO,
+    CadastroClientes,
+    adicionar_venda,
+    reservar_atendimento,
+)
+from conftest import DIA, atendimento
+
+def cadastro(**pessoas):
+    clientes = CadastroClientes()
+    for nome, (tel, nasc) in pessoas.items():
+        clientes[nome.replace("_", " ")] = {"nasc": nasc, "tel": tel}
+    return clientes
+
+def test_propor_fusoes_acha_grafias_e_telefone_iguais():
+    clientes = cadastro(
+        Lucas_Cavalheiro=("47999990000", "15/03"),
+        Lucas_Cavaleiro=("", "15/03"),
+        Lucas_Silva=("47988880000", ""),
+        Luquinhas=("(47) 98888-0000", ""),
+        Rafael_Souza=("47977770000", "01/01"),
+    )
+    pares = {(a, b): motivos for _nota, a, b, motivos in propor_fusoes(clientes)}
+    assert ("Lucas Cavaleiro", "Lucas Cavalheiro") in pares
+    assert "mesmo telefone" in pares[("Lucas Silva", "Luquinhas")]
+    assert not any("Rafael Souza" in par for par in pares)
+    assert ("Lucas Cavalheiro", "Lucas Silva") not in pares
+
+def test_fundir_troca_atendimentos_e_vendas_e_completa_o_cadastro(indice):
+    clientes = cadastro(Lucas_Cavalheiro=("", "15/03"), Lucas_Cavaleiro=("47999990000", ""))
+    reservar_atendimento(indice, DIA, RECURSO_PADRAO, "10:00", atendimento(
+        "Lucas Cavaleiro", **{CHAVE_CLIENTE_ID: clientes.id_de("Lucas Cavaleiro")}))
+    adicionar_venda(indice, DIA, {"produto": "Pomada", "valor": 40.0, "cliente": "Lucas Cavaleiro"})
+    referencias = indice_referencias(indice.agenda, clientes)
+
+    trocados, dias = fundir_clientes(indice.agenda, clientes, "Lucas Cavalheiro", "Lucas Cavaleiro", referencias)
+
+    assert (trocados, dias) == (2, {DIA})
+    slot = indice.agenda[DIA]["10:00"]
+    assert (slot["cliente"], slot[CHAVE_CLIENTE_ID]) == ("Lucas Cavalheiro", clientes.id_de("Lucas Cavalheiro"))
+    assert indice.agenda[DIA][CHAVE_VENDAS][0]["cliente"] == "Lucas Cavalheiro"
+    assert "Lucas Cavaleiro" not in clientes
+    assert clientes["Lucas Cavalheiro"] == {"nome": "Lucas Cavalheiro", "nasc": "15/03", "tel": "47999990000"}
+    assert len(referencias["Lucas Cavalheiro"]) == 2 and "Lucas Cavaleiro" not in referencias
+
+def test_telefone_pelo_numero_completo_ou_pelo_final():
+    clientes = cadastro(Ana=("(47) 99999-0000", ""), Bia=("47 9999-0000", ""), Caio=("", ""))
+    assert clientes.nomes_do_telefone("+55 47 99999-0000") == ["Ana"]
+    assert clientes.nomes_do_telefone("9999-0000") == ["Ana", "Bia"]      # sem DDD
+    assert clientes.nomes_do_telefone("123") == []
+
+    clientes["Ana"] = {"nasc": "", "tel": "47988881111"}
+    assert clientes.nomes_do_telefone("47999990000") == ["Bia"]          # sobrou só o final
+    assert clientes.nomes_do_telefone("47988881111") == ["Ana"]
+
+def test_identificar_telefone_traz_o_proximo_atendimento(indice):
+    clientes = cadastro(Ana=("47999990000", ""))
+    id_ana = clientes.id_de("Ana")
+    reservar_atendimento(indice, DIA, RECURSO_PADRAO, "09:00", atendimento("Ana", **{CHAVE_CLIENTE_ID: id_ana}))
+    reservar_atendimento(indice, DIA, RECURSO_PADRAO, "15:00", atendimento("Ana", "Barba", 20, **{CHAVE_CLIENTE_ID: id_ana}))
+
+    achado, = identificar_telefone(clientes, indice.agenda, "47999990000", agora=datetime(2030, 1, 7, 12, 0))
+
+    assert (achado["id"], achado["nome"]) == (id_ana, "Ana")
+    assert achado["proximo"] == (DIA, RECURSO_PADRAO, "15:00", "Barba")
+    assert identificar_telefone(clientes, indice.agenda, "47911112222") == []
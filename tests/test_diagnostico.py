@@ -0,0 +1,59 @@
+import threading
+
+import pytest
+
+import agenda_diagnostico as diagnostico
+from agenda_diagnostico import histograma, medido, registrar, resumo
+
+@pytest.fixture(autouse=True)
+def estatisticas_zeradas():
+    diagnostico.zerar()
+    yield
+    diagnostico.zerar()
+
+def test_desligado_nao_mede(monkeypatch):
+    monkeypatch.setattr(diagnostico, "_ativo", False)
+
+    @medido("soma")
+    def soma(a, b):
+        return a + b
+
+    assert soma(1, 2) == 3
+    assert resumo() == []
+
+def test_ligado_mede_cada_chamada(monkeypatch):
+    monkeypatch.setattr(diagnostico, "_ativo", True)
+
+    @medido("soma")
+    def soma(a, b):
+        return a + b
+
+    soma(1, 2)
+    soma(3, 4)
+    linha, = resumo()
+    assert (linha["operacao"], linha["chamadas"]) == ("soma", 2)
+
+def test_percentis_e_histograma():
+    for ms in range(1, 101):
+        registrar("busca", float(ms))
+    linha, = resumo()
+    assert linha["p50_ms"] == pytest.approx(51.0, abs=1)
+    assert linha["p95_ms"] == pytest.approx(95.0, abs=1)
+    assert linha["maximo_ms"] == 100.0
+    faixas = dict(histograma("busca"))
+    assert faixas["≤ 1 ms"] == 1
+    assert faixas["≤ 100 ms"] == 50
+    assert sum(faixas.values()) == 100
+    assert histograma("outra") == []
+
+def test_registrar_de_varias_threads_nao_perde_amostra():
+    def medir():
+        for _ in range(500):
+            registrar("paralela", 1.0)
+
+    threads = [threading.Thread(target=medir) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert resumo()[0]["chamadas"] == 4000
@@ -0,0 +1,136 @@
+from datetime import datetime
+
+import pytest
+
+from agenda_espera import ListaEspera, novo_pedido
+from agenda_historico import HistoricoAgenda
+from agenda_nucleo import RECURSO_PADRAO, liberar_atendimento, reservar_atendimento
+from conftest import DIA, atendimento
+
+AGORA = datetime(2030, 1, 1, 8, 0)
+OUTRO_DIA = "2030-01-08"
+
+@pytest.fixture
+def espera(indice):
+    # 09:00-10:00 Carlos, 10:00 Ana, 10:30 Davi: cancelar Ana abre só 10:00-10:30
+    reservar_atendimento(indice, DIA, RECURSO_PADRAO, "09:00", atendimento("Carlos", "Cabelo e Barba", 60))
+    reservar_atendimento(indice, DIA, RECURSO_PADRAO, "10:00", atendimento("Ana"))
+    reservar_atendimento(indice, DIA, RECURSO_PADRAO, "10:30", atendimento("Davi"))
+    return ListaEspera(indice)
+
+def pedir(espera, cliente, servico="Cabelo", prioridade=0, minuto=0, **campos):
+    campos.setdefault("janelas", [("09:00", "12:00")])
+    pedido = novo_pedido(cliente, servico, prioridade=prioridade,
+                         quando=datetime(2029, 12, 1, 9, minuto), **campos)
+    return espera.pedir(pedido)
+
+def test_horario_cancelado_vira_oferta(indice, espera):
+    pedido = pedir(espera, "Bia", dias=[0])
+    liberar_atendimento(indice, DIA, RECURSO_PADRAO, "10:00")
+    ofertas = espera.processar(AGORA)
+
+    assert [(o["cliente"], o["data_iso"], o["hora"]) for o in ofertas] == [("Bia", DIA, "10:00")]
+    assert ListaEspera(indice).pedidos[pedido["id"]]["status"] == "oferecido"
+    assert espera.processar(AGORA) == []      # o horário já foi casado
+
+def test_fila_por_prioridade_e_depois_por_ordem_de_chegada(indice, espera):
+    pedir(espera, "Bia", minuto=0)
+    pedir(espera, "Caio", minuto=5)
+    pedir(espera, "Duda", prioridade=1, minuto=10)
+    liberar_atendimento(indice, DIA, RECURSO_PADRAO, "10:00")
+    ofertas = espera.processar(AGORA)
+    assert [(o["cliente"], o["posicao"]) for o in ofertas] == [("Duda", 1), ("Bia", 2), ("Caio", 3)]
+
+def test_pedido_que_nao_cabe_nao_recebe_oferta(indice, espera):
+    pedir(espera, "Bia", "Cabelo e Barba")                  # 60 min num buraco de 30
+    pedir(espera, "Caio", janelas=[("14:00", "18:00")])
+    pedir(espera, "Duda", dias=[2])                        # só quarta
+    pedir(espera, "Eva", ate="2030-01-06")                 # já venceu
+    liberar_atendimento(indice, DIA, RECURSO_PADRAO, "10:00")
+    assert espera.processar(AGORA) == []
+
+def test_remarcar_para_o_mesmo_horario_nao_oferece(indice, espera):
+    pedir(espera, "Bia")
+    slot = liberar_atendimento(indice, DIA, RECURSO_PADRAO, "10:00")
+    reservar_atendimento(indice, DIA, RECURSO_PADRAO, "10:00", dict(slot, obs="mudou"))
+    assert espera.processar(AGORA) == []
+
+def test_aceitar_reserva_e_expira_as_outras_ofertas_da_vaga(indice, espera):
+    pedir(espera, "Bia", minuto=0)
+    caio = pedir(espera, "Caio", minuto=5)
+    liberar_atendimento(indice, DIA, RECURSO_PADRAO, "10:00")
+    primeira, segunda = espera.processar(AGORA)
+
+    slot = espera.aceitar(primeira["id"])
+
+    assert indice.agenda[DIA]["10:00"]["cliente"] == "Bia"
+    assert slot["status"] == "confirmado"
+    assert espera.ofertas[segunda["id"]]["status"] == "expirada"
+    assert espera.pedidos[caio["id"]]["status"] == "aguardando"
+    with pytest.raises(ValueError):
+        espera.aceitar(segunda["id"])
+
+def test_aceitar_horario_ja_ocupado(indice, espera):
+    pedir(espera, "Bia")
+    liberar_atendimento(indice, DIA, RECURSO_PADRAO, "10:00")
+    oferta, = espera.processar(AGORA)
+    reservar_atendimento(indice, DIA, RECURSO_PADRAO, "10:00", atendimento("Ana"))
+    with pytest.raises(ValueError):
+        espera.aceitar(oferta["id"])
+    assert espera.ofertas[oferta["id"]]["status"] == "expirada"
+    assert espera.pedidos[oferta["pedido"]]["status"] == "aguardando"
+
+def test_recusar_devolve_o_pedido_para_a_fila(indice, espera):
+    pedir(espera, "Bia")
+    liberar_atendimento(indice, DIA, RECURSO_PADRAO, "10:00")
+    oferta, = espera.processar(AGORA)
+    espera.recusar(oferta["id"])
+    assert espera.pendentes() == []
+    assert espera.pedidos[oferta["pedido"]]["status"] == "aguardando"
+
+def test_processar_so_os_dias_pedidos(indice, espera):
+    pedir(espera, "Bia", dias=[0, 1])
+    reservar_atendimento(indice, OUTRO_DIA, RECURSO_PADRAO, "10:00", atendimento("Eva"))
+    liberar_atendimento(indice, OUTRO_DIA, RECURSO_PADRAO, "10:00")
+    liberar_atendimento(indice, DIA, RECURSO_PADRAO, "10:00")
+
+    assert [o["data_iso"] for o in espera.processar(AGORA, dias={OUTRO_DIA})] == [OUTRO_DIA]
+    pedir(espera, "Caio")
+    assert [o["cliente"] for o in espera.processar(AGORA)] == ["Caio"]    # DIA ficou anotado
+
+def test_esquecer_descarta_o_dia_que_perdeu_a_gravacao(indice, espera):
+    pedir(espera, "Bia")
+    liberar_atendimento(indice, DIA, RECURSO_PADRAO, "10:00")
+    espera.esquecer(DIA)
+    assert espera.processar(AGORA) == []
+
+def test_dia_que_ja_passou_nao_recebe_oferta(indice, espera):
+    pedir(espera, "Bia")
+    liberar_atendimento(indice, DIA, RECURSO_PADRAO, "10:00")
+    assert espera.processar(datetime(2030, 1, 8, 8, 0)) == []
+
+def test_desfazer_agendamento_oferece_o_horario(indice, espera):
+    historico = HistoricoAgenda(indice)
+    reservar_atendimento(indice, DIA, RECURSO_PADRAO, "11:00", atendimento("Eva"))
+    historico.fechar()
+    pedir(espera, "Bia")
+
+    historico.desfazer()
+
+    assert [(o["cliente"], o["hora"]) for o in espera.processar(AGORA)] == [("Bia", "11:00")]
+
+def test_desfazer_cancelamento_nao_oferece(indice, espera):
+    historico = HistoricoAgenda(indice)
+    pedir(espera, "Bia")
+    liberar_atendimento(indice, DIA, RECURSO_PADRAO, "10:00")
+    historico.fechar()
+    historico.desfazer()
+    assert espera.processar(AGORA) == []
+
+def test_pedido_invalido():
+    with pytest.raises(ValueError):
+        novo_pedido("Bia", "Corte Navalhado")
+    with pytest.raises(ValueError):
+        novo_pedido(" ", "Cabelo")
+    with pytest.raises(ValueError):
+        novo_pedido("Bia", "Cabelo", janelas=[("12:00", "09:00")])
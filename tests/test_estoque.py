@@ -0,0 +1,107 @@
+from datetime import datetime
+
+import pytest
+
+from agenda_arquivo_morto import ArquivoMorto, arquivar_meses
+from agenda_estoque import Estoque
+from agenda_nucleo import (
+    RECURSO_PADRAO,
+    adicionar_venda,
+    atualizar_atendimento,
+    copia_dos_dias,
+    liberar_atendimento,
+    remover_venda,
+    reservar_atendimento,
+)
+from conftest import DIA, atendimento
+
+PRODUTO = "Minoxidil 10%"
+CONTAGEM = datetime(2030, 1, 1, 9, 0)
+
+def venda(qtd=1):
+    return {"produto": PRODUTO, "valor": 70.0 * qtd, "qtd": qtd, "pago": True}
+
+def com_extra(cliente, qtd=1):
+    return atendimento(cliente, extras=[{"nome": PRODUTO, "valor": 70.0, "qtd": qtd}])
+
+@pytest.fixture
+def estoque(indice):
+    estoque = Estoque(indice)
+    estoque.lancar("contagem", PRODUTO, 10, quando=CONTAGEM)
+    return estoque.montar()
+
+def test_produto_sem_contagem_nem_entrada_nao_tem_saldo(indice):
+    assert Estoque(indice).saldo(PRODUTO) is None
+
+def test_saldo_desconta_vendas_e_extras_depois_da_contagem(indice, estoque):
+    adicionar_venda(indice, "2029-12-20", venda(5))          # antes da contagem: já estava fora
+    adicionar_venda(indice, DIA, venda(2))
+    reservar_atendimento(indice, DIA, RECURSO_PADRAO, "10:00", com_extra("Ana"))
+    estoque.lancar("entrada", PRODUTO, 4, quando=datetime(2030, 1, 8, 9, 0))
+    assert estoque.saldo(PRODUTO) == 10 - 2 - 1 + 4
+
+def test_cancelar_e_apagar_devolvem_ao_saldo(indice, estoque):
+    pos = adicionar_venda(indice, DIA, venda(2))
+    reservar_atendimento(indice, DIA, RECURSO_PADRAO, "10:00", com_extra("Ana"))
+    reservar_atendimento(indice, DIA, RECURSO_PADRAO, "11:00", com_extra("Bia", 2))
+    assert estoque.saldo(PRODUTO) == 5
+
+    atualizar_atendimento(indice, DIA, RECURSO_PADRAO, "10:00", status="cancelado")
+    liberar_atendimento(indice, DIA, RECURSO_PADRAO, "11:00")
+    remover_venda(indice, DIA, pos)
+    assert estoque.saldo(PRODUTO) == 10
+
+def test_indice_incremental_bate_com_montar_do_zero(indice, estoque):
+    adicionar_venda(indice, DIA, venda(2))
+    adicionar_venda(indice, DIA, venda(1))
+    remover_venda(indice, DIA, 0)
+    reservar_atendimento(indice, DIA, RECURSO_PADRAO, "10:00", com_extra("Ana", 3))
+    assert estoque.saldo(PRODUTO) == Estoque(indice).saldo(PRODUTO) == 6
+
+def test_minimo_e_alertas(indice, estoque):
+    estoque.lancar("minimo", PRODUTO, 8)
+    assert not estoque.baixo(PRODUTO)
+    adicionar_venda(indice, DIA, venda(2))
+    assert estoque.baixo(PRODUTO)
+    assert estoque.alertas() == [(PRODUTO, 8, 8)]
+
+def test_movimento_invalido(estoque):
+    with pytest.raises(ValueError):
+        estoque.lancar("entrada", PRODUTO, 0)
+    with pytest.raises(ValueError):
+        estoque.lancar("entrada", "Cabelo", 1)       # serviço não tem estoque
+    with pytest.raises(ValueError):
+        estoque.lancar("saida", PRODUTO, 1)
+
+def test_dias_arquivados_continuam_no_saldo(indice):
+    estoque = Estoque(indice, arquivo=ArquivoMorto())
+    estoque.lancar("contagem", PRODUTO, 10, quando=datetime(2029, 12, 1, 9, 0))
+    adicionar_venda(indice, "2029-12-10", venda(3))
+    adicionar_venda(indice, DIA, venda(1))
+    estoque.montar()
+
+    assert arquivar_meses(indice, ArquivoMorto(), ["2029-12"]) == ["2029-12-10"]
+    assert "2029-12-10" not in indice.agenda
+    assert estoque.saldo(PRODUTO) == 6
+
+    # programa reaberto: o dia arquivado só existe no arquivo morto
+    assert Estoque(indice, arquivo=ArquivoMorto()).saldo(PRODUTO) == 6
+
+def test_giro_do_periodo(indice, estoque):
+    adicionar_venda(indice, DIA, venda(2))
+    adicionar_venda(indice, "2030-02-03", venda(1))
+    linha = next(l for l in estoque.giro("2030-01-01", "2030-01-31") if l["produto"] == PRODUTO)
+    assert (linha["vendido"], linha["saldo_fim"]) == (2, 8)
+    assert linha["giro"] == pytest.approx(0.2)
+
+def test_leitura_em_segundo_plano_conta_o_que_mudou_durante_ela(indice):
+    adicionar_venda(indice, DIA, venda(2))
+    estoque = Estoque(indice)
+    estoque.lancar("contagem", PRODUTO, 10, quando=CONTAGEM)
+    copia = copia_dos_dias(indice.agenda)
+    reservar_atendimento(indice, DIA, RECURSO_PADRAO, "10:00", com_extra("Ana", 3))
+    lidos = estoque.ler(copia)
+
+    estoque.instalar(lidos)
+
+    assert estoque.saldo(PRODUTO) == 10 - 2 - 3
@@ -0,0 +1,31 @@
+import csv
+import os
+
+from agenda_exportar import COLUNAS, exportar_csv, linhas_exportacao
+from agenda_nucleo import RECURSO_PADRAO, adicionar_venda, reservar_atendimento
+from conftest import DIA, atendimento
+
+def test_atendimento_extras_e_vendas_do_periodo(indice):
+    reservar_atendimento(indice, DIA, RECURSO_PADRAO, "10:00", atendimento(
+        "Ana", preco=50.0, pago=True, extras=[{"nome": "Pomada", "valor": 35.5}],
+    ))
+    adicionar_venda(indice, DIA, {"produto": "Balm para Barba", "valor": 35.0, "cliente": "Bia", "pago": False})
+    reservar_atendimento(indice, "2030-01-09", RECURSO_PADRAO, "10:00", atendimento("Fora do período"))
+
+    linhas = [dict(zip(COLUNAS, l)) for l in linhas_exportacao(indice.agenda, "2030-01-06", DIA)]
+
+    assert [(l["tipo"], l["cliente"], l["descricao"], l["valor"], l["pago"]) for l in linhas] == [
+        ("ATENDIMENTO", "Ana", "Cabelo", "50,00", "sim"),
+        ("EXTRA", "Ana", "Pomada", "35,50", "sim"),
+        ("VENDA", "Bia", "Balm para Barba", "35,00", "não"),
+    ]
+    assert linhas[0]["data"] == "07/01/2030"
+
+def test_exportar_csv_grava_com_cabecalho(indice):
+    reservar_atendimento(indice, DIA, RECURSO_PADRAO, "10:00", atendimento("Ana", preco=50.0))
+    assert exportar_csv(indice.agenda, "saida.csv", DIA, DIA) == 1
+    with open("saida.csv", encoding="utf-8-sig", newline="") as f:
+        cabecalho, linha = list(csv.reader(f, delimiter=";"))
+    assert tuple(cabecalho) == COLUNAS
+    assert linha[COLUNAS.index("cliente")] == "Ana"
+    assert not os.path.exists("saida.csv.tmp")
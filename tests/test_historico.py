@@ -0,0 +1,123 @@
+import pytest
+
+from agenda_historico import HistoricoAgenda, HistoricoDesatualizado
+from agenda_nucleo import (
+    CHAVE_VENDAS,
+    RECURSO_PADRAO,
+    adicionar_venda,
+    atualizar_atendimento,
+    atualizar_venda,
+    liberar_atendimento,
+    remover_venda,
+    reservar_atendimento,
+)
+from conftest import DIA, atendimento
+
+@pytest.fixture
+def historico(indice):
+    return HistoricoAgenda(indice)
+
+def test_desfazer_e_refazer_um_agendamento(indice, historico):
+    reservar_atendimento(indice, DIA, RECURSO_PADRAO, "10:00", atendimento("Ana", "Cabelo e Barba", 60))
+    operacao = historico.fechar()
+    assert operacao.descricao.startswith("Agendar Ana 10:00")
+
+    historico.desfazer()
+    assert indice.agenda[DIA]["10:00"] is None
+    assert indice.cabe(DIA, RECURSO_PADRAO, "10:30", 30)
+    assert historico.pode_refazer() and not historico.pode_desfazer()
+
+    historico.refazer()
+    assert indice.agenda[DIA]["10:00"]["cliente"] == "Ana"
+    assert not indice.cabe(DIA, RECURSO_PADRAO, "10:30", 30)
+
+def test_remarcar_vira_um_passo_so(indice, historico):
+    reservar_atendimento(indice, DIA, RECURSO_PADRAO, "10:00", atendimento("Ana"))
+    historico.fechar()
+    slot = liberar_atendimento(indice, DIA, RECURSO_PADRAO, "10:00")
+    reservar_atendimento(indice, DIA, RECURSO_PADRAO, "15:00", slot)
+    historico.fechar()
+
+    historico.desfazer()
+    assert indice.agenda[DIA]["10:00"]["cliente"] == "Ana"
+    assert indice.agenda[DIA]["15:00"] is None
+    assert historico.pode_desfazer()    # o agendamento ainda está na pilha
+
+def test_desfazer_alteracao_de_campos(indice, historico):
+    reservar_atendimento(indice, DIA, RECURSO_PADRAO, "10:00", atendimento("Ana"))
+    historico.fechar()
+    atualizar_atendimento(indice, DIA, RECURSO_PADRAO, "10:00", pago=True, status="confirmado")
+    historico.fechar()
+    historico.desfazer()
+    slot = indice.agenda[DIA]["10:00"]
+    assert (slot["pago"], slot["status"]) == (False, "pendente")
+
+def test_desfazer_remocao_de_venda_devolve_na_mesma_posicao(indice, historico):
+    adicionar_venda(indice, DIA, {"produto": "Balm para Barba", "valor": 35.0})
+    adicionar_venda(indice, DIA, {"produto": "Minoxidil 10%", "valor": 70.0})
+    historico.fechar()
+    remover_venda(indice, DIA, 0)
+    historico.fechar()
+
+    historico.desfazer()
+    assert [v["produto"] for v in indice.agenda[DIA][CHAVE_VENDAS]] == ["Balm para Barba", "Minoxidil 10%"]
+    historico.desfazer()
+    assert indice.agenda[DIA][CHAVE_VENDAS] == []
+
+def test_apagar_duas_vendas_na_mesma_posicao_desfaz_as_duas(indice, historico):
+    for produto in ("Balm para Barba", "Minoxidil 10%", "Escova Barba"):
+        adicionar_venda(indice, DIA, {"produto": produto, "valor": 20.0})
+    historico.fechar()
+    remover_venda(indice, DIA, 0)
+    remover_venda(indice, DIA, 0)
+    historico.fechar()
+
+    historico.desfazer()
+    assert [v["produto"] for v in indice.agenda[DIA][CHAVE_VENDAS]] == [
+        "Balm para Barba", "Minoxidil 10%", "Escova Barba",
+    ]
+    historico.refazer()
+    assert [v["produto"] for v in indice.agenda[DIA][CHAVE_VENDAS]] == ["Escova Barba"]
+
+def test_desfazer_venda_criada_e_alterada_no_mesmo_passo(indice, historico):
+    adicionar_venda(indice, DIA, {"produto": "Balm para Barba", "valor": 35.0})
+    historico.fechar()
+    pos = adicionar_venda(indice, DIA, {"produto": "Minoxidil 10%", "valor": 70.0})
+    atualizar_venda(indice, DIA, pos, pago=True)
+    remover_venda(indice, DIA, 0)
+    historico.fechar()
+
+    historico.desfazer()
+    assert [v["produto"] for v in indice.agenda[DIA][CHAVE_VENDAS]] == ["Balm para Barba"]
+    historico.refazer()
+    vendas = indice.agenda[DIA][CHAVE_VENDAS]
+    assert [(v["produto"], v.get("pago")) for v in vendas] == [("Minoxidil 10%", True)]
+
+def test_registro_mudado_por_fora_nao_e_desfeito_pela_metade(indice, historico):
+    reservar_atendimento(indice, DIA, RECURSO_PADRAO, "10:00", atendimento("Ana"))
+    reservar_atendimento(indice, DIA, RECURSO_PADRAO, "11:00", atendimento("Bia"))
+    historico.fechar()
+    indice.agenda[DIA]["11:00"]["pago"] = True     # outro terminal mexeu
+    indice.invalidar(DIA)
+
+    with pytest.raises(HistoricoDesatualizado):
+        historico.desfazer()
+    assert indice.agenda[DIA]["10:00"]["cliente"] == "Ana"
+    assert historico.pode_desfazer()
+
+def test_nova_operacao_limpa_o_refazer(indice, historico):
+    reservar_atendimento(indice, DIA, RECURSO_PADRAO, "10:00", atendimento("Ana"))
+    historico.fechar()
+    historico.desfazer()
+    reservar_atendimento(indice, DIA, RECURSO_PADRAO, "11:00", atendimento("Bia"))
+    historico.fechar()
+    assert not historico.pode_refazer()
+
+def test_desfazer_avisa_os_observadores_de_cada_horario(indice, historico):
+    reservar_atendimento(indice, DIA, RECURSO_PADRAO, "10:00", atendimento("Ana"))
+    historico.fechar()
+    avisos = []
+    indice.observadores.append(lambda dia, lugar: avisos.append((dia, lugar)))
+    historico.desfazer()
+    assert (DIA, None) in avisos
+    assert (DIA, (RECURSO_PADRAO, "10:00")) in avisos
@@ -0,0 +1,44 @@
+from agenda_importar import importar_clientes, ler_contatos, validar_nasc
+
+def escrever(caminho, texto):
+    with open(caminho, "w", encoding="utf-8") as f:
+        f.write(texto)
+    return caminho
+
+def test_csv_com_duplicados_por_nome_e_telefone():
+    caminho = escrever("contatos.csv", (
+        "Nome;Celular;Aniversário\n"
+        "Ana Souza;(47) 99999-0000;15/03/1990\n"
+        "JOSÉ  silva;;\n"
+        "Zé da Barba;47 98888-0000;\n"
+        ";47977770000;\n"
+        "Caio;;31/02\n"
+    ))
+    existentes = {"Jose Silva": {"nasc": "", "tel": ""}, "Zé": {"nasc": "01/01", "tel": "5547988880000"}}
+
+    resultado = importar_clientes(existentes, ler_contatos(caminho))
+
+    assert resultado.novos == ["Ana Souza", "Caio"]
+    assert resultado.clientes["Ana Souza"] == {"nasc": "15/03", "tel": "5547999990000"}
+    assert [(l, existente) for l, _nome, existente in resultado.duplicados] == [(3, "Jose Silva"), (4, "Zé")]
+    assert resultado.invalidos == [(5, "sem nome")]
+    assert [l for l, _texto in resultado.avisos] == [6]
+    assert "Ana Souza" not in existentes
+
+def test_duplicado_completa_o_que_faltava():
+    existentes = {"Ana Souza": {"nasc": "", "tel": ""}}
+    resultado = importar_clientes(existentes, [{"nome": "ana souza", "tel": "47999990000", "nasc": "1990-03-15"}])
+    assert resultado.completados == ["Ana Souza"]
+    assert resultado.clientes["Ana Souza"] == {"nasc": "15/03", "tel": "5547999990000"}
+    assert existentes["Ana Souza"]["tel"] == ""
+
+def test_vcard_com_linha_dobrada_e_celular():
+    caminho = escrever("contatos.vcf", (
+        "BEGIN:VCARD\r\nVERSION:3.0\r\nN:Souza;Ana;;;\r\n"
+        "TEL;TYPE=HOME:4733330000\r\nTEL;TYPE=CELL:47 9999\r\n 9-0000\r\nBDAY:--0315\r\nEND:VCARD\r\n"
+        "BEGIN:VCARD\r\nFN:Bia\r\nEND:VCARD\r\n"
+    ))
+    assert [(c["nome"], c["tel"], validar_nasc(c["nasc"])) for c in ler_contatos(caminho)] == [
+        ("Ana Souza", "47 99999-0000", "15/03"),
+        ("Bia", "", ""),
+    ]
@@ -0,0 +1,28 @@
+import os
+import subprocess
+import sys
+
+import agenda_benchmark
+from agenda_benchmark import modulos_da_interface
+
+def test_modulos_da_interface_so_os_do_topo(tmp_path):
+    caminho = tmp_path / "interface.py"
+    caminho.write_text(
+        "import os\n"
+        "from agenda_nucleo import RECURSOS\n"
+        "import agenda_diagnostico, agenda_nucleo\n"
+        "def abrir():\n"
+        "    import agenda_exportar\n",
+        encoding="utf-8",
+    )
+    assert modulos_da_interface(str(caminho)) == ["agenda_nucleo", "agenda_diagnostico"]
+
+def test_abrir_a_interface_nao_importa_os_modulos_adiados():
+    codigo = (
+        "import sys\n"
+        f"import {', '.join(modulos_da_interface())}\n"
+        "print(sorted(m for m in ('tkcalendar', 'holidays', 'webbrowser') if m in sys.modules))"
+    )
+    ambiente = dict(os.environ, PYTHONPATH=os.path.dirname(agenda_benchmark.__file__))
+    saida = subprocess.run([sys.executable, "-c", codigo], capture_output=True, text=True, env=ambiente, check=True)
+    assert saida.stdout.strip() == "[]"
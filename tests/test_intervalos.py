@@ -0,0 +1,144 @@
+import agenda
+from agenda_intervalos import IntervalosDia, MascaraDia, hora_para_minutos
+from agenda_nucleo import (
+    RECURSO_PADRAO,
+    IndiceOcupacao,
+    horarios_do_dia,
+    liberar_atendimento,
+    linhas_do_dia,
+    reservar_atendimento,
+    slot_em,
+)
+from agenda_sincronia import SincroniaAgenda
+from conftest import DIA, atendimento
+
+def m(hora):
+    return hora_para_minutos(hora)
+
+# ---------- IntervalosDia ----------
+
+def test_adicionar_fora_de_ordem_mantem_inicios_e_fins_ordenados():
+    ints = IntervalosDia()
+    ints.adicionar(m("14:00"), m("15:00"))
+    ints.adicionar(m("09:00"), m("09:30"))
+    ints.adicionar(m("10:00"), m("10:45"))
+    assert list(ints) == [(m("09:00"), m("09:30")), (m("10:00"), m("10:45")), (m("14:00"), m("15:00"))]
+
+def test_em_acha_o_atendimento_que_cobre_o_minuto():
+    ints = IntervalosDia()
+    ints.adicionar(m("10:00"), m("11:00"))
+    assert ints.em(m("10:00")) == m("10:00")
+    assert ints.em(m("10:30")) == m("10:00")
+    assert ints.em(m("11:00")) is None     # o fim é aberto
+    assert ints.em(m("09:59")) is None
+
+def test_sobrepostos_respeita_o_ignorar():
+    ints = IntervalosDia()
+    ints.adicionar(m("09:00"), m("10:00"))
+    ints.adicionar(m("10:00"), m("10:30"))
+    assert ints.sobrepostos(m("09:30"), m("10:15")) == [m("09:00"), m("10:00")]
+    assert ints.sobrepostos(m("09:30"), m("10:15"), ignorar=m("09:00")) == [m("10:00")]
+    assert ints.livre(m("10:30"), m("11:00"))
+
+def test_remover_so_tira_o_inicio_pedido():
+    ints = IntervalosDia()
+    ints.adicionar(m("09:00"), m("09:30"))
+    assert not ints.remover(m("09:15"))
+    assert ints.remover(m("09:00"))
+    assert len(ints) == 0
+
+def test_lacunas_e_inicios_livres():
+    ints = IntervalosDia()
+    ints.adicionar(m("09:00"), m("10:00"))
+    ints.adicionar(m("10:30"), m("11:00"))
+    assert ints.lacunas(m("09:00"), m("12:00")) == [(m("10:00"), m("10:30")), (m("11:00"), m("12:00"))]
+    assert ints.inicios_livres(30, m("09:00"), m("12:00"), 15) == [
+        m("10:00"), m("11:00"), m("11:15"), m("11:30"),
+    ]
+    assert ints.inicios_livres(60, m("09:00"), m("12:00"), 15) == [m("11:00")]
+
+# ---------- IndiceOcupacao ----------
+
+def test_servico_longo_ocupa_os_blocos_seguintes(indice):
+    reservar_atendimento(indice, DIA, RECURSO_PADRAO, "10:00", atendimento("Ana", "Cabelo e Barba", 60))
+    assert indice.inicio_em(DIA, RECURSO_PADRAO, "10:30") == "10:00"
+    assert not indice.cabe(DIA, RECURSO_PADRAO, "10:30", 30)
+    assert not indice.cabe(DIA, RECURSO_PADRAO, "09:45", 30)
+    assert indice.cabe(DIA, RECURSO_PADRAO, "11:00", 30)
+    assert slot_em(indice, DIA, RECURSO_PADRAO, "10:45")[0] == "10:00"
+
+def test_liberar_depois_de_reservar_em_dia_novo_libera_o_horario(indice):
+    # o índice do dia era montado depois de gravar o slot e o intervalo entrava duas vezes
+    reservar_atendimento(indice, DIA, RECURSO_PADRAO, "10:00", atendimento("Ana"))
+    assert len(indice.intervalos(DIA, RECURSO_PADRAO)) == 1
+    liberar_atendimento(indice, DIA, RECURSO_PADRAO, "10:00")
+    assert indice.cabe(DIA, RECURSO_PADRAO, "10:00", 30)
+    assert len(indice.intervalos(DIA, RECURSO_PADRAO)) == 0
+
+def test_reservar_no_mesmo_inicio_troca_o_intervalo(indice):
+    reservar_atendimento(indice, DIA, RECURSO_PADRAO, "10:00", atendimento("Ana", "Cabelo e Barba", 60))
+    reservar_atendimento(indice, DIA, RECURSO_PADRAO, "10:00", atendimento("Ana"))
+    assert list(indice.intervalos(DIA, RECURSO_PADRAO)) == [(m("10:00"), m("10:30"))]
+    assert indice.cabe(DIA, RECURSO_PADRAO, "10:30", 30)
+
+def test_cadeiras_tem_ocupacao_separada(indice):
+    reservar_atendimento(indice, DIA, RECURSO_PADRAO, "10:00", atendimento("Ana"))
+    assert indice.recursos_livres(DIA, "10:00", 30) == ["Cadeira 2"]
+    reservar_atendimento(indice, DIA, "Cadeira 2", "10:00", atendimento("Bia"))
+    assert indice.recursos_livres(DIA, "10:00", 30) == []
+
+def test_fora_do_expediente_nao_cabe(indice):
+    assert not indice.cabe(DIA, RECURSO_PADRAO, "08:30", 30)
+    assert not indice.cabe(DIA, RECURSO_PADRAO, "20:30", 60)
+    assert indice.cabe(DIA, RECURSO_PADRAO, "20:30", 30)
+
+def test_horarios_livres_pula_o_ocupado(indice):
+    reservar_atendimento(indice, DIA, RECURSO_PADRAO, "09:15", atendimento("Ana", duracao=45))
+    livres = indice.horarios_livres(DIA, RECURSO_PADRAO, 30)
+    assert livres[:2] == ["10:00", "10:15"]
+    assert "09:00" not in livres     # 09:00-09:30 bate com 09:15
+
+def test_invalidar_remonta_o_dia_mudado_por_fora(indice):
+    reservar_atendimento(indice, DIA, RECURSO_PADRAO, "10:00", atendimento("Ana"))
+    avisos = []
+    indice.observadores.append(lambda dia, lugar: avisos.append((dia, lugar)))
+    indice.agenda[DIA]["10:00"] = None          # outro terminal cancelou
+    indice.agenda[DIA]["15:00"] = atendimento("Bia", inicio="15:00")
+    indice.invalidar(DIA)
+    assert avisos == [(DIA, None)]
+    assert indice.cabe(DIA, RECURSO_PADRAO, "10:00", 30)
+    assert not indice.cabe(DIA, RECURSO_PADRAO, "15:00", 30)
+
+def test_linhas_do_dia_mostra_inicio_fora_da_grade(indice):
+    reservar_atendimento(indice, DIA, RECURSO_PADRAO, "09:15", atendimento("Ana"))
+    linhas = {h: (inicio, slot) for h, inicio, slot, _motivo in linhas_do_dia(indice, DIA)}
+    assert linhas["09:15"][0] == "09:15"
+    assert linhas["09:30"][0] == "09:15"
+    assert linhas["09:00"] == (None, None)
+
+def test_horarios_do_dia_de_15_em_15_dentro_do_expediente(indice):
+    horarios = horarios_do_dia(indice, DIA)
+    assert horarios[:3] == ["09:00", "09:15", "09:30"]
+    assert horarios[-1] == "20:45"
+    assert "09:07" not in horarios
+
+def test_horarios_do_dia_contam_de_cada_abertura():
+    class Expediente:
+        def mascara(self, dia):
+            return MascaraDia([(m("09:00"), m("12:00")), (m("13:10"), m("14:00"))])
+
+    horarios = horarios_do_dia(IndiceOcupacao({}, Expediente()), DIA)
+    assert "11:45" in horarios and "12:00" not in horarios
+    assert [h for h in horarios if h >= "13:00"] == ["13:10", "13:25", "13:40", "13:55"]
+
+def test_terminal_recusa_inicio_fora_do_passo(monkeypatch, capsys):
+    respostas = iter(["07/01/2030", "Ana", "1", "", "09:07", "9:15"])
+    monkeypatch.setattr("builtins.input", lambda _pergunta="": next(respostas))
+    sincronia = SincroniaAgenda()
+    indice = IndiceOcupacao(sincronia.carregar())
+
+    agenda.agendar_horario(sincronia, indice)
+
+    assert "de 15 em 15 minutos" in capsys.readouterr().out
+    assert indice.agenda[DIA]["09:15"]["cliente"] == "Ana"
+    assert indice.agenda[DIA].get("09:07") is None
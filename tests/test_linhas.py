@@ -0,0 +1,32 @@
+from agenda_nucleo import RECURSO_PADRAO, linhas_do_dia, reservar_atendimento, trocas_de_linhas
+from conftest import DIA, atendimento
+
+def aplicar(tela, trocas):
+    """Como o Listbox: apaga e insere por posição, contando quantas linhas mexeu."""
+    mexidas = 0
+    for de, ate, linhas in trocas:
+        del tela[de:ate]
+        tela[de:de] = linhas
+        mexidas += (ate - de) + len(linhas)
+    return mexidas
+
+def textos(indice):
+    return [f"{h} {slot['cliente'] if slot else 'LIVRE'}" for h, _i, slot, _m in linhas_do_dia(indice, DIA)]
+
+def test_so_as_linhas_que_mudaram_sao_trocadas(indice):
+    tela = []
+    aplicar(tela, trocas_de_linhas(tela, textos(indice)))
+    antes = textos(indice)
+    assert tela == antes
+
+    reservar_atendimento(indice, DIA, RECURSO_PADRAO, "10:00", atendimento("Ana"))
+    depois = textos(indice)
+    assert aplicar(tela, trocas_de_linhas(tela, depois)) == 2
+    assert tela == depois
+
+def test_inserir_e_apagar_no_meio():
+    tela = ["a", "b", "c", "d"]
+    novas = ["a", "x", "y", "c", "e"]
+    aplicar(tela, trocas_de_linhas(tela, novas))
+    assert tela == novas
+    assert trocas_de_linhas(novas, list(novas)) == []
@@ -0,0 +1,93 @@
+from datetime import datetime
+
+import pytest
+
+from agenda_nucleo import (
+    RECURSO_PADRAO,
+    atualizar_atendimento,
+    copia_dos_dias,
+    liberar_atendimento,
+    reservar_atendimento,
+)
+from agenda_pacotes import FaturasPacote, IndicePacotes, conciliar, conciliar_fatura, situacao
+from conftest import atendimento
+
+MES = "2030-01"
+
+def do_pacote(cliente, **campos):
+    return atendimento(cliente, pacote=True, pacote_nome="Mensal", pacote_valor_mensal=150.0, **campos)
+
+@pytest.fixture
+def pacotes(indice):
+    for dia in ("2030-01-07", "2030-01-14", "2030-01-21", "2030-01-28"):
+        reservar_atendimento(indice, dia, RECURSO_PADRAO, "10:00", do_pacote("Ana"))
+    reservar_atendimento(indice, "2030-01-07", RECURSO_PADRAO, "11:00", atendimento("Bia"))
+    return IndicePacotes(indice)
+
+def test_conciliar_conta_por_situacao():
+    ocorrencias = [
+        {"data_iso": "2030-01-07", "status": "confirmado"},
+        {"data_iso": "2030-01-14", "status": "cancelado"},
+        {"data_iso": "2030-01-21", "status": "remarcar"},
+        {"data_iso": "2030-01-28", "status": "pendente"},
+    ]
+    contagem = conciliar(ocorrencias, hoje="2030-01-20")
+    assert contagem == {"previstas": 3, "realizadas": 1, "futuras": 1, "canceladas": 1, "remarcar": 1}
+    assert situacao(contagem) == "1/3 realizadas, 1 por vir, 1 a remarcar, 1 cancelada(s)"
+
+def test_indice_agrupa_por_pacote_e_mes(pacotes):
+    chave = ("Ana", "Mensal")
+    assert [c for c, _info in pacotes.pacotes()] == [chave]
+    assert pacotes.meses(chave) == [MES]
+    assert [o["data_iso"] for o in pacotes.ocorrencias(chave, MES)] == [
+        "2030-01-07", "2030-01-14", "2030-01-21", "2030-01-28",
+    ]
+
+def test_indice_acompanha_as_escritas(indice, pacotes):
+    chave = ("Ana", "Mensal")
+    pacotes.montar()
+    liberar_atendimento(indice, "2030-01-28", RECURSO_PADRAO, "10:00")
+    atualizar_atendimento(indice, "2030-01-21", RECURSO_PADRAO, "10:00", status="cancelado")
+    ocorrencias = pacotes.ocorrencias(chave, MES)
+    assert [(o["data_iso"], o["status"]) for o in ocorrencias] == [
+        ("2030-01-07", "pendente"), ("2030-01-14", "pendente"), ("2030-01-21", "cancelado"),
+    ]
+
+def test_leitura_em_segundo_plano_le_a_copia_e_refaz_o_que_mudou(indice, pacotes):
+    chave = ("Ana", "Mensal")
+    copia = copia_dos_dias(indice.agenda)
+    # enquanto a tarefa lê a cópia, a tela mexe na agenda de verdade
+    atualizar_atendimento(indice, "2030-01-14", RECURSO_PADRAO, "10:00", status="cancelado")
+    liberar_atendimento(indice, "2030-01-28", RECURSO_PADRAO, "10:00")
+    lidos = pacotes.ler(copia)
+    assert not pacotes.montado
+    assert copia["2030-01-14"]["10:00"]["status"] == "pendente"
+
+    pacotes.instalar(lidos)
+
+    assert [(o["data_iso"], o["status"]) for o in pacotes.ocorrencias(chave, MES)] == [
+        ("2030-01-07", "pendente"), ("2030-01-14", "cancelado"), ("2030-01-21", "pendente"),
+    ]
+
+def test_faturar_mes_nao_duplica(indice, pacotes):
+    faturas = FaturasPacote()
+    novas = faturas.faturar_mes(pacotes, MES, quando=datetime(2030, 2, 1, 9, 0))
+    assert [(f["cliente"], f["valor"], f["previstas"]) for f in novas] == [("Ana", 150.0, 4)]
+    assert faturas.faturar_mes(pacotes, MES) == []
+    assert len(FaturasPacote().do_mes(MES)) == 1      # gravado para os outros terminais
+
+def test_mes_so_com_cancelados_nao_fatura(indice, pacotes):
+    for dia in ("2030-01-07", "2030-01-14", "2030-01-21", "2030-01-28"):
+        atualizar_atendimento(indice, dia, RECURSO_PADRAO, "10:00", status="cancelado")
+    assert FaturasPacote().faturar_mes(pacotes, MES) == []
+
+def test_marcar_paga_e_conciliar_fatura(indice, pacotes):
+    faturas = FaturasPacote()
+    fatura = faturas.faturar_mes(pacotes, MES)[0]
+    paga = faturas.marcar_paga(fatura["id"], "Pix", "lanc-1")
+    assert (paga["pago"], paga["forma_pagamento"], paga["lancamento"]) == (True, "Pix", "lanc-1")
+    assert faturas.marcar_paga(fatura["id"])["pago"] is False
+
+    atualizar_atendimento(indice, "2030-01-14", RECURSO_PADRAO, "10:00", status="cancelado")
+    contagem = conciliar_fatura(pacotes, fatura, hoje="2030-01-20")
+    assert (contagem["realizadas"], contagem["futuras"], contagem["canceladas"]) == (1, 2, 1)
@@ -0,0 +1,115 @@
+import json
+import os
+
+import agenda_restaurar
+from agenda_nucleo import (
+    CHAVE_VENDAS,
+    RECURSO_PADRAO,
+    adicionar_venda,
+    atualizar_venda,
+    reservar_atendimento,
+)
+from agenda_restaurar import (
+    VENDA,
+    comparar,
+    ler_dias,
+    listar_backups,
+    restaurar_cliente,
+    restaurar_dia,
+)
+from conftest import DIA, atendimento
+
+OUTRO_DIA = "2030-01-08"
+
+def gravar_backup(agenda, carimbo="20300101-120000"):
+    os.makedirs("backups", exist_ok=True)
+    caminho = os.path.join("backups", f"agenda_{carimbo}.json")
+    with open(caminho, "w", encoding="utf-8") as f:
+        json.dump(agenda, f, ensure_ascii=False, indent=2)
+    return caminho
+
+def test_listar_backups_do_mais_novo_para_o_mais_antigo():
+    gravar_backup({}, "20300101-120000")
+    gravar_backup({}, "20300102-080000")
+    assert [b.carimbo for b in listar_backups()] == ["20300102-080000", "20300101-120000"]
+
+def test_ler_dias_aos_pedacos(monkeypatch):
+    agenda = {f"2030-01-{d:02d}": {"10:00": atendimento(f"Cliente {d}", inicio="10:00")} for d in range(1, 29)}
+    caminho = gravar_backup(agenda)
+    monkeypatch.setattr(agenda_restaurar, "TAMANHO_BLOCO", 64)
+    assert dict(ler_dias(caminho)) == agenda
+    assert [d for d, _dia in ler_dias(caminho, {"2030-01-05"})] == ["2030-01-05"]
+
+def test_comparar_backup_com_a_agenda_em_uso(indice):
+    reservar_atendimento(indice, DIA, RECURSO_PADRAO, "10:00", atendimento("Ana"))
+    caminho = gravar_backup(indice.agenda)
+    reservar_atendimento(indice, DIA, RECURSO_PADRAO, "10:00", atendimento("Ana", pago=True))
+    reservar_atendimento(indice, OUTRO_DIA, RECURSO_PADRAO, "11:00", atendimento("Bia"))
+
+    diferencas = comparar(caminho, indice.agenda)
+
+    assert [(d["data_iso"], d["hora"], d["tipo"], d["campos"]) for d in diferencas] == [
+        (DIA, "10:00", "alterado", ["pago"]),
+        (OUTRO_DIA, "11:00", "novo", []),
+    ]
+
+def test_restaurar_dia(indice):
+    reservar_atendimento(indice, DIA, RECURSO_PADRAO, "10:00", atendimento("Ana"))
+    caminho = gravar_backup(indice.agenda)
+    reservar_atendimento(indice, DIA, RECURSO_PADRAO, "10:00", atendimento("Ana", pago=True))
+    reservar_atendimento(indice, DIA, RECURSO_PADRAO, "15:00", atendimento("Bia"))
+
+    resultado = restaurar_dia(indice, caminho, DIA)
+
+    assert resultado.alterados == 2
+    assert indice.agenda[DIA]["10:00"]["pago"] is False
+    assert indice.agenda[DIA]["15:00"] is None
+    assert indice.cabe(DIA, RECURSO_PADRAO, "15:00", 30)
+
+def test_restaurar_venda_de_backup_sem_id_mantem_o_id(indice):
+    caminho = gravar_backup({DIA: {CHAVE_VENDAS: [
+        {"produto": "Balm para Barba", "valor": 35.0, "cliente": "Ana", "pago": False},
+    ]}})
+    adicionar_venda(indice, DIA, {"produto": "Balm para Barba", "valor": 35.0, "cliente": "Ana", "pago": False})
+    atualizar_venda(indice, DIA, 0, pago=True, forma_pagamento="Pix")
+    id_venda = indice.agenda[DIA][CHAVE_VENDAS][0]["id"]
+
+    assert [(d["recurso"], d["campos"]) for d in comparar(caminho, indice.agenda)] == [
+        (VENDA, ["forma_pagamento", "pago"]),
+    ]
+    restaurar_dia(indice, caminho, DIA)
+
+    venda = indice.agenda[DIA][CHAVE_VENDAS][0]
+    assert venda["id"] == id_venda
+    assert venda["pago"] is False
+    assert "forma_pagamento" not in venda
+
+def test_venda_igual_a_do_backup_sem_id_nao_e_diferenca(indice):
+    caminho = gravar_backup({DIA: {CHAVE_VENDAS: [{"produto": "Balm para Barba", "valor": 35.0}]}})
+    adicionar_venda(indice, DIA, {"produto": "Balm para Barba", "valor": 35.0})
+    assert comparar(caminho, indice.agenda) == []
+
+def test_restaurar_cliente_nao_toca_nos_outros(indice):
+    reservar_atendimento(indice, DIA, RECURSO_PADRAO, "10:00", atendimento("Ana"))
+    reservar_atendimento(indice, DIA, RECURSO_PADRAO, "11:00", atendimento("Caio"))
+    caminho = gravar_backup(indice.agenda)
+    indice.agenda[DIA]["10:00"] = None
+    indice.invalidar(DIA)
+    reservar_atendimento(indice, DIA, RECURSO_PADRAO, "14:00", atendimento("Ana"))
+    reservar_atendimento(indice, DIA, RECURSO_PADRAO, "11:00", atendimento("Caio", pago=True))
+
+    restaurar_cliente(indice, caminho, "Ana")
+
+    assert indice.agenda[DIA]["10:00"]["cliente"] == "Ana"
+    assert indice.agenda[DIA]["14:00"] is None
+    assert indice.agenda[DIA]["11:00"]["pago"] is True
+
+def test_restaurar_cliente_em_horario_de_outro_vira_conflito(indice):
+    reservar_atendimento(indice, DIA, RECURSO_PADRAO, "10:00", atendimento("Ana"))
+    caminho = gravar_backup(indice.agenda)
+    reservar_atendimento(indice, DIA, RECURSO_PADRAO, "10:00", atendimento("Bia"))
+
+    resultado = restaurar_cliente(indice, caminho, "Ana")
+
+    assert [(d, h) for d, _r, h, _motivo in resultado.conflitos] == [(DIA, "10:00")]
+    assert indice.agenda[DIA]["10:00"]["cliente"] == "Bia"
@@ -0,0 +1,154 @@
+import json
+import os
+
+from agenda_nucleo import (
+    CHAVE_VENDAS,
+    RECURSO_PADRAO,
+    IndiceOcupacao,
+    adicionar_venda,
+    reservar_atendimento,
+)
+from agenda_sincronia import (
+    CHAVE_VERSAO,
+    SincroniaAgenda,
+    acrescentar_jsonl,
+    alterar_json,
+    assinatura_arquivo,
+    ler_json,
+    ler_jsonl,
+    mesclar_dia,
+)
+from conftest import DIA, atendimento
+
+def terminal(arquivo="agenda.json"):
+    """Um terminal: a sincronia e o índice sobre a agenda que ela leu."""
+    sincronia = SincroniaAgenda(arquivo)
+    return sincronia, IndiceOcupacao(sincronia.carregar())
+
+def disco(arquivo="agenda.json"):
+    with open(arquivo, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def test_terminais_em_horarios_diferentes_do_mesmo_dia_ficam_os_dois():
+    sinc_a, ind_a = terminal()
+    sinc_b, ind_b = terminal()
+    reservar_atendimento(ind_a, DIA, RECURSO_PADRAO, "10:00", atendimento("Ana"))
+    reservar_atendimento(ind_b, DIA, RECURSO_PADRAO, "14:00", atendimento("Bia"))
+
+    assert not sinc_a.salvar(ind_a.agenda).conflitos
+    resultado = sinc_b.salvar(ind_b.agenda)
+
+    assert resultado.conflitos == []
+    assert DIA in resultado.recarregados
+    gravado = disco()[DIA]
+    assert gravado["10:00"]["cliente"] == "Ana"
+    assert gravado["14:00"]["cliente"] == "Bia"
+    assert gravado[CHAVE_VERSAO] == 2
+    assert ind_b.agenda[DIA]["10:00"]["cliente"] == "Ana"
+
+def test_mesmo_horario_nos_dois_terminais_fica_o_do_disco():
+    sinc_a, ind_a = terminal()
+    sinc_b, ind_b = terminal()
+    reservar_atendimento(ind_a, DIA, RECURSO_PADRAO, "10:00", atendimento("Ana"))
+    reservar_atendimento(ind_b, DIA, RECURSO_PADRAO, "10:00", atendimento("Bia"))
+    sinc_a.salvar(ind_a.agenda)
+
+    resultado = sinc_b.salvar(ind_b.agenda)
+
+    assert [(d, r, h, s["cliente"]) for d, r, h, s in resultado.conflitos] == [
+        (DIA, RECURSO_PADRAO, "10:00", "Bia")
+    ]
+    assert disco()[DIA]["10:00"]["cliente"] == "Ana"
+    assert ind_b.agenda[DIA]["10:00"]["cliente"] == "Ana"
+
+def test_horarios_que_se_sobrepoem_voltam_como_conflito():
+    sinc_a, ind_a = terminal()
+    sinc_b, ind_b = terminal()
+    reservar_atendimento(ind_a, DIA, RECURSO_PADRAO, "10:00", atendimento("Ana", "Cabelo e Barba", 60))
+    reservar_atendimento(ind_b, DIA, RECURSO_PADRAO, "10:30", atendimento("Bia"))
+    sinc_a.salvar(ind_a.agenda)
+
+    resultado = sinc_b.salvar(ind_b.agenda)
+
+    assert [(h, s["cliente"]) for _d, _r, h, s in resultado.conflitos] == [("10:30", "Bia")]
+    assert disco()[DIA]["10:30"] is None
+
+def test_dia_que_so_o_outro_mexeu_e_recarregado_sem_mescla():
+    sinc_a, ind_a = terminal()
+    sinc_b, ind_b = terminal()
+    reservar_atendimento(ind_a, DIA, RECURSO_PADRAO, "10:00", atendimento("Ana"))
+    sinc_a.salvar(ind_a.agenda)
+
+    assert sinc_b.recarregar_alterados(ind_b.agenda) == {DIA}
+    assert ind_b.agenda[DIA]["10:00"]["cliente"] == "Ana"
+    assert sinc_b.recarregar_alterados(ind_b.agenda) == set()   # nada novo: só stat
+
+def test_versao_sobe_a_cada_gravacao_do_dia():
+    sinc, ind = terminal()
+    reservar_atendimento(ind, DIA, RECURSO_PADRAO, "10:00", atendimento("Ana"))
+    sinc.salvar(ind.agenda)
+    reservar_atendimento(ind, DIA, RECURSO_PADRAO, "11:00", atendimento("Bia"))
+    sinc.salvar(ind.agenda)
+    sinc.salvar(ind.agenda)        # sem mudança: a versão fica
+    assert disco()[DIA][CHAVE_VERSAO] == 2
+
+def test_vendas_novas_dos_dois_terminais_sao_juntadas():
+    sinc_a, ind_a = terminal()
+    sinc_b, ind_b = terminal()
+    adicionar_venda(ind_a, DIA, {"produto": "Balm para Barba", "valor": 35.0, "pago": True})
+    adicionar_venda(ind_b, DIA, {"produto": "Minoxidil 10%", "valor": 70.0, "pago": True})
+    sinc_a.salvar(ind_a.agenda)
+    sinc_b.salvar(ind_b.agenda)
+    assert [v["produto"] for v in disco()[DIA][CHAVE_VENDAS]] == ["Balm para Barba", "Minoxidil 10%"]
+
+def test_mesclar_dia_aplica_o_que_cada_lado_mudou():
+    base = {"10:00": None, "11:00": atendimento("Ana", inicio="11:00")}
+    local = {"10:00": atendimento("Bia", inicio="10:00"), "11:00": atendimento("Ana", inicio="11:00")}
+    no_disco = {"10:00": None, "11:00": dict(atendimento("Ana", inicio="11:00"), pago=True)}
+    mesclado, conflitos = mesclar_dia(base, local, no_disco)
+    assert conflitos == []
+    assert mesclado["10:00"]["cliente"] == "Bia"
+    assert mesclado["11:00"]["pago"] is True
+
+def test_arquivo_fora_do_padrao_e_o_que_trava_le_e_grava():
+    os.makedirs("loja")
+    arquivo = os.path.join("loja", "agenda.json")
+    sinc_a, ind_a = terminal(arquivo)
+    sinc_b, ind_b = terminal(arquivo)
+    reservar_atendimento(ind_a, DIA, RECURSO_PADRAO, "10:00", atendimento("Ana"))
+    reservar_atendimento(ind_b, DIA, RECURSO_PADRAO, "10:00", atendimento("Bia"))
+    reservar_atendimento(ind_b, DIA, RECURSO_PADRAO, "14:00", atendimento("Caio"))
+    sinc_a.salvar(ind_a.agenda)
+
+    resultado = sinc_b.salvar(ind_b.agenda)
+
+    assert [h for _d, _r, h, _s in resultado.conflitos] == ["10:00"]
+    gravado = disco(arquivo)[DIA]
+    assert (gravado["10:00"]["cliente"], gravado["14:00"]["cliente"]) == ("Ana", "Caio")
+    assert gravado[CHAVE_VERSAO] == 2
+    assert disco(os.path.join("loja", "agenda_backup.json")) == disco(arquivo)
+    assert not os.path.exists("agenda.json")
+
+def test_alterar_json_rele_o_arquivo_antes_de_gravar():
+    caminho = os.path.join("pasta", "dados.json")
+    assert assinatura_arquivo(caminho) is None
+    alterar_json(caminho, lambda dados: dados.update(a=1))
+    with open(caminho, "w", encoding="utf-8") as f:
+        json.dump({"a": 1, "b": 2}, f)          # outro terminal gravou no meio
+    assert alterar_json(caminho, lambda dados: dados.update(c=3)) == {"a": 1, "b": 2, "c": 3}
+    assert ler_json(caminho) == {"a": 1, "b": 2, "c": 3}
+    assert not os.path.exists(caminho + ".tmp")
+
+def test_arquivo_ilegivel_vale_o_padrao():
+    with open("quebrado.json", "w", encoding="utf-8") as f:
+        f.write('{"a": ')
+    assert ler_json("quebrado.json") == {}
+    assert ler_json("nao_existe.json", []) == []
+
+def test_jsonl_pula_linha_cortada():
+    caminho = os.path.join("caixa", "lancamentos.jsonl")
+    acrescentar_jsonl(caminho, {"id": 1})
+    with open(caminho, "a", encoding="utf-8") as f:
+        f.write('{"id": 2, "val')               # queda de energia no meio da linha
+    acrescentar_jsonl(caminho, {"id": 3})
+    assert [r["id"] for r in ler_jsonl(caminho)] == [1, 3]
@@ -0,0 +1,44 @@
+from agenda_nucleo import RECURSO_PADRAO, CadastroClientes, reservar_atendimento
+from agenda_tarefas import Tarefa
+from agenda_whatsapp import EnviadorTeste, enviar_confirmacoes, montar_confirmacoes
+from conftest import DIA, atendimento
+
+VESPERA = "2030-01-06"
+
+def cadastro():
+    clientes = CadastroClientes()
+    clientes["Ana Souza"] = {"nasc": "", "tel": "(47) 99999-0000"}
+    clientes["Bia"] = {"nasc": "", "tel": "123"}
+    return clientes
+
+def test_so_pendentes_com_telefone_valido(indice):
+    reservar_atendimento(indice, DIA, RECURSO_PADRAO, "14:00", atendimento("Ana Souza"))
+    reservar_atendimento(indice, DIA, RECURSO_PADRAO, "10:00", atendimento("Ana Souza", "Barba", 20))
+    reservar_atendimento(indice, DIA, RECURSO_PADRAO, "11:00", atendimento("Bia"))
+    reservar_atendimento(indice, DIA, RECURSO_PADRAO, "15:00", atendimento("Ana Souza", status="confirmado"))
+    reservar_atendimento(indice, DIA, RECURSO_PADRAO, "16:00", atendimento("Ana Souza", confirmacao_enviada=True))
+
+    itens, sem_telefone = montar_confirmacoes(indice.agenda, cadastro(), [DIA], hoje=VESPERA)
+
+    assert [i["hora"] for i in itens] == ["10:00", "14:00"]
+    assert itens[0]["telefone"] == "5547999990000"
+    assert itens[0]["mensagem"].startswith("Olá Ana, tudo bem?")
+    assert "amanhã às 10:00 (Barba)" in itens[0]["mensagem"]
+    assert [i["cliente"] for i in sem_telefone] == ["Bia"]
+
+    itens, _ = montar_confirmacoes(indice.agenda, cadastro(), [DIA], hoje=VESPERA, reenviar=True)
+    assert [i["hora"] for i in itens] == ["10:00", "14:00", "16:00"]
+
+def test_fila_continua_depois_de_uma_falha():
+    enviador = EnviadorTeste()
+
+    def enviar(telefone, mensagem):
+        if telefone == "falha":
+            raise OSError("sem rede")
+        enviador(telefone, mensagem)
+
+    itens = [{"telefone": t, "mensagem": "oi"} for t in ("5547999990000", "falha", "5547988880000")]
+    enviados, falhas = [], []
+    assert enviar_confirmacoes(Tarefa(), itens, enviar, enviados, falhas, intervalo=0) == 2
+    assert [t for t, _m in enviador.enviados] == ["5547999990000", "5547988880000"]
+    assert [(i["telefone"], erro) for i, erro in falhas] == [("falha", "sem rede")]